@@ -83,6 +83,35 @@ class MarvinConfig(object):
         xyorig (str):
             Globally set the origin point for all your spaxel selections.  Either 'center' or 'lower'.
             Default is 'center'
+        use_api_cache (bool):
+            Set to turn on the persistent on-disk cache of remote API responses. Default is False.
+        api_cache_dir (str):
+            The directory of the API cache.  Defaults to ~/.marvin/cache/api
+        forms_cache_dir (str):
+            The directory of the parameter lookups of the query forms.  Defaults to
+            ~/.marvin/cache/forms
+        api_cache_size (float):
+            The maximum size of the API cache in MB.  The least recently used responses are
+            evicted first.  Default is 2048.
+        maps_cache_size (float):
+            The maximum size in MB of the map data cached by each Maps, so that retrieving a
+            map again does not read it from the file, database, or API.  Set to 0 to disable
+            the cache.  Default is 256.
+        use_routemap_cache (bool):
+            If True, the route map of the API is cached on disk for each server and Marvin
+            version, and revalidated in the background, instead of being requested by each
+            session.  Default is True.
+        use_query_plan_cache (bool):
+            If True, the compiled plans of local queries are cached in memory, so that
+            repeated queries with the same filter and options skip building the query.
+            Default is True.
+        query_plan_cache_size (int):
+            The maximum number of cached query plans.  The least recently used plans are
+            evicted first.  Default is 256.
+        use_spaxel_summary (bool):
+            If True, local ``npergood`` queries select the galaxies with the precomputed
+            spaxel summary of the release, when it has been built, and only count the
+            spaxels of the galaxies it cannot decide.  Default is True.
     '''
     def __init__(self):
 
@@ -101,6 +130,27 @@ class MarvinConfig(object):
         self.add_github_message = True
         self._allowed_releases = {}
 
+        # Persistent cache of remote API responses
+        self.use_api_cache = False
+        self.api_cache_dir = None
+        self.api_cache_size = 2048
+
+        # Stored parameter lookups of the query forms
+        self.forms_cache_dir = None
+
+        # Per-Maps cache of map data
+        self.maps_cache_size = 256
+
+        # Disk cache of the API route map
+        self.use_routemap_cache = True
+
+        # In-memory cache of compiled local query plans
+        self.use_query_plan_cache = True
+        self.query_plan_cache_size = 256
+
+        # Precomputed spaxel summaries for npergood queries
+        self.use_spaxel_summary = True
+
         # Allow DAP queries
         self._allow_DAP_queries = False
 
@@ -325,13 +375,14 @@ class MarvinConfig(object):
 
         if self._urlmap is None or (isinstance(self._urlmap, dict) and len(self._urlmap) == 0):
             try:
-                response = Interaction('/marvin/api/general/getroutemap', request_type='get', auth='netrc')
+                from marvin.api.routemap import get_routemap
+                urlmap = get_routemap()
             except Exception as e:
                 warnings.warn('Cannot retrieve URLMap. Remote functionality will not work: {0}'.format(e),
                               MarvinUserWarning)
                 self.urlmap = URLMapDict()
             else:
-                self.urlmap = response.getRouteMap()
+                self.urlmap = urlmap
 
         return self._urlmap
 
@@ -339,7 +390,11 @@ class MarvinConfig(object):
     def urlmap(self, value):
         """Manually sets the URLMap."""
         self._urlmap = value
-        arg_validate.urlmap = self._urlmap
+
+        # Only updates the API validator if it is in use, to avoid importing it.
+        api_base = sys.modules.get('marvin.api.base', None)
+        if api_base is not None and hasattr(api_base, 'arg_validate'):
+            api_base.arg_validate.urlmap = self._urlmap
 
     @property
     def xyorig(self):
@@ -709,6 +764,7 @@ class MarvinConfig(object):
             # send token request
             url = self.urlmap['api']['login']['url']
             try:
+                from marvin.api.api import Interaction
                 resp = Interaction(url, params=data, auth='netrc')
             except Exception as e:
                 raise MarvinError('Error getting login token. {0}'.format(e))
@@ -719,11 +775,13 @@ class MarvinConfig(object):
 config = MarvinConfig()
 # up to here - time: 1.6 seconds
 
-# Inits the Database session and ModelClasses (time: 1.8 seconds)
+# Inits the Database. The session and ModelClasses (time: 1.8 seconds) are only
+# set up the first time they are needed.
 marvindb = None
 if config.db:
     from marvin.db.marvindb import MarvinDB
-    marvindb = MarvinDB(dbtype=config.db, log=log, allowed_releases=config._allowed_releases.keys())
+    marvindb = MarvinDB(dbtype=config.db, log=log, allowed_releases=config._allowed_releases.keys(),
+                        lazy=True)
 
 # Init MARVIN_DIR
 marvindir = os.environ.get('MARVIN_DIR', None)
@@ -732,10 +790,31 @@ if not marvindir:
     marvindir = moduledir.rsplit('/', 2)[0]
     os.environ['MARVIN_DIR'] = marvindir
 
-from marvin.api.api import Interaction
-from marvin.api.base import arg_validate
+# Provide access to base submodules from the marvin namespace. They, the
+# Interaction class, and the arg_validate of the API (which require flask) are
+# imported the first time they are accessed. Python versions without module
+# __getattr__ import them now.
+_lazy_submodules = ('tools', 'db', 'utils')
+
+
+def __getattr__(name):
+
+    if name in _lazy_submodules:
+        import importlib
+        return importlib.import_module('.' + name, __name__)
+    elif name == 'Interaction':
+        from marvin.api.api import Interaction
+        return Interaction
+    elif name == 'arg_validate':
+        from marvin.api.base import arg_validate
+        return arg_validate
+
+    raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
+
 
-# Provide access to base submodules from the marvin namespace
-from . import tools
-from . import db
-from . import utils
+if sys.version_info < (3, 7):
+    from marvin.api.api import Interaction
+    from marvin.api.base import arg_validate
+    from . import tools
+    from . import db
+    from . import utils
@@ -75,8 +75,13 @@ params = {'query': {'searchfilter': fields.String(allow_none=True),
                     'return_all': fields.Boolean(allow_none=True),
                     'format_type': fields.String(allow_none=True, validate=validate.OneOf(['list', 'listdict', 'dictlist'])),
                     'caching': fields.Boolean(allow_none=True),
+                    'columnar': fields.Boolean(allow_none=True),
                     'query_type': fields.String(allow_none=True, validate=validate.OneOf(['raw', 'core', 'orm']))
                     },
+          'transport': {'compression': fields.String(allow_none=True, validate=validate.OneOf(['json', 'msgpack']))},
+          'spaxels': {'x': fields.DelimitedList(fields.Integer(validate=validate.Range(min=0, max=100)), required=True),
+                      'y': fields.DelimitedList(fields.Integer(validate=validate.Range(min=0, max=100)), required=True)
+                      },
           'search': {'searchbox': fields.String(required=True),
                      'parambox': fields.DelimitedList(fields.String(), allow_none=True)
                      },
@@ -93,7 +98,9 @@ params = {'query': {'searchfilter': fields.String(allow_none=True),
                      'y': fields.String(allow_none=True),
                      'mousecoords[]': fields.List(fields.String(), allow_none=True),
                      'bintemp': fields.String(allow_none=True),
-                     'params[]': fields.List(fields.String(), allow_none=True)
+                     'params[]': fields.List(fields.String(), allow_none=True),
+                     'property': fields.String(allow_none=True),
+                     'format': fields.String(allow_none=True, validate=validate.OneOf(['png', 'binary']))
                      }
           }
 
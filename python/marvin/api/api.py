@@ -12,6 +12,10 @@ Revision History:
 '''
 from __future__ import print_function
 from __future__ import division
+
+import json
+
+import requests
 from brain.api.api import BrainInteraction
 from marvin import config
 
@@ -58,6 +62,15 @@ class Interaction(BrainInteraction):
             All matters when Marvin Query return_all is True.
         base (str):
             Optional replacement for domain API url.
+        cache (bool):
+            If True, the response is retrieved from the persistent
+            :class:`~marvin.api.cache.APICache` if it exists there, and stored in it
+            otherwise. Default is False.
+        iterate (bool):
+            If True, the request is sent with a streamed response whose content is
+            not read. The items of a ``datastream`` route can then be consumed one
+            at a time with :meth:`iterData`, without holding the whole response
+            in memory. Default is False.
 
     Returns:
         results (dict):
@@ -88,6 +101,83 @@ class Interaction(BrainInteraction):
         >>> print(data)
     '''
 
+    def __init__(self, *args, **kwargs):
+
+        self.cache = kwargs.pop('cache', False)
+        self.from_cache = False
+
+        self.iterate = kwargs.pop('iterate', False)
+        self.response = None
+
+        super(Interaction, self).__init__(*args, **kwargs)
+
+    def _sendRequest(self, request_type):
+        """Sends the request, or retrieves the response from the API cache."""
+
+        if self.iterate:
+            return self._openStream(request_type)
+
+        if not self.cache:
+            return super(Interaction, self)._sendRequest(request_type)
+
+        from marvin.api.cache import get_api_cache
+
+        api_cache = get_api_cache()
+
+        self._loadConfigParams()
+        key = api_cache.make_key(self.url, self.params)
+
+        results = api_cache.get(key)
+        if results is not None:
+            self.results = results
+            self.status_code = 200
+            self.from_cache = True
+            return
+
+        super(Interaction, self)._sendRequest(request_type)
+
+        if self.status_code == 200 and self.results and not self.results.get('error', None):
+            api_cache.set(key, self.results)
+
+    def _openStream(self, request_type):
+        """Sends the request, leaving the content of the response unread."""
+
+        self._loadConfigParams()
+
+        kwargs = dict(timeout=self.timeout, headers=self.headers, stream=True)
+        if request_type == 'get':
+            self.response = requests.get(self.url, params=self.params, **kwargs)
+        else:
+            self.response = requests.post(self.url, data=self.params, **kwargs)
+
+        self.status_code = self.response.status_code
+        self.results = {}
+
+        if not self.response.ok:
+            self.response.close()
+            raise requests.HTTPError('Streamed API call failed with status code {0}: {1}'
+                                     .format(self.status_code, self.response.reason),
+                                     response=self.response)
+
+    def iterData(self, delimiter=';\n'):
+        """Yields the items of a streamed response one at a time.
+
+        Only available when the Interaction was created with ``iterate=True``.
+        Each item must be JSON-encoded and terminated by ``delimiter``, as
+        returned by the Marvin ``datastream`` routes with ``compression='json'``.
+
+        """
+
+        assert self.response is not None, 'iterData requires an Interaction with iterate=True'
+
+        try:
+            for line in self.response.iter_lines(delimiter=delimiter.encode('utf-8')):
+                line = line.strip()
+                if line:
+                    yield json.loads(line.decode('utf-8'))
+        finally:
+            self.response.close()
+
     def _loadConfigParams(self):
         """Load the local configuration into a parameters dictionary to be sent with the request"""
 
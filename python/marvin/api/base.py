@@ -11,14 +11,71 @@ Revision History:
 '''
 from __future__ import print_function
 from __future__ import division
+import hashlib
+import json
 from brain.api.base import BrainBaseView
-from brain.utils.general import build_routemap
+from brain.utils.general import build_routemap, compress_data
 from marvin import config
 from marvin.api import ArgValidator, set_api_decorators
-from flask import current_app
+from marvin.utils.db import get_traceback
+from flask import Response, current_app, stream_with_context
 
 
-arg_validate = ArgValidator(urlmap=None)
+# Starts with the URLMap if it was set before this module was imported.
+arg_validate = ArgValidator(urlmap=config._urlmap)
+
+
+def get_app_routemap(app=None):
+    ''' Returns the route map of a Flask app and its ETag
+
+    The route map is only built the first time it is requested for an app,
+    and it is then stored in the app extensions.
+
+    Parameters:
+        app:
+            The Flask app. Defaults to the current app.
+
+    Returns:
+        A tuple of the route map dictionary and its ETag, a hash of its content.
+
+    '''
+
+    app = app if app is not None else current_app._get_current_object()
+
+    if 'marvin_routemap' not in app.extensions:
+        urlmap = build_routemap(app)
+        content = json.dumps(urlmap, sort_keys=True, default=str)
+        etag = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        app.extensions['marvin_routemap'] = (urlmap, etag)
+
+    return app.extensions['marvin_routemap']
+
+
+def _compressed_response(compression, results):
+    ''' Compress the data before sending it back in the Response
+
+    Parameters:
+        compression (str):
+            The compression type.  Either `json` or `msgpack`.
+        results (dict):
+            The current response dictionary
+
+    Returns:
+        A Flask Response object with the compressed data
+    '''
+
+    # pack the data
+    mimetype = 'json' if compression == 'json' else 'octet-stream'
+    try:
+        packed = compress_data(results, compress_with=compression)
+    except Exception as e:
+        results['error'] = str(e)
+        results['traceback'] = get_traceback(asstring=True)
+        # send back the error as json since the data could not be packed
+        mimetype = 'json'
+        packed = json.dumps({'error': results['error'], 'traceback': results['traceback']})
+
+    return Response(stream_with_context(packed), mimetype='application/{0}'.format(mimetype))
 
 
 class BaseView(BrainBaseView):
@@ -42,7 +99,7 @@ class BaseView(BrainBaseView):
 
         # try to get a local version of the urlmap for the arg_validator
         if not arg_validate.urlmap:
-            urlmap = build_routemap(current_app)
+            urlmap, __ = get_app_routemap()
             config.urlmap = urlmap
             arg_validate.urlmap = urlmap
 
@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under a 3-clause BSD license.
+#
+# @Filename: cache.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from marvin import config, log
+from marvin.utils.general import unpack_array
+
+
+__all__ = ('APICache', 'get_api_cache')
+
+
+# Request parameters that do not change the content of a response
+_ignored_params = ('session_id', )
+
+# Name of the npz member containing the JSON-encoded response
+_results_member = '__results__'
+
+
+def _encode(obj, arrays):
+    ''' Replaces arrays and binary array frames in a response by placeholders '''
+
+    if isinstance(obj, np.ndarray) or (isinstance(obj, dict) and 'buffer' in obj):
+        name = 'arr_{0}'.format(len(arrays))
+        arrays[name] = unpack_array(obj)
+        return {'__ndarray__': name}
+    elif isinstance(obj, dict):
+        return {key: _encode(value, arrays) for key, value in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [_encode(value, arrays) for value in obj]
+
+    return obj
+
+
+def _decode(obj, npz):
+    ''' Replaces the placeholders in a cached response by the stored arrays '''
+
+    if isinstance(obj, dict):
+        if '__ndarray__' in obj:
+            return npz[obj['__ndarray__']]
+        return {key: _decode(value, npz) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [_decode(value, npz) for value in obj]
+
+    return obj
+
+
+class APICache(object):
+    ''' A persistent, content-addressed cache of Marvin API responses
+
+    Responses are stored on disk as compressed ``.npz`` files, named after a
+    hash of the request url and parameters (which include the release). Any
+    array in the response is stored as a binary array; the rest of the
+    response is stored as JSON. The total size of the cache is capped at
+    ``max_size`` bytes, evicting the least recently used responses first.
+    Because the cache lives on disk it is shared between processes and
+    sessions.
+
+    Parameters:
+        path (str):
+            The directory where the cache is stored. Defaults to
+            ``~/.marvin/cache/api``.
+        max_size (int):
+            The maximum size of the cache in bytes. If None, the cache size
+            is not capped.
+
+    Attributes:
+        hits (int):
+            The number of requests served from the cache in this session.
+        misses (int):
+            The number of requests not found in the cache in this session.
+
+    Example:
+        >>> from marvin.api.cache import get_api_cache
+        >>> cache = get_api_cache()
+        >>> cache.info()
+        {'hits': 12, 'misses': 3, 'hit_rate': 0.8, 'nfiles': 3, 'size': 104857600, ...}
+
+    '''
+
+    def __init__(self, path=None, max_size=None):
+
+        self.path = path or os.path.join(os.path.expanduser('~'), '.marvin', 'cache', 'api')
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return '<APICache (path={0!r}, hits={1}, misses={2})>'.format(self.path, self.hits,
+                                                                      self.misses)
+
+    @staticmethod
+    def make_key(url, params=None):
+        ''' Returns the cache key for a request
+
+        Parameters:
+            url (str):
+                The full url of the request.
+            params (dict):
+                The parameters sent with the request.
+
+        Returns:
+            A hexadecimal hash string.
+
+        '''
+
+        params = {key: value for key, value in (params or {}).items()
+                  if key not in _ignored_params}
+        request = json.dumps({'url': url, 'params': params}, sort_keys=True, default=str)
+
+        return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+    def _get_filepath(self, key):
+        ''' Returns the path of the file for a cache key '''
+        return os.path.join(self.path, key[:2], '{0}.npz'.format(key))
+
+    def _list_files(self):
+        ''' Returns a list of (path, size, last access time) for all the cached files '''
+
+        files = []
+        for filepath in glob.glob(os.path.join(self.path, '*', '*.npz')):
+            try:
+                stat = os.stat(filepath)
+            except OSError:
+                continue
+            files.append((filepath, stat.st_size, stat.st_mtime))
+
+        return files
+
+    def get(self, key):
+        ''' Returns the cached response for a key or None if it is not cached '''
+
+        filepath = self._get_filepath(key)
+
+        if not os.path.exists(filepath):
+            self.misses += 1
+            return None
+
+        try:
+            with np.load(filepath, allow_pickle=False) as npz:
+                results = _decode(json.loads(npz[_results_member].item()), npz)
+        except Exception as ee:
+            log.debug('removing unreadable API cache file {0}: {1}'.format(filepath, ee))
+            self._remove(filepath)
+            self.misses += 1
+            return None
+
+        # Touches the file so that the eviction is least recently used.
+        try:
+            os.utime(filepath, None)
+        except OSError:
+            pass
+
+        self.hits += 1
+
+        return results
+
+    def set(self, key, results):
+        ''' Stores a response in the cache
+
+        Parameters:
+            key (str):
+                The cache key, as returned by `make_key`.
+            results (dict):
+                The response dictionary.
+
+        Returns:
+            True if the response was stored, False if it cannot be serialised.
+
+        '''
+
+        arrays = {}
+        try:
+            encoded = json.dumps(_encode(results, arrays))
+        except (TypeError, ValueError):
+            return False
+
+        filepath = self._get_filepath(key)
+        dirname = os.path.dirname(filepath)
+        if not os.path.exists(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                pass
+
+        # Writes to a temporary file and then moves it in place so that other
+        # processes never read a partial file.
+        fd, tmppath = tempfile.mkstemp(suffix='.tmp', dir=dirname)
+        try:
+            with os.fdopen(fd, 'wb') as fileobj:
+                arrays[_results_member] = np.array(encoded)
+                np.savez_compressed(fileobj, **arrays)
+            os.rename(tmppath, filepath)
+        except (IOError, OSError) as ee:
+            log.debug('failed writing API cache file {0}: {1}'.format(filepath, ee))
+            self._remove(tmppath)
+            return False
+
+        self.evict()
+
+        return True
+
+    def evict(self):
+        ''' Removes the least recently used responses until the cache fits in ``max_size`` '''
+
+        if self.max_size is None:
+            return
+
+        files = self._list_files()
+        size = sum(ff[1] for ff in files)
+
+        for filepath, filesize, __ in sorted(files, key=lambda ff: ff[2]):
+            if size <= self.max_size:
+                break
+            self._remove(filepath)
+            size -= filesize
+
+    def clear(self):
+        ''' Removes all the cached responses and resets the counters '''
+
+        for filepath, __, __ in self._list_files():
+            self._remove(filepath)
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _remove(filepath):
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
+
+    @property
+    def size(self):
+        ''' The size of the cache in bytes '''
+        return sum(ff[1] for ff in self._list_files())
+
+    def info(self):
+        ''' Returns a dictionary with the statistics of the cache '''
+
+        files = self._list_files()
+        nrequests = self.hits + self.misses
+
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / nrequests if nrequests > 0 else 0.,
+                'nfiles': len(files), 'size': sum(ff[1] for ff in files),
+                'max_size': self.max_size, 'path': self.path}
+
+
+_api_cache = None
+
+
+def get_api_cache():
+    ''' Returns the `APICache` configured by ``marvin.config``
+
+    The cache directory and size cap are set by the ``api_cache_dir`` and
+    ``api_cache_size`` (in MB) config attributes.
+
+    '''
+
+    global _api_cache
+
+    if _api_cache is None or (config.api_cache_dir and _api_cache.path != config.api_cache_dir):
+        _api_cache = APICache(path=config.api_cache_dir)
+
+    _api_cache.max_size = (int(config.api_cache_size * 1024 ** 2)
+                           if config.api_cache_size is not None else None)
+
+    return _api_cache
@@ -10,9 +10,9 @@ from flask import jsonify, request, Response
 import json
 
 from marvin import config
-from marvin.api.base import BaseView, arg_validate as av
+from marvin.api.base import BaseView, _compressed_response, arg_validate as av
 from marvin.core.exceptions import MarvinError
-from marvin.utils.general import parseIdentifier, mangaid2plateifu
+from marvin.utils.general import parseIdentifier, mangaid2plateifu, pack_array
 from marvin.tools.cube import Cube
 
 from brain.core.exceptions import BrainError
@@ -220,7 +220,7 @@ class CubeView(BaseView):
 
     @route('/<name>/extensions/<cube_extension>/', methods=['GET', 'POST'],
            endpoint='getExtension')
-    @av.check_args()
+    @av.check_args(use_params='transport')
     def getExtension(self, args, name, cube_extension):
         """Returns the extension for a cube given a plateifu/mangaid.
 
@@ -229,6 +229,8 @@ class CubeView(BaseView):
         :param name: The name of the cube as plate-ifu or mangaid
         :param cube_extension: The name of the cube extension.  Either flux, ivar, or mask.
         :form release: the release of MaNGA
+        :form compression: the response compression. If ``msgpack``, the extension is returned
+            as a binary frame with the dtype, shape, and raw data buffer.
         :form use_file: if True, forces to load the cube from a file.
         :resjson int status: status of response. 1 if good, -1 if bad.
         :resjson string error: error message, null if None
@@ -268,6 +270,7 @@ class CubeView(BaseView):
 
         # Pass the args in and get the cube
         args = self._pop_args(args, arglist=['name', 'cube_extension'])
+        compression = args.pop('compression', None) or config.compression
         cube, res = _getCube(name, use_file=True, **args)
         self.update_results(res)
 
@@ -275,10 +278,11 @@ class CubeView(BaseView):
 
             extension_data = cube.data[cube_extension.upper()].data
 
-            if extension_data is None:
-                self.results['data'] = {'extension_data': None}
-            else:
-                self.results['data'] = {'extension_data': extension_data.tolist()}
+            self.results['data'] = {'extension_data': pack_array(extension_data,
+                                                                 compression=compression)}
+
+        if compression == 'msgpack':
+            return _compressed_response(compression, self.results)
 
         return Response(json.dumps(self.results), mimetype='application/json')
 
@@ -360,3 +364,75 @@ class CubeView(BaseView):
             self.results['data']['wavelength'] = cube._wavelength.tolist()
 
         return Response(json.dumps(self.results), mimetype='application/json')
+
+    @route('/<name>/quantities/', methods=['POST'], endpoint='getCubeQuantitiesSpaxels')
+    @av.check_args(use_params=['spaxels', 'transport'])
+    def getCubeQuantitiesSpaxels(self, args, name):
+        """Returns the quantities for a list of spaxels.
+
+        .. :quickref: Cube; Returns the quantities for a list of spaxels
+
+        :param name: The name of the cube as plate-ifu or mangaid
+        :form release: the release of MaNGA
+        :form x: comma-separated list of x coordinates of the spaxels (origin is ``lower``)
+        :form y: comma-separated list of y coordinates of the spaxels (origin is ``lower``)
+        :form compression: the compression of the response. Either ``json`` or ``msgpack``
+        :resjson int status: status of response. 1 if good, -1 if bad.
+        :resjson string error: error message, null if None
+        :resjson json inconfig: json of incoming configuration
+        :resjson json utahconfig: json of outcoming configuration
+        :resjson string traceback: traceback of an error, null if None
+        :resjson json data: dictionary of returned data
+        :resheader Content-Type: application/json
+        :statuscode 200: no error
+        :statuscode 422: invalid input parameters
+
+        **Example request**:
+
+        .. sourcecode:: http
+
+           POST /marvin/api/cubes/8485-1901/quantities/ HTTP/1.1
+           Host: api.sdss.org
+           Accept: application/json, */*
+
+           release=MPL-5&x=10,11&y=12,12
+
+        **Example response**:
+
+        .. sourcecode:: http
+
+           HTTP/1.1 200 OK
+           Content-Type: application/json
+           {
+              "status": 1,
+              "error": null,
+              "inconfig": {"release": "MPL-5", "x": [10, 11], "y": [12, 12]},
+              "utahconfig": {"release": "MPL-5", "mode": "local"},
+              "traceback": null,
+              "data": {"flux": {"value": [[0,0,..0], [0,0,..0]], "ivar": ...},
+                       "specres": ...}
+              }
+           }
+        """
+
+        xs = args.pop('x')
+        ys = args.pop('y')
+        args = self._pop_args(args, arglist=['name'])
+        compression = args.pop('compression', None) or config.compression
+        cube, res = _getCube(name, **args)
+        self.update_results(res)
+
+        if len(xs) != len(ys):
+            self.results['error'] = 'x and y must have the same number of coordinates'
+        elif cube:
+
+            spaxel_arrays = cube._get_spaxel_arrays(xs, ys)
+
+            self.results['data'] = {quant: {key: pack_array(value, compression=compression)
+                                            for key, value in arrays.items()}
+                                    for quant, arrays in spaxel_arrays.items()}
+
+        if compression == 'msgpack':
+            return _compressed_response(compression, self.results)
+
+        return Response(json.dumps(self.results), mimetype='application/json')
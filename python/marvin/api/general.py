@@ -27,7 +27,7 @@ from brain.utils.general.decorators import public
 from marvin import marvindb, config
 from marvin.utils.general import mangaid2plateifu as mangaid2plateifu
 from marvin.utils.general import get_nsa_data
-from marvin.api.base import arg_validate as av
+from marvin.api.base import arg_validate as av, get_app_routemap
 from flask_jwt_extended import create_access_token
 import json
 
@@ -225,6 +225,50 @@ class GeneralRequestsView(BrainGeneralRequestsView):
 
         return Response(json.dumps(self.results), mimetype='application/json')
 
+    @public
+    @route('/routemap/', endpoint='routemap', methods=['GET'])
+    def get_routemap(self):
+        """Returns the URL route map of the API, with an ETag.
+
+        The route map is built once when the app is created. Clients that
+        send the ETag of their copy in an ``If-None-Match`` header receive an
+        empty 304 response if their copy is current.
+
+        .. :quickref: General; Returns the URL route map of the API
+
+        :reqheader If-None-Match: the ETag of the route map cached by the client
+        :resjson json urlmap: the route map of the API
+        :resheader ETag: the version of the route map
+        :statuscode 200: no error
+        :statuscode 304: the cached route map is current
+
+        **Example request**:
+
+        .. sourcecode:: http
+
+           GET /marvin/api/general/routemap/ HTTP/1.1
+           Host: api.sdss.org
+           If-None-Match: "2f7c2b4e52a1f9d2f3bd76c6c3a0c2dcd6a1a3e0"
+
+        **Example response**:
+
+        .. sourcecode:: http
+
+           HTTP/1.1 304 NOT MODIFIED
+           ETag: "2f7c2b4e52a1f9d2f3bd76c6c3a0c2dcd6a1a3e0"
+
+        """
+
+        urlmap, etag = get_app_routemap()
+
+        self.results['urlmap'] = urlmap
+        self.results['status'] = 1
+
+        response = Response(json.dumps(self.results), mimetype='application/json')
+        response.set_etag(etag)
+
+        return response.make_conditional(request)
+
     @public
     @route('/login/', methods=['POST'], endpoint='login')
     def login(self):
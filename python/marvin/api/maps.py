@@ -432,3 +432,80 @@ class MapsView(marvin.api.base.BaseView):
                                                'mask': mask}
 
         return jsonify(self.results)
+
+    @route('/<name>/<bintype>/<template>/quantities/',
+           methods=['POST'],
+           endpoint='getMapsQuantitiesSpaxels')
+    @marvin.api.base.arg_validate.check_args(use_params=['spaxels', 'transport'])
+    def getMapsQuantitiesSpaxels(self, args, name, bintype, template):
+        """Returns the quantities for a list of spaxels.
+
+        .. :quickref: Maps; Returns the quantities for a list of spaxels
+
+        :param name: The name of the maps as plate-ifu or mangaid
+        :param bintype: The bintype associated with this maps.
+        :param template: The template associated with this maps.
+        :form release: the release of MaNGA
+        :form x: comma-separated list of x coordinates of the spaxels (origin is ``lower``)
+        :form y: comma-separated list of y coordinates of the spaxels (origin is ``lower``)
+        :form compression: the compression of the response. Either ``json`` or ``msgpack``
+        :resjson int status: status of response. 1 if good, -1 if bad.
+        :resjson string error: error message, null if None
+        :resjson json inconfig: json of incoming configuration
+        :resjson json utahconfig: json of outcoming configuration
+        :resjson string traceback: traceback of an error, null if None
+        :resjson json data: dictionary of returned data
+        :resheader Content-Type: application/json
+        :statuscode 200: no error
+        :statuscode 422: invalid input parameters
+
+        **Example request**:
+
+        .. sourcecode:: http
+
+           POST /marvin/api/maps/8485-1901/SPX/GAU-MILESHC/quantities/ HTTP/1.1
+           Host: api.sdss.org
+           Accept: application/json, */*
+
+           release=MPL-5&x=10,11&y=12,12
+
+        **Example response**:
+
+        .. sourcecode:: http
+
+           HTTP/1.1 200 OK
+           Content-Type: application/json
+           {
+              "status": 1,
+              "error": null,
+              "inconfig": {"release": "MPL-5", "x": [10, 11], "y": [12, 12]},
+              "utahconfig": {"release": "MPL-5", "mode": "local"},
+              "traceback": null,
+              "data": {"emline_gflux_ha6564": {"value": [2.3, 2.1], "ivar": ...},
+                       "binid": ...}
+              }
+           }
+        """
+
+        xs = args.pop('x')
+        ys = args.pop('y')
+        args = self._pop_args(args, arglist=['name'])
+        compression = args.pop('compression', None) or marvin.config.compression
+        maps, res = _getMaps(name, **args)
+        self.update_results(res)
+
+        if len(xs) != len(ys):
+            self.results['error'] = 'x and y must have the same number of coordinates'
+        elif maps:
+
+            spaxel_arrays = maps._get_spaxel_arrays(xs, ys)
+
+            self.results['data'] = {
+                quant: {key: marvin.utils.general.pack_array(value, compression=compression)
+                        for key, value in arrays.items()}
+                for quant, arrays in spaxel_arrays.items()}
+
+        if compression == 'msgpack':
+            return marvin.api.base._compressed_response(compression, self.results)
+
+        return jsonify(self.results)
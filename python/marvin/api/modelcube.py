@@ -19,11 +19,11 @@ from flask import Response, jsonify
 from flask_classful import route
 
 from marvin import config
-from marvin.api.base import BaseView
+from marvin.api.base import BaseView, _compressed_response
 from marvin.api.base import arg_validate as av
 from marvin.core.exceptions import MarvinError
 from marvin.tools.modelcube import ModelCube
-from marvin.utils.general import mangaid2plateifu, parseIdentifier
+from marvin.utils.general import mangaid2plateifu, pack_array, parseIdentifier
 
 
 try:
@@ -198,7 +198,7 @@ class ModelCubeView(BaseView):
            methods=['GET', 'POST'], endpoint='getModelCubeExtension')
     @route('/<name>/<bintype>/<template>/extensions/<modelcube_extension>/',
            methods=['GET', 'POST'], endpoint='getModelCubeExtension')
-    @av.check_args()
+    @av.check_args(use_params='transport')
     def getModelCubeExtension(self, args, name, bintype, template, modelcube_extension):
         """Returns the extension for a modelcube given a plateifu/mangaid.
 
@@ -209,6 +209,8 @@ class ModelCubeView(BaseView):
         :param template: The template associated with this modelcube.
         :param modelcube_extension: The name of the cube extension.  Either flux, ivar, or mask.
         :form release: the release of MaNGA
+        :form compression: the response compression. If ``msgpack``, the extension is returned
+            as a binary frame with the dtype, shape, and raw data buffer.
         :resjson int status: status of response. 1 if good, -1 if bad.
         :resjson string error: error message, null if None
         :resjson json inconfig: json of incoming configuration
@@ -247,6 +249,7 @@ class ModelCubeView(BaseView):
 
         # Pass the args in and get the cube
         args = self._pop_args(args, arglist=['name', 'modelcube_extension'])
+        compression = args.pop('compression', None) or config.compression
         modelcube, res = _get_model_cube(name, use_file=True, **args)
         self.update_results(res)
 
@@ -254,10 +257,11 @@ class ModelCubeView(BaseView):
 
             extension_data = modelcube.data[modelcube_extension.upper()].data
 
-            if extension_data is None:
-                self.results['data'] = {'extension_data': None}
-            else:
-                self.results['data'] = {'extension_data': extension_data.tolist()}
+            self.results['data'] = {'extension_data': pack_array(extension_data,
+                                                                 compression=compression)}
+
+        if compression == 'msgpack':
+            return _compressed_response(compression, self.results)
 
         return Response(json.dumps(self.results), mimetype='application/json')
 
@@ -411,3 +415,78 @@ class ModelCubeView(BaseView):
             self.results['data']['wavelength'] = modelcube._wavelength.tolist()
 
         return Response(json.dumps(self.results), mimetype='application/json')
+
+    @route('/<name>/<bintype>/<template>/quantities/',
+           methods=['POST'], endpoint='getModelCubeQuantitiesSpaxels')
+    @av.check_args(use_params=['spaxels', 'transport'])
+    def getModelCubeQuantitiesSpaxels(self, args, name, bintype, template):
+        """Returns the quantities for a list of spaxels.
+
+        .. :quickref: ModelCube; Returns the quantities for a list of spaxels
+
+        :param name: The name of the modelcube as plate-ifu or mangaid
+        :param bintype: The bintype associated with this modelcube.
+        :param template: The template associated with this modelcube.
+        :form release: the release of MaNGA
+        :form x: comma-separated list of x coordinates of the spaxels (origin is ``lower``)
+        :form y: comma-separated list of y coordinates of the spaxels (origin is ``lower``)
+        :form compression: the compression of the response. Either ``json`` or ``msgpack``
+        :resjson int status: status of response. 1 if good, -1 if bad.
+        :resjson string error: error message, null if None
+        :resjson json inconfig: json of incoming configuration
+        :resjson json utahconfig: json of outcoming configuration
+        :resjson string traceback: traceback of an error, null if None
+        :resjson json data: dictionary of returned data
+        :resheader Content-Type: application/json
+        :statuscode 200: no error
+        :statuscode 422: invalid input parameters
+
+        **Example request**:
+
+        .. sourcecode:: http
+
+           POST /marvin/api/modelcubes/8485-1901/SPX/GAU_MILESHC/quantities/ HTTP/1.1
+           Host: api.sdss.org
+           Accept: application/json, */*
+
+           release=MPL-5&x=10,11&y=12,12
+
+        **Example response**:
+
+        .. sourcecode:: http
+
+           HTTP/1.1 200 OK
+           Content-Type: application/json
+           {
+              "status": 1,
+              "error": null,
+              "inconfig": {"release": "MPL-5", "x": [10, 11], "y": [12, 12]},
+              "utahconfig": {"release": "MPL-5", "mode": "local"},
+              "traceback": null,
+              "data": {"binned_flux": {"value": [[0,0,..0], [0,0,..0]], "ivar": ...},
+                       "emline_fit": ...}
+              }
+           }
+        """
+
+        xs = args.pop('x')
+        ys = args.pop('y')
+        args = self._pop_args(args, arglist=['name'])
+        compression = args.pop('compression', None) or config.compression
+        modelcube, res = _get_model_cube(name, **args)
+        self.update_results(res)
+
+        if len(xs) != len(ys):
+            self.results['error'] = 'x and y must have the same number of coordinates'
+        elif modelcube:
+
+            spaxel_arrays = modelcube._get_spaxel_arrays(xs, ys)
+
+            self.results['data'] = {quant: {key: pack_array(value, compression=compression)
+                                            for key, value in arrays.items()}
+                                    for quant, arrays in spaxel_arrays.items()}
+
+        if compression == 'msgpack':
+            return _compressed_response(compression, self.results)
+
+        return Response(json.dumps(self.results), mimetype='application/json')
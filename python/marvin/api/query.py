@@ -16,13 +16,19 @@ from flask import Response, jsonify, redirect, stream_with_context, url_for
 from flask_classful import route
 from marvin import config
 from marvin.api.base import arg_validate as av
-from marvin.api.base import BaseView
+from marvin.api.base import BaseView, _compressed_response
 from marvin.core.exceptions import MarvinError
 from marvin.tools.query import Query, doQuery
 from marvin.utils.datamodel.query.base import bestparams
 from marvin.utils.db import get_traceback
+from marvin.utils.general import pack_table
 from marvin.web.extensions import limiter
 
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
 
 def _recombine_args(args):
     ''' Recombine any list keyword args intro strings '''
@@ -52,8 +58,13 @@ def _get_runtime(query):
     return runtime
 
 
-def _getCubes(searchfilter, **kwargs):
-    """Run query locally at Utah and format the output into the full JSON """
+def _getCubes(searchfilter, columnar=False, **kwargs):
+    """Run query locally at Utah and format the output into the full JSON
+
+    If ``columnar`` is True, the results are returned as an Arrow IPC stream
+    of record batches instead of a list of rows.
+
+    """
 
     # run the query
     q, r = _run_query(searchfilter, **kwargs)
@@ -73,11 +84,14 @@ def _getCubes(searchfilter, **kwargs):
 
     # get results
     results = r.results
+    count = len(results)
+    if columnar:
+        results = pack_table(r.toArrow())
 
     # set up the output
     output = dict(data=results, query=r.showQuery(), chunk=limit,
                   filter=searchfilter, params=q.params, returnparams=returnparams, runtime=_get_runtime(q),
-                  queryparams_order=q._query_params_order, count=len(results), totalcount=r.totalcount)
+                  queryparams_order=q._query_params_order, count=count, totalcount=r.totalcount)
     return output
 
 
@@ -133,30 +147,6 @@ def _get_column(results, colname, format_type=None):
     return column
 
 
-def _compressed_response(compression, results):
-    ''' Compress the data before sending it back in the Response
-
-    Parameters:
-        compression (str):
-            The compression type.  Either `json` or `msgpack`.
-        results (dict):
-            The current response dictionary
-
-    Returns:
-        A Flask Response object with the compressed data
-    '''
-
-    # pack the data
-    mimetype = 'json' if compression == 'json' else 'octet-stream'
-    try:
-        packed = compress_data(results, compress_with=compression)
-    except Exception as e:
-        results['error'] = str(e)
-        results['traceback'] = get_traceback(asstring=True)
-
-    return Response(stream_with_context(packed), mimetype='application/{0}'.format(mimetype))
-
-
 class QueryView(BaseView):
     """Class describing API calls related to queries."""
     decorators = [limiter.limit("60/minute")]
@@ -239,6 +229,7 @@ class QueryView(BaseView):
         :form limit: the limiting number of results to return for large results
         :form sort: a string parameter name to sort on
         :form order: the order of the sort, either ``desc`` or ``asc``
+        :form columnar: if True and the compression is ``msgpack``, data is returned as Arrow record batches
         :resjson int status: status of response. 1 if good, -1 if bad.
         :resjson string error: error message, null if None
         :resjson json inconfig: json of incoming configuration
@@ -296,16 +287,22 @@ class QueryView(BaseView):
            }
 
         '''
-        # if return_all is True, perform a redirect to stream
+        # columnar results are packed as Arrow record batches in a msgpack response
+        columnar = args.pop('columnar', None)
+        columnar = bool(columnar and pyarrow is not None and
+                        args.get('compression', config.compression) == 'msgpack')
+
+        # if return_all is True, perform a redirect to stream, unless the
+        # results are columnar, which are already compact
         return_all = args.get('return_all', None)
-        if return_all:
+        if return_all and not columnar:
             args = _recombine_args(args)
             return redirect(url_for('api.stream', **args))
 
         searchfilter = args.pop('searchfilter', None)
 
         try:
-            res = _getCubes(searchfilter, **args)
+            res = _getCubes(searchfilter, columnar=columnar, **args)
         except MarvinError as e:
             self.results['error'] = str(e)
             self.results['traceback'] = get_traceback(asstring=True)
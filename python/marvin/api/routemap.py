@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under a 3-clause BSD license.
+#
+# @Filename: routemap.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+from brain.core.core import URLMapDict
+
+import marvin
+from marvin import config, log
+
+
+__all__ = ('RouteMapCache', 'get_routemap')
+
+
+# The route serving the route map with an ETag, and the route of older servers.
+_routemap_route = '/marvin/api/general/routemap/'
+_legacy_route = '/marvin/api/general/getroutemap'
+
+# Seconds after which a cached route map is revalidated with the server.
+_revalidate_after = 600
+
+
+class RouteMapCache(object):
+    ''' A disk cache of the URL route maps of Marvin API servers
+
+    Each route map is stored as a JSON file, along with its ETag, and keyed by
+    the url of the server and the Marvin version. Because the cache lives on
+    disk it is shared between processes and sessions.
+
+    Parameters:
+        path (str):
+            The directory where the route maps are stored. Defaults to
+            ``~/.marvin/cache/routemap``.
+
+    '''
+
+    def __init__(self, path=None):
+
+        self.path = path or os.path.join(os.path.expanduser('~'), '.marvin', 'cache', 'routemap')
+
+    def __repr__(self):
+        return '<RouteMapCache (path={0!r})>'.format(self.path)
+
+    def _get_filepath(self, url):
+        ''' Returns the path of the file for the route map of a server '''
+
+        key = json.dumps({'url': url, 'version': marvin.__version__}, sort_keys=True)
+        name = hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+        return os.path.join(self.path, '{0}.json'.format(name))
+
+    def get(self, url):
+        ''' Returns the cached route map of a server
+
+        Returns:
+            A tuple of the route map, its ETag, and the age in seconds of
+            the last validation, or None if the route map is not cached.
+
+        '''
+
+        filepath = self._get_filepath(url)
+
+        try:
+            with open(filepath) as fileobj:
+                cached = json.load(fileobj)
+            age = time.time() - os.stat(filepath).st_mtime
+        except (IOError, OSError, ValueError):
+            return None
+
+        return cached['urlmap'], cached['etag'], age
+
+    def set(self, url, urlmap, etag):
+        ''' Stores the route map of a server and its ETag '''
+
+        filepath = self._get_filepath(url)
+
+        try:
+            if not os.path.exists(self.path):
+                os.makedirs(self.path)
+
+            # Writes to a temporary file and then moves it in place so that
+            # other processes never read a partial file.
+            fd, tmppath = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+            with os.fdopen(fd, 'w') as fileobj:
+                json.dump({'url': url, 'urlmap': urlmap, 'etag': etag}, fileobj)
+            os.rename(tmppath, filepath)
+        except (IOError, OSError) as ee:
+            log.debug('failed writing route map cache file {0}: {1}'.format(filepath, ee))
+            return False
+
+        return True
+
+    def touch(self, url):
+        ''' Marks the cached route map of a server as just validated '''
+
+        try:
+            os.utime(self._get_filepath(url), None)
+        except OSError:
+            pass
+
+    def clear(self):
+        ''' Removes all the cached route maps '''
+
+        if not os.path.exists(self.path):
+            return
+
+        for name in os.listdir(self.path):
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+
+
+def _request_routemap(etag=None):
+    ''' Requests the route map from the server
+
+    Returns:
+        A tuple of the route map and its ETag. The route map is None if the
+        server replied that ``etag`` is current.
+
+    '''
+
+    from marvin.api.api import Interaction
+
+    interaction = Interaction(_routemap_route, request_type='get', auth='netrc', send=False)
+
+    headers = dict(interaction.headers or {})
+    if etag:
+        headers['If-None-Match'] = etag
+
+    response = requests.get(interaction.url, headers=headers, timeout=interaction.timeout)
+
+    if response.status_code == 304:
+        return None, etag
+    elif response.status_code == 404:
+        # Servers without the routemap route.
+        interaction = Interaction(_legacy_route, request_type='get', auth='netrc')
+        return interaction.getRouteMap(), None
+
+    response.raise_for_status()
+
+    return response.json()['urlmap'], response.headers.get('ETag', None)
+
+
+def _revalidate(cache, url, etag):
+    ''' Checks the cached route map against the server, updating the cache if it changed
+
+    Returns:
+        The new route map, or None if the cached one is current or the
+        server cannot be reached.
+
+    '''
+
+    try:
+        urlmap, new_etag = _request_routemap(etag=etag)
+    except Exception as ee:
+        log.debug('cannot revalidate the route map of {0}: {1}'.format(url, ee))
+        return None
+
+    if urlmap is None:
+        cache.touch(url)
+    elif new_etag:
+        cache.set(url, urlmap, new_etag)
+
+    return urlmap
+
+
+def _revalidate_config(cache, url, etag):
+    ''' Revalidates the cached route map and sets it in the config if it changed '''
+
+    urlmap = _revalidate(cache, url, etag)
+
+    # Only replaces the route map if the server has not been changed meanwhile.
+    if urlmap is not None and config.sasurl == url:
+        config.urlmap = URLMapDict(urlmap)
+
+
+def get_routemap(background=True):
+    ''' Returns the URL route map of the current Marvin API server
+
+    If ``config.use_routemap_cache`` is True, the route map is read from a
+    `RouteMapCache`, shared by all the processes, and only requested from the
+    server if it is not cached. A cached route map that has not been
+    validated recently is revalidated with an ``If-None-Match`` request,
+    which only transfers the route map if it has changed.
+
+    Parameters:
+        background (bool):
+            If True, the cached route map is returned immediately and
+            revalidated in a background thread, which updates
+            ``config.urlmap`` if the route map has changed.
+
+    Returns:
+        A `URLMapDict` with the route map.
+
+    '''
+
+    url = config.sasurl
+
+    if not config.use_routemap_cache:
+        return URLMapDict(_request_routemap()[0])
+
+    cache = RouteMapCache()
+    cached = cache.get(url)
+
+    if cached is None:
+        urlmap, etag = _request_routemap()
+        if etag:
+            cache.set(url, urlmap, etag)
+        return URLMapDict(urlmap)
+
+    urlmap, etag, age = cached
+
+    if age > _revalidate_after:
+        if background:
+            thread = threading.Thread(target=_revalidate_config, args=(cache, url, etag))
+            thread.daemon = True
+            thread.start()
+        else:
+            urlmap = _revalidate(cache, url, etag) or urlmap
+
+    return URLMapDict(urlmap)
@@ -13,20 +13,21 @@
 from __future__ import division, print_function
 
 import io
+import json
 import os
 import sys
 
 import numpy
 from brain.core.exceptions import BrainError
-from flask import jsonify
+from flask import Response, jsonify
 from flask_classful import route
 from sdss_access.path import Path
 
 import marvin
-from marvin.api.base import BaseView
+from marvin.api.base import BaseView, _compressed_response
 from marvin.api.base import arg_validate as av
 from marvin.core.exceptions import MarvinError
-from marvin.utils.general import mangaid2plateifu, parseIdentifier
+from marvin.utils.general import mangaid2plateifu, pack_array, parseIdentifier
 
 
 def _getRSS(name, use_file=True, release=None, **kwargs):
@@ -236,3 +237,145 @@ class RSSView(BaseView):
                     self.results['data'][ext.name] = ext.data.tolist()
 
         return jsonify(self.results)
+
+    @route('/<name>/fibers/', methods=['GET', 'POST'], endpoint='getRSSAllFibers')
+    @av.check_args()
+    def getAllFibers(self, args, name):
+        """Returns the flux, ivar, and mask of all the fibres.
+
+        .. :quickref: RSS; Get the flux, ivar, and mask of all the fibres.
+
+        :param name: The name of the cube as plate-ifu or mangaid
+        :form release: the release of MaNGA
+        :resjson int status: status of response. 1 if good, -1 if bad.
+        :resjson string error: error message, null if None
+        :resjson json inconfig: json of incoming configuration
+        :resjson json utahconfig: json of outcoming configuration
+        :resjson string traceback: traceback of an error, null if None
+        :resjson json data: dictionary of returned data
+        :resheader Content-Type: application/json
+        :statuscode 200: no error
+        :statuscode 422: invalid input parameters
+
+        **Example request**:
+
+        .. sourcecode:: http
+
+           GET /marvin/api/rss/8485-1901/fibers/ HTTP/1.1
+           Host: api.sdss.org
+           Accept: application/json, */*
+
+        **Example response**:
+
+        .. sourcecode:: http
+
+           HTTP/1.1 200 OK
+           Content-Type: application/json
+           {
+              "status": 1,
+              "error": null,
+              "inconfig": {"release": "MPL-5"},
+              "utahconfig": {"release": "MPL-5", "mode": "local"},
+              "traceback": null,
+              "data": {"0": [[1., 2., 3., ...], [...], [...]],
+                       "1": [[1., 2., 3., ...], [...], [...]],
+                       ...
+                       "wavelength": [3621.6, 3622.43, 3623.26, ...]
+              }
+           }
+
+        """
+
+        # Pop any args we don't want going into Rss
+        args = self._pop_args(args, arglist='name')
+
+        rss, res = _getRSS(name, **args)
+        self.update_results(res)
+
+        if rss:
+
+            self.results['data'] = {}
+            self.results['data']['wavelength'] = rss.data['WAVE'].data.tolist()
+
+            flux = rss.data['FLUX'].data
+            ivar = rss.data['IVAR'].data
+            mask = rss.data['MASK'].data
+
+            # str keys, as jsonify sorts the keys and cannot mix them with int keys
+            for ii in range(flux.shape[0]):
+                self.results['data'][str(ii)] = [flux[ii].tolist(), ivar[ii].tolist(),
+                                            mask[ii].tolist()]
+
+        return jsonify(self.results)
+
+    @route('/<name>/extensions/', methods=['GET', 'POST'], endpoint='getRSSExtensions')
+    @av.check_args(use_params='transport')
+    def getExtensions(self, args, name):
+        """Returns all the row-stacked RSS arrays, for all the fibres.
+
+        .. :quickref: RSS; Get all the RSS arrays for all the fibres.
+
+        :param name: The name of the cube as plate-ifu or mangaid
+        :form release: the release of MaNGA
+        :form compression: the response compression. If ``msgpack``, each extension is
+            returned as a binary frame with the dtype, shape, and raw data buffer.
+        :resjson int status: status of response. 1 if good, -1 if bad.
+        :resjson string error: error message, null if None
+        :resjson json inconfig: json of incoming configuration
+        :resjson json utahconfig: json of outcoming configuration
+        :resjson string traceback: traceback of an error, null if None
+        :resjson json data: dictionary of returned data
+        :resheader Content-Type: application/json
+        :statuscode 200: no error
+        :statuscode 422: invalid input parameters
+
+        **Example request**:
+
+        .. sourcecode:: http
+
+           GET /marvin/api/rss/8485-1901/extensions/ HTTP/1.1
+           Host: api.sdss.org
+           Accept: application/json, */*
+
+        **Example response**:
+
+        .. sourcecode:: http
+
+           HTTP/1.1 200 OK
+           Content-Type: application/json
+           {
+              "status": 1,
+              "error": null,
+              "inconfig": {"release": "MPL-5"},
+              "utahconfig": {"release": "MPL-5", "mode": "local"},
+              "traceback": null,
+              "data": {"FLUX": [[1., 2., 3., ...], ...]
+                       "IVAR": [[...], ...],
+                       "MASK": [[...], ...],
+                       "WAVE": [3621.6, 3622.43, 3623.26, ...],
+                       ...
+              }
+           }
+
+        """
+
+        # Pop any args we don't want going into Rss
+        args = self._pop_args(args, arglist='name')
+        compression = args.pop('compression', None) or marvin.config.compression
+
+        rss, res = _getRSS(name, **args)
+        self.update_results(res)
+
+        if rss:
+
+            self.results['data'] = {}
+
+            for ext in rss.data:
+                if ext.data is None or ext.name == 'OBSINFO':
+                    continue
+                self.results['data'][ext.name] = pack_array(ext.data, compression=compression)
+
+        if compression == 'msgpack':
+            return _compressed_response(compression, self.results)
+
+        return Response(json.dumps(self.results), mimetype='application/json')
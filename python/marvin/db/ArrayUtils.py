@@ -12,7 +12,10 @@ Revision History:
 '''
 from __future__ import print_function
 from __future__ import division
-from sqlalchemy import type_coerce
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import Integer, tuple_, type_coerce
 from sqlalchemy.dialects.postgresql import *
 
 
@@ -49,3 +52,152 @@ class ARRAY_D(ARRAY):
                 )
             return super_
     comparator_factory = Comparator
+
+
+def _get_array_dtype(column):
+    ''' Returns the numpy dtype matching the item type of an ARRAY column '''
+
+    item_type = getattr(column.type, 'item_type', None)
+    if isinstance(item_type, Integer):
+        return np.int32
+
+    return np.float64
+
+
+def get_spaxel_arrays(session, model, fk_column, pk, columns, shape=None, chunk_size=1000):
+    ''' Reconstructs 3D arrays from the per-spaxel array columns of a table
+
+    Selects ``x``, ``y`` and all the requested array ``columns`` of the spaxels
+    belonging to the parent row ``pk`` in a single query, and streams the rows
+    through a server-side cursor into preallocated ``(nwave, ny, nx)`` arrays.
+    The arrays have the same ordering as the FITS data cube.
+
+    Parameters:
+        session (object):
+            The SQLAlchemy session.
+        model (object):
+            The ModelClass of the spaxel table, e.g. ``datadb.Spaxel``.
+        fk_column (str):
+            The name of the foreign key column to the parent table, e.g. ``cube_pk``.
+        pk (int):
+            The primary key of the parent row.
+        columns (list):
+            The names of the array columns to retrieve.
+        shape (tuple):
+            The ``(ny, nx)`` spatial shape of the cube. If None, it is determined
+            from the maximum ``x`` and ``y`` of the spaxels.
+        chunk_size (int):
+            The number of rows to fetch from the cursor at a time.
+
+    Returns:
+        An ordered dictionary of column name to 3D array. Columns with no data
+        are returned as None.
+
+    '''
+
+    table = model.__table__
+    sql_columns = [table.c[column] for column in columns]
+    names = ', '.join(['x', 'y'] + [column.name for column in sql_columns])
+    where = '{0} = %(pk)s'.format(table.c[fk_column].name)
+
+    conn = session.connection().connection
+
+    if shape is None:
+        cursor = conn.cursor()
+        cursor.execute('SELECT max(y) + 1, max(x) + 1 FROM {0} WHERE {1}'.format(table.fullname, where),
+                       {'pk': pk})
+        shape = cursor.fetchone()
+        cursor.close()
+
+    ny, nx = int(shape[0]), int(shape[1])
+
+    # a named cursor is server-side, so rows are streamed rather than loaded at once
+    cursor = conn.cursor('spaxel_arrays_cursor')
+    cursor.itersize = chunk_size
+    cursor.execute('SELECT {0} FROM {1} WHERE {2}'.format(names, table.fullname, where), {'pk': pk})
+
+    arrays = OrderedDict((column, None) for column in columns)
+
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+
+            xx = np.fromiter((row[0] for row in rows), dtype=int, count=len(rows))
+            yy = np.fromiter((row[1] for row in rows), dtype=int, count=len(rows))
+
+            for ii, column in enumerate(columns):
+                # spaxels with a NULL array are left as zeros
+                valid = [jj for jj, row in enumerate(rows) if row[ii + 2] is not None]
+                if not valid:
+                    continue
+
+                values = np.array([rows[jj][ii + 2] for jj in valid],
+                                  dtype=_get_array_dtype(sql_columns[ii]))
+
+                if arrays[column] is None:
+                    arrays[column] = np.zeros((values.shape[1], ny, nx), dtype=values.dtype)
+
+                arrays[column][:, yy[valid], xx[valid]] = values.T
+    finally:
+        cursor.close()
+
+    return arrays
+
+
+def get_spaxel_values(session, model, fk_column, pk, xs, ys, columns):
+    ''' Retrieves the values of several columns for a list of spaxels
+
+    Selects ``x``, ``y`` and the requested ``columns`` of all the spaxels
+    matching the input coordinates in a single ``(x, y) IN (...)`` query.
+
+    Parameters:
+        session (object):
+            The SQLAlchemy session.
+        model (object):
+            The ModelClass of the spaxel table, e.g. ``datadb.Spaxel``.
+        fk_column (str):
+            The name of the foreign key column to the parent table, e.g. ``cube_pk``.
+        pk (int):
+            The primary key of the parent row.
+        xs,ys (list):
+            The coordinates of the spaxels.
+        columns (list):
+            The names of the columns to retrieve.
+
+    Returns:
+        An ordered dictionary of column name to array, with one element (or
+        row, for array columns) per input coordinate and in the same order.
+        Columns with no data are returned as None. If only some spaxels have no
+        data, the column is returned as a list with None for those spaxels.
+
+    '''
+
+    from marvin.core.exceptions import MarvinError
+
+    coords = [(int(xx), int(yy)) for xx, yy in zip(xs, ys)]
+
+    query = session.query(model.x, model.y, *[getattr(model, column) for column in columns])
+    query = query.filter(getattr(model, fk_column) == pk,
+                         tuple_(model.x, model.y).in_(sorted(set(coords))))
+
+    rows = {(row[0], row[1]): row[2:] for row in query}
+
+    missing = [coord for coord in coords if coord not in rows]
+    if missing:
+        raise MarvinError('no spaxels found in {0} for (x, y) = {1}'.format(
+            model.__tablename__, ', '.join(map(str, missing))))
+
+    values = OrderedDict()
+    for ii, column in enumerate(columns):
+        column_values = [rows[coord][ii] for coord in coords]
+        if all(value is None for value in column_values):
+            values[column] = None
+        elif any(value is None for value in column_values):
+            values[column] = [np.array(value) if value is not None else None
+                              for value in column_values]
+        else:
+            values[column] = np.array(column_values)
+
+    return values
@@ -11,29 +11,58 @@ Revision History:
 
 '''
 from __future__ import print_function, division
-from brain.db.modelGraph import ModelGraph
 import inspect
 
 __author__ = 'Brian Cherinka'
 
 
 class MarvinDB(object):
-    ''' Class designed to handle database related things with Marvin '''
-
-    def __init__(self, dbtype=None, log=None, allowed_releases=None):
+    ''' Class designed to handle database related things with Marvin
+
+    Parameters:
+        dbtype (str):
+            The database machine to connect to.
+        log:
+            The Marvin logger.
+        allowed_releases (list):
+            The releases for which the SpaxelProp tables are set.
+        lazy (bool):
+            If True, the database, its model classes and the session are only
+            set up the first time an attribute that needs them (e.g.,
+            ``session`` or ``isdbconnected``) is accessed.
+
+    '''
+
+    def __init__(self, dbtype=None, log=None, allowed_releases=None, lazy=False):
         self.dbtype = dbtype
-        self.db = None
         self.log = log
         self.allowed_releases = allowed_releases
         self.error = []
-        self.spaxelpropdict = None
-        self.datadb = None
-        self.dapdb = None
-        self.sampledb = None
+        self._initialised = False
+        if not lazy:
+            self._init_the_db()
+
+    def __getattr__(self, name):
+        ''' Initialises the db the first time one of its attributes is needed '''
+
+        # Only called for attributes that are not set, so this is never
+        # reached once the db has been initialised.
+        if name.startswith('_') or self.__dict__.get('_initialised', True):
+            raise AttributeError('{0!r} object has no attribute {1!r}'.format(
+                self.__class__.__name__, name))
+
         self._init_the_db()
 
+        return getattr(self, name)
+
     def _init_the_db(self):
         ''' Initialize the db '''
+        self._initialised = True
+        self.db = None
+        self.spaxelpropdict = None
+        self.datadb = None
+        self.dapdb = None
+        self.sampledb = None
         if self.dbtype:
             self._setupDB()
         if self.db:
@@ -143,12 +172,16 @@ class MarvinDB(object):
 
     def forceDbOff(self):
         ''' Force the database to turn off '''
+        self._initialised = True
         self.db = None
         self.session = None
         self.isdbconnected = False
         self.datadb = None
         self.dapdb = None
         self.sampledb = None
+        self.spaxelpropdict = None
+        self.modelgraph = None
+        self.cache_bits = []
 
     def forceDbOn(self, dbtype=None):
         ''' Force the database to turn on '''
@@ -189,6 +222,7 @@ class MarvinDB(object):
         ''' Initiates the ModelGraph using all available ModelClasses '''
         models = list(filter(None, [self.datadb, self.sampledb, self.dapdb]))
         if models:
+            from brain.db.modelGraph import ModelGraph
             self.modelgraph = ModelGraph(models)
         else:
             self.modelgraph = None
@@ -14,6 +14,7 @@ import marvin.db.models.DataModelClasses as datadb
 import numpy as np
 from astropy.io import fits
 from marvin.core.caching_query import RelationshipCache
+from marvin.db.ArrayUtils import get_spaxel_arrays
 from marvin.db.database import db
 from marvin.utils.datamodel.dap import datamodel
 from sqlalchemy import Float, ForeignKeyConstraint, and_, case, cast, select
@@ -340,28 +341,36 @@ class ModelCube(Base):
     def __repr__(self):
         return '<ModelCube (pk={0}, file={1})'.format(self.pk, self.file_pk)
 
-    def get3DCube(self, extension='flux'):
+    def get3DCube(self, extension='flux', shape=None):
         """Returns a 3D array of ``extension`` from the modelcube spaxels.
 
         For example, ``modelcube.get3DCube('flux')`` will return the original
-        flux cube with the same ordering as the FITS data cube.
-
-        Note that this method seems to be really slow retrieving arrays (this
-        is especially serious for large IFUs).
+        flux cube with the same ordering as the FITS data cube. See
+        `get3DCubes` for the description of ``shape``.
 
         """
 
-        session = db.Session.object_session(self)
-        spaxels = session.query(getattr(ModelSpaxel, extension)).filter(
-            ModelSpaxel.modelcube_pk == self.pk).order_by(ModelSpaxel.x, ModelSpaxel.y).all()
+        return self.get3DCubes([extension], shape=shape)[extension]
+
+    def get3DCubes(self, extensions=('flux', 'ivar', 'mask'), shape=None):
+        """Returns a dictionary of 3D arrays of ``extensions`` from the modelcube spaxels.
 
-        # Assumes cubes are always square (!)
-        nx = ny = int(np.sqrt(len(spaxels)))
-        nwave = len(spaxels[0][0])
+        All the extensions are retrieved in a single query and streamed into
+        preallocated ``(nwave, ny, nx)`` arrays, with the same ordering as the
+        FITS data cube.
 
-        spArray = np.array(spaxels)
+        Parameters:
+            extensions (list):
+                The names of the modelspaxel array columns to retrieve.
+            shape (tuple):
+                The ``(ny, nx)`` spatial shape of the cube. If None, it is
+                determined from the spaxel coordinates.
 
-        return spArray.transpose().reshape((nwave, ny, nx)).transpose(0, 2, 1)
+        """
+
+        session = db.Session.object_session(self)
+        return get_spaxel_arrays(session, ModelSpaxel, 'modelcube_pk', self.pk,
+                                 list(extensions), shape=shape)
 
 
 class ModelSpaxel(Base):
@@ -15,7 +15,7 @@ import numpy as np
 from astropy.io import fits
 from flask_login import UserMixin
 from marvin.core.caching_query import RelationshipCache
-from marvin.db.ArrayUtils import ARRAY_D
+from marvin.db.ArrayUtils import ARRAY_D, get_spaxel_arrays
 from marvin.db.database import db
 from sqlalchemy import and_, func, select  # for aggregate, other functions
 from sqlalchemy.dialects.postgresql import *
@@ -328,28 +328,36 @@ class Cube(Base, ArrayOps):
         bits = hdr.get(newcol, hdr.get(oldcol, None))
         return bits
 
-    def get3DCube(self, extension='flux'):
+    def get3DCube(self, extension='flux', shape=None):
         """Returns a 3D array of ``extension`` from the cube spaxels.
 
         For example, ``cube.get3DCube('flux')`` will return the original
-        flux cube with the same ordering as the FITS data cube.
-
-        Note that this method seems to be really slow retrieving arrays (this
-        is especially serious for large IFUs).
+        flux cube with the same ordering as the FITS data cube. See
+        `get3DCubes` for the description of ``shape``.
 
         """
 
-        session = Session.object_session(self)
-        spaxels = session.query(getattr(Spaxel, extension)).filter(
-            Spaxel.cube_pk == self.pk).order_by(Spaxel.x, Spaxel.y).all()
+        return self.get3DCubes([extension], shape=shape)[extension]
+
+    def get3DCubes(self, extensions=('flux', 'ivar', 'mask'), shape=None):
+        """Returns a dictionary of 3D arrays of ``extensions`` from the cube spaxels.
 
-        # Assumes cubes are always square (!)
-        nx = ny = int(np.sqrt(len(spaxels)))
-        nwave = len(spaxels[0][0])
+        All the extensions are retrieved in a single query and streamed into
+        preallocated ``(nwave, ny, nx)`` arrays, with the same ordering as the
+        FITS data cube.
 
-        spArray = np.array(spaxels)
+        Parameters:
+            extensions (list):
+                The names of the spaxel array columns to retrieve.
+            shape (tuple):
+                The ``(ny, nx)`` spatial shape of the cube. If None, it is
+                determined from the spaxel coordinates.
 
-        return spArray.transpose().reshape((nwave, ny, nx)).transpose(0, 2, 1)
+        """
+
+        session = Session.object_session(self)
+        return get_spaxel_arrays(session, Spaxel, 'cube_pk', self.pk, list(extensions),
+                                 shape=shape)
 
     @hybrid_property
     def plateifu(self):
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under a 3-clause BSD license.
+#
+# @Filename: test_cache.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+import pytest
+
+from marvin.api.cache import APICache
+from marvin.utils.general import pack_array
+
+
+@pytest.fixture()
+def api_cache(tmpdir):
+    yield APICache(path=str(tmpdir.join('api')))
+
+
+class TestAPICache(object):
+
+    def test_key(self):
+        key1 = APICache.make_key('/cubes/8485-1901/', {'release': 'MPL-8', 'session_id': 'a'})
+        key2 = APICache.make_key('/cubes/8485-1901/', {'session_id': 'b', 'release': 'MPL-8'})
+        key3 = APICache.make_key('/cubes/8485-1901/', {'release': 'MPL-7'})
+        assert key1 == key2
+        assert key1 != key3
+
+    def test_miss(self, api_cache):
+        assert api_cache.get('abcd') is None
+        assert api_cache.misses == 1
+        assert api_cache.hits == 0
+
+    @pytest.mark.parametrize('compression', ['json', 'msgpack'])
+    def test_roundtrip(self, api_cache, compression):
+        flux = np.arange(60, dtype='>f4').reshape(3, 4, 5)
+        results = {'status': 1, 'error': None,
+                   'data': {'extension_data': pack_array(flux, compression=compression),
+                            'header': 'SIMPLE = T'}}
+
+        key = api_cache.make_key('/cubes/8485-1901/extensions/flux/', {'release': 'MPL-8'})
+        assert api_cache.set(key, results) is True
+
+        cached = api_cache.get(key)
+        assert api_cache.hits == 1
+        assert cached['data']['header'] == 'SIMPLE = T'
+        assert np.all(np.array(cached['data']['extension_data']) == flux)
+
+    def test_not_serialisable(self, api_cache):
+        assert api_cache.set('abcd', {'data': object()}) is False
+
+    def test_evict(self, api_cache):
+        for ii in range(4):
+            api_cache.set('key{0}'.format(ii), {'data': np.random.random(1000).tolist()})
+
+        api_cache.max_size = api_cache.size // 2
+        api_cache.evict()
+        assert api_cache.size <= api_cache.max_size
+        assert api_cache.info()['nfiles'] < 4
+
+    def test_clear(self, api_cache):
+        api_cache.set('abcd', {'data': 1})
+        api_cache.get('abcd')
+        api_cache.clear()
+        assert api_cache.info()['nfiles'] == 0
+        assert api_cache.hits == 0
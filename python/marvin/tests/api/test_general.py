@@ -76,3 +76,18 @@ class TestGeneralNSADrpall(object):
         assert page.json['data'] is None
         assert page.json['status'] == -1
         assert page.json['error'] == error
+
+
+@pytest.mark.parametrize('page', [('api', 'routemap')], ids=['routemap'], indirect=True)
+class TestGeneralRouteMap(object):
+
+    def test_routemap_etag(self, app, client, page):
+        response = client.get(page.url)
+        assert response.status_code == 200
+        assert 'api' in response.json['urlmap']
+
+        etag = response.headers['ETag']
+        assert etag
+
+        response = client.get(page.url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
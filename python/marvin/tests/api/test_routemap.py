@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under a 3-clause BSD license.
+#
+# @Filename: test_routemap.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import os
+
+import marvin
+from marvin.api.routemap import RouteMapCache
+
+
+urlmap = {'api': {'getCube': {'url': '/marvin/api/cubes/{name}/', 'methods': ['GET', 'POST']}}}
+
+
+class TestRouteMapCache(object):
+
+    def test_get_set(self, tmpdir):
+        cache = RouteMapCache(path=str(tmpdir))
+        url = 'https://sas.sdss.org/marvin/'
+
+        assert cache.get(url) is None
+        assert cache.set(url, urlmap, '"abc"')
+
+        cached_urlmap, etag, age = cache.get(url)
+        assert cached_urlmap == urlmap
+        assert etag == '"abc"'
+        assert age < 60
+
+        assert cache.get('http://localhost:5000/') is None
+
+    def test_version(self, tmpdir, monkeypatch):
+        cache = RouteMapCache(path=str(tmpdir))
+        url = 'https://sas.sdss.org/marvin/'
+        cache.set(url, urlmap, '"abc"')
+
+        monkeypatch.setattr(marvin, '__version__', '0.0.0')
+        assert cache.get(url) is None
+
+    def test_touch(self, tmpdir):
+        cache = RouteMapCache(path=str(tmpdir))
+        url = 'https://sas.sdss.org/marvin/'
+        cache.set(url, urlmap, '"abc"')
+
+        filepath = cache._get_filepath(url)
+        os.utime(filepath, (0, 0))
+        assert cache.get(url)[2] > 3600
+
+        cache.touch(url)
+        assert cache.get(url)[2] < 60
+
+        cache.clear()
+        assert cache.get(url) is None
@@ -46,6 +46,34 @@ class TestGetRssFibers(object):
         page.load_page(reqtype, page.url.format(name=galaxy.plateifu), params=params)
         page.assert_success()
         assert len(page.json['data'].keys()) == 172
+        assert '0' in page.json['data']
+        assert len(page.json['data']['0']) == 3
+
+    @pytest.mark.parametrize('reqtype', [('get'), ('post')])
+    @pytest.mark.parametrize('name, missing, errmsg', [(None, 'release', 'Missing data for required field.'),
+                                                       ('badname', 'name', 'String does not match expected pattern.'),
+                                                       ('84', 'name', 'Shorter than minimum length 4.')],
+                             ids=['norelease', 'badname', 'shortname'])
+    def test_plateifu_failure(self, galaxy, page, reqtype, params, name, missing, errmsg):
+        if name is None:
+            page.route_no_valid_params(page.url.format(name=galaxy.plateifu), missing, reqtype=reqtype, errmsg=errmsg)
+        else:
+            page.route_no_valid_params(page.url.format(name=name), missing, reqtype=reqtype, params=params, errmsg=errmsg)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('page', [('api', 'getRSSExtensions')], ids=['getrssextensions'], indirect=True)
+class TestGetRssExtensions(object):
+
+    @pytest.mark.parametrize('reqtype', [('get'), ('post')])
+    def test_plateifu_success(self, galaxy, page, params, reqtype):
+        page.load_page(reqtype, page.url.format(name=galaxy.plateifu), params=params)
+        page.assert_success()
+
+        data = page.json['data']
+        assert 'FLUX' in data and 'IVAR' in data and 'MASK' in data
+        assert len(data['FLUX']) == len(data['IVAR'])
+        assert len(data['FLUX'][0]) == len(data['WAVE'])
 
     @pytest.mark.parametrize('reqtype', [('get'), ('post')])
     @pytest.mark.parametrize('name, missing, errmsg', [(None, 'release', 'Missing data for required field.'),
@@ -9,7 +9,16 @@
 # @Last modified by:   Brian Cherinka
 # @Last modified time: 2018-07-09 12:11:48
 
+import importlib
+import json
+import subprocess
+import sys
+from collections import OrderedDict
+
+import pytest
+
 import marvin
+from marvin.utils.datamodel.dap import datamodel
 
 
 class TestImports(object):
@@ -33,3 +42,68 @@ class TestImports(object):
         assert marvin.tools.Spaxel is not None
         assert marvin.tools.Bin is not None
         assert marvin.tools.Image is not None
+
+
+# Third-party modules imported by marvin, which are imported before timing it.
+_dependencies = ['yaml', 'six', 'astropy.wcs', 'brain', 'brain.core.core',
+                 'brain.utils.general.general', 'brain.core.logger']
+
+# Maximum time, in ms, that a cold ``import marvin`` may take, once its
+# dependencies have been imported.
+_import_budget = 500
+
+# Modules that should only be imported when they are first used.
+_lazy_modules = ['marvin.tools', 'marvin.utils.datamodel', 'marvin.utils.datamodel.dap',
+                 'marvin.utils.datamodel.drp', 'marvin.utils.datamodel.query',
+                 'marvin.db.models', 'marvin.api.api', 'marvin.api.base',
+                 'sqlalchemy', 'matplotlib.pyplot', 'flask']
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='requires module __getattr__')
+class TestLazyImport(object):
+
+    def _run(self, code):
+        output = subprocess.check_output([sys.executable, '-c', code])
+        return json.loads(output.decode().strip().splitlines()[-1])
+
+    def test_import_budget(self):
+
+        code = ('import json, sys, time; import %s; tt = time.time(); import marvin; '
+                'elapsed = (time.time() - tt) * 1000.; '
+                'print(json.dumps({"elapsed": elapsed, '
+                '"imported": [mm for mm in %r if mm in sys.modules]}))' % (', '.join(_dependencies),
+                                                                         _lazy_modules))
+
+        result = self._run(code)
+
+        assert result['imported'] == []
+        assert result['elapsed'] < _import_budget
+
+    def test_lazy_submodules(self):
+
+        code = ('import json, sys, marvin; cube = marvin.tools.Cube; '
+                'print(json.dumps("marvin.tools" in sys.modules))')
+
+        assert self._run(code) is True
+
+    def test_lazy_datamodel(self):
+
+        code = ('import json, sys; from marvin.utils.datamodel.dap import datamodel; '
+                'found = "MPL-7" in datamodel; '
+                'lazy = "marvin.utils.datamodel.dap.MPL7" not in sys.modules; '
+                'release = datamodel["MPL-7"].release; '
+                'print(json.dumps([found, lazy, release, '
+                '"marvin.utils.datamodel.dap.MPL4" in sys.modules]))')
+
+        assert self._run(code) == [True, True, '2.2.1', False]
+
+
+class TestLazyDataModels(object):
+
+    @pytest.mark.parametrize('name', ['MPL4', 'MPL5', 'MPL6', 'MPL7', 'MPL8'])
+    def test_aliases(self, name):
+        # the aliases of the lazy datamodels must match those of the built ones
+        module = importlib.import_module('marvin.utils.datamodel.dap.' + name)
+        built = getattr(module, name)
+        entry = OrderedDict.__getitem__(datamodel, built.release)
+        assert list(entry.aliases) == list(built.aliases)
@@ -14,6 +14,7 @@ import pytest
 
 import marvin
 from marvin.tests.conftest import set_the_config
+from marvin.tools.mixins.aperture import extract_apertures
 
 
 # Inputs are [class, plateifu, release, coords,
@@ -124,3 +125,89 @@ def test_get_spaxels_custom_mask():
     my_mask[0:5, 0:5] = 1
 
     assert len(aperture.getSpaxels(mask=my_mask)) == 34
+
+
+class TestExtract(object):
+
+    def test_extract_sum(self):
+
+        cube = marvin.tools.Cube('8485-1901')
+        aperture = cube.getAperture((17, 17), 3)
+
+        spectrum = aperture.extract(cube.flux)
+
+        assert isinstance(spectrum, marvin.tools.quantities.Spectrum)
+        assert spectrum.shape == cube.flux.shape[0:1]
+        assert spectrum.unit == cube.flux.unit
+        assert spectrum.ivar is not None
+
+        good = ~numpy.ma.getmaskarray(cube.flux.masked) & (cube.flux.ivar > 0)
+        expected = numpy.sum(numpy.where(good, cube.flux.value, 0) * aperture.mask, axis=(1, 2))
+
+        numpy.testing.assert_allclose(spectrum.value, expected, rtol=1e-5)
+
+    def test_extract_mean(self):
+
+        cube = marvin.tools.Cube('8485-1901')
+        aperture = cube.getAperture((17, 17), 3)
+
+        spec_sum = aperture.extract(cube.flux, combine='sum')
+        spec_mean = aperture.extract(cube.flux, combine='mean')
+
+        valid = spec_mean.mask == 0
+        assert numpy.all(numpy.abs(spec_mean.value[valid]) <= numpy.abs(spec_sum.value[valid]))
+        assert numpy.all(spec_mean.ivar[valid] >= spec_sum.ivar[valid])
+
+    def test_extract_separate(self):
+
+        cube = marvin.tools.Cube('8485-1901')
+        aperture = cube.getAperture([(17, 17), (10, 12)], 2)
+
+        spectra = aperture.extract(cube.flux, separate=True)
+        assert len(spectra) == 2
+
+        spectrum = aperture.extract(cube.flux, mask=aperture.masks[1])
+        numpy.testing.assert_allclose(spectra[1].value, spectrum.value)
+
+    def test_extract_threshold(self):
+
+        maps = marvin.tools.Maps('8485-1901')
+        aperture = maps.getAperture((17, 17), 3)
+
+        ha = maps.emline_gflux_ha_6564
+        value = aperture.extract(ha, threshold=0.5)
+
+        assert isinstance(value, marvin.tools.quantities.AnalysisProperty)
+
+        spaxels = aperture.getSpaxels(threshold=0.5, lazy=True)
+        selected = numpy.zeros(ha.shape, dtype=bool)
+        for spaxel in spaxels:
+            selected[spaxel.y, spaxel.x] = True
+
+        good = selected & ~numpy.ma.getmaskarray(ha.masked) & (ha.ivar > 0)
+        assert value.value == pytest.approx(ha.value[good].sum(), rel=1e-5)
+
+    def test_extract_apertures(self):
+
+        cube = marvin.tools.Cube('8485-1901')
+        apertures = [cube.getAperture((17, 17), 3), cube.getAperture((10, 12), 2)]
+
+        spectra = extract_apertures(apertures, 'flux', nworkers=2)
+        assert len(spectra) == 2
+
+        for aperture, spectrum in zip(apertures, spectra):
+            numpy.testing.assert_allclose(spectrum.value, aperture.extract(cube.flux).value)
+
+    def test_extract_apertures_db(self):
+
+        cube = marvin.tools.Cube('8485-1901')
+        if cube.data_origin != 'db':
+            pytest.skip('requires the local database')
+
+        apertures = [cube.getAperture((17, 17), 3), cube.getAperture((10, 12), 2)]
+
+        with pytest.warns(marvin.core.exceptions.MarvinUserWarning) as record:
+            spectra = extract_apertures(apertures, 'flux', nworkers=2)
+
+        assert 'extracting sequentially' in str(record[0].message)
+        assert len(spectra) == 2
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under a 3-clause BSD license.
+#
+# @Filename: test_catalogue_query.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from marvin import config
+from marvin.core.exceptions import MarvinError
+from marvin.tools.catalogue_query import CatalogueQuery
+
+
+@pytest.fixture()
+def catalogues(tmpdir):
+
+    drpall_columns = [
+        fits.Column(name='PLATEIFU', format='11A',
+                    array=['8485-1901', '7443-12701', '8485-1902', '7443-1901']),
+        fits.Column(name='MANGAID', format='9A',
+                    array=['1-209232', '12-98126', '1-209113', '12-84617']),
+        fits.Column(name='OBJRA', format='D', array=[232.544, 230.508, 232.447, 230.633]),
+        fits.Column(name='OBJDEC', format='D', array=[48.690, 43.532, 48.923, 43.573]),
+        fits.Column(name='DRP3QUAL', format='J', array=[0, 256, 0, 64]),
+        fits.Column(name='NSA_Z', format='E', array=[0.041, 0.117, 0.025, 0.020]),
+        fits.Column(name='NSA_ELPETRO_MASS', format='E', array=[1.e10, 5.e11, 3.e9, 2.e10])]
+
+    dapall_columns = [
+        fits.Column(name='PLATEIFU', format='11A',
+                    array=['8485-1901', '8485-1901', '7443-12701', '9999-1901']),
+        fits.Column(name='DAPTYPE', format='20A',
+                    array=['SPX-GAU-MILESHC', 'HYB10-GAU-MILESHC', 'HYB10-GAU-MILESHC',
+                           'HYB10-GAU-MILESHC']),
+        fits.Column(name='DAPQUAL', format='J', array=[0, 0, 2, 0]),
+        fits.Column(name='EMLINE_GFLUX_1RE', format='2E',
+                    array=[[1., 10.], [2., 20.], [3., 30.], [4., 40.]])]
+
+    header = fits.Header([('ELG0', 'Hb-4862'), ('ELG1', 'Ha-6564')])
+
+    drpall = str(tmpdir.join('drpall.fits'))
+    fits.HDUList([fits.PrimaryHDU(),
+                  fits.BinTableHDU.from_columns(drpall_columns, name='MANGA')]).writeto(drpall)
+
+    dapall = str(tmpdir.join('dapall.fits'))
+    fits.HDUList([fits.PrimaryHDU(header=header),
+                  fits.BinTableHDU.from_columns(dapall_columns, name='DAPALL')]).writeto(dapall)
+
+    yield drpall, dapall
+
+
+@pytest.fixture()
+def query(catalogues):
+    drpall, dapall = catalogues
+    yield CatalogueQuery(release=config.release, drpall=drpall, dapall=dapall)
+
+
+class TestCatalogueQuery(object):
+
+    @pytest.mark.parametrize('name, full',
+                             [('nsa.z', 'nsa.z'),
+                              ('mangasampledb.nsa.z', 'nsa.z'),
+                              ('ifu.name', 'ifudesign.name'),
+                              ('elpetro_mass', 'nsa.elpetro_mass')])
+    def test_full_name(self, query, name, full):
+        assert query.get_full_name(name) == full
+
+    def test_filter(self, query):
+        query = query.add_columns('cube.plateifu', 'nsa.z').filter('nsa.z < 0.1')
+        assert query.count() == 3
+        assert query.order_by('nsa.z', 'desc').all() == [('8485-1901', pytest.approx(0.041)),
+                                                          ('8485-1902', pytest.approx(0.025)),
+                                                          ('7443-1901', pytest.approx(0.020))]
+
+    @pytest.mark.parametrize('search_filter, plateifus',
+                             [('nsa.z < 0.1 and cube.quality & 64', ['7443-1901']),
+                              ('nsa.z > 0.1 or not nsa.elpetro_logmass > 9.5', ['7443-12701', '8485-1902']),
+                              ('cube.plateifu = 8485*', ['8485-1901', '8485-1902']),
+                              ('cube.plateifu == 7443-1901', ['7443-1901']),
+                              ('radial(232.5, 48.7, 0.5)', ['8485-1901', '8485-1902'])])
+    def test_conditions(self, query, search_filter, plateifus):
+        query = query.add_columns('cube.plateifu').filter(search_filter).order_by('cube.plateifu')
+        assert [row[0] for row in query.all()] == sorted(plateifus)
+
+    def test_radial_many(self, query):
+        query = query.add_columns('cube.plateifu').order_by('cube.plateifu')
+        query = query.radial_many([(232.447, 48.923), (230.633, 43.573), (0., 0.)], 0.01)
+        assert query.get_filter_params() == ['cube.ra', 'cube.dec']
+        assert query.all() == [('7443-1901', ), ('8485-1902', )]
+
+    def test_slice(self, query):
+        query = query.add_columns('cube.mangaid').order_by('cube.mangaid')
+        assert query.slice(1, 3).all() == [('1-209232', ), ('12-84617', )]
+        assert query.slice(1, 3).slice(1, 5).all() == [('12-84617', )]
+
+    def test_dapall(self, query):
+        query = query.add_columns('cube.plateifu', 'bintype.name', 'nsa.z')
+        query = query.filter('dapall.emline_gflux_1re_ha_6564 > 15')
+        # the DAPall row without a drpall target is not returned
+        assert query.uses_dapall
+        assert query.all() == [('8485-1901', 'HYB10', pytest.approx(0.041)),
+                               ('7443-12701', 'HYB10', pytest.approx(0.117))]
+
+    def test_spaxel_function(self, query):
+        with pytest.raises(MarvinError) as cm:
+            query.filter('npergood(spaxelprop.emline_gflux_ha_6564 > 5) >= 20').count()
+        assert 'cannot be used in catalogue queries' in str(cm.value)
+
+    def test_bad_parameter(self, query):
+        with pytest.raises(MarvinError) as cm:
+            query.filter('nsa.not_a_column < 1')
+        assert 'not available' in str(cm.value)
+
+    def test_columns_memmapped(self, query):
+        assert isinstance(query.column('nsa.z'), np.memmap)
+
+
+class TestQueryFile(object):
+
+    def test_run(self, catalogues, monkeypatch):
+        from marvin.tools.query import Query
+
+        monkeypatch.setattr(config, 'db', None)
+        monkeypatch.setattr(config, '_getDrpAllPath', lambda drpver: catalogues[0])
+
+        query = Query(search_filter='nsa.z < 0.1', return_params=['cube.ra'], mode='local')
+        assert query.data_origin == 'file'
+        assert query.params == ['cube.mangaid', 'cube.plateifu', 'cube.ra', 'nsa.z']
+
+        results = query.run()
+        assert results.totalcount == 3
+        assert list(results.results['plateifu']) == ['8485-1902', '8485-1901', '7443-1901']
@@ -191,6 +191,54 @@ class TestMaps(object):
         assert map_ratio.ivar == pytest.approx(map_arith.ivar, nan_ok=True)
         assert map_ratio.mask == pytest.approx(map_arith.mask, nan_ok=True)
 
+    def test_getMaps(self, maps):
+        names = ['emline_gflux_ha_6564', 'stellar_vel', 'emline_gflux_nii_6585']
+        multi = maps.getMaps(names)
+
+        assert len(multi) == len(names)
+        for name, map_multi in zip(names, multi):
+            map_single = maps.getMap(name)
+            assert map_multi.datamodel.full() == name
+            assert map_multi.value == pytest.approx(map_single.value, nan_ok=True)
+            assert map_multi.ivar == pytest.approx(map_single.ivar, nan_ok=True)
+            assert map_multi.mask == pytest.approx(map_single.mask, nan_ok=True)
+            assert map_multi.binid == pytest.approx(map_single.binid)
+
+    def test_get_maps_from_db_mixed_tables(self, maps):
+        from marvin.utils.datamodel.dap import datamodel
+
+        props = [datamodel['MPL-5']['stellar_vel'], datamodel['MPL-7']['stellar_vel']]
+        with pytest.raises(MarvinError) as cm:
+            marvin.tools.quantities.Map._get_maps_from_db(maps, props)
+        assert 'all properties must be stored in the same table' in str(cm.value)
+
+    def test_map_cache(self, maps):
+        ha = maps.getMap('emline_gflux_ha_6564')
+        hits = maps._map_cache.hits
+
+        ha_cached = maps.getMap('emline_gflux_ha_6564')
+        assert maps._map_cache.hits > hits
+        assert ha_cached.value == pytest.approx(ha.value, nan_ok=True)
+
+        # the maps are independent copies of the cached data
+        ha_cached.value[0, 0] = -999
+        assert maps.getMap('emline_gflux_ha_6564').value[0, 0] != -999
+
+        # maps with the same binid share the array
+        nii = maps.getMap('emline_gflux_nii_6585')
+        assert np.shares_memory(ha.binid, nii.binid)
+
+        maps.clear_cache('emline_gflux_ha_6564')
+        assert 'emline_gflux_ha_6564' not in maps._map_cache
+        maps.clear_cache()
+        assert len(maps._map_cache) == 0
+
+    def test_map_cache_disabled(self, galaxy, exporigin):
+        maps = Maps(cache_maps=False, **self._get_maps_kwargs(galaxy, exporigin))
+        ha = maps.getMap('emline_gflux_ha_6564')
+        assert ha.binid is not None
+        assert len(maps._map_cache) == 0
+
 
 class TestMaskbit(object):
 
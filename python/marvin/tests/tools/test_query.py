@@ -22,7 +22,9 @@ from marvin.tools.cube import Cube
 from marvin.tools.maps import Maps
 from marvin.tools.modelcube import ModelCube
 from marvin.tools.query import Query, doQuery
+from marvin.tools.query_cache import QueryPlanCache, get_query_plan_cache
 from marvin.tools.spaxel import Spaxel
+from marvin.utils.general.spaxel_summary import build_spaxel_summary
 
 
 @pytest.fixture(scope='function', autouse=True)
@@ -359,6 +361,46 @@ class TestQueryLocal(object):
         r = q.run()
         assert r.results is not None
 
+    def test_radial_many(self):
+        coords = [(232.5447, 48.6902), (0., 0.)]
+        q = Query(mode=self.mode)
+        q.radial_many(coords, 1)
+        assert 'q3c_join' in q.show()
+
+        radial = Query(search_filter='radial(232.5447, 48.6902, 1)', mode=self.mode).run()
+        assert sorted(q.run().getListOf('plateifu')) == sorted(radial.getListOf('plateifu'))
+
+    @pytest.mark.parametrize('coords, radius',
+                             [([(232.5447, float('nan'))], 1),
+                              ([(float('inf'), 48.6902)], 1),
+                              ([(232.5447, 48.6902)], float('nan'))],
+                             ids=['nandec', 'infra', 'nanradius'])
+    def test_radial_many_not_finite(self, coords, radius):
+        q = Query(mode=self.mode)
+        with pytest.raises(MarvinError) as cm:
+            q.radial_many(coords, radius)
+        assert 'must be finite numbers' in str(cm.value)
+
+    @pytest.mark.parametrize('sf',
+                             [('npergood(emline_gflux_ha_6564 > 5) > 20'),
+                              ('npergood(emline_gflux_ha_6564 >= 25) < 50'),
+                              ('npergood(stellar_vel > 0) == 0'),
+                              ('npergood(stellar_vel > 0) != 0')],
+                             ids=['gt', 'lt', 'eq', 'ne'])
+    def test_npergood_spaxel_summary(self, monkeypatch, tmpdir, sf):
+        monkeypatch.setenv('MANGA_SCRATCH_DIR', str(tmpdir))
+        monkeypatch.setattr(config, 'use_query_plan_cache', False)
+        path = build_spaxel_summary()
+        assert build_spaxel_summary() == path
+
+        monkeypatch.setattr(config, 'use_spaxel_summary', False)
+        exact = Query(search_filter=sf, mode=self.mode)
+        monkeypatch.setattr(config, 'use_spaxel_summary', True)
+        summary = Query(search_filter=sf, mode=self.mode)
+        assert summary._uses_spaxel_summary
+
+        assert sorted(summary.run().getListOf('plateifu')) == sorted(exact.run().getListOf('plateifu'))
+
     @pytest.mark.parametrize('sf, qual, flags, count',
                              [(None, None, 'mangadatadb.cube', 5),
                               (None, ['BADFLUX'], 'DRP3QUAL', 0),
@@ -402,6 +444,64 @@ class TestQueryLocal(object):
         assert "__init__() got an unexpected keyword argument '{0}'".format(badinput) in str(cm.value)
 
 
+class TestQueryPlanCache(object):
+    mode = 'local'
+    sf = 'nsa.z < 0.1'
+
+    @pytest.fixture(autouse=True)
+    def plan_cache(self):
+        cache = get_query_plan_cache()
+        cache.clear()
+        yield cache
+        cache.clear()
+
+    def test_hit(self, plan_cache):
+        query = Query(search_filter=self.sf, return_params=['cube.ra'], mode=self.mode)
+        assert plan_cache.info()['misses'] == 1
+
+        cached = Query(search_filter='nsa.z  <   0.1', return_params=['cube.ra'], mode=self.mode)
+        assert plan_cache.hits == 1
+        assert plan_cache.hit_rate == pytest.approx(0.5)
+        assert cached.params == query.params
+        assert cached._joins == query._joins
+        assert cached.show() == query.show()
+
+        r = cached.run()
+        assert r.totalcount == query.run().totalcount
+
+    @pytest.mark.parametrize('kwargs', [({'return_params': ['cube.dec']}),
+                                        ({'quality': ['BADFLUX']}),
+                                        ({'return_type': 'cube'})],
+                             ids=['returns', 'quality', 'returntype'])
+    def test_miss(self, plan_cache, kwargs):
+        Query(search_filter=self.sf, mode=self.mode)
+        Query(search_filter=self.sf, mode=self.mode, **kwargs)
+        assert plan_cache.hits == 0
+        assert len(plan_cache) == 2
+
+    def test_params_not_shared(self, plan_cache):
+        query = Query(search_filter=self.sf, mode=self.mode)
+        query.params.append('cube.ra')
+        cached = Query(search_filter=self.sf, mode=self.mode)
+        assert 'cube.ra' not in cached.params
+
+    def test_disabled(self, monkeypatch, plan_cache):
+        monkeypatch.setattr(config, 'use_query_plan_cache', False)
+        Query(search_filter=self.sf, mode=self.mode)
+        Query(search_filter=self.sf, mode=self.mode)
+        assert plan_cache.hits == 0
+        assert len(plan_cache) == 0
+
+    def test_eviction(self):
+        cache = QueryPlanCache(max_size=2)
+        for ii in range(3):
+            cache.set(cache.make_key('nsa.z < {0}'.format(ii)), {'params': [ii]})
+        assert len(cache) == 2
+        assert cache.get(cache.make_key('nsa.z < 0')) is None
+        assert cache.get(cache.make_key('nsa.z <  2')) == {'params': [2]}
+        assert cache.info()['hit_rate'] == pytest.approx(0.5)
+
+
 class TestQueryAuto(object):
 
     @pytest.mark.parametrize('mode', [('local'), ('remote')])
@@ -194,6 +194,31 @@ class TestResultsOutput(object):
         json_res = json.loads(res)
         assert isinstance(json_res, list)
 
+    def test_toparquet(self, results, temp_scratch):
+        pytest.importorskip('pyarrow')
+        file = temp_scratch.join('test_results.parquet')
+        results.toParquet(filename=str(file), overwrite=True)
+        assert file.check(file=1, exists=1) is True
+
+    def test_columnar(self, results):
+        pytest.importorskip('pyarrow')
+        table = results.toArrow()
+        assert table.num_rows == results.count
+        columnar = Results(results=table, params=results._params, release=results.release,
+                           search_filter=results.search_filter, mode=results.mode)
+        assert columnar.count == results.count
+        assert columnar.toDF().shape == results.toDF().shape
+        assert columnar.results[0] == results.results[0]
+
+    def test_columnar_empty(self, results):
+        pytest.importorskip('pyarrow')
+        table = results.toArrow().slice(0, 0)
+        columnar = Results(results=table, params=results._params, release=results.release,
+                           search_filter=results.search_filter, mode=results.mode)
+        assert isinstance(columnar.results, ResultSet)
+        assert len(columnar.results) == 0
+        assert columnar.toDF().shape[0] == 0
+
 
 class TestResultsGetParams(object):
 
@@ -373,6 +398,14 @@ class TestResultsPaging(object):
         res = results.getAll()
         assert results.count == results.totalcount
 
+    @pytest.mark.parametrize('results', [('nsa.z < 0.1')], indirect=True)
+    def test_iter_rows(self, results):
+        sets = list(results.iter_rows(chunk=400))
+        assert all(len(rows) <= 400 for rows in sets)
+        assert sum(len(rows) for rows in sets) == results.totalcount
+        assert sets[1].index == 400
+        assert sets[0][0]._fields == results.results[0]._fields
+
 
 class TestResultsPickling(object):
 
@@ -407,6 +440,16 @@ class TestResultsConvertTool(object):
         if objtype != 'spaxel':
             assert results.mode == results.objects[0].mode
 
+    @pytest.mark.parametrize('objtype', [('cube'), ('maps')])
+    def test_convert_concurrent(self, results, objtype):
+        results.convertToTool(objtype, limit=3, mode=results.mode)
+        sequential = [obj.plateifu for obj in results.objects]
+
+        objects = results.convertToTool(objtype, limit=3, mode=results.mode, nworkers=3,
+                                        generator=True)
+        assert isinstance(objects, list) is False
+        assert [obj.plateifu for obj in objects] == sequential
+
     @pytest.mark.parametrize('objtype, error, errmsg',
                              [('modelcube', AssertionError, "ModelCubes require a release of MPL-5 and up"),
                               ('spaxel', AssertionError, 'Parameters must include spaxelprop.x and y in order to convert to Marvin Spaxel')],
@@ -115,9 +115,52 @@ class TestRSS(object):
         if rss.mode == 'remote':
             pytest.skip()
 
-        rss.load_all()
+        rss.load_all(bulk=False)
         assert all([rss_fiber.loaded is True for rss_fiber in rss])
 
+    def test_load_all_bulk(self, rss):
+
+        rss.autoload = False
+        rss._extension_arrays = None
+
+        # Loads a fibre on its own and keeps copies of its arrays.
+        rss[1].load()
+        value = rss[1].value.copy()
+        ivar = rss[1].ivar.copy()
+        mask = rss[1].mask.copy()
+        xpos = rss[1].xpos.value.copy()
+
+        for fiber in rss:
+            fiber.loaded = False
+
+        rss.load_all()
+
+        assert rss._extension_arrays is not None
+        assert all([fiber.loaded is True for fiber in rss])
+
+        numpy.testing.assert_array_equal(rss[1].value, value)
+        numpy.testing.assert_array_equal(rss[1].ivar, ivar)
+        numpy.testing.assert_array_equal(rss[1].mask, mask)
+        numpy.testing.assert_allclose(rss[1].xpos.value, xpos)
+
+        # The ivar is a view of the row-stacked array.
+        assert numpy.may_share_memory(rss[1].ivar, rss._extension_arrays['flux'][1])
+
+    def test_load_all_bulk_unsupported(self, rss, monkeypatch):
+
+        if rss.mode != 'remote':
+            pytest.skip()
+
+        rss.autoload = False
+        monkeypatch.setattr(rss, '_extension_arrays', None)
+        monkeypatch.delitem(marvin.config.urlmap['api'], 'getRSSExtensions')
+
+        # Falls back to loading the fibres one by one.
+        rss.load_all()
+
+        assert rss._extension_arrays is None
+        assert all([fiber.loaded is True for fiber in rss])
+
     def test_obsinfo_to_rssfiber(self, rss):
 
         # We get it in this complicated way so that it is a different way of
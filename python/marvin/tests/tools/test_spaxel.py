@@ -17,6 +17,7 @@ import astropy.io.fits
 import pytest
 
 from marvin import config
+from marvin.api.api import Interaction
 from marvin.core.exceptions import MarvinDeprecationError, MarvinError
 from marvin.tests import marvin_test_if, marvin_test_if_class
 from marvin.tests.conftest import set_the_config
@@ -761,3 +762,137 @@ class TestModelCubeGetSpaxel(object):
         assert spaxel_getspaxel_file.binned_flux.mask[idx] == pytest.approx(mask)
         assert spaxel_getspaxel_db.binned_flux.mask[idx] == pytest.approx(mask)
         assert spaxel_getspaxel_api.binned_flux.mask[idx] == pytest.approx(mask)
+
+
+class TestGetSpaxelQuantities(object):
+
+    @staticmethod
+    def _coords(xx, yy):
+        # The reference spaxel is requested twice, around a different spaxel.
+        return [xx, 0, xx], [yy, 0, yy]
+
+    def test_cube(self, cube, galaxy):
+        idx = galaxy.spaxel['specidx']
+        xs, ys = self._coords(galaxy.spaxel['x'], galaxy.spaxel['y'])
+
+        quantities = cube.get_spaxel_quantities(xs, ys)
+        assert len(quantities) == len(xs)
+
+        for ii in [0, 2]:
+            flux = quantities[ii]['flux']
+            assert flux.value[idx] == pytest.approx(galaxy.spaxel['flux'], abs=1.e-7)
+            assert flux.ivar[idx] == pytest.approx(galaxy.spaxel['ivar'])
+            assert flux.mask[idx] == pytest.approx(galaxy.spaxel['mask'])
+
+        assert quantities[1]['flux'].value[idx] != pytest.approx(galaxy.spaxel['flux'])
+
+    @marvin_test_if(mark='include', galaxy=dict(bintype=['SPX', 'NONE']))
+    def test_maps(self, maps, galaxy):
+        template = str(galaxy.template)
+
+        if template not in galaxy.dap or str(maps.template) != template:
+            pytest.skip()
+
+        xs, ys = self._coords(galaxy.dap['x'], galaxy.dap['y'])
+
+        quantities = maps.get_spaxel_quantities(xs, ys)
+        assert len(quantities) == len(xs)
+
+        for channel in galaxy.dap[template]:
+
+            if channel == 'model':
+                continue
+
+            channel_data = galaxy.dap[template][channel]
+
+            for ii in [0, 2]:
+                quantity = quantities[ii][channel]
+                assert quantity.value == pytest.approx(channel_data['value'], abs=1.e-4)
+                assert quantity.ivar == pytest.approx(channel_data['ivar'], abs=1.e-4)
+                assert quantity.mask == pytest.approx(channel_data['mask'], abs=1.e-4)
+
+    def test_modelcube(self, modelcube, galaxy):
+        if modelcube.release == 'MPL-4':
+            pytest.skip('ModelCube not available for MPL-4')
+
+        idx = galaxy.spaxel['specidx']
+        xs, ys = self._coords(galaxy.spaxel['x'], galaxy.spaxel['y'])
+
+        quantities = modelcube.get_spaxel_quantities(xs, ys)
+        assert len(quantities) == len(xs)
+
+        for ii in [0, 2]:
+            binned_flux = quantities[ii]['binned_flux']
+            assert binned_flux.value[idx] == pytest.approx(galaxy.spaxel['model_flux'], abs=1e-6)
+            assert binned_flux.ivar[idx] == pytest.approx(galaxy.spaxel['model_ivar'])
+            assert binned_flux.mask[idx] == pytest.approx(galaxy.spaxel['model_mask'])
+
+    def test_getSpaxel_multiple(self, cube, galaxy):
+        idx = galaxy.spaxel['specidx']
+        xs, ys = self._coords(galaxy.spaxel['x'], galaxy.spaxel['y'])
+
+        spaxels = cube.getSpaxel(x=xs, y=ys, xyorig='lower')
+        assert len(spaxels) == len(xs)
+
+        for xx, yy, spaxel in zip(xs, ys, spaxels):
+            assert spaxel.loaded
+            assert (spaxel.x, spaxel.y) == (xx, yy)
+
+        for ii in [0, 2]:
+            assert spaxels[ii].flux.value[idx] == pytest.approx(galaxy.spaxel['flux'], abs=1.e-7)
+            assert spaxels[ii].flux.ivar[idx] == pytest.approx(galaxy.spaxel['ivar'])
+
+    @marvin_test_if(mark='include', galaxy=dict(bintype=['SPX']))
+    def test_remote_without_bulk_route(self, galaxy, monkeypatch):
+        cube = Cube(plateifu=galaxy.plateifu, release=galaxy.release, mode='remote')
+        monkeypatch.delitem(config.urlmap['api'], 'getCubeQuantitiesSpaxels')
+
+        idx = galaxy.spaxel['specidx']
+        xs, ys = self._coords(galaxy.spaxel['x'], galaxy.spaxel['y'])
+
+        quantities = cube.get_spaxel_quantities(xs, ys)
+        assert len(quantities) == len(xs)
+
+        for ii in [0, 2]:
+            flux = quantities[ii]['flux']
+            assert flux.value[idx] == pytest.approx(galaxy.spaxel['flux'], abs=1.e-7)
+            assert flux.ivar[idx] == pytest.approx(galaxy.spaxel['ivar'])
+
+    @marvin_test_if(mark='include', galaxy=dict(bintype=['SPX']))
+    def test_remote_bulk_route_error(self, galaxy, monkeypatch):
+        cube = Cube(plateifu=galaxy.plateifu, release=galaxy.release, mode='remote')
+        requests = []
+
+        def send_request(interaction, request_type):
+            requests.append(interaction.url)
+            interaction.status_code = 500
+            raise MarvinError('internal server error')
+
+        monkeypatch.setattr(Interaction, '_sendRequest', send_request)
+
+        xs, ys = self._coords(galaxy.spaxel['x'], galaxy.spaxel['y'])
+        with pytest.raises(MarvinError) as cm:
+            cube.get_spaxel_quantities(xs, ys)
+
+        assert 'internal server error' in str(cm.value)
+        assert len(requests) == 1
+
+    @marvin_test_if(mark='include', galaxy=dict(bintype=['SPX']))
+    def test_remote_bulk_route_not_found(self, galaxy, monkeypatch):
+        cube = Cube(plateifu=galaxy.plateifu, release=galaxy.release, mode='remote')
+        bulk_url = config.urlmap['api']['getCubeQuantitiesSpaxels']['url'].format(name=cube.plateifu)
+        send = Interaction._sendRequest
+
+        def send_request(interaction, request_type):
+            if interaction.url.endswith(bulk_url):
+                interaction.status_code = 404
+                raise MarvinError('not found')
+            return send(interaction, request_type)
+
+        monkeypatch.setattr(Interaction, '_sendRequest', send_request)
+
+        idx = galaxy.spaxel['specidx']
+        xs, ys = self._coords(galaxy.spaxel['x'], galaxy.spaxel['y'])
+
+        quantities = cube.get_spaxel_quantities(xs, ys)
+        assert quantities[2]['flux'].value[idx] == pytest.approx(galaxy.spaxel['flux'], abs=1.e-7)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under a 3-clause BSD license.
+#
+# @Filename: test_forms.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import os
+
+import pytest
+
+from marvin import config, marvindb
+from marvin.utils.datamodel.query.forms import MarvinForm, get_marvin_form, get_param_lookup
+
+
+@pytest.fixture()
+def lookup_dir(monkeypatch, tmpdir):
+    path = str(tmpdir.join('forms'))
+    monkeypatch.setattr(config, 'forms_cache_dir', path)
+    yield path
+
+
+class TestParamLookup(object):
+
+    def test_stored(self, lookup_dir):
+        modelclasses = marvindb.buildUberClassDict(release=config.release)
+        lookup = get_param_lookup(config.release, modelclasses)
+        assert 'mangasampledb.nsa.z' in lookup['params']
+        assert len(os.listdir(lookup_dir)) == 1
+
+        # A second lookup is read from the file.
+        assert get_param_lookup(config.release, modelclasses) == lookup
+        assert len(os.listdir(lookup_dir)) == 1
+
+    def test_marvinform(self, lookup_dir):
+        mf = MarvinForm(release=config.release)
+        model = mf._param_form_lookup.get_model('nsa.z')
+        assert model.__name__ == 'NSA'
+        assert mf._param_form_lookup.mapToColumn('nsa.z').class_ == model
+        assert mf._param_form_lookup['nsa.z'].Meta.model == model
+        assert mf.NSAForm.Meta.model == model
+        assert 'nsa.z' in mf._param_form_lookup
+        assert 'nsa.not_a_column' not in mf._param_form_lookup
+
+    def test_shared(self, lookup_dir):
+        mf = get_marvin_form(release=config.release)
+        assert get_marvin_form(release=config.release) is mf
+        assert get_marvin_form(release=config.release, allspaxels=True) is not mf
@@ -21,7 +21,8 @@ import pytest
 from marvin.core.exceptions import MarvinError
 from marvin.tools.maps import Maps
 from marvin.tests import marvin_test_if_class
-from marvin.utils.dap.bpt import get_snr, bpt_kewley06
+from marvin.utils.dap.bpt import (get_snr, bpt_kewley06, bpt_kewley06_batch, bpt_channels,
+                                  bpt_classes)
 from marvin.core.exceptions import MarvinDeprecationWarning
 
 
@@ -126,6 +127,77 @@ class TestBPT(object):
         assert 'unknown keyword extra_keyword' in str(error.value)
         assert 'unknown keyword extra_keyword' in str(error2.value)
 
+    def test_bpt_batch_maps(self, maps):
+        if maps.bptsums is None:
+            pytest.skip('no bpt data found in galaxy test data')
+
+        bpt = bpt_kewley06_batch([maps, maps], nworkers=2)
+        masks = maps.get_bpt(show_plot=False, return_figure=False)
+
+        assert len(bpt['classification']) == 2
+        assert bpt['classification'][0].dtype == np.int8
+
+        for mech in self.mechanisms:
+            assert list(bpt['counts'][mech]) == [maps.bptsums['global'][mech]] * 2
+
+        for name in ['sf', 'comp', 'seyfert', 'liner', 'invalid', 'ambiguous']:
+            code = bpt_classes.index(name)
+            assert ((bpt['classification'][1] == code) == masks[name]['global']).all()
+
+
+class TestBPTBatch(object):
+
+    @staticmethod
+    def _get_stack(ngal=5, shape=(4, 6)):
+        state = np.random.RandomState(42)
+        fluxes = dict((channel, state.lognormal(0, 1, size=(ngal, ) + shape))
+                      for channel, __ in bpt_channels)
+        fluxes['oi_6302'][0, 0, 0] = -1.
+        ivars = dict((channel, np.full((ngal, ) + shape, 100.)) for channel, __ in bpt_channels)
+        return fluxes, ivars
+
+    @pytest.mark.parametrize('nworkers', [1, 3])
+    @pytest.mark.parametrize('use_oi', [True, False])
+    def test_stack(self, nworkers, use_oi):
+        fluxes, ivars = self._get_stack()
+
+        bpt = bpt_kewley06_batch(fluxes, ivar=ivars, use_oi=use_oi, nworkers=nworkers)
+        codes = bpt['classification']
+
+        assert codes.shape == (5, 4, 6)
+        assert codes.dtype == np.int8
+        assert (bpt['counts']['sf'] == (codes == bpt_classes.index('sf')).sum(axis=(1, 2))).all()
+
+        total = sum(bpt['counts'][name] for name in bpt_classes)
+        assert (total == 24).all()
+
+        if use_oi:
+            assert codes[0, 0, 0] == bpt_classes.index('invalid')
+
+        # Each galaxy gives the same result when classified alone.
+        single = bpt_kewley06_batch(dict((kk, vv[2:3]) for kk, vv in fluxes.items()),
+                                    ivar=dict((kk, vv[2:3]) for kk, vv in ivars.items()),
+                                    use_oi=use_oi)
+        assert (single['classification'][0] == codes[2]).all()
+
+    def test_stack_mask(self):
+        fluxes, ivars = self._get_stack(ngal=2)
+        mask = {'ha_6564': np.zeros((2, 4, 6), dtype=bool)}
+        mask['ha_6564'][1] = True
+
+        bpt = bpt_kewley06_batch(fluxes, ivar=ivars, mask=mask)
+
+        assert (bpt['classification'][1] == bpt_classes.index('invalid')).all()
+        assert bpt['counts']['invalid'][1] == 24
+
+    def test_stack_no_ivar(self):
+        fluxes, __ = self._get_stack()
+
+        with pytest.raises(AssertionError) as ee:
+            bpt_kewley06_batch(fluxes)
+
+        assert 'ivar is required' in str(ee.value)
+
 
 class TestGetSNR(object):
 
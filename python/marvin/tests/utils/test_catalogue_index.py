@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under a 3-clause BSD license.
+#
+# @Filename: test_catalogue_index.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import os
+
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from marvin.utils.general.catalogue_index import (CatalogueIndex, SkyIndex, angular_separation,
+                                                  get_catalogue_column, get_fits_colnames)
+
+
+@pytest.fixture()
+def catalogue(tmpdir):
+
+    columns = [fits.Column(name='plateifu', format='11A',
+                           array=['8485-1901', '7443-12701', '8485-1902', '8485-1901']),
+               fits.Column(name='mangaid', format='9A',
+                           array=['1-209232 ', '12-98126', '1-209113', '1-209232 ']),
+               fits.Column(name='daptype', format='20A',
+                           array=['SPX-GAU-MILESHC', 'HYB10-GAU-MILESHC',
+                                  'SPX-GAU-MILESHC', 'HYB10-GAU-MILESHC']),
+               fits.Column(name='bluesn2', format='E', array=[10., 20., 30., 15.])]
+
+    path = str(tmpdir.join('catalogue.fits'))
+    fits.HDUList([fits.PrimaryHDU(),
+                  fits.BinTableHDU.from_columns(columns, name='MANGA')]).writeto(path)
+
+    yield path
+
+
+def _make_index(path):
+    return CatalogueIndex(path, hdu='MANGA',
+                          keys={'mangaid': ['mangaid'],
+                                'plateifu_daptype': ['plateifu', 'daptype']},
+                          columns=['plateifu', 'bluesn2'])
+
+
+class TestCatalogueIndex(object):
+
+    def test_lookup(self, catalogue):
+        index = _make_index(catalogue)
+        assert list(index.lookup('mangaid', '1-209232')) == [0, 3]
+        assert list(index.lookup('mangaid', '12-98126')) == [1]
+        assert len(index.lookup('mangaid', '1-000000')) == 0
+
+    def test_compound_key(self, catalogue):
+        index = _make_index(catalogue)
+        rows = index.lookup('plateifu_daptype', ('8485-1901', 'HYB10-GAU-MILESHC'))
+        assert list(rows) == [3]
+
+    def test_lookup_many(self, catalogue):
+        index = _make_index(catalogue)
+        rows = index.lookup_many('mangaid', ['12-98126', '1-000000', '1-209232'])
+        assert [list(rr) for rr in rows] == [[1], [], [0, 3]]
+
+    def test_lookup_first(self, catalogue):
+        index = _make_index(catalogue)
+        rows = index.lookup_first('mangaid', np.array(['12-98126', '1-000000', '1-209232']))
+        assert list(rows) == [1, -1, 0]
+
+    def test_columns(self, catalogue):
+        index = _make_index(catalogue)
+        assert index.column('plateifu')[2] == '8485-1902'
+        assert index.column('bluesn2')[1] == pytest.approx(20.)
+
+    def test_read_rows(self, catalogue):
+        index = _make_index(catalogue)
+        rows = index.read_rows([1], as_table=True)
+        assert len(rows) == 1
+        assert rows[0]['bluesn2'] == pytest.approx(20.)
+
+    def test_sidecar(self, catalogue):
+        index = _make_index(catalogue)
+        assert os.path.exists(index._get_meta_filename())
+
+        # A second index is loaded from the memory-mapped sidecar files.
+        index = _make_index(catalogue)
+        assert isinstance(index._keys['mangaid'], np.memmap)
+        assert list(index.lookup('mangaid', '1-209232')) == [0, 3]
+
+    def test_save_cleanup(self, catalogue, monkeypatch):
+        def fail(*args, **kwargs):
+            raise IOError('disk full')
+
+        monkeypatch.setattr(np, 'save', fail)
+
+        # The index is kept in memory and no temporary directory is left behind.
+        index = _make_index(catalogue)
+        assert list(index.lookup('mangaid', '1-209232')) == [0, 3]
+        assert os.listdir(index.sidecar) == []
+
+    def test_close(self, catalogue):
+        index = _make_index(catalogue)
+        index.read_rows([0])
+        assert index._hdulist is not None
+
+        index.close()
+        assert index._hdulist is None
+
+    def test_fits_colnames(self, catalogue):
+        assert get_fits_colnames(catalogue, hdu='MANGA') == ['plateifu', 'mangaid',
+                                                             'daptype', 'bluesn2']
+
+
+class TestCatalogueColumn(object):
+
+    def test_column(self, catalogue):
+        column = get_catalogue_column(catalogue, 'mangaid', hdu='MANGA')
+        assert isinstance(column, np.memmap)
+        assert list(column) == ['1-209232', '12-98126', '1-209113', '1-209232']
+        assert os.path.exists(os.path.join(catalogue + '.idx', 'manga_data_mangaid.npy'))
+
+
+class TestSkyIndex(object):
+
+    ra = np.array([10., 10.05, 10.2, 190., np.nan, 359.99])
+    dec = np.array([0., 0., 0., -45., 0., 0.])
+
+    def test_query(self):
+        index = SkyIndex(self.ra, self.dec)
+        assert list(index.query(10., 0., 0.1)) == [0, 1]
+        assert list(index.query(190., -45., 0.01)) == [3]
+        # cones wrap around RA = 0
+        assert list(index.query(0.005, 0., 0.1)) == [5]
+
+    def test_query_many(self):
+        index = SkyIndex(self.ra, self.dec)
+        matches = index.query_many([(10.15, 0.), (100., 20.), (10., 0.)], 0.06)
+        assert [list(mm) for mm in matches] == [[2], [], [0, 1]]
+
+    def test_match_mask(self):
+        index = SkyIndex(self.ra, self.dec)
+        mask = index.match_mask([(10.15, 0.), (190., -45.)], 0.06)
+        assert list(mask) == [False, False, True, True, False, False]
+
+    def test_exact(self):
+        ra, dec = np.random.RandomState(0).uniform([0, -90], [360, 90], size=(2000, 2)).T
+        index = SkyIndex(ra, dec)
+        rows = index.query(120., 30., 15.)
+        assert list(rows) == list(np.nonzero(angular_separation(ra, dec, 120., 30.) <= 15.)[0])
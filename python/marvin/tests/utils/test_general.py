@@ -34,7 +34,9 @@ from marvin.core.exceptions import MarvinError
 from marvin.utils.general import (convertCoords, get_nsa_data, getWCSFromPng,
                                   _sort_dir, getDapRedux, getDefaultMapPath, target_status,
                                   target_is_observed, downloadList, check_versions,
-                                  get_manga_image)
+                                  get_manga_image, pack_array, unpack_array,
+                                  rows_to_arrow, pack_table, unpack_table,
+                                  open_fits, get_fits_section)
 from marvin.utils.datamodel.dap import datamodel
 
 
@@ -344,3 +346,82 @@ class TestGetMangaImage(object):
         img = get_manga_image(drpver=v1, plate=8485, ifu=1901, dir3d=dir3d)
         assert exp in img
 
+
+class TestPackArray(object):
+
+    @pytest.mark.parametrize('dtype', ['>f4', '<f8', '>i4', 'int16'])
+    def test_msgpack_roundtrip(self, dtype):
+        arr = np.arange(24, dtype=dtype).reshape(2, 3, 4)
+        packed = pack_array(arr, compression='msgpack')
+        assert isinstance(packed['buffer'], bytes)
+        assert packed['shape'] == [2, 3, 4]
+        unpacked = unpack_array(packed)
+        assert unpacked.dtype == arr.dtype
+        assert np.all(unpacked == arr)
+        assert unpacked.flags.writeable is True
+        unpacked[0, 0, 0] = 1
+
+    def test_json(self):
+        arr = np.arange(6).reshape(2, 3)
+        packed = pack_array(arr, compression='json')
+        assert packed == [[0, 1, 2], [3, 4, 5]]
+        assert np.all(unpack_array(packed) == arr)
+
+    def test_none(self):
+        assert pack_array(None, compression='msgpack') is None
+        assert unpack_array(None) is None
+
+
+class TestPackTable(object):
+
+    def test_roundtrip(self):
+        pytest.importorskip('pyarrow')
+        rows = [('1-209232', 8485, 0.0407), ('1-209113', 8485, 0.0379), ('1-209191', 8485, None)]
+        table = rows_to_arrow(rows, ['mangaid', 'plate', 'z'])
+        assert table.column_names == ['mangaid', 'plate', 'z']
+        unpacked = unpack_table(pack_table(table, chunk=2))
+        assert unpacked.equals(table)
+        assert unpacked.column('z').to_pylist() == [0.0407, 0.0379, None]
+
+    def test_empty(self):
+        pytest.importorskip('pyarrow')
+        table = rows_to_arrow([], ['mangaid', 'z'])
+        assert table.num_rows == 0
+        assert unpack_table(pack_table(table)).num_rows == 0
+
+
+class TestFitsSection(object):
+
+    @pytest.fixture(params=['fits', 'fits.gz'])
+    def fits_file(self, request, tmpdir):
+        data = np.arange(5 * 6 * 7, dtype='>f4').reshape(5, 6, 7)
+        path = str(tmpdir.join('test.' + request.param))
+        fits.HDUList([fits.PrimaryHDU(), fits.ImageHDU(data, name='FLUX'),
+                      fits.ImageHDU(data * 2, name='IVAR')]).writeto(path)
+        yield path, data
+
+    @pytest.mark.parametrize('key', [(2, ), (slice(None), 3, 4), (1, [0, 5, 2], [6, 1, 3]),
+                                     (slice(None), np.array([1, 2]), np.array([3, 3]))],
+                             ids=['channel', 'spaxel', 'channel-spaxels', 'spaxels'])
+    def test_section(self, fits_file, key):
+        path, data = fits_file
+        hdulist = open_fits(path)
+        assert get_fits_section(hdulist['FLUX'], key) == pytest.approx(data[key])
+        hdulist.close()
+
+    def test_memmap(self, fits_file):
+        path, __ = fits_file
+        hdulist = open_fits(path)
+        assert hdulist._file.memmap is True
+        hdulist.close()
+
+    def test_many_spaxels(self, fits_file):
+        path, data = fits_file
+        hdulist = open_fits(path)
+
+        for xx, yy in [(0, 0), (3, 4), (6, 5), (2, 1)]:
+            for extname, factor in [('FLUX', 1), ('IVAR', 2)]:
+                spectrum = get_fits_section(hdulist[extname], (slice(None), yy, xx))
+                assert spectrum == pytest.approx(data[:, yy, xx] * factor)
+
+        hdulist.close()
@@ -179,3 +179,43 @@ class TestMaskbit(object):
         mb.mask = mask
         actual = mb.get_mask(labels, mask=custom_mask, dtype=dtype)
         assert (actual == expected).all()
+
+    def test_values_to_labels_lookup_cache(self):
+
+        mb = Maskbit(name=name, schema=schema, description=description)
+        values = np.array([[3, 3], [0, 12]])
+
+        actual = mb.values_to_labels(values=values)
+        assert actual == [[['BITZERO', 'BITONE'], ['BITZERO', 'BITONE']],
+                          [[], ['BITTWO', 'BITTHREE']]]
+
+        # Each unique value is decoded once and cached.
+        assert sorted(mb._lookup['labels']) == [0, 3, 12]
+        assert mb.values_to_labels(values=3) == ['BITZERO', 'BITONE']
+
+    def test_values_to_labels_not_shared(self):
+
+        mb = Maskbit(name=name, schema=schema, description=description)
+
+        labels = mb.values_to_labels(values=np.array([1, 1, 0]))
+        labels[0].append('OOPS')
+
+        assert labels[1] == ['BITZERO']
+        assert mb.values_to_labels(values=1) == ['BITZERO']
+        assert mb.values_to_labels(values=np.array([1])) == [['BITZERO']]
+
+    @pytest.mark.parametrize('packed', [False, True])
+    def test_get_bit_planes(self, packed):
+
+        mb = Maskbit(name=name, schema=schema, description=description)
+        mb.mask = mask
+
+        planes = mb.get_bit_planes(packed=packed)
+
+        if packed:
+            assert planes.dtype == np.uint8
+            planes = np.unpackbits(planes, axis=-1)[..., :mask.shape[-1]].astype(bool)
+
+        assert planes.shape == (len(schema),) + mask.shape
+        for ii, bit in enumerate(schema.bit):
+            assert (planes[ii] == ((mask & 2**bit) > 0)).all()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under a 3-clause BSD license.
+#
+# @Filename: test_nsa_store.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+import pytest
+from astropy import table
+
+from marvin.utils.general.nsa_store import _fill_missing, get_nsa_columns, get_nsa_store
+
+
+@pytest.fixture()
+def nsa_store(tmpdir):
+
+    nsa_table = table.Table()
+    nsa_table['plateifu'] = ['8485-1901', '7443-12701', '8485-1902']
+    nsa_table['z'] = [0.0407, 0.0202, 0.0251]
+    nsa_table['elpetro_absmag'] = np.arange(21, dtype=float).reshape(3, 7)
+
+    path = str(tmpdir.join('nsa_v2_4_3.fits'))
+    nsa_table.write(path, format='fits')
+
+    yield path
+
+
+class TestNSAStore(object):
+
+    def test_no_store(self, tmpdir):
+        assert get_nsa_store('v2_4_3', path=str(tmpdir.join('nsa_none.fits'))) is None
+
+    def test_columns(self, nsa_store):
+        store = get_nsa_store('v2_4_3', path=nsa_store)
+        assert 'elpetro_absmag' in store.columns
+        assert store.column('z')[1] == pytest.approx(0.0202)
+        assert store.column('elpetro_absmag').shape == (3, 7)
+
+    def test_filter_plateifu(self, nsa_store):
+        store = get_nsa_store('v2_4_3', path=nsa_store)
+        columns = get_nsa_columns(store, ['z', 'elpetro_absmag'],
+                                  plateifus=['8485-1902', '1-000000', '8485-1901'])
+        np.testing.assert_allclose(columns['z'], [0.0251, 0.0407])
+        assert columns['elpetro_absmag'][0, 5] == pytest.approx(19.)
+
+    def test_fill_missing(self):
+        np.testing.assert_allclose(_fill_missing([1, None, 3]), [1, np.nan, 3])
+        assert _fill_missing([[1., 2.], None])[1] == pytest.approx([np.nan, np.nan], nan_ok=True)
+        assert list(_fill_missing(['a', None])) == ['a', '']
+        assert _fill_missing([None, None]) is None
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under a 3-clause BSD license.
+#
+# @Filename: test_spaxel_summary.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+import pytest
+
+from marvin.utils.general.spaxel_summary import _save_summary, _summary_version, get_spaxel_summary
+
+
+@pytest.fixture()
+def summary_path(tmpdir):
+
+    # three files, with histograms of a flux over the bins
+    # (-inf, 0), [0, 10), [10, 20), [20, inf)
+    edges = np.array([0., 10., 20.])
+    counts = np.array([[0, 5, 5, 10],
+                       [2, 8, 0, 0],
+                       [0, 0, 6, 4]])
+
+    path = str(tmpdir.join('2.2.1_cleanspaxelprop5'))
+    meta = {'version': _summary_version, 'dapver': '2.2.1', 'table': 'cleanspaxelprop5',
+            'params': ['emline_gflux_ha_6564'],
+            'edges': {'emline_gflux_ha_6564': edges.tolist()}}
+    _save_summary(path, meta, {'file_pk': np.array([3, 7, 9]),
+                               'goodcount': np.array([20, 10, 10]),
+                               'nspaxels': np.array([25, 12, 10]),
+                               'maxspaxelpk': np.array([25, 37, 47]),
+                               'edges_emline_gflux_ha_6564': edges,
+                               'counts_emline_gflux_ha_6564': counts})
+
+    yield path
+
+
+class TestSpaxelSummary(object):
+
+    def test_no_summary(self, tmpdir):
+        assert get_spaxel_summary('2.2.1', 'cleanspaxelprop5', path=str(tmpdir.join('none'))) is None
+
+    def test_load(self, summary_path):
+        summary = get_spaxel_summary('2.2.1', 'cleanspaxelprop5', path=summary_path)
+        assert 'emline_gflux_ha_6564' in summary
+        assert list(summary.file_pks) == [3, 7, 9]
+        assert get_spaxel_summary('2.2.1', 'cleanspaxelprop5', path=summary_path) is summary
+
+    @pytest.mark.parametrize('op, value, lower, upper',
+                             [('>=', 10, [15, 0, 10], [15, 0, 10]),
+                              ('>', 15, [10, 0, 4], [15, 0, 10]),
+                              ('<', 0, [0, 2, 0], [0, 2, 0]),
+                              ('<=', 12, [5, 10, 0], [10, 10, 6]),
+                              ('==', 5, [0, 0, 0], [5, 8, 0])])
+    def test_count_bounds(self, summary_path, op, value, lower, upper):
+        summary = get_spaxel_summary('2.2.1', 'cleanspaxelprop5', path=summary_path)
+        bounds = summary.count_bounds('emline_gflux_ha_6564', op, value)
+        assert list(bounds[0]) == lower
+        assert list(bounds[1]) == upper
+
+    def test_npergood(self, summary_path):
+        summary = get_spaxel_summary('2.2.1', 'cleanspaxelprop5', path=summary_path)
+
+        # exact at a bin edge: 15/20, 0/10, and 10/10 spaxels above 10
+        passes, check = summary.npergood('emline_gflux_ha_6564', '>=', 10, '>=', 0.5)
+        assert list(passes) == [3, 9]
+        assert list(check) == []
+
+        # 10 to 15 of 20, none of 10, and 4 to 10 of 10 spaxels above 15
+        passes, check = summary.npergood('emline_gflux_ha_6564', '>', 15, '>=', 0.6)
+        assert list(passes) == []
+        assert list(check) == [3, 9]
+
+    @pytest.mark.parametrize('op, value, fxn_op, percent, passes, check',
+                             [('>=', 10, '==', 0.75, [3], []),
+                              ('>=', 10, '!=', 0.75, [9], []),
+                              ('>', 15, '==', 0.5, [], [3, 9]),
+                              ('>', 15, '==', 0.9, [], [9]),
+                              ('>', 15, '!=', 0.5, [], [3, 9]),
+                              ('>', 15, '!=', 0.9, [3], [9])],
+                             ids=['eq_exact', 'ne_exact', 'eq_check', 'eq_outside',
+                                  'ne_check', 'ne_outside'])
+    def test_npergood_equality(self, summary_path, op, value, fxn_op, percent, passes, check):
+        summary = get_spaxel_summary('2.2.1', 'cleanspaxelprop5', path=summary_path)
+        result = summary.npergood('emline_gflux_ha_6564', op, value, fxn_op, percent)
+        assert list(result[0]) == passes
+        assert list(result[1]) == check
@@ -9,7 +9,7 @@
 # @Last Modified time: 2017-06-12 19:13:15
 
 from __future__ import print_function, division, absolute_import
-from marvin.utils.general.structs import Dotable, DotableCaseInsensitive
+from marvin.utils.general.structs import Dotable, DotableCaseInsensitive, FuzzyDict, FuzzyList
 import pytest
 
 from collections import OrderedDict
@@ -39,3 +39,60 @@ class TestCoreDotable(object):
         assert dotdictci[key.upper()] == dotdictci.__getattr__(key.lower())
         assert dotdictci[key.lower()] == dotdictci.__getattr__(key.upper())
         assert dotdictci[key.lower()] == dotdictci.__getattr__(key.lower())
+
+
+class AliasedFuzzyList(FuzzyList):
+
+    def aliases(self, item):
+        return [item.upper(), item.split('_')[0]]
+
+
+class TestFuzzyList(object):
+
+    def test_exact(self):
+        flist = FuzzyList(['emline_gflux_ha_6564', 'emline_gflux_hb_4862'])
+        assert flist['emline_gflux_hb_4862'] == 'emline_gflux_hb_4862'
+        assert 'emline_gflux_ha_6564' in flist._get_index()[1]
+
+    def test_fuzzy_cached(self):
+        flist = FuzzyList(['emline_gflux_ha_6564', 'stellar_vel'])
+        assert flist['stellar vel'] == 'stellar_vel'
+        assert flist._get_index()[2] == {'stellar vel': 1}
+        assert flist['stellar vel'] == 'stellar_vel'
+
+    def test_aliases(self):
+        flist = AliasedFuzzyList(['stellar_vel', 'stellar_sigma', 'binid'])
+        assert flist['BINID'] == 'binid'
+        assert flist['binid'] == 'binid'
+        # stellar is an alias of two items so it is not an exact match.
+        assert 'stellar' not in flist._get_index()[1]
+
+    def test_invalidation(self):
+        flist = FuzzyList(['stellar_vel', 'stellar_sigma'])
+        assert 'binid' not in flist
+        flist.append('binid')
+        assert flist['binid'] == 'binid'
+        flist.pop(0)
+        assert flist._get_index()[0] == ['stellar_sigma', 'binid']
+        flist[0] = 'emline_gflux_ha_6564'
+        assert 'stellar_sigma' not in flist._get_index()[1]
+
+
+class TestFuzzyDict(object):
+
+    def test_fuzzy_cached(self):
+        fdict = FuzzyDict([('stellar_vel', 1), ('emline_gflux_ha_6564', 2)])
+        assert fdict['stellar vel'] == 1
+        assert fdict._fuzzy_cache == {'stellar vel': 'stellar_vel'}
+        fdict['stellar_sigma'] = 3
+        assert '_fuzzy_cache' not in fdict.__dict__
+        assert fdict.stellar_sigma == 3
+
+    @pytest.mark.parametrize('method, args', [('pop', ('stellar_vel', )), ('popitem', ()),
+                                              ('clear', ()), ('__delitem__', ('stellar_vel', )),
+                                              ('update', ({'stellar_sigma': 3}, ))])
+    def test_fuzzy_cache_invalidated(self, method, args):
+        fdict = FuzzyDict([('emline_gflux_ha_6564', 2), ('stellar_vel', 1)])
+        assert fdict['stellar vel'] == 1
+        getattr(fdict, method)(*args)
+        assert '_fuzzy_cache' not in fdict.__dict__
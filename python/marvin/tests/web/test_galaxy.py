@@ -10,7 +10,7 @@
 
 from __future__ import print_function, division, absolute_import
 from marvin.web.controllers.galaxy import make_nsa_dict
-from marvin.web.controllers.galaxy import getWebMap
+from marvin.web.controllers.galaxy import getWebMap, get_web_plot_params
 from marvin.tools.cube import Cube
 from marvin.tests.conftest import set_the_config
 import pytest
@@ -85,7 +85,41 @@ class TestWebMap(object):
         assert webmap is None
         assert 'Could not get map' in mapmsg
 
+    def test_plot_params_memoized(self, cube):
+        dapver = cube._dapver
+        plotparams = get_web_plot_params(dapver, 'emline_gflux')
+        assert 'nocov' in plotparams['bits']
+        assert 'badData' in plotparams['bits']
 
+        # a copy is returned each time
+        plotparams['cmap'] = 'crap'
+        assert get_web_plot_params(dapver, 'emline_gflux')['cmap'] != 'crap'
 
 
+@pytest.mark.parametrize('page', [('galaxy_page', 'webmap')], ids=['webmap'], indirect=True)
+class TestWebMapRoute(object):
 
+    def test_webmap_png(self, galaxy, page):
+        params = {'plateifu': galaxy.plateifu, 'property': 'emline_gflux:ha_6564'}
+        page.load_page('get', page.url, params=params)
+        page.assert200(message='response status should be 200 for ok')
+        assert page.response.mimetype == 'image/png'
+        assert page.response.data[:8] == b'\x89PNG\r\n\x1a\n'
+
+        # a second request with the ETag is not modified
+        etag = page.response.headers['ETag']
+        response = page.client.get(page.url, query_string=params,
+                                   headers={'If-None-Match': etag})
+        assert response.status_code == 304
+
+    def test_webmap_binary(self, galaxy, page):
+        params = {'plateifu': galaxy.plateifu, 'property': 'stellar_vel', 'format': 'binary'}
+        page.load_page('get', page.url, params=params)
+        page.assert200(message='response status should be 200 for ok')
+        assert page.response.mimetype == 'application/octet-stream'
+
+    def test_webmap_bad_property(self, galaxy, page):
+        params = {'plateifu': galaxy.plateifu, 'property': 'crap'}
+        page.load_page('get', page.url, params=params)
+        assert page.json['result']['status'] == -1
+        assert 'Could not get map' in page.json['result']['mapmsg']
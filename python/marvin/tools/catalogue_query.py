@@ -0,0 +1,640 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under a 3-clause BSD license.
+#
+# @Filename: catalogue_query.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import copy
+import os
+import re
+from operator import eq, ge, gt, le, lt, ne
+
+import numpy as np
+from astropy.io import fits
+
+from marvin import config
+from marvin.core.exceptions import MarvinError
+from marvin.utils.datamodel.query.base import query_params
+from marvin.utils.general.catalogue_index import (get_catalogue_column, get_fits_colnames,
+                                                  get_sky_index)
+
+try:
+    from sqlalchemy_boolean_search import BooleanSearchException, parse_boolean_search
+except ImportError:
+    BooleanSearchException = parse_boolean_search = None
+
+
+__all__ = ('CatalogueQuery', )
+
+
+opdict = {'<=': le, '>=': ge, '>': gt, '<': lt, '!=': ne, '=': eq, '==': eq}
+
+# The tables whose parameters are columns of the drpall or the DAPall file
+_drpall_tables = ('cube', 'ifudesign', 'nsa')
+_dapall_tables = ('dapall', 'file', 'bintype', 'template')
+
+# Table shortcuts, as in the parameter lookup of the database queries
+_table_shortcuts = {'ifu': 'ifudesign'}
+
+# Parameters whose catalogue column has a different name
+_column_aliases = {'cube.ra': 'objra', 'cube.dec': 'objdec', 'cube.quality': 'drp3qual',
+                   'cube.manga_target1': 'mngtarg1', 'cube.manga_target2': 'mngtarg2',
+                   'cube.manga_target3': 'mngtarg3', 'cube.design': 'designid',
+                   'ifudesign.name': 'ifudsgn', 'file.quality': 'dapqual'}
+
+
+def _log_mass(mass):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(mass > 0, np.log10(np.where(mass > 0, mass, 1.)), 0.)
+
+
+def _colour(flux):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return -2.5 * np.log10(flux[:, 3] / flux[:, 4])
+
+
+# Parameters computed from other parameters, as the hybrid properties of the database models.
+# The NSA array columns are ordered FNugriz.
+_derived = {'nsa.elpetro_logmass': (['nsa.elpetro_mass'], _log_mass),
+            'nsa.sersic_logmass': (['nsa.sersic_mass'], _log_mass),
+            'nsa.elpetro_mag_g_r': (['nsa.elpetro_flux'], _colour),
+            'nsa.elpetro_absmag_g_r': (['nsa.elpetro_absmag'], lambda mag: mag[:, 3] - mag[:, 4])}
+
+
+def _iter_conditions(node):
+    ''' Yields the conditions and functions of a parsed filter '''
+
+    if hasattr(node, 'fxn_name'):
+        yield node
+    elif hasattr(node, 'conditions'):
+        for condition in node.conditions:
+            for item in _iter_conditions(condition):
+                yield item
+    elif hasattr(node, 'condition'):
+        for item in _iter_conditions(node.condition):
+            yield item
+    else:
+        yield node
+
+
+def _get_range(condition):
+    ''' Returns the lower and upper values of a between condition '''
+
+    if getattr(condition, 'value2', None) is not None:
+        return condition.value, condition.value2
+
+    low, __, high = str(condition.value).lower().partition('and')
+    return low, high
+
+
+def _compare_strings(values, op, value):
+    ''' Evaluates a condition on a string column, case-insensitively
+
+    As in the database queries, ``=`` selects the values containing ``value``,
+    or matching it if it has ``*`` wildcards, while ``==`` and ``!=`` compare
+    whole values.
+
+    '''
+
+    values = np.char.lower(values)
+    value = str(value).lower()
+
+    if op == '=':
+        if '*' in value:
+            pattern = re.compile('^{0}$'.format('.*'.join(re.escape(vv) for vv in value.split('*'))))
+            return np.array([pattern.match(vv) is not None for vv in values], dtype=bool)
+        return np.char.find(values, value) >= 0
+    elif op in opdict:
+        return opdict[op](values, value)
+
+    raise MarvinError('operator {0} cannot be used with string parameters'.format(op))
+
+
+class _ConeCondition(object):
+    ''' Cone searches around a list of positions, evaluated as a parsed function condition '''
+
+    fxn_name = 'radial_many'
+
+    def __init__(self, coords, radius):
+        self.coords = coords
+        self.value = radius
+
+
+class CatalogueQuery(object):
+    ''' A query on the drpall and DAPall catalogues
+
+    Evaluates the boolean search filters of a :class:`~marvin.tools.query.Query`
+    against the drpall and DAPall files of a release, instead of the
+    database. Only the columns used by the query are read, each one from a
+    memory-mapped ``.npy`` file saved next to the catalogue the first time
+    it is needed (see `~marvin.utils.general.catalogue_index.get_catalogue_column`),
+    and the conditions are evaluated as vectorised operations on whole
+    columns.
+
+    The rows of the query are the targets of the drpall file or, if any
+    ``dapall``, ``file``, ``bintype``, or ``template`` parameter is used, the
+    rows of the DAPall file, one per target and DAP analysis, joined to the
+    drpall by ``plateifu``. Parameters are named as in the database queries,
+    e.g., ``nsa.z`` or ``cube.ra``, and the ``radial`` function is supported.
+    Functions on the spaxel properties, such as ``npergood``, are not. Cone
+    searches use the spatial index of the drpall positions (see
+    `~marvin.utils.general.catalogue_index.SkyIndex`), and `radial_many`
+    cross-matches a whole list of positions at once.
+
+    Like a SQLAlchemy query, on which its interface is modelled so that
+    it can be used by :class:`~marvin.tools.results.Results`, the methods
+    that refine the query return a new one.
+
+    Parameters:
+        release (str):
+            The release of the catalogues. Defaults to the current release.
+        drpall (str):
+            The path to the drpall file. Defaults to the one of the release.
+        dapall (str):
+            The path to the DAPall file. Defaults to the one of the release.
+
+    Example:
+        >>> query = CatalogueQuery(release='MPL-7').add_columns('cube.plateifu', 'nsa.z')
+        >>> query = query.filter('nsa.z < 0.1 and radial(232.5, 48.7, 1)')
+        >>> query.order_by('nsa.z').slice(0, 10).all()
+        [('8485-1901', 0.0407), ...]
+
+    '''
+
+    def __init__(self, release=None, drpall=None, dapall=None):
+
+        self.release = release or config.release
+        self._drpver, self._dapver = config.lookUpVersions(release=self.release)
+
+        self.drpall = drpall or config._getDrpAllPath(drpver=self._drpver)
+        self._dapall = dapall
+
+        # MPLs 1-7 only have one data extension
+        self._drpall_hdu = 'MANGA'
+        self._dapall_hdu = -1
+
+        self.params = []
+        self.filters = []
+        self._order = None
+        self._slice = (None, None)
+
+        self._rows = None
+        self._join = None
+        self._full_names = {}
+        self._dapall_channels = None
+
+    def __repr__(self):
+        return '<CatalogueQuery (release={0!r}, params={1}, filters={2})>'.format(
+            self.release, self.params, [strfilter for strfilter, __ in self.filters])
+
+    def __str__(self):
+
+        statement = 'SELECT {0} FROM {1}'.format(', '.join(self.params) or '*',
+                                                 os.path.basename(self.drpall))
+        if self.uses_dapall:
+            statement += ' JOIN {0} USING (plateifu)'.format(os.path.basename(self.dapall))
+        if self.filters:
+            statement += ' WHERE {0}'.format(self.filter_string)
+        if self._order:
+            statement += ' ORDER BY {0} {1}'.format(self._order[0], self._order[1].upper())
+
+        start, end = self._slice
+        if end is not None:
+            statement += ' LIMIT {0}'.format(end - (start or 0))
+        if start:
+            statement += ' OFFSET {0}'.format(start)
+
+        return statement
+
+    @property
+    def dapall(self):
+        ''' The path to the DAPall file '''
+
+        if self._dapall is None:
+            from marvin.utils.general import get_dapall_file
+            self._dapall = get_dapall_file(self._drpver, self._dapver)
+
+        return self._dapall
+
+    @property
+    def filter_string(self):
+        ''' The filters of the query, joined by and '''
+        return ' and '.join('({0})'.format(strfilter) for strfilter, __ in self.filters)
+
+    @property
+    def statement(self):
+        ''' The query itself, mirroring the SQLAlchemy query attribute '''
+        return self
+
+    def compile(self, *args, **kwargs):
+        ''' Returns a description of the query, in a SQL-like syntax '''
+        return str(self)
+
+    def _clone(self, **kwargs):
+        ''' Returns a copy of the query with some attributes changed '''
+
+        query = copy.copy(self)
+        query.params = list(self.params)
+        query.filters = list(self.filters)
+        query._rows = None
+        query._join = None
+
+        for name, value in kwargs.items():
+            setattr(query, name, value)
+
+        return query
+
+    def add_columns(self, *params):
+        ''' Returns a new query also returning some parameters '''
+
+        new_params = list(self.params)
+        for param in params:
+            param = self.get_full_name(param)
+            if param not in new_params:
+                new_params.append(param)
+
+        return self._clone(params=new_params)
+
+    def filter(self, search_filter):
+        ''' Returns a new query also selecting the rows that match a boolean search filter '''
+
+        if parse_boolean_search is None:
+            raise MarvinError('sqlalchemy_boolean_search is needed to query the catalogues')
+
+        try:
+            parsed = parse_boolean_search(search_filter)
+        except BooleanSearchException as ee:
+            raise MarvinError('Your boolean expression contained a syntax error: {0}'.format(ee))
+
+        # check all the parameters before the query is run
+        for name in self._get_filter_names(parsed):
+            try:
+                self._get_source(self.get_full_name(name))
+            except KeyError as ee:
+                raise MarvinError('Could not set parameters: {0}'.format(ee))
+
+        return self._clone(filters=self.filters + [(search_filter, parsed)])
+
+    def radial_many(self, coords, radius):
+        ''' Returns a new query also selecting the rows within a radius of any of a list of positions
+
+        A bulk version of the ``radial`` function of the search filters, to
+        cross-match a list of targets in a single query.
+
+        Parameters:
+            coords (array):
+                A list or ``(N, 2)`` array of RA and Dec pairs, in degrees.
+            radius (float):
+                The radius of the cone around each position, in degrees.
+
+        '''
+
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        description = 'radial_many({0} positions, {1})'.format(len(coords), radius)
+
+        return self._clone(filters=self.filters + [(description, _ConeCondition(coords, radius))])
+
+    def order_by(self, param, order='asc'):
+        ''' Returns a new query sorted by a parameter, or unsorted if ``param`` is None '''
+
+        if param is None:
+            return self._clone(_order=None)
+
+        assert order in ['asc', 'desc'], 'Sort order parameter must be either "asc" or "desc"'
+
+        return self._clone(_order=(self.get_full_name(param), order))
+
+    def slice(self, start, end):
+        ''' Returns a new query returning the rows from ``start`` to ``end`` of this one '''
+
+        rows = self._get_rows()
+        cur_start, cur_end = self._slice
+
+        start = (cur_start or 0) + (start or 0)
+        end = (cur_start or 0) + end if end is not None else None
+        if cur_end is not None:
+            end = min(end, cur_end) if end is not None else cur_end
+
+        query = self._clone(_slice=(start or None, end))
+        query._rows = rows
+        query._join = self._join
+
+        return query
+
+    def from_self(self):
+        ''' Returns the query itself, mirroring the SQLAlchemy method '''
+        return self
+
+    def count(self):
+        ''' Returns the number of rows matching the query '''
+        return len(self._get_rows()[slice(*self._slice)])
+
+    def all(self):
+        ''' Runs the query and returns the rows as a list of tuples '''
+
+        rows = self._get_rows()[slice(*self._slice)]
+        columns = [np.asarray(self.column(param))[rows].tolist() for param in self.params]
+
+        return list(zip(*columns))
+
+    @property
+    def uses_dapall(self):
+        ''' True if the rows of the query are the rows of the DAPall file '''
+
+        names = list(self.params) + [self.get_full_name(name) for __, parsed in self.filters
+                                     for name in self._get_filter_names(parsed)]
+
+        return any(name.split('.')[0] in _dapall_tables for name in names)
+
+    @staticmethod
+    def _get_filter_names(parsed):
+        ''' Returns the parameter names used by the conditions of a parsed filter '''
+
+        names = []
+        for condition in _iter_conditions(parsed):
+            if hasattr(condition, 'fxn_name'):
+                if condition.fxn_name.lower() in ['radial', 'radial_many']:
+                    names.extend(['cube.ra', 'cube.dec'])
+            else:
+                names.append(getattr(condition, 'fullname', None) or condition.name)
+
+        return names
+
+    def get_filter_params(self):
+        ''' Returns the full names of the parameters used by the filters '''
+
+        names = []
+        for __, parsed in self.filters:
+            for name in self._get_filter_names(parsed):
+                name = self.get_full_name(name)
+                if name not in names:
+                    names.append(name)
+
+        return names
+
+    def _get_colnames(self, catalogue):
+        ''' Returns the lowercase column names of the drpall or DAPall file '''
+
+        if catalogue == 'drpall':
+            colnames = get_fits_colnames(self.drpall, hdu=self._drpall_hdu)
+        else:
+            colnames = get_fits_colnames(self.dapall, hdu=self._dapall_hdu)
+
+        return [colname.lower() for colname in colnames]
+
+    def _has_dapall(self):
+        try:
+            return os.path.isfile(self.dapall)
+        except (AssertionError, MarvinError):
+            return False
+
+    def get_full_name(self, name):
+        ''' Returns the full ``table.column`` name of a parameter
+
+        The schema is removed from full names. Names without a table are
+        looked up in the query parameters of the datamodel and then in the
+        columns of the catalogues.
+
+        Raises:
+            KeyError: if the name does not match any parameter, or matches more than one.
+
+        '''
+
+        name = name.lower()
+        if name in self._full_names:
+            return self._full_names[name]
+
+        parts = name.split('.')
+        if len(parts) > 1:
+            table = _table_shortcuts.get(parts[-2], parts[-2])
+            full = '{0}.{1}'.format(table, parts[-1])
+        else:
+            matches = set(qp.full for qp in query_params.parameters
+                          if name in [qp.name, qp.short, qp.remote])
+
+            if not matches:
+                drpall_columns = self._get_colnames('drpall')
+                if 'nsa_' + name in drpall_columns:
+                    matches.add('nsa.' + name)
+                if name in drpall_columns:
+                    matches.add('cube.' + name)
+                if self._has_dapall() and self._resolve_dapall(name):
+                    matches.add('dapall.' + name)
+
+            if len(matches) == 0:
+                raise KeyError('{0} does not match any column.'.format(name))
+            elif len(matches) > 1:
+                raise KeyError('{0} matches multiple parameters in the lookup table: {1}'
+                               .format(name, ', '.join(sorted(matches))))
+
+            full = matches.pop()
+
+        self._full_names[name] = full
+
+        return full
+
+    def _get_dapall_channels(self):
+        ''' Returns the channel names of the DAPall array columns, from its primary header '''
+
+        if self._dapall_channels is None:
+            header = fits.getheader(self.dapall, 0)
+            channels = {'emline_s': [], 'emline_g': [], 'specindex': []}
+            for key, val in header.items():
+                if 'ELS' in key:
+                    kind = 'emline_s'
+                elif 'ELG' in key:
+                    kind = 'emline_g'
+                elif re.search('SPI([0-9])', key):
+                    kind = 'specindex'
+                else:
+                    continue
+                channels[kind].append(val.lower().replace('-', '_').replace('.', '_'))
+            self._dapall_channels = channels
+
+        return self._dapall_channels
+
+    def _resolve_dapall(self, name):
+        ''' Returns the DAPall column and channel index of a parameter, or None
+
+        Array columns are split into one parameter per channel, as in
+        `~marvin.utils.general.general.map_dapall`, e.g., the ``ha_6564``
+        channel of ``emline_gflux_1re`` is ``emline_gflux_1re_ha_6564``.
+
+        '''
+
+        colnames = self._get_colnames('dapall')
+        if name in colnames:
+            return name, None
+
+        channels = self._get_dapall_channels()
+        for colname in sorted(colnames, key=len, reverse=True):
+            if not name.startswith(colname + '_'):
+                continue
+            channel = name[len(colname) + 1:]
+            kind = [kk for kk in channels if kk in colname]
+            if kind and channel in channels[kind[0]]:
+                return colname, channels[kind[0]].index(channel)
+            elif not kind and channel.isdigit():
+                return colname, int(channel) - 1
+
+        return None
+
+    def _get_source(self, full):
+        ''' Returns the catalogue, column, and channel index of a full parameter name '''
+
+        if full in _derived:
+            return 'derived', full, None
+
+        table, column = full.split('.', 1)
+        column = _column_aliases.get(full, column)
+
+        if table in ('bintype', 'template') and column == 'name':
+            return 'dapall', 'daptype', None
+        elif table == 'nsa' and 'nsa_' + column in self._get_colnames('drpall'):
+            return 'drpall', 'nsa_' + column, None
+        elif table in ('cube', 'ifudesign') and column in self._get_colnames('drpall'):
+            return 'drpall', column, None
+        elif table in ('dapall', 'file') and self._has_dapall():
+            resolved = self._resolve_dapall(column)
+            if resolved:
+                return ('dapall', ) + resolved
+
+        raise MarvinError('{0} is not available in the drpall or DAPall catalogues'.format(full))
+
+    def _get_join(self):
+        ''' Returns the DAPall rows and the matching drpall rows of a DAPall query '''
+
+        if self._join is None:
+            from marvin.utils.general.general import get_drpall_index
+
+            index = get_drpall_index(drpver=self._drpver, drpall=self.drpall)
+            plateifus = get_catalogue_column(self.dapall, 'plateifu', hdu=self._dapall_hdu)
+            drprows = index.lookup_first('plateifu', plateifus)
+            daprows = np.nonzero(drprows >= 0)[0]
+            self._join = (daprows, drprows[daprows])
+
+        return self._join
+
+    def column(self, param):
+        ''' Returns the values of a parameter for all the rows of the query, before filtering '''
+
+        param = self.get_full_name(param)
+        catalogue, colname, channel = self._get_source(param)
+
+        if catalogue == 'derived':
+            inputs, function = _derived[param]
+            return function(*[np.asarray(self.column(name), dtype=float) for name in inputs])
+
+        if catalogue == 'drpall':
+            values = get_catalogue_column(self.drpall, colname, hdu=self._drpall_hdu)
+            if self.uses_dapall:
+                values = values[self._get_join()[1]]
+        else:
+            values = get_catalogue_column(self.dapall, colname, hdu=self._dapall_hdu)
+            values = values[self._get_join()[0]]
+
+        if channel is not None:
+            values = values[:, channel]
+
+        if colname == 'daptype':
+            # the DAP type is the binning type and the template, e.g., HYB10-GAU-MILESHC
+            parts = np.char.partition(values, '-')
+            values = parts[:, 0] if param.startswith('bintype') else parts[:, 2]
+
+        return values
+
+    def _get_nrows(self):
+        ''' Returns the number of rows of the query, before filtering '''
+
+        if self.uses_dapall:
+            return len(self._get_join()[0])
+
+        return len(get_catalogue_column(self.drpall, 'plateifu', hdu=self._drpall_hdu))
+
+    def _evaluate(self, node):
+        ''' Returns the boolean mask of the rows matching a node of a parsed filter '''
+
+        if hasattr(node, 'fxn_name'):
+            return self._evaluate_function(node)
+        elif hasattr(node, 'conditions'):
+            masks = [self._evaluate(condition) for condition in node.conditions]
+            if type(node).__name__ == 'BoolOr':
+                return np.logical_or.reduce(masks)
+            return np.logical_and.reduce(masks)
+        elif hasattr(node, 'condition'):
+            return ~self._evaluate(node.condition)
+
+        return self._evaluate_condition(node)
+
+    def _evaluate_condition(self, condition):
+        ''' Returns the boolean mask of the rows matching a single condition '''
+
+        name = getattr(condition, 'fullname', None) or condition.name
+        values = np.asarray(self.column(name))
+        op = condition.op.strip().lower()
+        value = condition.value
+
+        if values.dtype.kind in ['S', 'U']:
+            return _compare_strings(values, op, value)
+
+        if op == 'between':
+            low, high = _get_range(condition)
+            return (values >= float(low)) & (values <= float(high))
+        elif op.startswith('&'):
+            # as in the database, "a & ~N" selects the rows with any bit outside of N
+            value = '{0}{1}'.format(op[1:], value).replace(' ', '')
+            bits = ~int(value[1:]) if value.startswith('~') else int(value)
+            return (values.astype(np.int64) & bits) != 0
+        elif op not in opdict:
+            raise MarvinError('operator {0} is not supported in catalogue queries'.format(op))
+
+        try:
+            value = float(value)
+        except ValueError:
+            raise MarvinError('{0} is not a valid value for {1}'.format(value, name))
+
+        return opdict[op](values, value)
+
+    def _evaluate_function(self, fxn):
+        ''' Returns the boolean mask of the rows matching a function condition '''
+
+        name = fxn.fxn_name.lower()
+
+        if name in ['radial', 'radial_many']:
+            coords = fxn.coords if name == 'radial_many' else [list(map(float, fxn.coords))]
+            index = get_sky_index(self.drpall, hdu=self._drpall_hdu,
+                                  ra=_column_aliases['cube.ra'], dec=_column_aliases['cube.dec'])
+            mask = index.match_mask(coords, float(fxn.value))
+            return mask[self._get_join()[1]] if self.uses_dapall else mask
+
+        raise MarvinError('function {0} needs the spaxel properties and cannot be used '
+                          'in catalogue queries'.format(fxn.fxn_name))
+
+    def _get_rows(self):
+        ''' Returns the sorted numbers of the rows matching the filters '''
+
+        if self._rows is not None:
+            return self._rows
+
+        mask = np.ones(self._get_nrows(), dtype=bool)
+        for __, parsed in self.filters:
+            mask &= self._evaluate(parsed)
+
+        rows = np.nonzero(mask)[0]
+
+        if self._order is not None:
+            param, order = self._order
+            values = np.asarray(self.column(param))[rows]
+            # a stable sort, reversed for descending order, keeps ties in row order
+            if order == 'desc':
+                rows = rows[::-1][np.argsort(values[::-1], kind='mergesort')[::-1]]
+            else:
+                rows = rows[np.argsort(values, kind='mergesort')]
+
+        self._rows = rows
+
+        return rows
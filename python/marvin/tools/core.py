@@ -14,12 +14,15 @@ import abc
 import warnings
 
 import astropy.io.fits
+import numpy as np
+from brain.core.exceptions import BrainError
 
 import marvin
 import marvin.api.api
 from marvin.core import marvin_pickle
 from marvin.core.exceptions import MarvinBreadCrumb, MarvinError, MarvinUserWarning
 from marvin.tools.mixins import MMAMixIn
+from marvin.utils.general import open_fits, unpack_array
 from marvin.utils.general.maskbit import get_manga_target
 
 
@@ -125,11 +128,82 @@ class MarvinToolsClass(MMAMixIn):
         from marvin.contrib.vacs.base import VACMixIn
         self.vacs = VACMixIn.get_vacs(self)
 
-    def _toolInteraction(self, url, params=None):
-        """Runs an Interaction and passes self._release."""
+    def _toolInteraction(self, url, params=None, cache=None, send=True):
+        """Runs an Interaction and passes self._release.
+
+        Responses are read from and stored in the persistent API cache if
+        ``cache=True`` or, if ``cache=None``, if ``marvin.config.use_api_cache``
+        is set. If ``send=False``, the Interaction is returned without sending
+        the request.
+
+        """
 
         params = params or {'release': self._release}
-        return marvin.api.api.Interaction(url, params=params)
+        cache = marvin.config.use_api_cache if cache is None else cache
+        return marvin.api.api.Interaction(url, params=params, cache=cache, send=send)
+
+    def _get_remote_spaxel_arrays(self, route, single_route, xs, ys, names, keys, common=(),
+                                  **url_kwargs):
+        """Requests the arrays of several quantities for a list of spaxels.
+
+        All the spaxels are requested at once from the bulk ``route``. If the
+        server does not provide that route (it is not in the URL map, or the
+        server replies with a 404), falls back to one request per spaxel to
+        ``single_route`` and stacks the responses. Any other error is raised.
+        Quantities in ``common`` are the same for all the spaxels and are not
+        stacked.
+
+        Returns a dictionary of quantity name to a dictionary of ``keys`` to
+        arrays. A key with no data for any spaxel is None; if only some spaxels
+        have no data, a list with None for those spaxels is returned instead.
+
+        """
+
+        urlmap = marvin.config.urlmap['api']
+
+        params = {'release': self._release,
+                  'x': ','.join(map(str, xs)),
+                  'y': ','.join(map(str, ys))}
+
+        if route in urlmap:
+            interaction = self._toolInteraction(urlmap[route]['url'].format(**url_kwargs),
+                                                params=params, send=False)
+            try:
+                interaction._sendRequest('post')
+            except (MarvinError, BrainError):
+                if getattr(interaction, 'status_code', None) != 404:
+                    raise
+                marvin.log.debug('bulk route {0} not found on the server. Requesting '
+                                 'one spaxel at a time.'.format(route))
+            else:
+                data = interaction.getData()
+                return dict((name, dict((key, unpack_array(data[name].get(key))) for key in keys))
+                            for name in names)
+        else:
+            marvin.log.debug('bulk route {0} not in the URL map. Requesting one spaxel '
+                             'at a time.'.format(route))
+
+        url = urlmap[single_route]['url']
+        responses = [self._toolInteraction(url.format(x=x, y=y, **url_kwargs),
+                                           params={'release': self._release}).getData()
+                     for x, y in zip(xs, ys)]
+
+        arrays = {}
+        for name in names:
+            arrays[name] = {}
+            for key in keys:
+                values = [(response.get(name) or {}).get(key) for response in responses]
+                if name in common:
+                    arrays[name][key] = unpack_array(values[0])
+                elif all(value is None for value in values):
+                    arrays[name][key] = None
+                elif any(value is None for value in values):
+                    arrays[name][key] = [np.array(value) if value is not None else None
+                                         for value in values]
+                else:
+                    arrays[name][key] = np.array(values)
+
+        return arrays
 
     @staticmethod
     def _check_file(header, data, objtype):
@@ -177,7 +251,7 @@ class MarvinToolsClass(MMAMixIn):
         data = None
         if idict['data_origin'] == 'file':
             try:
-                data = astropy.io.fits.open(idict['filename'])
+                data = open_fits(idict['filename'])
             except Exception as ee:
                 warnings.warn('there was a problem reloading the FITS object: {0}. '
                               'The object has been unpickled but not all the functionality '
@@ -13,6 +13,7 @@
 from __future__ import absolute_import, division, print_function
 
 import warnings
+from collections import OrderedDict
 
 import numpy as np
 from astropy.io import fits
@@ -26,7 +27,8 @@ import marvin.utils.general.general
 from marvin.core.exceptions import MarvinError, MarvinUserWarning
 from marvin.tools.quantities import DataCube, Spectrum
 from marvin.utils.datamodel.drp import datamodel
-from marvin.utils.general import FuzzyDict, get_nsa_data, gunzip
+from marvin.utils.general import (FuzzyDict, get_fits_section, get_nsa_data, open_fits,
+                                  unpack_array)
 
 from .core import MarvinToolsClass
 from .mixins import GetApertureMixIn, NSAMixIn
@@ -177,8 +179,7 @@ class Cube(MarvinToolsClass, NSAMixIn, GetApertureMixIn):
             assert isinstance(data, fits.HDUList), 'data is not an HDUList object'
         else:
             try:
-                with gunzip(self.filename) as gg:
-                    self.data = fits.open(gg.name)
+                self.data = open_fits(self.filename)
             except (IOError, OSError) as err:
                 raise OSError('filename {0} cannot be found: {1}'.format(self.filename, err))
 
@@ -389,7 +390,17 @@ class Cube(MarvinToolsClass, NSAMixIn, GetApertureMixIn):
             # If the table is "spaxel", this must be a 3D cube. If it is "cube",
             # uses self.data, which is basically the DataModelClass.Cube instance.
             if model.db_table == 'spaxel':
-                ext_data = self.data.get3DCube(model.db_column(ext))
+                # Retrieves the value, ivar, and mask in a single query and
+                # caches all of them.
+                exts = [ext] + [key for key in [None, 'ivar', 'mask']
+                                if key != ext and self._get_ext_name(model, key)]
+                columns = [model.db_column(key) for key in exts]
+                cubes = self.data.get3DCubes(columns, shape=self._shape)
+
+                for key, column in zip(exts[1:], columns[1:]):
+                    self._extension_data[self._get_ext_name(model, key)] = cubes[column]
+
+                ext_data = cubes[columns[0]]
             elif model.db_table == 'cube':
                 ext_data = getattr(self.data, model.db_column(ext))
             else:
@@ -410,8 +421,7 @@ class Cube(MarvinToolsClass, NSAMixIn, GetApertureMixIn):
                                   'exists: {0}'.format(str(ee)))
 
             data = response.getData()
-            cube_ext_data = data['extension_data']
-            ext_data = np.array(cube_ext_data) if cube_ext_data is not None else None
+            ext_data = unpack_array(data['extension_data'])
 
         self._extension_data[ext_name] = ext_data
 
@@ -420,114 +430,157 @@ class Cube(MarvinToolsClass, NSAMixIn, GetApertureMixIn):
     def _get_spaxel_quantities(self, x, y, spaxel=None):
         """Returns a dictionary of spaxel quantities."""
 
-        cube_quantities = FuzzyDict({})
+        return self.get_spaxel_quantities([x], [y], spaxels=[spaxel])[0]
 
-        if self.data_origin == 'db':
+    def get_spaxel_quantities(self, xs, ys, spaxels=None):
+        """Returns the spaxel quantities for a list of spaxels.
 
-            session = marvin.marvindb.session
-            datadb = marvin.marvindb.datadb
+        The quantities for all the spaxels are retrieved in bulk: a single
+        slice of each extension for files, a single query for the DB, and a
+        single request in remote mode.
 
-        if self.data_origin == 'file' or self.data_origin == 'db':
+        Parameters:
+            xs,ys (list):
+                The ``x`` and ``y`` coordinates of the spaxels (0-indexed,
+                origin is ``lower``).
+            spaxels (list or None):
+                Not used; accepted for consistency with
+                `.Maps.get_spaxel_quantities`.
 
-            # Stores a dictionary of (table, row)
-            _db_rows = {}
+        Returns:
+            quantities (list):
+                A list with one `~marvin.utils.general.structs.FuzzyDict` of
+                `.Spectrum` quantities per input coordinate.
 
-            for dm in self.datamodel.datacubes + self.datamodel.spectra:
+        """
 
-                data = {'value': None, 'ivar': None, 'mask': None, 'std': None}
+        xs = np.atleast_1d(xs).astype(int)
+        ys = np.atleast_1d(ys).astype(int)
 
-                for key in data:
+        assert xs.shape == ys.shape, 'xs and ys must have the same size'
 
-                    if key == 'ivar':
-                        if dm in self.datamodel.spectra or not dm.has_ivar():
-                            continue
-                    if key == 'mask':
-                        if dm in self.datamodel.spectra or not dm.has_mask():
-                            continue
-                    if key == 'std':
-                        if dm in self.datamodel.datacubes or not dm.has_std():
-                            continue
+        arrays = self._get_spaxel_arrays(xs, ys)
 
-                    if self.data_origin == 'file':
+        wavelength = self._wavelength
+        cube_quantities = [FuzzyDict({}) for __ in range(len(xs))]
 
-                        extname = dm.fits_extension(None if key == 'value' else key)
+        for dm in self.datamodel.datacubes + self.datamodel.spectra:
 
-                        if dm in self.datamodel.datacubes:
-                            data[key] = self.data[extname].data[:, y, x]
-                        else:
-                            data[key] = self.data[extname].data
+            data = arrays[dm.name]
 
-                    elif self.data_origin == 'db':
+            if data['value'] is None:
+                warnings.warn('cannot find {!r} data for {!r}. '
+                              'Maybe the data is not in the DB.'.format(
+                                  dm.name, self.plateifu), MarvinUserWarning)
+                for quantities in cube_quantities:
+                    quantities[dm.name] = None
+                continue
 
-                        colname = dm.db_column(None if key == 'value' else key)
+            # Datacube arrays have one row per spaxel. Spectra are the same for all spaxels.
+            is_datacube = dm in self.datamodel.datacubes
 
-                        if dm in self.datamodel.datacubes:
+            for ii, quantities in enumerate(cube_quantities):
 
-                            if 'datacubes' not in _db_rows:
-                                _db_rows['datacubes'] = session.query(datadb.Spaxel).filter(
-                                    datadb.Spaxel.cube == self.data,
-                                    datadb.Spaxel.x == x, datadb.Spaxel.y == y).one()
+                spaxel_data = {key: data[key][ii] if (data[key] is not None and is_datacube)
+                               else data[key] for key in data}
 
-                            spaxel_data = getattr(_db_rows['datacubes'], colname)
+                # In case the spaxel was empty in the DB.
+                if spaxel_data['value'] is None:
+                    warnings.warn('cannot find {!r} data for {!r} at spaxel ({}, {}). '
+                                  'Maybe the data is not in the DB.'.format(
+                                      dm.name, self.plateifu, xs[ii], ys[ii]), MarvinUserWarning)
+                    quantities[dm.name] = None
+                    continue
 
-                        else:
+                quantities[dm.name] = Spectrum(spaxel_data['value'],
+                                               ivar=spaxel_data['ivar'],
+                                               mask=spaxel_data['mask'],
+                                               std=spaxel_data['std'],
+                                               wavelength=wavelength,
+                                               unit=dm.unit,
+                                               pixmask_flag=dm.pixmask_flag)
 
-                            if 'spectra' not in _db_rows:
-                                _db_rows['spectra'] = session.query(datadb.Cube).filter(
-                                    datadb.Cube.pk == self.data.pk).one()
+        return cube_quantities
 
-                            spaxel_data = getattr(_db_rows['spectra'], colname, None)
+    def _get_spaxel_keys(self, dm):
+        """Returns the value, ivar, mask, and std keys available for a datamodel."""
 
-                        # In case the column was empty in the DB. At some point
-                        # this can be removed.
-                        if spaxel_data is None:
-                            warnings.warn('cannot find {!r} data for {!r}. '
-                                          'Maybe the data is not in the DB.'.format(
-                                              colname, self.plateifu), MarvinUserWarning)
-                            cube_quantities[dm.name] = None
-                            continue
+        if dm in self.datamodel.datacubes:
+            return ['value'] + [key for key, has_key in [('ivar', dm.has_ivar()),
+                                                         ('mask', dm.has_mask())] if has_key]
 
-                        data[key] = np.array(spaxel_data)
+        return ['value', 'std'] if dm.has_std() else ['value']
 
-                cube_quantities[dm.name] = Spectrum(data['value'],
-                                                    ivar=data['ivar'],
-                                                    mask=data['mask'],
-                                                    std=data['std'],
-                                                    wavelength=self._wavelength,
-                                                    unit=dm.unit,
-                                                    pixmask_flag=dm.pixmask_flag)
+    def _get_spaxel_arrays(self, xs, ys):
+        """Returns the value, ivar, mask, and std arrays for a list of spaxels.
 
-        if self.data_origin == 'api':
+        Returns a dictionary keyed by datamodel name. Datacube arrays have
+        shape ``(len(xs), nwave)``; spectra, which are the same for all the
+        spaxels, are one-dimensional. Missing quantities are ``None``.
 
-            params = {'release': self._release}
-            url = marvin.config.urlmap['api']['getCubeQuantitiesSpaxel']['url']
+        """
+
+        arrays = OrderedDict()
+        for dm in self.datamodel.datacubes + self.datamodel.spectra:
+            arrays[dm.name] = OrderedDict((key, None) for key in ['value', 'ivar', 'mask', 'std'])
+
+        if self.data_origin == 'file':
+
+            for dm in self.datamodel.datacubes + self.datamodel.spectra:
+                for key in self._get_spaxel_keys(dm):
+
+                    extname = dm.fits_extension(None if key == 'value' else key)
+
+                    if dm in self.datamodel.datacubes:
+                        arrays[dm.name][key] = get_fits_section(self.data[extname],
+                                                                (slice(None), ys, xs)).T
+                    else:
+                        arrays[dm.name][key] = self.data[extname].data
+
+        elif self.data_origin == 'db':
+
+            from marvin.db.ArrayUtils import get_spaxel_values
+
+            session = marvin.marvindb.session
+            datadb = marvin.marvindb.datadb
+
+            columns = [dm.db_column(None if key == 'value' else key)
+                       for dm in self.datamodel.datacubes
+                       for key in self._get_spaxel_keys(dm)]
+
+            values = get_spaxel_values(session, datadb.Spaxel, 'cube_pk', self.data.pk,
+                                       xs, ys, columns)
+
+            for dm in self.datamodel.datacubes + self.datamodel.spectra:
+                for key in self._get_spaxel_keys(dm):
+
+                    colname = dm.db_column(None if key == 'value' else key)
+
+                    if dm in self.datamodel.datacubes:
+                        arrays[dm.name][key] = values[colname]
+                    else:
+                        spectrum = getattr(self.data, colname, None)
+                        if spectrum is not None:
+                            arrays[dm.name][key] = np.array(spectrum)
+
+        elif self.data_origin == 'api':
 
             try:
-                response = self._toolInteraction(url.format(name=self.plateifu,
-                                                            x=x, y=y, params=params))
+                data = self._get_remote_spaxel_arrays(
+                    'getCubeQuantitiesSpaxels', 'getCubeQuantitiesSpaxel', xs, ys,
+                    [dm.name for dm in self.datamodel.datacubes + self.datamodel.spectra],
+                    ['value', 'ivar', 'mask', 'std'],
+                    common=[dm.name for dm in self.datamodel.spectra],
+                    name=self.plateifu)
             except Exception as ee:
                 raise MarvinError('found a problem when checking if remote cube '
                                   'exists: {0}'.format(str(ee)))
 
-            data = response.getData()
-
             for dm in self.datamodel.datacubes + self.datamodel.spectra:
+                arrays[dm.name] = OrderedDict(
+                    (key, data[dm.name][key]) for key in ['value', 'ivar', 'mask', 'std'])
 
-                if data[dm.name]['value'] is None:
-                    warnings.warn('cannot find {!r} data for {!r}. '
-                                  'Maybe the data is not in the DB.'.format(
-                                      dm.name, self.plateifu), MarvinUserWarning)
-                    cube_quantities[dm.name] = None
-                    continue
-
-                cube_quantities[dm.name] = Spectrum(data[dm.name]['value'],
-                                                    ivar=data[dm.name]['ivar'],
-                                                    mask=data[dm.name]['mask'],
-                                                    wavelength=data['wavelength'],
-                                                    unit=dm.unit,
-                                                    pixmask_flag=dm.pixmask_flag)
-
-        return cube_quantities
+        return arrays
 
     def getSpaxel(self, x=None, y=None, ra=None, dec=None,
                   maps=False, modelcube=False, **kwargs):
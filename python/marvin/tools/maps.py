@@ -15,6 +15,7 @@ from __future__ import absolute_import, division, print_function
 import copy
 import inspect
 import warnings
+from collections import OrderedDict
 
 import astropy.io.fits
 import astropy.wcs
@@ -34,7 +35,8 @@ import marvin.utils.dap.bpt
 import marvin.utils.general.general
 from marvin.utils.datamodel.dap import datamodel
 from marvin.utils.datamodel.dap.base import Channel, Property
-from marvin.utils.general import FuzzyDict, turn_off_ion, check_versions
+from marvin.utils.general import (ArrayCache, FuzzyDict, turn_off_ion, check_versions,
+                                  get_fits_section, open_fits)
 
 from .core import MarvinToolsClass
 from .mixins import DAPallMixIn, GetApertureMixIn, NSAMixIn
@@ -69,6 +71,11 @@ class Maps(MarvinToolsClass, NSAMixIn, DAPallMixIn, GetApertureMixIn):
             ``'M11-STELIB-ZSOL', 'MILES-THIN', 'MIUSCAT-THIN'`` (if ``None``,
             defaults to ``'MIUSCAT-THIN'``). For MPL-5 and successive, the only
             option in ``'GAU-MILESHC'`` (``None`` defaults to it).
+        cache_maps (bool):
+            If True (the default), the data of the maps retrieved are kept in
+            a cache of up to ``config.maps_cache_size`` MB, so that getting a
+            map again, or its binid or correction maps, does not read the
+            data again. Use `.clear_cache` to invalidate it.
 
     Attributes:
         header (`astropy.io.fits.Header`):
@@ -81,7 +88,7 @@ class Maps(MarvinToolsClass, NSAMixIn, DAPallMixIn, GetApertureMixIn):
     def __init__(self, input=None, filename=None, mangaid=None, plateifu=None,
                  mode=None, data=None, release=None,
                  drpall=None, download=None, nsa_source='auto',
-                 bintype=None, template=None, template_kin=None):
+                 bintype=None, template=None, template_kin=None, cache_maps=True):
 
         if template_kin is not None:
             warnings.warn('template_kin is deprecated and will be removed in a future version.',
@@ -94,6 +101,10 @@ class Maps(MarvinToolsClass, NSAMixIn, DAPallMixIn, GetApertureMixIn):
 
         self._bitmasks = None
 
+        cache_size = marvin.config.maps_cache_size if cache_maps else 0
+        self._map_cache = ArrayCache(
+            max_size=int(cache_size * 1024 ** 2) if cache_size is not None else None)
+
         MarvinToolsClass.__init__(self, input=input, filename=filename,
                                   mangaid=mangaid, plateifu=plateifu,
                                   mode=mode, data=data, release=release,
@@ -163,6 +174,13 @@ class Maps(MarvinToolsClass, NSAMixIn, DAPallMixIn, GetApertureMixIn):
                     template=copy.deepcopy(self.template, memo),
                     nsa_source=copy.deepcopy(self.nsa_source, memo))
 
+    def __getstate__(self):
+
+        odict = super(Maps, self).__getstate__()
+        odict['_map_cache'] = ArrayCache(max_size=self._map_cache.max_size)
+
+        return odict
+
     @staticmethod
     def _check_versions(instance):
         """Confirm that drpver and dapver match the ones from the header.
@@ -241,7 +259,7 @@ class Maps(MarvinToolsClass, NSAMixIn, DAPallMixIn, GetApertureMixIn):
         if data is not None:
             assert isinstance(data, astropy.io.fits.HDUList), 'data is not a HDUList.'
         else:
-            self.data = astropy.io.fits.open(self.filename)
+            self.data = open_fits(self.filename)
 
         self.header = self.data[0].header
 
@@ -401,85 +419,133 @@ class Maps(MarvinToolsClass, NSAMixIn, DAPallMixIn, GetApertureMixIn):
     def _get_spaxel_quantities(self, x, y, spaxel=None):
         """Returns a dictionary of spaxel quantities."""
 
-        maps_quantities = FuzzyDict({})
+        return self.get_spaxel_quantities([x], [y], spaxels=[spaxel])[0]
 
-        if self.data_origin == 'file' or self.data_origin == 'db':
+    def get_spaxel_quantities(self, xs, ys, spaxels=None):
+        """Returns the spaxel quantities for a list of spaxels.
 
-            # Stores a dictionary of (table, row)
-            _db_rows = {}
+        The quantities for all the spaxels are retrieved in bulk: a single
+        slice of each extension for files, one query per DAP table for the DB,
+        and a single request in remote mode.
 
-            for dm in self.datamodel:
+        Parameters:
+            xs,ys (list):
+                The ``x`` and ``y`` coordinates of the spaxels (0-indexed,
+                origin is ``lower``).
+            spaxels (list or None):
+                A list of `~marvin.tools.spaxel.Spaxel` objects, one per
+                coordinate, to which the bin information of each quantity
+                will be linked.
 
-                data = {'value': None, 'ivar': None, 'mask': None}
+        Returns:
+            quantities (list):
+                A list with one `~marvin.utils.general.structs.FuzzyDict` of
+                `.AnalysisProperty` quantities per input coordinate.
+
+        """
 
-                for key in data:
+        xs = np.atleast_1d(xs).astype(int)
+        ys = np.atleast_1d(ys).astype(int)
 
-                    if key == 'ivar' and not dm.has_ivar():
-                        continue
-                    if key == 'mask' and not dm.has_mask():
-                        continue
+        assert xs.shape == ys.shape, 'xs and ys must have the same size'
 
-                    if self.data_origin == 'file':
+        spaxels = spaxels if spaxels is not None else [None] * len(xs)
 
-                        extname = dm.name + '' if key == 'value' else dm.name + '_' + key
+        arrays = self._get_spaxel_arrays(xs, ys)
 
-                        if dm.channel:
-                            data[key] = self.data[extname].data[dm.channel.idx, y, x]
-                        else:
-                            data[key] = self.data[extname].data[y, x]
+        maps_quantities = [FuzzyDict({}) for __ in range(len(xs))]
 
-                    elif self.data_origin == 'db':
+        for dm in self.datamodel:
 
-                        mdb = marvin.marvindb
+            data = arrays[dm.full()]
 
-                        table = getattr(mdb.dapdb, dm.model)
+            for ii, quantities in enumerate(maps_quantities):
 
-                        if table not in _db_rows:
-                            _db_rows[table] = mdb.session.query(table).filter(
-                                table.file_pk == self.data.pk, table.x == x, table.y == y).one()
+                quantity = AnalysisProperty(
+                    data['value'][ii] if data['value'] is not None else None, unit=dm.unit,
+                    ivar=data['ivar'][ii] if data['ivar'] is not None else None,
+                    mask=data['mask'][ii] if data['mask'] is not None else None,
+                    pixmask_flag=dm.pixmask_flag)
 
-                        colname = dm.db_column(ext=None if key == 'value' else key)
-                        data[key] = getattr(_db_rows[table], colname)
+                if spaxels[ii]:
+                    quantity._init_bin(spaxel=spaxels[ii], parent=self, datamodel=dm)
 
-                quantity = AnalysisProperty(data['value'], unit=dm.unit, ivar=data['ivar'],
-                                            mask=data['mask'], pixmask_flag=dm.pixmask_flag)
+                quantities[dm.full()] = quantity
+
+        return maps_quantities
 
-                if spaxel:
-                    quantity._init_bin(spaxel=spaxel, parent=self, datamodel=dm)
+    def _get_spaxel_arrays(self, xs, ys):
+        """Returns the value, ivar, and mask arrays for a list of spaxels.
 
-                maps_quantities[dm.full()] = quantity
+        Returns a dictionary keyed by the full name of each property, in
+        which each array has one element per spaxel.
 
-        if self.data_origin == 'api':
+        """
+
+        arrays = OrderedDict()
+        for dm in self.datamodel:
+            arrays[dm.full()] = OrderedDict((key, None) for key in ['value', 'ivar', 'mask'])
+
+        if self.data_origin == 'file':
+
+            for dm in self.datamodel:
+                for key in self._get_spaxel_keys(dm):
+
+                    extname = dm.name + '' if key == 'value' else dm.name + '_' + key
+
+                    if dm.channel:
+                        arrays[dm.full()][key] = get_fits_section(self.data[extname],
+                                                                  (dm.channel.idx, ys, xs))
+                    else:
+                        arrays[dm.full()][key] = get_fits_section(self.data[extname], (ys, xs))
+
+        elif self.data_origin == 'db':
 
-            params = {'release': self._release}
-            url = marvin.config.urlmap['api']['getMapsQuantitiesSpaxel']['url']
+            from marvin.db.ArrayUtils import get_spaxel_values
+
+            mdb = marvin.marvindb
+
+            # Groups the columns by table so that each table is queried once.
+            table_columns = OrderedDict()
+            for dm in self.datamodel:
+                table_columns.setdefault(dm.model, []).extend(
+                    dm.db_column(ext=None if key == 'value' else key)
+                    for key in self._get_spaxel_keys(dm))
+
+            values = {}
+            for model, columns in table_columns.items():
+                values[model] = get_spaxel_values(mdb.session, getattr(mdb.dapdb, model),
+                                                  'file_pk', self.data.pk, xs, ys, columns)
+
+            for dm in self.datamodel:
+                for key in self._get_spaxel_keys(dm):
+                    colname = dm.db_column(ext=None if key == 'value' else key)
+                    arrays[dm.full()][key] = values[dm.model][colname]
+
+        elif self.data_origin == 'api':
 
             try:
-                response = self._toolInteraction(url.format(name=self.plateifu,
-                                                            x=x, y=y,
-                                                            bintype=self.bintype.name,
-                                                            template=self.template.name,
-                                                            params=params))
+                data = self._get_remote_spaxel_arrays(
+                    'getMapsQuantitiesSpaxels', 'getMapsQuantitiesSpaxel', xs, ys,
+                    [dm.full() for dm in self.datamodel], ['value', 'ivar', 'mask'],
+                    name=self.plateifu, bintype=self.bintype.name,
+                    template=self.template.name)
             except Exception as ee:
                 raise marvin.core.exceptions.MarvinError(
                     'found a problem when checking if remote cube exists: {0}'.format(str(ee)))
 
-            data = response.getData()
-
             for dm in self.datamodel:
+                arrays[dm.full()] = OrderedDict(
+                    (key, data[dm.full()][key]) for key in ['value', 'ivar', 'mask'])
 
-                quantity = AnalysisProperty(data[dm.full()]['value'],
-                                            ivar=data[dm.full()]['ivar'],
-                                            mask=data[dm.full()]['mask'],
-                                            unit=dm.unit,
-                                            pixmask_flag=dm.pixmask_flag)
-
-                if spaxel:
-                    quantity._init_bin(spaxel=spaxel, parent=self, datamodel=dm)
+        return arrays
 
-                maps_quantities[dm.full()] = quantity
+    @staticmethod
+    def _get_spaxel_keys(dm):
+        """Returns the value, ivar, and mask keys available for a property."""
 
-        return maps_quantities
+        return ['value'] + [key for key, has_key in [('ivar', dm.has_ivar()),
+                                                     ('mask', dm.has_mask())] if has_key]
 
     def get_binid(self, property=None):
         """Returns the binid map associated with a property.
@@ -498,16 +564,74 @@ class Maps(MarvinToolsClass, NSAMixIn, DAPallMixIn, GetApertureMixIn):
 
         """
 
+        return self.getMap(self._get_binid_property(property))
+
+    def _get_binid_property(self, property=None):
+        """Returns the binid `.Property` associated with a property."""
+
         assert property is None or isinstance(property, Property), \
             'property must be None or a Property.'
 
         if property is None:
             assert self.datamodel.parent.default_binid is not None
-            binid = self.datamodel.parent.default_binid
-        else:
-            binid = property.binid
+            return self.datamodel.parent.default_binid
+
+        return property.binid
+
+    def _get_binid_array(self, property=None):
+        """Returns the binid array for a property, shared by all the maps that use it."""
+
+        binid_map = None
+
+        name = self._get_binid_property(property).full()
+        if name not in self._map_cache:
+            binid_map = self.get_binid(property)
+
+        data = self._map_cache.get(name)
 
-        return self.getMap(binid)
+        return data[0] if data is not None else binid_map.value
+
+    def _get_cached_map_data(self, prop):
+        """Returns the cached ``(value, ivar, mask)`` of a property, or None."""
+
+        return self._map_cache.get(prop.full())
+
+    def _cache_map_data(self, prop, data):
+        """Caches the ``(value, ivar, mask)`` of a property and returns them.
+
+        The cached arrays are read-only copies, so that they can be shared.
+
+        """
+
+        if self._map_cache.max_size == 0:
+            return data
+
+        frozen = []
+        for array in data:
+            if array is not None:
+                array = np.array(array)
+                array.setflags(write=False)
+            frozen.append(array)
+
+        data = tuple(frozen)
+        self._map_cache.set(prop.full(), data)
+
+        return data
+
+    def clear_cache(self, property_name=None):
+        """Invalidates the cached data of the maps.
+
+        Parameters:
+            property_name (str or None):
+                The property whose cached data will be removed. If None, the
+                whole cache is cleared.
+
+        """
+
+        if property_name is None:
+            self._map_cache.clear()
+        else:
+            self._map_cache.pop(self._get_property(property_name).full())
 
     def getCube(self):
         """Returns the :class:`~marvin.tools.cube.Cube` for with this Maps."""
@@ -621,6 +745,13 @@ class Maps(MarvinToolsClass, NSAMixIn, DAPallMixIn, GetApertureMixIn):
 
         """
 
+        best = self._get_property(property_name, channel=channel, exact=exact)
+
+        return marvin.tools.quantities.Map.from_maps(self, best)
+
+    def _get_property(self, property_name, channel=None, exact=False):
+        """Returns the `.Property` for a property name, checking it can be retrieved."""
+
         if isinstance(property_name, Property):
             best = property_name
         else:
@@ -631,7 +762,72 @@ class Maps(MarvinToolsClass, NSAMixIn, DAPallMixIn, GetApertureMixIn):
             raise marvin.core.exceptions.MarvinError('stellar_sigmacorr is unreliable in MPL-6. '
                                                      'Please use MPL-7.')
 
-        return marvin.tools.quantities.Map.from_maps(self, best)
+        return best
+
+    def getMaps(self, property_names, exact=False):
+        """Retrieves several :class:`~marvin.tools.quantities.Map` objects at once.
+
+        Equivalent to calling `.getMap` for each property but, if the data
+        origin is ``'db'``, the values, ivars, and masks of all the properties,
+        and of their binids, are retrieved in a single query. For any data
+        origin, each binid map is retrieved only once for all the maps that
+        reference it, and the maps already in the cache are not retrieved
+        again.
+
+        Parameters:
+            property_names (list):
+                A list of property names (e.g., ``'emline_gflux_ha_6564'``) or
+                `~marvin.utils.datamodel.dap.Property` objects.
+            exact (bool):
+                If ``exact=False``, fuzzy matching will be used, retrieving
+                the best match for each property name. If ``True``, will check
+                that the names of the returned maps match the input values
+                exactly.
+
+        Returns:
+            A list of :class:`~marvin.tools.quantities.Map` objects, in the
+            same order as ``property_names``.
+
+        Example:
+            >>> maps = Maps(plateifu='8485-1901')
+            >>> ha, stvel = maps.getMaps(['emline_gflux_ha_6564', 'stellar_vel'])
+
+        """
+
+        Map = marvin.tools.quantities.Map
+
+        props = [self._get_property(name, exact=exact) for name in property_names]
+
+        binid_props = OrderedDict()
+        for prop in props:
+            if prop.name != 'binid':
+                binid_props[prop.binid.full()] = prop.binid
+
+        data = {}
+        if self.data_origin == 'db':
+            # only the properties not yet in the cache are queried
+            missing = [prop for prop in list(binid_props.values()) + props
+                       if prop.full() not in self._map_cache]
+
+            # one query per table storing the properties
+            tables = OrderedDict()
+            for prop in missing:
+                tables.setdefault(prop.model, []).append(prop)
+            for table_props in tables.values():
+                data.update(Map._get_maps_from_db(self, table_props))
+
+        binids = OrderedDict((name, Map.from_maps(self, prop, data=data.get(name)))
+                             for name, prop in binid_props.items())
+
+        maps = []
+        for prop in props:
+            if prop.name == 'binid' and prop.full() in binids:
+                maps.append(binids[prop.full()])
+            else:
+                binid = binids[prop.binid.full()] if prop.name != 'binid' else None
+                maps.append(Map.from_maps(self, prop, data=data.get(prop.full()), binid=binid))
+
+        return maps
 
     def getMapRatio(self, property_name, channel_1, channel_2):
         """Returns a ratio `~marvin.tools.quantities.Map`.
@@ -9,9 +9,15 @@
 # @Last modified by: José Sánchez-Gallego (gallegoj@uw.edu)
 # @Last modified time: 2018-07-27 13:02:19
 
+import warnings
+from multiprocessing.pool import ThreadPool
+
 import astropy.coordinates
 import astropy.units
 import numpy
+import six
+
+from marvin.core.exceptions import MarvinUserWarning
 
 
 try:
@@ -20,7 +26,7 @@ except ImportError:
     photutils = None
 
 
-__all__ = ['GetApertureMixIn', 'MarvinAperture']
+__all__ = ['GetApertureMixIn', 'MarvinAperture', 'extract_apertures']
 
 
 class MarvinAperture(photutils.Aperture if photutils else object):
@@ -45,6 +51,38 @@ class MarvinAperture(photutils.Aperture if photutils else object):
 
         self._parent = value
 
+    @property
+    def masks(self):
+        """Returns the fractional overlap mask of each aperture.
+
+        An array with shape ``(n_apertures, ny, nx)`` where ``(ny, nx)`` is
+        the shape of the parent object. Each aperture mask is only computed
+        within its bounding box.
+
+        """
+
+        assert self.parent is not None, 'no parent set'
+
+        if isinstance(self, photutils.SkyAperture):
+            aperture = self.to_pixel(self.parent.wcs)
+        else:
+            aperture = self
+
+        shape = tuple(self.parent._shape)
+        ap_masks = list(aperture.to_mask(method='exact'))
+
+        masks = numpy.zeros((len(ap_masks), ) + shape)
+
+        for ii, ap_mask in enumerate(ap_masks):
+            if hasattr(ap_mask, 'get_overlap_slices'):
+                slices_large, slices_small = ap_mask.get_overlap_slices(shape)
+                if slices_large is not None:
+                    masks[ii][slices_large] = ap_mask.data[slices_small]
+            else:
+                masks[ii] = ap_mask.to_image(shape=shape)
+
+        return masks
+
     @property
     def mask(self):
         """Returns the fractional overlap mask.
@@ -55,19 +93,79 @@ class MarvinAperture(photutils.Aperture if photutils else object):
 
         """
 
-        assert self.parent is not None, 'no parent set'
+        return self.masks.sum(axis=0)
 
-        if isinstance(self, photutils.SkyAperture):
-            aperture = self.to_pixel(self.parent.wcs)
+    def extract(self, quantity, combine='sum', separate=False, threshold=None, mask=None):
+        """Extracts the weighted sum or mean of a quantity within the aperture.
+
+        The fractional overlap mask is applied directly to the arrays of the
+        quantity, without creating `~marvin.tools.spaxel.Spaxel` objects.
+        Masked spaxels and spaxels with zero ivar are excluded, and the ivar
+        is propagated. Only the spaxels covered by the aperture are used.
+
+        Parameters
+        ----------
+        quantity : `~marvin.tools.quantities.DataCube` or `~marvin.tools.quantities.Map`
+            The quantity to extract, e.g., ``cube.flux`` or
+            ``maps.emline_gflux_ha_6564``. Its spatial shape must match the
+            shape of the parent object.
+        combine : {'sum', 'mean'}
+            Whether to return the weighted sum of the quantity within the
+            aperture or its weighted mean.
+        separate : bool
+            If ``True``, returns a list with the extraction for each
+            aperture. Otherwise the apertures are combined in a single mask,
+            with the fractional overlap capped to one.
+        threshold : float
+            If set, spaxels with a fractional overlap of at least
+            ``threshold`` are used with a weight of one and the rest are
+            excluded, as in `.MarvinAperture.getSpaxels`.
+        mask : numpy.ndarray
+            A mask that defines the fractional pixel overlap with the
+            apertures, with the shape of the parent, or with shape
+            ``(n_apertures, ny, nx)``. If ``None``, the masks returned by
+            `.MarvinAperture.masks` will be used.
+
+        Returns
+        -------
+        extracted : `~marvin.tools.quantities.Spectrum` or `~marvin.tools.quantities.AnalysisProperty`
+            The extracted spectrum for a `~marvin.tools.quantities.DataCube`,
+            or the extracted value for a `~marvin.tools.quantities.Map`. Its
+            mask has the ``DONOTUSE`` bit (or 1, if the quantity does not
+            have a pixmask) set where no valid spaxel contributed. If
+            ``separate=True``, a list with the extraction for each aperture.
+
+        Examples
+        --------
+
+            >>> cube = marvin.tools.Cube('8485-1901')
+            >>> aperture = cube.getAperture([(17, 17), (10, 12)], 3)
+            >>> spectra = aperture.extract(cube.flux, separate=True)
+            >>> spectra[0]
+            <Spectrum [0.54676276, 0.46566465, ..., 0.        ,  0.        ] 1e-17 erg / (Angstrom cm2 s spaxel)>
+
+        """
+
+        assert combine in ['sum', 'mean'], 'combine must be sum or mean'
+
+        if mask is None:
+            weights = self.masks
         else:
-            aperture = self
+            weights = numpy.asarray(mask, dtype=float)
+            if weights.ndim == 2:
+                weights = weights[numpy.newaxis]
+            assert weights.shape[1:] == tuple(self.parent._shape), 'invalid mask shape'
 
-        mask = numpy.zeros(self.parent._shape)
+        if not separate:
+            weights = numpy.clip(weights.sum(axis=0), 0, 1)[numpy.newaxis]
 
-        for ap in aperture.to_mask(method='exact'):
-            mask += ap.to_image(shape=(self.parent._shape))
+        if threshold is not None:
+            assert threshold > 0 and threshold <= 1, 'invalid threshold value'
+            weights = (weights >= threshold).astype(float)
 
-        return mask
+        extracted = _extract_weighted(quantity, weights, combine=combine)
+
+        return extracted if separate else extracted[0]
 
     def getSpaxels(self, threshold=0.5, lazy=True, mask=None, **kwargs):
         """Returns the spaxels that fall within the aperture.
@@ -107,6 +205,172 @@ class MarvinAperture(photutils.Aperture if photutils else object):
                                      xyorig='lower', lazy=lazy, **kwargs)
 
 
+def _extract_weighted(quantity, weights, combine='sum'):
+    """Returns the weighted sum or mean of a quantity for each set of weights.
+
+    ``weights`` must have shape ``(n_apertures, ny, nx)``. Returns a list with
+    a `~marvin.tools.quantities.Spectrum` (for 3D quantities) or an
+    `~marvin.tools.quantities.AnalysisProperty` (for 2D quantities) for each
+    aperture.
+
+    """
+
+    from marvin.tools.quantities import AnalysisProperty, Spectrum
+
+    value = numpy.asarray(quantity.value)
+    assert value.ndim in [2, 3], 'quantity must be a 2D or 3D array'
+    assert value.shape[-2:] == weights.shape[1:], 'quantity and aperture shapes do not match'
+
+    n_apertures = weights.shape[0]
+
+    # Keeps only the spaxels covered by any of the apertures.
+    weights = weights.reshape((n_apertures, -1))
+    covered = numpy.nonzero(weights.any(axis=0))[0]
+    weights = weights[:, covered]
+
+    def _select(array):
+        return numpy.asarray(array).reshape(value.shape[:-2] + (-1, ))[..., covered]
+
+    data = _select(value)
+
+    if quantity.mask is not None:
+        good = ~_select(numpy.ma.getmaskarray(quantity.masked))
+    else:
+        good = numpy.ones(data.shape, dtype=bool)
+
+    if quantity.ivar is not None:
+        ivar = _select(quantity.ivar)
+        good &= ivar > 0
+        with numpy.errstate(divide='ignore'):
+            variance = numpy.where(good, 1. / ivar, 0.)
+    else:
+        variance = None
+
+    data = numpy.where(good, data, 0.)
+
+    # Contracts the spatial axis. The results have shape (n_wave, n_apertures)
+    # for a cube and (n_apertures, ) for a map.
+    total = numpy.dot(data, weights.T)
+    weight_sum = numpy.dot(good.astype(float), weights.T)
+    total_var = numpy.dot(variance, (weights ** 2).T) if variance is not None else None
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+
+        if combine == 'mean':
+            total = numpy.where(weight_sum > 0, total / weight_sum, 0.)
+            if total_var is not None:
+                total_var = numpy.where(weight_sum > 0, total_var / weight_sum**2, 0.)
+
+        if total_var is not None:
+            total_ivar = numpy.where(total_var > 0, 1. / total_var, 0.)
+        else:
+            total_ivar = None
+
+    # Flags the elements to which no valid spaxel contributed.
+    pixmask_flag = getattr(quantity, 'pixmask_flag', None)
+    donotuse = 1
+    if pixmask_flag and 'DONOTUSE' in quantity.pixmask.schema.label.tolist():
+        donotuse = int(quantity.pixmask.labels_to_value('DONOTUSE'))
+
+    total_mask = numpy.where(weight_sum > 0, 0, donotuse).astype(int)
+
+    extracted = []
+    for ii in range(n_apertures):
+
+        ivar_ii = total_ivar[..., ii] if total_ivar is not None else None
+
+        if value.ndim == 3:
+            extracted.append(Spectrum(total[:, ii], wavelength=quantity.wavelength,
+                                      unit=quantity.unit, ivar=ivar_ii,
+                                      mask=total_mask[:, ii], pixmask_flag=pixmask_flag))
+        else:
+            extracted.append(AnalysisProperty(total[ii], unit=quantity.unit, ivar=ivar_ii,
+                                              mask=total_mask[ii], pixmask_flag=pixmask_flag))
+
+    return extracted
+
+
+def extract_apertures(apertures, quantity, combine='sum', separate=False,
+                      threshold=None, nworkers=1):
+    """Extracts a quantity within many apertures, possibly from different galaxies.
+
+    A batch version of `.MarvinAperture.extract`.
+
+    Parameters
+    ----------
+    apertures : list
+        A list of `.MarvinAperture` instances, as returned by ``getAperture``.
+    quantity : str or list
+        Either the name of the quantity to extract from the parent of each
+        aperture (e.g., ``'flux'`` for a `~marvin.tools.cube.Cube` or
+        ``'emline_gflux_ha_6564'`` for a `~marvin.tools.maps.Maps`), or a
+        list with the quantity for each aperture.
+    combine : {'sum', 'mean'}
+        Whether to return the weighted sum or the weighted mean.
+    separate : bool
+        If ``True``, the apertures in each `.MarvinAperture` are extracted
+        separately.
+    threshold : float
+        As in `.MarvinAperture.extract`.
+    nworkers : int
+        The number of threads used to retrieve and extract the quantities.
+        Quantities read from the local database are always retrieved
+        sequentially.
+
+    Returns
+    -------
+    extracted : list
+        The output of `.MarvinAperture.extract` for each aperture, in the
+        same order as ``apertures``.
+
+    Examples
+    --------
+
+        >>> cubes = [marvin.tools.Cube(plateifu) for plateifu in ['8485-1901', '7443-12701']]
+        >>> apertures = [cube.getAperture((17, 17), 3) for cube in cubes]
+        >>> spectra = extract_apertures(apertures, 'flux', nworkers=2)
+
+    """
+
+    if isinstance(quantity, six.string_types):
+        quantities = [None] * len(apertures)
+    else:
+        quantities = list(quantity)
+        assert len(quantities) == len(apertures), 'one quantity per aperture is required'
+
+    def _extract(args):
+
+        aperture, aperture_quantity = args
+
+        if aperture_quantity is None:
+            try:
+                aperture_quantity = getattr(aperture.parent, quantity)
+            except AttributeError:
+                aperture_quantity = aperture.parent[quantity]
+
+        return aperture.extract(aperture_quantity, combine=combine, separate=separate,
+                                threshold=threshold)
+
+    tasks = list(zip(apertures, quantities))
+
+    # The DB session cannot be shared between threads
+    if nworkers > 1 and any(aperture_quantity is None and
+                            getattr(aperture.parent, 'data_origin', None) == 'db'
+                            for aperture, aperture_quantity in tasks):
+        warnings.warn('some apertures use the local database; extracting sequentially.',
+                      MarvinUserWarning)
+        nworkers = 1
+
+    if nworkers > 1 and len(tasks) > 1:
+        pool = ThreadPool(nworkers)
+        try:
+            return pool.map(_extract, tasks)
+        finally:
+            pool.close()
+
+    return [_extract(task) for task in tasks]
+
+
 class GetApertureMixIn(object):
 
     def getAperture(self, coords, aperture_params, aperture_type='circular',
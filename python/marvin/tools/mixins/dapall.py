@@ -12,11 +12,10 @@
 import distutils
 import os
 
-import astropy.io.fits
-
 import marvin
 from marvin.core.exceptions import MarvinError
 from marvin.utils.general import get_dapall_file, map_dapall
+from marvin.utils.general.catalogue_index import get_catalogue_index
 
 
 __all__ = ['DAPallMixIn']
@@ -75,17 +74,15 @@ class DAPallMixIn(object):
         if not os.path.exists(dapall_path):
             raise MarvinError('cannot find DAPall file in the system.')
 
-        dapall_hdu = astropy.io.fits.open(dapall_path)
-
-        header = dapall_hdu[0].header
-        dapall_table = dapall_hdu[-1].data
+        # Uses a sorted index of the DAPall file, so that only the matching row is read.
+        dapall_index = get_catalogue_index(dapall_path, hdu=-1,
+                                           keys={'plateifu_daptype': ['PLATEIFU', 'DAPTYPE']})
 
-        dapall_row = dapall_table[(dapall_table['PLATEIFU'] == self.plateifu) &
-                                  (dapall_table['DAPTYPE'] == daptype)]
+        rows = dapall_index.lookup('plateifu_daptype', (self.plateifu, daptype))
 
-        assert len(dapall_row) == 1, 'cannot find matching row in DAPall.'
+        assert len(rows) == 1, 'cannot find matching row in DAPall.'
 
-        return map_dapall(header, dapall_row[0])
+        return map_dapall(dapall_index.header(0), dapall_index.read_rows(rows)[0])
 
     def _get_dapall_from_db(self):
         """Uses the DB to retrieve the DAPAll data."""
@@ -14,6 +14,7 @@ from __future__ import absolute_import, division, print_function
 
 import distutils
 import warnings
+from collections import OrderedDict
 
 import numpy as np
 from pkg_resources import parse_version
@@ -28,7 +29,8 @@ import marvin.utils.general.general
 from marvin.core.exceptions import MarvinError
 from marvin.tools.quantities import DataCube, Map, Spectrum
 from marvin.utils.datamodel.dap import Model, datamodel
-from marvin.utils.general import FuzzyDict, gunzip, check_versions
+from marvin.utils.general import (FuzzyDict, check_versions, get_fits_section, open_fits,
+                                  unpack_array)
 
 from .core import MarvinToolsClass
 from .mixins import DAPallMixIn, GetApertureMixIn, NSAMixIn
@@ -179,8 +181,7 @@ class ModelCube(MarvinToolsClass, NSAMixIn, DAPallMixIn, GetApertureMixIn):
             assert isinstance(self.data, fits.HDUList), 'data is not an HDUList object'
         else:
             try:
-                with gunzip(self.filename) as gg:
-                    self.data = fits.open(gg.name)
+                self.data = open_fits(self.filename)
             except IOError as err:
                 raise IOError('filename {0} cannot be found: {1}'.format(self.filename, err))
 
@@ -376,9 +377,17 @@ class ModelCube(MarvinToolsClass, NSAMixIn, DAPallMixIn, GetApertureMixIn):
             ext_data = self.data[model.fits_extension(ext)].data
 
         elif self.data_origin == 'db':
-            # If the table is "spaxel", this must be a 3D cube. If it is "cube",
-            # uses self.data, which is basically the DataModelClass.Cube instance.
-            ext_data = self.data.get3DCube(model.db_column(ext))
+            # Retrieves the value, ivar, and mask of the model in a single query
+            # and caches all of them.
+            exts = [ext] + [key for key in [None, 'ivar', 'mask'] if key != ext and
+                            (key is None or getattr(model, 'has_{0}'.format(key))())]
+            columns = [model.db_column(key) for key in exts]
+            cubes = self.data.get3DCubes(columns, shape=self._shape)
+
+            for key, column in zip(exts[1:], columns[1:]):
+                self._extension_data[model.fits_extension(key)] = cubes[column]
+
+            ext_data = cubes[columns[0]]
 
         elif self.data_origin == 'api':
 
@@ -396,8 +405,7 @@ class ModelCube(MarvinToolsClass, NSAMixIn, DAPallMixIn, GetApertureMixIn):
                                   'modelcube exists: {0}'.format(str(ee)))
 
             data = response.getData()
-            cube_ext_data = data['extension_data']
-            ext_data = np.array(cube_ext_data) if cube_ext_data is not None else None
+            ext_data = unpack_array(data['extension_data'])
 
         self._extension_data[ext_name] = ext_data
 
@@ -406,82 +414,123 @@ class ModelCube(MarvinToolsClass, NSAMixIn, DAPallMixIn, GetApertureMixIn):
     def _get_spaxel_quantities(self, x, y, spaxel=None):
         """Returns a dictionary of spaxel quantities."""
 
-        modelcube_quantities = FuzzyDict({})
+        return self.get_spaxel_quantities([x], [y], spaxels=[spaxel])[0]
 
-        if self.data_origin == 'db':
+    def get_spaxel_quantities(self, xs, ys, spaxels=None):
+        """Returns the spaxel quantities for a list of spaxels.
 
-            session = marvin.marvindb.session
-            dapdb = marvin.marvindb.dapdb
+        The quantities for all the spaxels are retrieved in bulk: a single
+        slice of each extension for files, a single query for the DB, and a
+        single request in remote mode.
 
-        if self.data_origin == 'file' or self.data_origin == 'db':
-
-            _db_row = None
+        Parameters:
+            xs,ys (list):
+                The ``x`` and ``y`` coordinates of the spaxels (0-indexed,
+                origin is ``lower``).
+            spaxels (list or None):
+                A list of `~marvin.tools.spaxel.Spaxel` objects, one per
+                coordinate, to which the bin information of each quantity
+                will be linked.
 
-            for dm in self.datamodel:
+        Returns:
+            quantities (list):
+                A list with one `~marvin.utils.general.structs.FuzzyDict` of
+                `.Spectrum` quantities per input coordinate.
 
-                data = {'value': None, 'ivar': None, 'mask': None}
+        """
 
-                for key in data:
+        xs = np.atleast_1d(xs).astype(int)
+        ys = np.atleast_1d(ys).astype(int)
 
-                    if key == 'ivar' and not dm.has_ivar():
-                        continue
-                    if key == 'mask' and not dm.has_mask():
-                        continue
+        assert xs.shape == ys.shape, 'xs and ys must have the same size'
 
-                    if self.data_origin == 'file':
+        spaxels = spaxels if spaxels is not None else [None] * len(xs)
 
-                        extname = dm.fits_extension(None if key == 'value' else key)
-                        data[key] = self.data[extname].data[:, y, x]
+        arrays = self._get_spaxel_arrays(xs, ys)
 
-                    elif self.data_origin == 'db':
+        modelcube_quantities = [FuzzyDict({}) for __ in range(len(xs))]
 
-                        colname = dm.db_column(None if key == 'value' else key)
+        for dm in self.datamodel:
 
-                        if not _db_row:
-                            _db_row = session.query(dapdb.ModelSpaxel).filter(
-                                dapdb.ModelSpaxel.modelcube_pk == self.data.pk,
-                                dapdb.ModelSpaxel.x == x, dapdb.ModelSpaxel.y == y).one()
+            data = arrays[dm.full()]
 
-                        data[key] = np.array(getattr(_db_row, colname))
+            for ii, quantities in enumerate(modelcube_quantities):
 
-                quantity = Spectrum(data['value'], ivar=data['ivar'], mask=data['mask'],
+                quantity = Spectrum(data['value'][ii] if data['value'] is not None else None,
+                                    ivar=data['ivar'][ii] if data['ivar'] is not None else None,
+                                    mask=data['mask'][ii] if data['mask'] is not None else None,
                                     wavelength=self._wavelength, unit=dm.unit,
                                     pixmask_flag=dm.pixmask_flag)
 
-                if spaxel:
-                    quantity._init_bin(spaxel=spaxel, parent=self, datamodel=dm)
+                if spaxels[ii]:
+                    quantity._init_bin(spaxel=spaxels[ii], parent=self, datamodel=dm)
 
-                modelcube_quantities[dm.full()] = quantity
+                quantities[dm.full()] = quantity
 
-        if self.data_origin == 'api':
+        return modelcube_quantities
 
-            params = {'release': self._release}
-            url = marvin.config.urlmap['api']['getModelCubeQuantitiesSpaxel']['url']
+    def _get_spaxel_arrays(self, xs, ys):
+        """Returns the value, ivar, and mask arrays for a list of spaxels.
+
+        Returns a dictionary keyed by the full name of each model, in which
+        each array has shape ``(len(xs), nwave)``.
+
+        """
+
+        arrays = OrderedDict()
+        for dm in self.datamodel:
+            arrays[dm.full()] = OrderedDict((key, None) for key in ['value', 'ivar', 'mask'])
+
+        if self.data_origin == 'file':
+
+            for dm in self.datamodel:
+                for key in self._get_spaxel_keys(dm):
+                    extname = dm.fits_extension(None if key == 'value' else key)
+                    arrays[dm.full()][key] = get_fits_section(self.data[extname],
+                                                              (slice(None), ys, xs)).T
+
+        elif self.data_origin == 'db':
+
+            from marvin.db.ArrayUtils import get_spaxel_values
+
+            session = marvin.marvindb.session
+            dapdb = marvin.marvindb.dapdb
+
+            columns = [dm.db_column(None if key == 'value' else key)
+                       for dm in self.datamodel for key in self._get_spaxel_keys(dm)]
+
+            values = get_spaxel_values(session, dapdb.ModelSpaxel, 'modelcube_pk', self.data.pk,
+                                       xs, ys, columns)
+
+            for dm in self.datamodel:
+                for key in self._get_spaxel_keys(dm):
+                    arrays[dm.full()][key] = values[dm.db_column(None if key == 'value' else key)]
+
+        elif self.data_origin == 'api':
 
             try:
-                response = self._toolInteraction(url.format(name=self.plateifu,
-                                                            x=x, y=y,
-                                                            bintype=self.bintype.name,
-                                                            template=self.template.name,
-                                                            params=params))
+                data = self._get_remote_spaxel_arrays(
+                    'getModelCubeQuantitiesSpaxels', 'getModelCubeQuantitiesSpaxel',
+                    xs, ys,
+                    [dm.full() for dm in self.datamodel], ['value', 'ivar', 'mask'],
+                    name=self.plateifu, bintype=self.bintype.name,
+                    template=self.template.name)
             except Exception as ee:
                 raise MarvinError('found a problem when checking if remote modelcube '
                                   'exists: {0}'.format(str(ee)))
 
-            data = response.getData()
-
             for dm in self.datamodel:
+                arrays[dm.full()] = OrderedDict(
+                    (key, data[dm.full()][key]) for key in ['value', 'ivar', 'mask'])
 
-                quantity = Spectrum(data[dm.name]['value'], ivar=data[dm.name]['ivar'],
-                                    mask=data[dm.name]['mask'], wavelength=data['wavelength'],
-                                    unit=dm.unit, pixmask_flag=dm.pixmask_flag)
+        return arrays
 
-                if spaxel:
-                    quantity._init_bin(spaxel=spaxel, parent=self, datamodel=dm)
+    @staticmethod
+    def _get_spaxel_keys(dm):
+        """Returns the value, ivar, and mask keys available for a model."""
 
-                modelcube_quantities[dm.full()] = quantity
-
-        return modelcube_quantities
+        return ['value'] + [key for key, has_key in [('ivar', dm.has_ivar()),
+                                                     ('mask', dm.has_mask())] if has_key]
 
     def get_binid(self, model=None):
         """Returns the binid map associated with a model.
@@ -27,7 +27,7 @@ import marvin.core.marvin_pickle
 import marvin.utils.general
 import marvin.utils.plot.map
 from marvin.utils.datamodel.dap.base import Property
-from marvin.utils.general.general import add_doc
+from marvin.utils.general.general import add_doc, get_fits_section
 
 from .base_quantity import QuantityMixIn
 
@@ -68,7 +68,8 @@ class Map(units.Quantity, QuantityMixIn):
         mask (array-like, optional):
             The mask array for ``value``.
         binid (array-like, optional):
-            The associated binid map.
+            The associated binid map. It is not copied, so that the same
+            array can be shared by several maps.
         pixmask_flag (str):
             The maskbit flag to be used to convert from mask bits to labels
             (e.g., MANGA_DAPPIXMASK).
@@ -90,7 +91,7 @@ class Map(units.Quantity, QuantityMixIn):
 
         obj.ivar = np.array(ivar) if ivar is not None else None
         obj.mask = np.array(mask) if mask is not None else None
-        obj.binid = np.array(binid) if binid is not None else None
+        obj.binid = np.asarray(binid) if binid is not None else None
 
         obj.pixmask_flag = pixmask_flag
 
@@ -169,6 +170,7 @@ class Map(units.Quantity, QuantityMixIn):
             unit=self.unit,  # unit
             datamodel=self._datamodel,
             pixmask_flag=self.pixmask_flag,
+            binid=self.binid,
             copy=True,
         )
 
@@ -202,8 +204,16 @@ class Map(units.Quantity, QuantityMixIn):
         return self._datamodel
 
     @classmethod
-    def from_maps(cls, maps, prop, dtype=None, copy=True):
-        """Initialise a `.Map` from a `.~marvin.tools.maps.Maps`."""
+    def from_maps(cls, maps, prop, dtype=None, copy=True, data=None, binid=None):
+        """Initialise a `.Map` from a `.~marvin.tools.maps.Maps`.
+
+        If ``data`` is a tuple of ``(value, ivar, mask)`` arrays for ``prop``,
+        already retrieved from the ``maps``, it is used instead of reading the
+        data again. Similarly, ``binid`` can be the binid `.Map` associated
+        with ``prop``. Otherwise, the data are taken from the cache of
+        ``maps``, if present, and added to it after being read.
+
+        """
 
         import marvin.tools.maps
 
@@ -215,16 +225,25 @@ class Map(units.Quantity, QuantityMixIn):
 
         assert prop.full() in datamodel, 'failed sanity check. Property does not match.'
 
-        if maps.data_origin == 'file':
-            value, ivar, mask = cls._get_map_from_file(maps, prop)
-        elif maps.data_origin == 'db':
-            value, ivar, mask = cls._get_map_from_db(maps, prop)
-        elif maps.data_origin == 'api':
-            value, ivar, mask = cls._get_map_from_api(maps, prop)
+        if data is None:
+            data = maps._get_cached_map_data(prop)
+        else:
+            data = maps._cache_map_data(prop, data)
 
-        # Gets the binid array for this property.
+        if data is None:
+            if maps.data_origin == 'file':
+                data = cls._get_map_from_file(maps, prop)
+            elif maps.data_origin == 'db':
+                data = cls._get_map_from_db(maps, prop)
+            elif maps.data_origin == 'api':
+                data = cls._get_map_from_api(maps, prop)
+            data = maps._cache_map_data(prop, data)
+
+        value, ivar, mask = data
+
+        # Gets the binid array for this property, shared with the other maps.
         if prop.name != 'binid':
-            binid = maps.get_binid(prop)
+            binid = maps._get_binid_array(prop) if binid is None else binid
         else:
             binid = None
 
@@ -249,15 +268,12 @@ class Map(units.Quantity, QuantityMixIn):
     def _get_map_from_file(maps, prop):
         """Initialise the `.Map` from a `.~marvin.tools.maps.Maps` file."""
 
-        if prop.channel is not None:
-            channel_idx = prop.channel.idx
-            value = maps.data[prop.name].data[channel_idx]
-            ivar = maps.data[prop.name + '_ivar'].data[channel_idx] if prop.ivar else None
-            mask = maps.data[prop.name + '_mask'].data[channel_idx] if prop.mask else None
-        else:
-            value = maps.data[prop.name].data
-            ivar = maps.data[prop.name + '_ivar'].data if prop.ivar else None
-            mask = maps.data[prop.name + '_mask'].data if prop.mask else None
+        # Reads only the channel needed, not the whole multi-channel extension.
+        key = (prop.channel.idx, ) if prop.channel is not None else (slice(None), )
+
+        value = get_fits_section(maps.data[prop.name], key)
+        ivar = get_fits_section(maps.data[prop.name + '_ivar'], key) if prop.ivar else None
+        mask = get_fits_section(maps.data[prop.name + '_mask'], key) if prop.mask else None
 
         return value, ivar, mask
 
@@ -300,6 +316,65 @@ class Map(units.Quantity, QuantityMixIn):
 
         return value, ivar, mask
 
+    @staticmethod
+    def _get_maps_from_db(maps, props):
+        """Retrieves the data for several properties from the DB in a single query.
+
+        Selects the value, ivar, and mask columns of all ``props``, which must
+        be stored in the same table, at once and scatters them into
+        preallocated arrays with the shape of the ``maps``. Returns a dictionary of ``prop.full()`` to a ``(value, ivar, mask)``
+        tuple, as returned by ``_get_map_from_db``.
+
+        """
+
+        if len(set(prop.model for prop in props)) != 1:
+            raise marvin.core.exceptions.MarvinError(
+                'all properties must be stored in the same table. Got {0}.'.format(
+                    ', '.join(sorted(set(prop.model for prop in props)))))
+
+        mdb = marvin.marvindb
+
+        if not mdb.isdbconnected:
+            raise marvin.core.exceptions.MarvinError('No db connected')
+
+        if sqlalchemy is None:
+            raise marvin.core.exceptions.MarvinError('sqlalchemy required to access the local DB.')
+
+        table = getattr(mdb.dapdb, props[0].model)
+
+        columns = []
+        for prop in props:
+            for ext in [None, 'ivar', 'mask']:
+                if (ext == 'ivar' and not prop.ivar) or (ext == 'mask' and not prop.mask):
+                    continue
+                if prop.db_column(ext=ext) not in columns:
+                    columns.append(prop.db_column(ext=ext))
+
+        rows = mdb.session.query(table.x, table.y,
+                                 *[getattr(table, column) for column in columns]).filter(
+            table.file_pk == maps.data.pk).all()
+
+        rows = np.array(rows, dtype=np.float64)
+        xx = rows[:, 0].astype(int)
+        yy = rows[:, 1].astype(int)
+
+        shape = tuple(maps._shape) if maps._shape is not None else (yy.max() + 1, xx.max() + 1)
+
+        arrays = {}
+        for ii, column in enumerate(columns):
+            array = np.zeros(shape, dtype=np.float64)
+            array[yy, xx] = rows[:, ii + 2]
+            arrays[column] = array
+
+        data = {}
+        for prop in props:
+            value = arrays[prop.db_column()]
+            ivar = arrays[prop.db_column(ext='ivar')] if prop.ivar else None
+            mask = arrays[prop.db_column(ext='mask')].astype(int) if prop.mask else None
+            data[prop.full()] = (value, ivar, mask)
+
+        return data
+
     @staticmethod
     def _get_map_from_api(maps, prop):
         """Initialise the `.Map` from the API."""
@@ -314,8 +389,7 @@ class Map(units.Quantity, QuantityMixIn):
                'template': maps.template.name})
 
         try:
-            response = marvin.api.api.Interaction(url_full,
-                                                  params={'release': maps._release})
+            response = maps._toolInteraction(url_full, params={'release': maps._release})
         except Exception as ee:
             raise marvin.core.exceptions.MarvinError(
                 'found a problem when getting the map: {0}'.format(str(ee)))
@@ -465,7 +539,8 @@ class Map(units.Quantity, QuantityMixIn):
         map_mask[bad] = map_mask[bad] | self.pixmask.labels_to_value('DONOTUSE')
 
         return EnhancedMap(value=map_value, unit=self.unit, ivar=map_ivar, mask=map_mask,
-                           datamodel=self._datamodel, pixmask_flag=self.pixmask_flag, copy=True)
+                           datamodel=self._datamodel, pixmask_flag=self.pixmask_flag,
+                           binid=self.binid, copy=True)
 
     def _map_arith(self, map2, op):
         """Do map arithmetic and correctly handle map attributes."""
@@ -495,7 +570,8 @@ class Map(units.Quantity, QuantityMixIn):
         map12_unit = self._unit_propagation(self.unit, map2.unit, op)
 
         return EnhancedMap(value=map12_value, unit=map12_unit, ivar=map12_ivar, mask=map12_mask,
-                           datamodel=self._datamodel, pixmask_flag=self.pixmask_flag, copy=True)
+                           datamodel=self._datamodel, pixmask_flag=self.pixmask_flag,
+                           binid=self.binid, copy=True)
 
     def __add__(self, map2):
         """Add two maps."""
@@ -532,7 +608,8 @@ class Map(units.Quantity, QuantityMixIn):
         unit = self.unit**power
 
         return EnhancedMap(value=value, unit=unit, ivar=ivar, mask=self.mask,
-                           datamodel=self._datamodel, pixmask_flag=self.pixmask_flag, copy=True)
+                           datamodel=self._datamodel, pixmask_flag=self.pixmask_flag,
+                           binid=self.binid, copy=True)
 
     def inst_sigma_correction(self):
         """Correct for instrumental broadening.
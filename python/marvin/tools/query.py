@@ -24,15 +24,18 @@ from marvin import config, log
 from marvin.api.api import Interaction
 from marvin.core import marvin_pickle
 from marvin.core.exceptions import MarvinError, MarvinUserWarning
+from marvin.tools.catalogue_query import CatalogueQuery
+from marvin.tools.query_cache import get_query_plan_cache
 from marvin.tools.results import Results, remote_mode_only
-from marvin.utils.general import temp_setattr, getKeywordArgs
+from marvin.utils.general import temp_setattr, getKeywordArgs, unpack_table
+from marvin.utils.general.spaxel_summary import get_spaxel_summary
 from marvin.utils.datamodel.query import datamodel
 from marvin.utils.datamodel.query.base import query_params
 
 if config.db:
     from marvin import marvindb
     from marvin.utils.general.structs import string_folding_wrapper
-    from sqlalchemy import bindparam, func, and_
+    from sqlalchemy import Float, bindparam, column, exists, func, and_, or_, text
     from sqlalchemy.dialects import postgresql
     from sqlalchemy.orm import aliased
     from sqlalchemy.sql.expression import desc
@@ -43,11 +46,22 @@ try:
 except:
     import pickle
 
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
 
 __all__ = ['Query', 'doQuery']
 
 opdict = {'<=': le, '>=': ge, '>': gt, '<': lt, '!=': ne, '=': eq, '==': eq}
 
+# Attributes of a local Query set while building it, which form its cached plan
+_plan_attributes = ('search_filter', 'return_params', 'default_params', 'params',
+                    'filter_params', 'filter', 'query', '_parsed', '_query_params',
+                    '_query_params_order', '_joins', '_modellist', '_drp_alias',
+                    '_dap_alias', '_spaxelclass')
+
 
 def doQuery(**kwargs):
     """Convenience function for building a Query and retrieving the Results.
@@ -104,7 +118,9 @@ class Query(object):
     as well as, a list of desired parameters to return.
 
     Query will use a local database if it finds on.  Otherwise a remote query uses
-    the API to run a query on the Utah Server and return the results.
+    the API to run a query on the Utah Server and return the results.  Without a
+    database or API access, catalogue-level queries are run locally on the drpall
+    and DAPall files (see :class:`~marvin.tools.catalogue_query.CatalogueQuery`).
 
     The Query returns a list of tupled parameters and passed them into the
     Marvin Results object.  The parameters are a combination of user-defined
@@ -146,13 +162,17 @@ class Query(object):
             If True, turns on the dogpile memcache caching of results. Default is True.
         verbose (bool):
             If True, turns on verbosity.
+        columnar (bool):
+            If True, remote results are transferred as Arrow record batches and kept
+            in columnar form by the Results. Requires pyarrow and ``msgpack``
+            compression. Defaults to True if pyarrow is installed.
 
     '''
 
     def __init__(self, search_filter=None, return_params=None, return_type=None, targets=None,
                  quality=None, mode=None, return_all=False, default_params=None, nexus='cube',
                  sort='mangaid', order='asc', caching=True, limit=100, count_threshold=1000,
-                 verbose=False, release=None):
+                 verbose=False, release=None, columnar=None):
 
         # basic parameters
         self.release = release or config.release
@@ -181,6 +201,7 @@ class Query(object):
         self.count_threshold = count_threshold
         self.limit = limit
         self.verbose = verbose
+        self.columnar = columnar if columnar is not None else pyarrow is not None
 
         # add db specific parameters
         if config.db:
@@ -197,7 +218,7 @@ class Query(object):
 
         # initialize a query
         if self.data_origin == 'file':
-            raise MarvinError('Cannot currently query a file')
+            self._init_file_query()
         elif self.data_origin == 'db':
             self._init_local_query()
         elif self.data_origin == 'api':
@@ -226,23 +247,44 @@ class Query(object):
             self._do_remote()
         if self.mode == 'auto':
             try:
-                self._do_local()
+                self._do_local(use_catalogues=False)
             except MarvinError as e:
                 log.debug('local mode failed. Trying remote now.')
-                self._do_remote()
+                try:
+                    self._do_remote()
+                except MarvinError as e:
+                    log.debug('remote mode failed. Trying the local catalogues now.')
+                    self._do_local()
 
         # Sanity check to make sure data_origin has been properly set.
         assert self.data_origin in ['file', 'db', 'api'], 'data_origin is not properly set.'
 
-    def _do_local(self):
-        ''' Sets up to perform queries locally. '''
+    def _do_local(self, use_catalogues=True):
+        ''' Sets up to perform queries locally.
 
-        if not config.db:
-            warnings.warn('No local database found. Cannot perform queries.', MarvinUserWarning)
-            raise MarvinError('No local database found.  Query cannot be run in local mode')
-        else:
+        Queries the local database if there is one. Otherwise, if ``use_catalogues``
+        is True and the drpall file of the release exists, queries the drpall and
+        DAPall catalogues.
+
+        '''
+
+        if config.db:
             self.mode = 'local'
             self.data_origin = 'db'
+        elif use_catalogues and self._has_catalogues():
+            self.mode = 'local'
+            self.data_origin = 'file'
+        else:
+            warnings.warn('No local database found. Cannot perform queries.', MarvinUserWarning)
+            raise MarvinError('No local database found.  Query cannot be run in local mode')
+
+    def _has_catalogues(self):
+        ''' Checks if the drpall file of the release exists locally '''
+
+        try:
+            return os.path.isfile(config._getDrpAllPath(drpver=self._drpver))
+        except MarvinError:
+            return False
 
     def _do_remote(self):
         ''' Sets up to perform queries remotely. '''
@@ -254,7 +296,35 @@ class Query(object):
             self.data_origin = 'api'
 
     def _init_local_query(self):
-        ''' Initialize a local database query '''
+        ''' Initialize a local database query
+
+        If ``config.use_query_plan_cache`` is True, the plan of the query is
+        first looked up in the :class:`~marvin.tools.query_cache.QueryPlanCache`,
+        and only built if it is not cached. Plans selecting files with the
+        spaxel summary are not cached, as they depend on the summary at the
+        time they were built.
+
+        '''
+
+        plan_cache = get_query_plan_cache() if config.use_query_plan_cache else None
+
+        if plan_cache is not None:
+            plan_key = plan_cache.make_key(self.search_filter,
+                                           return_params=self.return_params,
+                                           default_params=self.default_params,
+                                           return_type=self.return_type,
+                                           targets=self.targets,
+                                           quality=self.quality,
+                                           nexus=self.nexus,
+                                           release=self.release,
+                                           allow_dap=config._allow_DAP_queries,
+                                           spaxel_summary=config.use_spaxel_summary)
+            plan = plan_cache.get(plan_key)
+            if plan is not None:
+                self._set_plan(plan)
+                return
+
+        self._uses_spaxel_summary = False
 
         # set default parameters
         self._set_defaultparams()
@@ -268,6 +338,63 @@ class Query(object):
         # build the query
         self._build_query()
 
+        if plan_cache is not None and not self._uses_spaxel_summary:
+            plan_cache.set(plan_key, self._get_plan())
+
+    def _get_plan(self):
+        ''' Returns the attributes set when building the query, as a dictionary '''
+
+        return {name: getattr(self, name) for name in _plan_attributes if hasattr(self, name)}
+
+    def _set_plan(self, plan):
+        ''' Sets the attributes of a cached query plan, binding its query to the session '''
+
+        for name, value in plan.items():
+            setattr(self, name, value)
+
+        self.query = self.query.with_session(self.session)
+
+    def _init_file_query(self):
+        ''' Initialize a local query on the drpall and DAPall catalogues
+
+        See :class:`~marvin.tools.catalogue_query.CatalogueQuery` for the
+        parameters and filters that can be used.
+
+        '''
+
+        self.query = CatalogueQuery(release=self.release)
+
+        # set default and user-defined input parameters, with their full names
+        self._set_defaultparams()
+        returns = self.return_params or []
+        returns = [returns] if not isinstance(returns, list) else returns
+        try:
+            defaults = [self.query.get_full_name(dp) for dp in self.params]
+            self.return_params = [self.query.get_full_name(rp) for rp in returns]
+        except KeyError as e:
+            raise MarvinError('Could not set parameters: {0}'.format(e))
+        self.params = []
+        self._add_columns(defaults + self.return_params)
+
+        # setup the search filter
+        if self.search_filter:
+            if not isinstance(self.search_filter, six.string_types):
+                raise MarvinError('Input parameters must be a natural language string!')
+            self._add_filter(self.search_filter)
+
+        # add any target or quality flags into the filter
+        self._check_targets()
+        self._check_quality()
+
+        # add the parameters used by the filters
+        self._add_columns(self.query.get_filter_params())
+
+        # rows of the DAPall file are identified by the DAP analysis
+        if self.query.uses_dapall:
+            self._add_columns(['bintype.name', 'template.name'])
+
+        self.query = self.query.add_columns(*self.params)
+
     def _init_remote_query(self):
         ''' Initialize a remote API query '''
 
@@ -289,7 +416,8 @@ class Query(object):
                                'order': self.order,
                                'limit': self.limit,
                                'return_all': self.return_all,
-                               'caching': self._caching}
+                               'caching': self._caching,
+                               'columnar': self.columnar and config.compression == 'msgpack'}
 
     def run(self, start=None, end=None, query_type=None):
         ''' Runs a Query
@@ -321,9 +449,99 @@ class Query(object):
             results = self._run_remote(start=start, end=end, query_type=query_type)
         elif self.data_origin == 'db':
             results = self._run_local(start=start, end=end, query_type=query_type)
+        elif self.data_origin == 'file':
+            results = self._run_file(start=start, end=end)
 
         return results
 
+    def stream(self, chunk=100000):
+        ''' Streams the results of a Query in batches of rows
+
+        Runs the query and yields its results in batches of at most ``chunk``
+        rows, so that the memory used is independent of the total number of
+        results. All the results are returned, regardless of ``limit``,
+        ``count_threshold``, and ``return_all``. Locally, the rows are read
+        from a server-side database cursor. Remotely, they are read from the
+        streamed response of the ``stream`` API route.
+
+        Parameters:
+            chunk (int):
+                The maximum number of rows in each batch.
+
+        Returns:
+            A generator yielding lists of tupled results.
+
+        Example:
+            >>> q = Query(search_filter='nsa.z < 0.1', return_params=['cube.ra', 'cube.dec'])
+            >>> for rows in q.stream(chunk=10000):
+            >>>     process(rows)
+
+        '''
+
+        assert int(chunk) > 0, 'chunk must be a positive integer'
+
+        if self.data_origin == 'api':
+            return self._stream_remote(chunk=int(chunk))
+        elif self.data_origin == 'db':
+            return self._stream_local(chunk=int(chunk))
+        elif self.data_origin == 'file':
+            return self._stream_file(chunk=int(chunk))
+
+    def _stream_local(self, chunk=100000):
+        ''' Yields batches of rows of a local Query from a server-side cursor '''
+
+        self._sort_query()
+
+        sql = str(self._get_sql(self.query))
+        conn = marvindb.db.engine.raw_connection()
+        try:
+            # a named cursor keeps the results on the database server
+            cursor = conn.cursor('query_stream_cursor')
+            cursor.itersize = chunk
+            cursor.execute(sql)
+            for rows in self._iter_fetch(cursor, n_rows=chunk):
+                yield rows
+        finally:
+            conn.close()
+
+    def _stream_file(self, chunk=100000):
+        ''' Yields batches of rows of a local Query on the catalogues '''
+
+        self._sort_query()
+
+        for start in range(0, self.query.count(), chunk):
+            yield self.query.slice(start, start + chunk).all()
+
+    def _stream_remote(self, chunk=100000):
+        ''' Yields batches of rows of a remote Query from the streamed API route '''
+
+        url = config.urlmap['api']['stream']['url']
+
+        # the rows are decoded one at a time, so they must be sent as JSON
+        params = dict(self._remote_params, compression='json')
+
+        try:
+            ii = Interaction(route=url, params=params, iterate=True)
+        except Exception as e:
+            raise MarvinError('API Query stream call failed: {0}'.format(e))
+
+        items = ii.iterData()
+
+        # the first item holds the names of the parameters
+        params = next(items, None)
+        if params is not None:
+            self.params = params
+
+        rows = []
+        for item in items:
+            rows.append(tuple(item))
+            if len(rows) == chunk:
+                yield rows
+                rows = []
+
+        if rows:
+            yield rows
+
     def _run_remote(self, start=None, end=None, query_type=None):
         ''' Run a remote Query
 
@@ -403,6 +621,9 @@ class Query(object):
 
         # get some parameters
         data = interaction.getData()
+        if isinstance(data, six.binary_type):
+            # columnar results, packed as Arrow record batches
+            data = unpack_table(data)
         params = results.get('params', None)
         query = results.get('query', self.search_filter)
         count = results.get('count', None)
@@ -487,6 +708,49 @@ class Query(object):
 
         return final
 
+    def _run_file(self, start=None, end=None):
+        ''' Run a local Query on the drpall and DAPall catalogues
+
+        Parameters:
+            start (int):
+                A starting index when slicing the query
+            end (int):
+                An ending index when slicing the query
+
+        Returns:
+            An instance of the :class:`~marvin.tools.query.results.Results`
+            class containing the results of your Query.
+
+        '''
+
+        # Check for adding a sort
+        self._sort_query()
+
+        # set the start time of query
+        starttime = datetime.datetime.now()
+
+        # get the count
+        totalcount = self.query.count()
+
+        # slice the query and get the results
+        query = self._slice_query(start=start, end=end, totalcount=totalcount)
+        results = query.all()
+
+        # get the runtime
+        endtime = datetime.datetime.now()
+        self._run_time = (endtime - starttime)
+
+        # convert to Marvin Results
+        final = Results(results=results, query=query, count=self._count, mode=self.mode,
+                        returntype=self.return_type, queryobj=self, totalcount=totalcount,
+                        chunk=self.limit, runtime=self._run_time, start=self._start, end=self._end)
+
+        # get the final time
+        posttime = datetime.datetime.now()
+        self._final_time = (posttime - starttime)
+
+        return final
+
     def _sort_query(self):
         ''' Sort the SQLA query object by a given parameter '''
 
@@ -496,6 +760,15 @@ class Query(object):
                 param = self.datamodel.parameters[str(self.sort)].full
             else:
                 param = self.datamodel.parameters.get_full_from_remote(self.sort)
+
+            # sort the catalogue query if the parameter is in the catalogues
+            if self.data_origin == 'file':
+                try:
+                    self.query = self.query.order_by(param, self.order)
+                except (KeyError, MarvinError) as e:
+                    log.debug('cannot sort the catalogue query by {0}: {1}'.format(param, e))
+                return
+
             sortparam = self._marvinform._param_form_lookup.mapToColumn(param)
 
             # check if sort param actually in the parameter list
@@ -602,7 +875,7 @@ class Query(object):
         # self.totalcount = count if not self.totalcount else self.totalcount
 
         # check history
-        if marvindb.isdbconnected:
+        if self.data_origin == 'db' and marvindb.isdbconnected:
             __ = self._check_history(totalcount=totalcount)
 
         if count > self.count_threshold and self.return_all is False:
@@ -700,14 +973,28 @@ class Query(object):
         if not self.return_all:
             res = obj.fetchall()
         else:
-            while True:
-                rows = obj.fetchmany(n_rows)
-                if rows:
-                    res.extend(rows)
-                else:
-                    break
+            for rows in self._iter_fetch(obj, n_rows=n_rows):
+                res.extend(rows)
         return res
 
+    @staticmethod
+    def _iter_fetch(obj, n_rows=100000):
+        ''' Yields batches of query results using fetchmany
+
+        Parameters:
+            obj (object):
+                SQLAlchemy connection object or Pyscopg2 cursor object
+            n_rows (int):
+                The number of rows to fetch at a time
+
+        '''
+
+        while True:
+            rows = obj.fetchmany(n_rows)
+            if not rows:
+                break
+            yield rows
+
     @staticmethod
     def _get_sql(query):
         ''' Get the sql for a given query
@@ -758,10 +1045,70 @@ class Query(object):
                 sql = self.__getattribute__(prop)
 
             return str(sql)
+        elif self.data_origin == 'file':
+            if not prop or prop == 'query':
+                sql = str(self.query)
+            elif prop == 'joins':
+                sql = ['drpall', 'dapall'] if self.query.uses_dapall else ['drpall']
+            elif prop == 'filter':
+                sql = self.query.filter_string
+            return str(sql)
         elif self.data_origin == 'api':
             sql = self.search_filter
             return sql
 
+    def radial_many(self, coords, radius):
+        ''' Restricts the Query to the objects within a radius of any of a list of positions
+
+        A bulk version of the ``radial`` function of the search filter, to
+        cross-match thousands of targets in a single query.  RA and Dec are
+        added to the returned parameters.  Locally, the positions are matched
+        to the cubes with a single ``q3c_join`` against a ``VALUES`` list,
+        which uses the q3c index of the cubes.
+        On the drpall and DAPall catalogues, all the positions are matched at
+        once against the spatial index of the catalogue.  Only available in
+        local mode.
+
+        Parameters:
+            coords (array):
+                A list or ``(N, 2)`` array of RA and Dec pairs, in degrees.
+            radius (float):
+                The radius of the cone around each position, in degrees.
+
+        Example:
+            >>> q = Query(search_filter='nsa.z < 0.1')
+            >>> q.radial_many([(232.5447, 48.6902), (230.5, 43.5)], 0.05)
+            >>> results = q.run()
+
+        '''
+
+        if self.data_origin == 'api':
+            raise MarvinError('radial_many is only available in local mode')
+
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        assert len(coords) > 0, 'coords must contain at least one position'
+        radius = float(radius)
+
+        # the positions are written into the SQL, where NaN and inf are not valid
+        if not np.isfinite(coords).all() or not np.isfinite(radius):
+            raise MarvinError('radial_many: coords and radius must be finite numbers')
+
+        # add RA, Dec as returned columns
+        self._add_columns(['cube.ra', 'cube.dec'])
+
+        if self.data_origin == 'file':
+            self.query = self.query.add_columns(*self.params).radial_many(coords, radius)
+        else:
+            # The positions are a VALUES list semi-joined to the cubes with
+            # q3c_join, so each position is one scan of the q3c index.
+            cube = marvindb.datadb.Cube
+            values = ', '.join('({0!r}, {1!r})'.format(float(ra), float(dec)) for ra, dec in coords)
+            positions = text('SELECT * FROM (VALUES {0}) AS v (ra, dec)'.format(values)).\
+                columns(column('ra', Float), column('dec', Float)).alias('radial_many_positions')
+            matches = exists().select_from(positions).where(
+                func.q3c_join(positions.c.ra, positions.c.dec, cube.ra, cube.dec, radius))
+            self.query = self.query.filter(matches)
+
     @classmethod
     def get_available_params(cls, paramdisplay='best', release=None):
         ''' Retrieve the available parameters to query on
@@ -1421,7 +1768,9 @@ class Query(object):
             quality_filter = self._create_quality_filter(daplabels, flag='DAPQUAL', quality_filter=quality_filter)
 
         # parse the filter and add to the main
-        if quality_filter:
+        if quality_filter and self.data_origin == 'file':
+            self._add_filter(quality_filter)
+        elif quality_filter:
             spaxelprop = marvindb.dapdb.__getattribute__('Clean{0}'.format(self.datamodel.dap_datamodel.property_table))
             models = [marvindb.datadb.Cube, marvindb.dapdb.File, spaxelprop]
             self._add_filter(quality_filter, modellist=models)
@@ -1498,6 +1847,11 @@ class Query(object):
 
         '''
 
+        # the catalogue query parses its own filters
+        if self.data_origin == 'file':
+            self.query = self.query.filter(strfilter)
+            return
+
         modellist = modellist if modellist else marvindb.datadb
         # parse the filter and add to the main
         parsed = parse_boolean_search(strfilter)
@@ -1514,6 +1868,13 @@ class Query(object):
 
         # get new columns not already added
         columns = [columns] if not isinstance(columns, list) else columns
+
+        # the catalogue query adds the columns once built, keeping their order
+        if self.data_origin == 'file':
+            self.params.extend([c for i, c in enumerate(columns)
+                                if c not in self.params and c not in columns[:i]])
+            return
+
         new_columns = list(set(columns) - set(self.params))
         if any(new_columns):
             colattrs = self._marvinform._param_form_lookup.mapToColumn([c for c in new_columns])
@@ -1639,13 +2000,18 @@ class Query(object):
                     methodcall = self.__getattribute__(methodname)
                     methodcall(fxn)
 
-    def _get_good_spaxels(self):
+    def _get_good_spaxels(self, file_filter=None):
         ''' Subquery - Counts the number of good spaxels
 
         Counts the number of good spaxels with binid != -1
         Uses the spaxelprop.bindid_pk != 9999 since this is known and set.
         Removes need to join to the binid table
 
+        Parameters:
+            file_filter (object):
+                If set, a condition on ``file_pk`` restricting the DAP files
+                whose spaxels are counted
+
         Returns:
             bincount (subquery):
                 An SQLalchemy subquery to be joined into the main query object
@@ -1659,12 +2025,15 @@ class Query(object):
         if 'CleanSpaxelProp' not in spaxelname:
             bincount = bincount.filter(self._spaxelclass.binid != -1)
 
+        if file_filter is not None:
+            bincount = bincount.filter(file_filter)
+
         # group the results by file_pk
         bincount = bincount.group_by(self._spaxelclass.file_pk).subquery('bingood', with_labels=True)
 
         return bincount
 
-    def _get_count_of(self, expression):
+    def _get_count_of(self, expression, file_filter=None):
         ''' Subquery - Counts spaxels satisfying an expression
 
         Counts the number of spaxels of a given
@@ -1673,6 +2042,9 @@ class Query(object):
         Parameters:
             expression (str):
                 The filter expression to parse
+            file_filter (object):
+                If set, a condition on ``file_pk`` restricting the DAP files
+                whose spaxels are counted
 
         Returns:
             valcount (subquery):
@@ -1691,8 +2063,12 @@ class Query(object):
         # Build the subquery
         valcount = self.session.query(self._spaxelclass.file_pk.label('valfile'),
                                       (func.count(self._spaxelclass.pk)).label('valcount')).\
-            filter(op(attribute, value)).\
-            group_by(self._spaxelclass.file_pk).subquery('goodhacount', with_labels=True)
+            filter(op(attribute, value))
+
+        if file_filter is not None:
+            valcount = valcount.filter(file_filter)
+
+        valcount = valcount.group_by(self._spaxelclass.file_pk).subquery('goodhacount', with_labels=True)
 
         return valcount
 
@@ -1717,29 +2093,101 @@ class Query(object):
             >>>
             >>> Select objects that have Ha flux > 25 in more than
             >>> 20% of their (good) spaxels.
+
+        If ``config.use_spaxel_summary`` is True and the spaxel summary of the
+        release (see :func:`~marvin.utils.general.spaxel_summary.build_spaxel_summary`)
+        has a histogram of the parameter, the files are selected with the summary,
+        and only those it cannot decide are counted exactly.
         '''
 
         # get the appropriate SpaxelProp ModelClass
-        self._spaxelclass = self._marvinform._param_form_lookup['spaxelprop.file'].Meta.model
+        self._spaxelclass = self._marvinform._param_form_lookup.get_model('spaxelprop.file')
 
         # parse the function into name, condition, operator, and value
         name, condition, ops, value = self._parse_fxn(fxn)
         percent = float(value) / 100.
         op = opdict[ops]
 
-        # Retrieve the necessary subqueries
-        bincount = self._get_good_spaxels()
-        valcount = self._get_count_of(condition)
+        summary = self._get_spaxel_summary()
+        param, cond_op, __ = self._parse_expression(condition)
+        column = self._marvinform._param_form_lookup.mapToColumn(param)
 
-        # Join to the main query
-        self.query = self.query.join(bincount, bincount.c.binfile == self._spaxelclass.file_pk).\
-            join(valcount, valcount.c.valfile == self._spaxelclass.file_pk).\
-            filter(op(valcount.c.valcount, percent * bincount.c.goodcount))
+        if summary is not None and column.key in summary and cond_op in opdict:
+            # Select the files meeting the condition
+            self.query = self.query.filter(self._get_percent_files(summary, condition, ops, percent))
+            self._uses_spaxel_summary = True
+        else:
+            # Retrieve the necessary subqueries
+            bincount = self._get_good_spaxels()
+            valcount = self._get_count_of(condition)
+
+            # Join to the main query
+            self.query = self.query.join(bincount, bincount.c.binfile == self._spaxelclass.file_pk).\
+                join(valcount, valcount.c.valfile == self._spaxelclass.file_pk).\
+                filter(op(valcount.c.valcount, percent * bincount.c.goodcount))
 
         # Group the results by main default datadb parameters, so as not to include all spaxels
         newdefs = [d for d in self.default_params if 'spaxelprop' not in d]
         self.query = self._group_by(params=newdefs)
 
+    def _get_spaxel_summary(self):
+        ''' Returns the spaxel summary of the spaxel table of the query, or None '''
+
+        if not config.use_spaxel_summary:
+            return None
+
+        return get_spaxel_summary(self._dapver, self._spaxelclass.__tablename__)
+
+    def _get_percent_files(self, summary, condition, ops, percent):
+        ''' Returns a filter selecting the DAP files meeting a npergood condition
+
+        The files decided by the bounds of the spaxel summary are selected by
+        primary key. Those it cannot decide, and those not in the summary (e.g.,
+        loaded after it was built), are counted exactly with the subqueries of
+        `_get_percent`, restricted to those files. The exact count is a subquery
+        of the filter, so nothing is queried until the query is run.
+
+        Parameters:
+            summary (SpaxelSummary):
+                The spaxel summary of the release
+            condition (str):
+                The parsed condition on the spaxels
+            ops (str):
+                The operator comparing the count with the percentage
+            percent (float):
+                The fraction of good spaxels
+
+        Returns:
+            A filter condition on the ``file_pk`` of the spaxel table
+
+        '''
+
+        param, cond_op, value = self._parse_expression(condition)
+        name = self._marvinform._param_form_lookup.mapToColumn(param).key
+        passes, check = summary.npergood(name, cond_op, float(value), ops, percent)
+
+        file_pk = self._spaxelclass.file_pk
+
+        # the files to count exactly
+        file_filters = []
+        if len(check) > 0:
+            file_filters.append(file_pk.in_(check.tolist()))
+        if len(summary.file_pks) > 0:
+            file_filters.append(~file_pk.in_(np.asarray(summary.file_pks).tolist()))
+        file_filter = or_(*file_filters) if file_filters else None
+
+        bincount = self._get_good_spaxels(file_filter=file_filter)
+        valcount = self._get_count_of(condition, file_filter=file_filter)
+        exact = self.session.query(bincount.c.binfile).\
+            join(valcount, valcount.c.valfile == bincount.c.binfile).\
+            filter(opdict[ops](valcount.c.valcount, percent * bincount.c.goodcount))
+
+        selected = file_pk.in_(exact.statement)
+        if len(passes) > 0:
+            selected = or_(file_pk.in_(passes.tolist()), selected)
+
+        return selected
+
     def _parse_fxn(self, fxn):
         ''' Parse a fxn condition '''
         return fxn.fxn_name, fxn.condition, fxn.operator, fxn.value
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under a 3-clause BSD license.
+#
+# @Filename: query_cache.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import copy
+import json
+import threading
+from collections import OrderedDict
+
+import six
+
+from marvin import config
+
+
+__all__ = ('QueryPlanCache', 'get_query_plan_cache')
+
+
+class QueryPlanCache(object):
+    ''' An in-memory cache of the compiled plans of local queries
+
+    Building a local :class:`~marvin.tools.query.Query` parses the search
+    filter, resolves the shortcut names and the columns of all the
+    parameters, finds the joins between the tables, and looks up the
+    pipeline versions in the database. The plan resulting from all those
+    steps (the SQLAlchemy query, the joins, the models and the labelled
+    columns) only depends on the options of the query, so it is cached
+    here and reused by any later query with the same options. The cache
+    holds at most ``max_size`` plans, evicting the least recently used
+    first.
+
+    Parameters:
+        max_size (int):
+            The maximum number of plans in the cache. If None, the number of
+            plans is not capped.
+
+    Attributes:
+        hits (int):
+            The number of queries whose plan was found in the cache.
+        misses (int):
+            The number of queries whose plan had to be built.
+
+    Example:
+        >>> from marvin.tools.query_cache import get_query_plan_cache
+        >>> cache = get_query_plan_cache()
+        >>> cache.info()
+        {'hits': 40, 'misses': 10, 'hit_rate': 0.8, 'nplans': 10, 'max_size': 256}
+
+    '''
+
+    def __init__(self, max_size=None):
+
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<QueryPlanCache (nplans={0}, hits={1}, misses={2})>'.format(len(self._plans),
+                                                                           self.hits, self.misses)
+
+    def __len__(self):
+        return len(self._plans)
+
+    @staticmethod
+    def make_key(search_filter, **options):
+        ''' Returns the cache key for the plan of a query
+
+        Parameters:
+            search_filter (str):
+                The search filter of the query. Runs of whitespace are
+                collapsed, so filters differing only in spacing share a plan.
+            options:
+                Any other option on which the plan depends, e.g., the return
+                parameters, the release, or the targets and quality flags.
+
+        Returns:
+            A string key.
+
+        '''
+
+        if isinstance(search_filter, six.string_types):
+            search_filter = ' '.join(search_filter.split())
+
+        options['search_filter'] = search_filter
+
+        return json.dumps(options, sort_keys=True, default=str)
+
+    def get(self, key):
+        ''' Returns a copy of the cached plan for a key or None if it is not cached '''
+
+        with self._lock:
+            plan = self._plans.pop(key, None)
+
+            if plan is None:
+                self.misses += 1
+                return None
+
+            # Reinserts the plan so that the eviction is least recently used.
+            self._plans[key] = plan
+            self.hits += 1
+
+        return _copy_plan(plan)
+
+    def set(self, key, plan):
+        ''' Stores a plan in the cache
+
+        Parameters:
+            key (str):
+                The cache key, as returned by `make_key`.
+            plan (dict):
+                A dictionary of the attributes of the query that form the plan.
+
+        '''
+
+        with self._lock:
+            self._plans.pop(key, None)
+            self._plans[key] = _copy_plan(plan)
+            self.evict()
+
+    def evict(self):
+        ''' Removes the least recently used plans until the cache fits in ``max_size`` '''
+
+        if self.max_size is None:
+            return
+
+        while len(self._plans) > max(self.max_size, 0):
+            self._plans.popitem(last=False)
+
+    def clear(self):
+        ''' Removes all the cached plans and resets the counters '''
+
+        with self._lock:
+            self._plans.clear()
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        ''' The fraction of queries whose plan was found in the cache '''
+
+        nqueries = self.hits + self.misses
+
+        return self.hits / nqueries if nqueries > 0 else 0.
+
+    def info(self):
+        ''' Returns a dictionary with the statistics of the cache '''
+
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate,
+                'nplans': len(self._plans), 'max_size': self.max_size}
+
+
+def _copy_plan(plan):
+    ''' Returns a copy of a plan, with copies of its mutable containers
+
+    SQLAlchemy queries and expressions are immutable, so they are shared.
+
+    '''
+
+    return {key: copy.copy(value) if isinstance(value, (list, dict)) else value
+            for key, value in plan.items()}
+
+
+_query_plan_cache = None
+
+
+def get_query_plan_cache():
+    ''' Returns the `QueryPlanCache` configured by ``marvin.config``
+
+    The maximum number of cached plans is set by the ``query_plan_cache_size``
+    config attribute.
+
+    '''
+
+    global _query_plan_cache
+
+    if _query_plan_cache is None:
+        _query_plan_cache = QueryPlanCache()
+
+    _query_plan_cache.max_size = config.query_plan_cache_size
+
+    return _query_plan_cache
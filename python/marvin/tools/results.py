@@ -10,9 +10,12 @@ import copy
 import datetime
 import json
 import os
+import sys
 import warnings
-from collections import namedtuple
+from collections import deque, namedtuple
 from functools import wraps
+from itertools import islice
+from multiprocessing.pool import ThreadPool
 from operator import add
 
 import numpy as np
@@ -30,8 +33,8 @@ from marvin.tools.modelcube import ModelCube
 from marvin.tools.rss import RSS
 from marvin.utils.datamodel.query import datamodel
 from marvin.utils.datamodel.query.base import ParameterGroup
-from marvin.utils.general import (downloadList, get_images_by_list, map_bins_to_column, temp_setattr,
-                                  turn_off_ion)
+from marvin.utils.general import (downloadList, get_images_by_list, map_bins_to_column,
+                                  rows_to_arrow, temp_setattr, turn_off_ion)
 
 try:
     import cPickle as pickle
@@ -43,6 +46,12 @@ try:
 except ImportError:
     warnings.warn('Could not import pandas.', MarvinUserWarning)
 
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
 __all__ = ['Results', 'ResultSet']
 
 breadcrumb = MarvinBreadCrumb()
@@ -190,7 +199,7 @@ class ResultSet(list):
         self.pages = int(np.ceil(self.total / float(self.count))) if self.count else 0
         self.index = kwargs.get('index') if kwargs.get('index') else 0
         self.end_index = self.index + self.count
-        self.current_page = (int(self.index) + self.count) / self.count
+        self.current_page = (int(self.index) + self.count) / self.count if self.count else 0
 
     def __repr__(self):
         old = list.__repr__(self)
@@ -385,8 +394,14 @@ class Results(object):
                  end=None, queryobj=None, query=None, search_filter=None, return_params=None,
                  return_type=None, limit=None, params=None, **kwargs):
 
-        # basic parameters
-        self.results = results
+        # basic parameters. Columnar results are kept as an Arrow table and
+        # only converted to rows when the ResultSet is first accessed.
+        self._arrow = None
+        self._results = None
+        if pyarrow is not None and isinstance(results, pyarrow.Table):
+            self._arrow = results
+        else:
+            self.results = results
         self.mode = mode if mode else config.mode
         self.data_origin = data_origin
         self.objects = None
@@ -403,7 +418,7 @@ class Results(object):
 
         # stat parameters
         self.datamodel = datamodel[self.release]
-        self.count = count if count else len(self.results)
+        self.count = count if count else len(self._arrow if self._arrow is not None else self.results)
         self.totalcount = totalcount if totalcount else self.count
         self._runtime = runtime
         self.query_time = self._getRunTime() if self._runtime is not None else None
@@ -421,7 +436,10 @@ class Results(object):
                         category=self.__class__)
 
         # Convert results to MarvinTuple
-        if self.count > 0 and self.results:
+        if self.count > 0 and self._arrow is not None:
+            self._set_page()
+            self.getColumns()
+        elif self.count > 0 and self.results:
             self._set_page()
             self._create_result_set(index=self.start)
 
@@ -429,6 +447,27 @@ class Results(object):
         if self.return_type:
             self.convertToTool(self.return_type)
 
+    @property
+    def results(self):
+        ''' The ResultSet of the current results '''
+
+        if self._results is None and self._arrow is not None:
+            arrow = self._arrow
+            if arrow.num_rows == 0:
+                self.results = ResultSet([], count=0, total=self.totalcount, index=self.start,
+                                         columns=self.getColumns(), results=self)
+            else:
+                columns = [column.to_pylist() for column in arrow.columns]
+                self._create_result_set(index=self.start, rows=list(zip(*columns)))
+            self._arrow = arrow
+
+        return self._results
+
+    @results.setter
+    def results(self, value):
+        self._results = value
+        self._arrow = None
+
     def __add__(self, other):
         assert isinstance(other, Results) is True, 'Can only add Marvin Results together'
         assert self.release == other.release, 'Cannot add Marvin Results from different releases'
@@ -588,7 +627,11 @@ class Results(object):
             >>>   4-4602     1901      -9999.0
         '''
         try:
-            tabres = Table(rows=self.results, names=self.columns.full)
+            if self._arrow is not None:
+                tabres = Table([column.to_numpy() for column in self._arrow.columns],
+                               names=self.columns.full)
+            else:
+                tabres = Table(rows=self.results, names=self.columns.full)
         except ValueError as e:
             raise MarvinError('Could not make astropy Table from results: {0}'.format(e))
         return tabres
@@ -680,6 +723,55 @@ class Results(object):
         table.write(filename, format='csv', overwrite=overwrite)
         print('Writing new CSV file {0}'.format(filename))
 
+    def toArrow(self):
+        ''' Output the results as a columnar Apache Arrow Table
+
+        Remote results transferred in columnar form are returned directly,
+        without building any per-row objects. Requires pyarrow.
+
+        Returns:
+            A `pyarrow.Table`, with one column per result parameter.
+
+        Example:
+            >>> r = q.run()
+            >>> r.toArrow()
+            pyarrow.Table
+            mangaid: string
+            plateifu: string
+            z: double
+        '''
+
+        if self._arrow is not None:
+            return self._arrow
+
+        rows = self.results if self.results else []
+        return rows_to_arrow(rows, self.columns.list_params('remote'))
+
+    def toParquet(self, filename='myresults.parquet', overwrite=False):
+        ''' Output the results as a Parquet file
+
+        Writes a new Parquet file from search results, using pyarrow.
+
+        Parameters:
+            filename (str):
+                Name of Parquet file to output
+            overwrite (bool):
+                Set to True to overwrite an existing file
+
+        '''
+
+        if pyarrow is None:
+            raise ImportError('this feature requires pyarrow. Install it by '
+                              'doing pip install pyarrow.')
+
+        myext = os.path.splitext(filename)[1]
+        if not myext:
+            filename = filename + '.parquet'
+        if os.path.exists(filename) and not overwrite:
+            raise MarvinError('File {0} already exists. Use overwrite=True.'.format(filename))
+        pyarrow.parquet.write_table(self.toArrow(), filename)
+        print('Writing new Parquet file {0}'.format(filename))
+
     def toDF(self):
         '''Call toDataFrame().
         '''
@@ -707,6 +799,9 @@ class Results(object):
             3  1-22942   7992  12705  8.470360e+10  0.104958
             4  1-22948   7992   9102  1.023530e+11  0.119399
         '''
+        if self._arrow is not None:
+            return self._arrow.to_pandas()
+
         res = self.results.to_list() if self.results else []
         try:
             dfres = pd.DataFrame(res)
@@ -732,8 +827,8 @@ class Results(object):
         self.columns = self.getColumns()
         ntnames = self.columns.list_params('remote')
         # dynamically create a new ResultRow Class
-        rows = rows if rows else self.results
-        row_is_dict = isinstance(rows[0], dict)
+        rows = rows if rows is not None else self.results
+        row_is_dict = len(rows) > 0 and isinstance(rows[0], dict)
         if not isinstance(rows, ResultSet):
             nt = marvintuple('ResultRow', ntnames, results=self)
             if row_is_dict:
@@ -920,8 +1015,8 @@ class Results(object):
         # add the release just in case
         params.update({'release': self.release})
 
-        # check if we're getting all results
-        datastream = calltype == 'getAll'
+        # check if we're getting all results, streamed unless they are columnar
+        datastream = calltype == 'getAll' and not params.get('columnar', None)
 
         # send the request
         try:
@@ -935,7 +1030,12 @@ class Results(object):
             self._runtime = remotes['runtime']
             self.query_time = self._getRunTime()
             index = kwargs.get('index', None)
-            if create_set:
+            if create_set and pyarrow is not None and isinstance(output, pyarrow.Table):
+                # columnar results are only converted to rows when accessed
+                self._results, self._arrow = None, output
+                self.start = index if index else 0
+                self.count = len(output)
+            elif create_set:
                 self._create_result_set(index=index, rows=output)
             else:
                 return output
@@ -1385,14 +1485,55 @@ class Results(object):
             # Get the query route
             url = config.urlmap['api']['querycubes']['url']
 
+            columnar = (self._queryobj is not None and self._queryobj.columnar and
+                        config.compression == 'msgpack')
             params = {'searchfilter': self.search_filter, 'return_all': True,
                       'returnparams': self.return_params, 'limit': self.limit,
-                      'sort': self.sortcol, 'order': self.order}
+                      'sort': self.sortcol, 'order': self.order, 'columnar': columnar}
             self._interaction(url, params, calltype='getAll', create_set=True)
             self.count = self.totalcount
             print('Returned all {0} results'.format(self.totalcount))
 
-    def convertToTool(self, tooltype, mode='auto', limit=None):
+    def iter_rows(self, chunk=100000):
+        ''' Iterate over all the results of a query in batches
+
+        Unlike `getAll`, which loads all the results at once, this streams
+        the results of the query in batches of at most ``chunk`` rows, so
+        that the memory used does not grow with the total number of results.
+        The current results are not modified.
+
+        Parameters:
+            chunk (int):
+                The maximum number of rows in each batch.
+
+        Returns:
+            A generator yielding a `ResultSet` of ResultRows for each batch.
+
+        Example:
+            >>> r = q.run()
+            >>> for rows in r.iter_rows(chunk=10000):
+            >>>     print(rows[0].mangaid)
+
+        See Also:
+            getAll, loop
+
+        '''
+
+        if self._queryobj is None:
+            raise MarvinError('iter_rows requires the Query that produced these results.')
+
+        columns = self.getColumns()
+        nt = marvintuple('ResultRow', columns.list_params('remote'), results=self)
+
+        index = 0
+        for rows in self._queryobj.stream(chunk=chunk):
+            rows = [nt(**row) if isinstance(row, dict) else nt(*row) for row in rows]
+            yield ResultSet(rows, count=len(rows), total=self.totalcount, index=index,
+                            results=self)
+            index += len(rows)
+
+    def convertToTool(self, tooltype, mode='auto', limit=None, nworkers=1, generator=False,
+                      progress=False):
         ''' Converts the list of results into Marvin Tool objects
 
         Creates a list of Marvin Tool objects from a set of query results.
@@ -1400,6 +1541,12 @@ class Results(object):
         If the Query.returntype parameter is specified, then the Results object
         will automatically convert the results to the desired Tool on initialization.
 
+        Objects can be created concurrently by setting ``nworkers``. This is
+        mostly useful in remote mode, where each object requires several API
+        requests. The order of the objects always matches that of the results
+        and, as with the sequential conversion, rows that fail are replaced by
+        an error message.
+
         Parameters:
             tooltype (str):
                 The requested Marvin Tool object that the results are converted into.
@@ -1411,6 +1558,19 @@ class Results(object):
             mode (str):
                 The mode to use when attempting to convert to Tool. Default mode
                 is to use the mode internal to Results. (most often remote mode)
+            nworkers (int):
+                The number of threads used to create the objects. Default is 1,
+                which creates the objects sequentially. Because the DB session
+                is not thread-safe, objects are always created sequentially if
+                they may be loaded from a local database.
+            generator (bool):
+                If True, returns a generator that yields the objects as they are
+                created, instead of storing them in Results.objects.
+            progress (bool):
+                If True, prints the progress of the conversion.
+
+        Returns:
+            A generator of Marvin Tool objects if ``generator=True``, otherwise None.
 
         Example:
             >>> # Get the results from some query
@@ -1431,6 +1591,10 @@ class Results(object):
             >>>  <Marvin Cube (plateifu='7995-1902', mode='remote', data_origin='api')>,
             >>>  <Marvin Cube (plateifu='8000-1901', mode='remote', data_origin='api')>]
 
+            >>> # convert the results using 8 threads, one object at a time
+            >>> for maps in r.convertToTool('maps', nworkers=8, generator=True):
+            >>>     print(maps.emline_gflux_ha_6564.value.max())
+
         '''
 
         # set the desired tool type
@@ -1441,66 +1605,120 @@ class Results(object):
         # get the parameter list to check against
         paramlist = self.columns.full
 
+        if tooltype == 'spaxel':
+            assert 'spaxelprop.x' in paramlist and 'spaxelprop.y' in paramlist, \
+                   'Parameters must include spaxelprop.x and y in order to convert to Marvin Spaxel.'
+        elif tooltype == 'modelcube':
+            assert self.release != 'MPL-4', "ModelCubes require a release of MPL-5 and up"
+
         print('Converting results to Marvin {0} objects'.format(tooltype.title()))
-        if tooltype == 'cube':
-            self.objects = [self._get_object(Cube, plateifu=res.plateifu, mode=mode) for res in self.results[0:limit]]
-        elif tooltype == 'maps':
+        if tooltype == 'spaxel':
+            objects = self._iter_spaxels(mode=mode)
+        else:
+            objects = self._iter_objects(tooltype, mode=mode, limit=limit, nworkers=nworkers,
+                                         progress=progress)
 
-            isbin = 'bintype.name' in paramlist
-            istemp = 'template.name' in paramlist
-            self.objects = []
+        if generator:
+            return objects
 
-            for res in self.results[0:limit]:
-                mapkwargs = {'mode': mode, 'plateifu': res.plateifu}
+        self.objects = list(objects)
 
-                if isbin:
-                    binval = res.bintype_name
-                    mapkwargs['bintype'] = binval
+    def _get_tool_kwargs(self, tooltype, mode='auto', limit=None):
+        ''' Returns the list of keyword arguments to create a tool for each row '''
 
-                if istemp:
-                    tempval = res.template_name
-                    mapkwargs['template_kin'] = tempval
+        # get the parameter list to check against
+        paramlist = self.columns.full
 
-                self.objects.append(self._get_object(Maps, **mapkwargs))
-        elif tooltype == 'spaxel':
+        isbin = 'bintype.name' in paramlist
+        istemp = 'template.name' in paramlist
 
-            assert 'spaxelprop.x' in paramlist and 'spaxelprop.y' in paramlist, \
-                   'Parameters must include spaxelprop.x and y in order to convert to Marvin Spaxel.'
+        tool_kwargs = []
+        for res in self.results[0:limit]:
+            kwargs = {'mode': mode, 'plateifu': res.plateifu}
+
+            if tooltype in ['maps', 'modelcube']:
+                if isbin:
+                    kwargs['bintype'] = res.bintype_name
 
-            self.objects = []
+                if istemp:
+                    kwargs['template_kin'] = res.template_name
 
-            tab = self.toTable()
-            uniq_plateifus = list(set(self.getListOf('plateifu')))
+            tool_kwargs.append(kwargs)
 
-            for plateifu in uniq_plateifus:
-                c = self._get_object(Cube, plateifu=plateifu, mode=mode)
-                univals = tab['cube.plateifu'] == plateifu
-                x = tab[univals]['spaxelprop.x'].tolist()
-                y = tab[univals]['spaxelprop.y'].tolist()
-                spaxels = c[y, x]
-                self.objects.extend(spaxels)
-        elif tooltype == 'rss':
-            self.objects = [self._get_object(RSS, plateifu=res.plateifu, mode=mode) for res in self.results[0:limit]]
-        elif tooltype == 'modelcube':
+        return tool_kwargs
 
-            isbin = 'bintype.name' in paramlist
-            istemp = 'template.name' in paramlist
-            self.objects = []
+    def _iter_objects(self, tooltype, mode='auto', limit=None, nworkers=1, progress=False):
+        ''' Yields a Marvin tool for each row, in order, creating them in a thread pool
 
-            assert self.release != 'MPL-4', "ModelCubes require a release of MPL-5 and up"
+        At most ``2 * nworkers`` objects are pending at any given time, so
+        that a slow consumer does not cause all the objects to be held in memory.
 
-            for res in self.results[0:limit]:
-                mapkwargs = {'mode': mode, 'plateifu': res.plateifu}
+        '''
 
-                if isbin:
-                    binval = res.bintype_name
-                    mapkwargs['bintype'] = binval
+        toolclasses = {'cube': Cube, 'maps': Maps, 'rss': RSS, 'modelcube': ModelCube}
+        toolclass = toolclasses[tooltype]
+
+        tool_kwargs = self._get_tool_kwargs(tooltype, mode=mode, limit=limit)
+        total = len(tool_kwargs)
+
+        # the DB session cannot be shared between threads
+        if nworkers > 1 and mode != 'remote':
+            from marvin import marvindb
+            if marvindb and marvindb.isdbconnected:
+                warnings.warn('a local database may be used; converting sequentially.',
+                              MarvinUserWarning)
+                nworkers = 1
+
+        if nworkers > 1:
+            pool = ThreadPool(nworkers)
+            tasks = iter(tool_kwargs)
+            pending = deque(pool.apply_async(self._get_object, (toolclass, ), kwargs)
+                            for kwargs in islice(tasks, 2 * nworkers))
+
+            def _results():
+                while pending:
+                    inst = pending.popleft().get()
+                    for kwargs in islice(tasks, 1):
+                        pending.append(pool.apply_async(self._get_object, (toolclass, ), kwargs))
+                    yield inst
+
+            objects = _results()
+        else:
+            pool = None
+            objects = (self._get_object(toolclass, **kwargs) for kwargs in tool_kwargs)
 
-                if istemp:
-                    tempval = res.template_name
-                    mapkwargs['template_kin'] = tempval
+        try:
+            for ii, inst in enumerate(objects):
+                if progress:
+                    self._print_progress(ii + 1, total, tooltype)
+                yield inst
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def _iter_spaxels(self, mode='auto'):
+        ''' Yields the Marvin Spaxels for each row, loading one cube per plateifu '''
+
+        tab = self.toTable()
+        uniq_plateifus = list(set(self.getListOf('plateifu')))
+
+        for plateifu in uniq_plateifus:
+            c = self._get_object(Cube, plateifu=plateifu, mode=mode)
+            univals = tab['cube.plateifu'] == plateifu
+            x = tab[univals]['spaxelprop.x'].tolist()
+            y = tab[univals]['spaxelprop.y'].tolist()
+            spaxels = c[y, x]
+            for spaxel in spaxels:
+                yield spaxel
+
+    @staticmethod
+    def _print_progress(ndone, total, tooltype):
+        ''' Prints the progress of the conversion to tools on a single line '''
 
-                self.objects.append(self._get_object(ModelCube, **mapkwargs))
+        sys.stdout.write('\rConverted {0}/{1} {2} objects'.format(ndone, total, tooltype))
+        if ndone == total:
+            sys.stdout.write('\n')
+        sys.stdout.flush()
 
     @staticmethod
     def _get_object(obj, **kwargs):
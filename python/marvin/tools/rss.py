@@ -25,6 +25,7 @@ from astropy.io import fits
 import marvin
 from marvin.core.exceptions import MarvinError, MarvinUserWarning
 from marvin.utils.datamodel.drp import datamodel_rss
+from marvin.utils.general import unpack_array
 from marvin.utils.datamodel.drp.base import Spectrum as SpectrumDataModel
 
 from .core import MarvinToolsClass
@@ -42,7 +43,8 @@ class RSS(MarvinToolsClass, NSAMixIn, list):
     and exposure. `.RSSFiber` are initialised lazily, containing only basic
     information. They need to be initialised by calling `.RSSFiber.load`
     (unless `.RSS.autoload` is ``True``, in which case the instance is loaded
-    when first accessed).
+    when first accessed). All the fibres can be loaded at once with
+    `.RSS.load_all`, which reads each extension only once.
 
     In addition to the input arguments supported by `~.MarvinToolsClass` and
     `~.NSAMixIn`, this class accepts an ``autoload`` keyword argument that
@@ -71,6 +73,9 @@ class RSS(MarvinToolsClass, NSAMixIn, list):
         #: when accessed. Otherwise, they need to be loaded via `.RSSFiber.load`.
         self.autoload = autoload
 
+        # The row-stacked arrays of each datamodel extension, once read in bulk.
+        self._extension_arrays = None
+
         if self.data_origin == 'file':
             self._load_rss_from_file(data=self.data)
         elif self.data_origin == 'db':
@@ -141,13 +146,89 @@ class RSS(MarvinToolsClass, NSAMixIn, list):
 
         return Cube(plateifu=self.plateifu, mode=self.mode, release=self.release)
 
-    def load_all(self):
-        """Loads all the `.RSSFiber` associated to this `.RSS` instance."""
+    def load_all(self, bulk=True):
+        """Loads all the `.RSSFiber` associated to this `.RSS` instance.
+
+        Parameters
+        ----------
+        bulk : bool
+            If ``True``, each extension is read only once (in remote mode,
+            all the fibres are retrieved in a single request) and the arrays
+            of each `.RSSFiber` are views of the row-stacked arrays. If
+            ``False``, or if the server does not support the bulk request,
+            the fibres are loaded one by one using `.RSSFiber.load`.
+
+        """
+
+        if bulk:
+            try:
+                self._get_extension_arrays()
+            except (KeyError, MarvinError) as ee:
+                marvin.log.debug('cannot load the RSS extensions in bulk ({0}). '
+                                 'Loading one fibre at a time.'.format(ee))
 
         for rssfiber in self:
             if not rssfiber.loaded:
                 rssfiber.load()
 
+    def _get_extension_arrays(self):
+        """Returns the value, ivar, and mask arrays of all the datamodel extensions.
+
+        The arrays are row-stacked (one row per fibre) for the RSS extensions
+        and 1D for the spectra. They are read only once and cached. In remote
+        mode, all the extensions are retrieved in a single request.
+
+        """
+
+        if self._extension_arrays is not None:
+            return self._extension_arrays
+
+        if self.data_origin == 'file':
+
+            hdu_data = dict((hdu.name, hdu.data) for hdu in self.data
+                            if hdu.data is not None and hdu.name != 'OBSINFO')
+
+        elif self.data_origin == 'api':
+
+            url = marvin.config.urlmap['api']['getRSSExtensions']['url']
+
+            try:
+                response = self._toolInteraction(url.format(name=self.plateifu))
+            except Exception as ee:
+                raise MarvinError('found a problem retrieving the RSS fibres for '
+                                  'plateifu={!r}: {}'.format(self.plateifu, str(ee)))
+
+            data = response.getData()
+            hdu_data = dict((ext.upper(), unpack_array(data[ext])) for ext in data)
+
+        else:
+            raise ValueError('invalid data_origin={!r}'.format(self.data_origin))
+
+        extension_arrays = {}
+
+        for extension in self.datamodel.rss + self.datamodel.spectra:
+
+            value = hdu_data[extension.fits_extension()]
+
+            if extension.has_mask():
+                mask = hdu_data[extension.fits_extension('mask')]
+            else:
+                mask = None
+
+            # The ivar is computed from the std for the whole array at once.
+            if hasattr(extension, 'has_ivar') and extension.has_ivar():
+                ivar = hdu_data[extension.fits_extension('ivar')]
+            elif hasattr(extension, 'has_std') and extension.has_std():
+                ivar = 1. / (hdu_data[extension.fits_extension('std')]**2)
+            else:
+                ivar = None
+
+            extension_arrays[extension.name] = (value, ivar, mask)
+
+        self._extension_arrays = extension_arrays
+
+        return extension_arrays
+
     def select_fibers(self, exposure_no=None, set=None, mjd=None):
         """Selects fibres that match one or multiple of the input parameters.
 
@@ -280,11 +361,14 @@ class RSS(MarvinToolsClass, NSAMixIn, list):
         n_exposures = len(self.obsinfo)
         n_fibres_per_exposure = self._nfibers // n_exposures
 
+        # The fibres of each exposure share the same obsinfo table.
+        exp_obsinfos = [self.obsinfo[[exp_index]] for exp_index in range(n_exposures)]
+
         for fiberid in range(self._nfibers):
             exp_index = fiberid // n_fibres_per_exposure
-            exp_obsinfo = self.obsinfo[[exp_index]]
             self.append(RSSFiber(fiberid, self, self._wavelength, load=False,
-                                 obsinfo=exp_obsinfo, pixmask_flag=self.header['MASKNAME']))
+                                 obsinfo=exp_obsinfos[exp_index],
+                                 pixmask_flag=self.header['MASKNAME']))
 
 
 class RSSFiber(Spectrum):
@@ -390,6 +474,11 @@ class RSSFiber(Spectrum):
 
         assert self.loaded is False, 'object already loaded.'
 
+        # If the parent RSS has already read all the extensions, uses them.
+        if self.rss._extension_arrays is not None:
+            self._load_from_arrays(self.rss._extension_arrays)
+            return
+
         # Depending on whether the parent RSS is a file or API-populated, we
         # select the data to use.
         if self.rss.data_origin == 'file':
@@ -449,6 +538,45 @@ class RSSFiber(Spectrum):
 
         self.loaded = True
 
+    def _load_from_arrays(self, extension_arrays):
+        """Loads the fibre from the arrays returned by `.RSS._get_extension_arrays`.
+
+        The ivar and mask of the fibre and its additional spectra are views
+        of the row-stacked arrays.
+
+        """
+
+        for extension in self.rss.datamodel.rss + self.rss.datamodel.spectra:
+
+            value, ivar, mask = extension_arrays[extension.name]
+
+            if not isinstance(extension, SpectrumDataModel):
+                value = value[self.fiberid]
+                ivar = ivar[self.fiberid] if ivar is not None else None
+                mask = mask[self.fiberid] if mask is not None else None
+
+            if extension.name == 'flux':
+
+                self.value[:] = value
+                self.ivar = ivar
+                self.mask = mask
+                self._set_unit(extension.unit)
+
+            else:
+
+                new_spectrum = astropy.units.Quantity(value, unit=extension.unit,
+                                                      copy=False).view(Spectrum)
+                new_spectrum.wavelength = self.wavelength
+                new_spectrum.ivar = ivar
+                new_spectrum.mask = mask
+
+                setattr(self, extension.name, new_spectrum)
+
+                if extension.name not in self._spectra:
+                    self._spectra.append(extension.name)
+
+        self.loaded = True
+
     def _get_extension_data(self, extension, data, data_origin='file'):
         """Returns the value of an extension for this fibre, either from file or API.
 
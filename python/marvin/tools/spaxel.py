@@ -286,6 +286,45 @@ class Spaxel(object):
         for tool in ['cube', 'maps', 'modelcube']:
             self._load_tool(tool, force=(force is not None and force == tool))
 
+        self._set_loaded()
+
+    @staticmethod
+    def _load_many(spaxels):
+        """Loads a list of spaxels that share the same parent tools.
+
+        The tools are instantiated once, from the first spaxel, and the
+        quantities for all the spaxels are retrieved in bulk using
+        ``get_spaxel_quantities``.
+
+        """
+
+        if len(spaxels) == 0:
+            return
+
+        for tool in ['cube', 'maps', 'modelcube']:
+
+            tool_object = spaxels[0]._get_tool(tool)
+
+            for spaxel in spaxels:
+                setattr(spaxel, '_' + tool, tool_object)
+
+            if tool_object is None:
+                continue
+
+            quantities = tool_object.get_spaxel_quantities([spaxel.x for spaxel in spaxels],
+                                                           [spaxel.y for spaxel in spaxels],
+                                                           spaxels=spaxels)
+
+            for spaxel, spaxel_quantities in zip(spaxels, quantities):
+                spaxel._parent_shape = tool_object._shape
+                setattr(spaxel, tool + '_quantities', spaxel_quantities)
+
+        for spaxel in spaxels:
+            spaxel._set_loaded()
+
+    def _set_loaded(self):
+        """Sets the coordinates and versions after the quantities have been loaded."""
+
         self._set_radec()
         self.loaded = True
 
@@ -294,43 +333,48 @@ class Spaxel(object):
 
         self.datamodel = DataModel(self.release)
 
-    def _load_tool(self, tool, force=False):
-        """Loads the tool and the associated quantities."""
+    def _get_tool(self, tool, force=False):
+        """Returns the tool object, instantiating it if needed, or None if not used."""
 
         if tool == 'cube':
             class_name = marvin.tools.cube.Cube
             method = self.getCube
-            quantities_dict = 'cube_quantities'
         elif tool == 'maps':
             class_name = marvin.tools.maps.Maps
             method = self.getMaps
-            quantities_dict = 'maps_quantities'
         elif tool == 'modelcube':
             class_name = marvin.tools.modelcube.ModelCube
             method = self.getModelCube
-            quantities_dict = 'modelcube_quantities'
 
         attr_value = getattr(self, '_' + tool)
         if (attr_value is False or attr_value is None) and force is False:
             setattr(self, '_' + tool, None)
-            return
+            return None
 
         if not isinstance(attr_value, class_name):
             if tool == 'modelcube' and self.release == 'MPL-4':
                 warnings.warn('ModelCube cannot be instantiated for MPL-4.', MarvinUserWarning)
                 self._modelcube = None
-                return
+                return None
             else:
                 setattr(self, '_' + tool, method())
         else:
             if force is True:
                 warnings.warn('{0} is already loaded'.format(tool), MarvinUserWarning)
 
-        self._parent_shape = getattr(getattr(self, '_' + tool), '_shape')
+        return getattr(self, '_' + tool)
+
+    def _load_tool(self, tool, force=False):
+        """Loads the tool and the associated quantities."""
+
+        tool_object = self._get_tool(tool, force=force)
+        if tool_object is None:
+            return
+
+        self._parent_shape = tool_object._shape
 
-        setattr(self, quantities_dict,
-                getattr(getattr(self, '_' + tool), '_get_spaxel_quantities')(self.x, self.y,
-                                                                             spaxel=self))
+        setattr(self, tool + '_quantities',
+                tool_object._get_spaxel_quantities(self.x, self.y, spaxel=self))
 
     def getCube(self):
         """Returns the associated `~marvin.tools.cube.Cube`"""
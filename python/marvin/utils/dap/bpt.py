@@ -11,19 +11,30 @@ from __future__ import print_function
 from __future__ import absolute_import
 
 import warnings
+from multiprocessing.pool import ThreadPool
 
-import matplotlib.pyplot as plt
 import numpy as np
 
-from mpl_toolkits.axes_grid1 import ImageGrid
-
-from marvin.core.exceptions import MarvinDeprecationWarning, MarvinError
-from marvin.utils.plot import bind_to_figure
+from marvin.core.exceptions import MarvinDeprecationWarning, MarvinError, MarvinUserWarning
 
 
 __ALL__ = ('get_snr', 'kewley_sf_nii', 'kewley_sf_sii', 'kewley_sf_oi',
            'kewley_comp_nii', 'kewley_agn_sii', 'kewley_agn_oi',
-           'bpt_kewley06')
+           'bpt_kewley06', 'bpt_kewley06_batch', 'bpt_classes')
+
+
+# The emission line channels used for the BPT classification, and the
+# keys of their minimum SNR.
+bpt_channels = (('oiii_5008', 'oiii'), ('nii_6585', 'nii'), ('ha_6564', 'ha'),
+                ('hb_4862', 'hb'), ('oi_6302', 'oi'), ('sii_6718', 'sii'),
+                ('sii_6732', 'sii'))
+
+# The classes of the compact classification arrays of `bpt_kewley06_batch`,
+# in the order of their codes.
+bpt_classes = ('invalid', 'sf', 'comp', 'seyfert', 'liner', 'ambiguous')
+
+# The mechanisms whose spaxels are counted by `bpt_kewley06_batch`.
+bpt_mechanisms = ('sf', 'comp', 'agn', 'seyfert', 'liner', 'invalid', 'ambiguous')
 
 
 def get_snr(snr_min, emission_line, default=3):
@@ -45,25 +56,43 @@ def get_snr(snr_min, emission_line, default=3):
         return default
 
 
+def _mask_flux(value, ivar, mask=None, snr=1):
+    """Returns a masked array of fluxes, masking non-positive and low SNR values.
+
+    ``mask`` is a boolean array, True for the values to mask.
+
+    """
+
+    value = np.asarray(value)
+    ivar = np.asarray(ivar)
+
+    bad = np.zeros(value.shape, dtype=bool) if mask is None else np.array(mask, dtype=bool)
+
+    with np.errstate(invalid='ignore'):
+        # Masks spaxels with flux <= 0
+        bad |= (value <= 0)
+
+        # Masks all spaxels that don't reach the cutoff SNR
+        bad |= np.abs(value * np.sqrt(ivar)) < snr
+        bad |= ivar == 0
+
+    return np.ma.array(value, mask=bad)
+
+
 def get_masked(maps, emline, snr=1):
     """Convenience function to get masked arrays without negative values."""
 
     gflux = maps['emline_gflux_' + emline]
-    gflux_masked = gflux.masked
-
-    # Masks spaxels with flux <= 0
-    gflux_masked.mask |= (gflux_masked.data <= 0)
 
-    # Masks all spaxels that don't reach the cutoff SNR
-    gflux_masked.mask |= gflux.snr < snr
-    gflux_masked.mask |= gflux.ivar == 0
-
-    return gflux_masked
+    return _mask_flux(gflux.value, gflux.ivar, mask=gflux.masked.mask, snr=snr)
 
 
 def _get_kewley06_axes(use_oi=True):
     """Creates custom axes for displaying Kewley06 plots."""
 
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.axes_grid1 import ImageGrid
+
     fig = plt.figure(None, (8.5, 10))
     fig.clf()
 
@@ -273,6 +302,285 @@ def bpt_kewley06(maps, snr_min=3, return_figure=True, use_oi=True, **kwargs):
 
     sii_6718 = get_masked(maps, 'sii_6718', snr=get_snr(snr_min, 'sii'))
     sii_6732 = get_masked(maps, 'sii_6732', snr=get_snr(snr_min, 'sii'))
+
+    bpt_return_classification, logs = _classify_kewley06(oiii, nii, ha, hb, oi,
+                                                         sii_6718, sii_6732, use_oi=use_oi)
+    log_oiii_hb, log_nii_ha, log_sii_ha, log_oi_ha = logs
+
+    sf_mask = bpt_return_classification['sf']['global']
+    comp_mask = bpt_return_classification['comp']['global']
+    seyfert_mask = bpt_return_classification['seyfert']['global']
+    liner_mask = bpt_return_classification['liner']['global']
+    invalid_mask = bpt_return_classification['invalid']['global']
+    ambiguous_mask = bpt_return_classification['ambiguous']['global']
+
+    if not return_figure:
+        return bpt_return_classification
+
+    import matplotlib.pyplot as plt
+
+    # Does all the plotting
+    with plt.style.context('seaborn-darkgrid'):
+        fig, grid_bpt, gal_bpt = _get_kewley06_axes(use_oi=use_oi)
+
+    sf_kwargs = {'marker': 's', 's': 12, 'color': 'c', 'zorder': 50, 'alpha': 0.7, 'lw': 0.0,
+                 'label': 'Star-forming'}
+    sf_handler = grid_bpt[0].scatter(log_nii_ha[sf_mask], log_oiii_hb[sf_mask], **sf_kwargs)
+    grid_bpt[1].scatter(log_sii_ha[sf_mask], log_oiii_hb[sf_mask], **sf_kwargs)
+
+    comp_kwargs = {'marker': 's', 's': 12, 'color': 'g', 'zorder': 45, 'alpha': 0.7, 'lw': 0.0,
+                   'label': 'Composite'}
+    comp_handler = grid_bpt[0].scatter(log_nii_ha[comp_mask], log_oiii_hb[comp_mask],
+                                       **comp_kwargs)
+    grid_bpt[1].scatter(log_sii_ha[comp_mask], log_oiii_hb[comp_mask], **comp_kwargs)
+
+    seyfert_kwargs = {'marker': 's', 's': 12, 'color': 'r', 'zorder': 40, 'alpha': 0.7, 'lw': 0.0,
+                      'label': 'Seyfert'}
+    seyfert_handler = grid_bpt[0].scatter(log_nii_ha[seyfert_mask], log_oiii_hb[seyfert_mask],
+                                          **seyfert_kwargs)
+    grid_bpt[1].scatter(log_sii_ha[seyfert_mask], log_oiii_hb[seyfert_mask], **seyfert_kwargs)
+
+    liner_kwargs = {'marker': 's', 's': 12, 'color': 'm', 'zorder': 35, 'alpha': 0.7, 'lw': 0.0,
+                    'label': 'LINER'}
+    liner_handler = grid_bpt[0].scatter(log_nii_ha[liner_mask], log_oiii_hb[liner_mask],
+                                        **liner_kwargs)
+    grid_bpt[1].scatter(log_sii_ha[liner_mask], log_oiii_hb[liner_mask], **liner_kwargs)
+
+    amb_kwargs = {'marker': 's', 's': 12, 'color': '0.6', 'zorder': 30, 'alpha': 0.7, 'lw': 0.0,
+                  'label': 'Ambiguous '}
+    amb_handler = grid_bpt[0].scatter(log_nii_ha[ambiguous_mask], log_oiii_hb[ambiguous_mask],
+                                      **amb_kwargs)
+    grid_bpt[1].scatter(log_sii_ha[ambiguous_mask], log_oiii_hb[ambiguous_mask], **amb_kwargs)
+
+    if use_oi:
+        grid_bpt[2].scatter(log_oi_ha[sf_mask], log_oiii_hb[sf_mask], **sf_kwargs)
+        grid_bpt[2].scatter(log_oi_ha[comp_mask], log_oiii_hb[comp_mask], **comp_kwargs)
+        grid_bpt[2].scatter(log_oi_ha[seyfert_mask], log_oiii_hb[seyfert_mask], **seyfert_kwargs)
+        grid_bpt[2].scatter(log_oi_ha[liner_mask], log_oiii_hb[liner_mask], **liner_kwargs)
+        grid_bpt[2].scatter(log_oi_ha[ambiguous_mask], log_oiii_hb[ambiguous_mask], **amb_kwargs)
+
+    # Creates the legend
+    grid_bpt[0].legend([sf_handler, comp_handler, seyfert_handler, liner_handler, amb_handler],
+                       ['Star-forming', 'Composite', 'Seyfert', 'LINER', 'Ambiguous'], ncol=2,
+                       loc='upper left', frameon=True, labelspacing=0.1, columnspacing=0.1,
+                       handletextpad=0.1, fontsize=9)
+
+    # Creates a RGB image of the galaxy, and sets the colours of the spaxels to match the
+    # classification masks
+    gal_rgb = np.zeros((ha.shape[0], ha.shape[1], 3), dtype=np.uint8)
+
+    for ii in [1, 2]:  # Cyan
+        gal_rgb[:, :, ii][sf_mask] = 255
+
+    gal_rgb[:, :, 1][comp_mask] = 128  # Green
+
+    gal_rgb[:, :, 0][seyfert_mask] = 255  # Red
+
+    # Magenta
+    gal_rgb[:, :, 0][liner_mask] = 255
+    gal_rgb[:, :, 2][liner_mask] = 255
+
+    for ii in [0, 1, 2]:
+        gal_rgb[:, :, ii][invalid_mask] = 255  # White
+        gal_rgb[:, :, ii][ambiguous_mask] = 169  # Grey
+
+    # Shows the image.
+    gal_bpt.imshow(gal_rgb, origin='lower', aspect='auto', interpolation='nearest')
+
+    gal_bpt.set_xlim(0, ha.shape[1] - 1)
+    gal_bpt.set_ylim(0, ha.shape[0] - 1)
+    gal_bpt.set_xlabel('x [spaxels]')
+    gal_bpt.set_ylabel('y [spaxels]')
+
+    axes = grid_bpt.axes_all + [gal_bpt]
+
+    # Adds custom method to create figure
+    for ax in axes:
+        setattr(ax.__class__, 'bind_to_figure', _bind_to_figure)
+
+    return (bpt_return_classification, fig, axes)
+
+
+def _compact_kewley06(classification, stacked=False):
+    """Returns the classification masks as an array of `bpt_classes` codes and counts.
+
+    If ``stacked=True``, the first axis of the masks runs over galaxies, and
+    the counts are returned for each galaxy.
+
+    """
+
+    shape = classification['invalid']['global'].shape
+
+    codes = np.full(shape, bpt_classes.index('ambiguous'), dtype=np.int8)
+    for name in ['sf', 'comp', 'seyfert', 'liner', 'invalid']:
+        codes[classification[name]['global']] = bpt_classes.index(name)
+
+    # Counts the spaxels of each mechanism, over the spatial axes.
+    axes = tuple(range(1, len(shape))) if stacked else None
+    counts = dict((name, classification[name]['global'].sum(axis=axes))
+                  for name in bpt_mechanisms)
+
+    return codes, counts
+
+
+def _get_batch_fluxes(maps, snr_min=3):
+    """Returns the masked arrays of the BPT lines of a Maps, read in a single bulk call."""
+
+    properties = ['emline_gflux_' + channel for channel, __ in bpt_channels]
+    gfluxes = maps.getMaps(properties)
+
+    return [_mask_flux(gflux.value, gflux.ivar, mask=gflux.masked.mask,
+                       snr=get_snr(snr_min, snr_key))
+            for gflux, (__, snr_key) in zip(gfluxes, bpt_channels)]
+
+
+def _classify_batch_maps(maps, snr_min=3, use_oi=True):
+    """Returns the compact classification and counts of a single Maps."""
+
+    classification, __ = _classify_kewley06(*_get_batch_fluxes(maps, snr_min=snr_min),
+                                            use_oi=use_oi)
+
+    codes, counts = _compact_kewley06(classification)
+
+    return codes, dict((name, int(count)) for name, count in counts.items())
+
+
+def _classify_batch_stack(fluxes, ivars, masks, index, snr_min=3, use_oi=True):
+    """Returns the compact classification and counts of a slice of stacked fluxes."""
+
+    masked = []
+    for channel, snr_key in bpt_channels:
+        mask = masks[channel][index] if channel in masks else None
+        masked.append(_mask_flux(fluxes[channel][index], ivars[channel][index], mask=mask,
+                                 snr=get_snr(snr_min, snr_key)))
+
+    classification, __ = _classify_kewley06(*masked, use_oi=use_oi)
+
+    return _compact_kewley06(classification, stacked=True)
+
+
+def bpt_kewley06_batch(data, ivar=None, mask=None, snr_min=3, use_oi=True, nworkers=1):
+    """Returns the Kewley+06 classification of many galaxies at once.
+
+    A batch version of `bpt_kewley06` for survey-wide statistics. It does not
+    produce any figure, and returns a compact classification array for each
+    galaxy and the number of spaxels of each excitation mechanism, instead of
+    the full dictionary of classification masks.
+
+    The input can be a list of `~marvin.tools.maps.Maps`, in which case the
+    emission line maps of each galaxy are retrieved with a single call to
+    `~marvin.tools.maps.Maps.getMaps` and each galaxy is classified with
+    array operations. Alternatively, the fluxes of many galaxies can be
+    stacked in arrays of shape ``(ngal, ny, nx)``, which are classified in a
+    single vectorised pass.
+
+    Parameters:
+        data (list or dict):
+            Either a list of `~marvin.tools.maps.Maps`, or a dictionary with
+            the stacked fluxes of each emission line channel in `bpt_channels`
+            (e.g., ``'ha_6564'``).
+        ivar (dict):
+            If ``data`` is a dictionary, a dictionary with the inverse
+            variance of the fluxes of each channel, with the same shapes.
+        mask (dict):
+            If ``data`` is a dictionary, an optional dictionary of boolean
+            arrays, True for the fluxes of each channel that must not be used.
+        snr_min (float or dict):
+            The signal-to-noise cutoff value for the emission lines, as in
+            `bpt_kewley06`.
+        use_oi (bool):
+            If ``True``, uses the OI diagnostic diagram for spaxel classification.
+        nworkers (int):
+            The number of threads used to retrieve and classify galaxies (or
+            chunks of the stacked fluxes) concurrently.
+
+    Returns:
+        result (dict):
+            A dictionary with keys ``'classification'``, with an array of
+            int8 codes for each spaxel, where the code is the index of its
+            class in `bpt_classes` (``'invalid'``, ``'sf'``, ``'comp'``,
+            ``'seyfert'``, ``'liner'``, ``'ambiguous'``), and ``'counts'``, a
+            dictionary with the number of spaxels of each mechanism
+            (including ``'agn'``) in each galaxy, as an array of length
+            ``ngal``. For a list of Maps, ``'classification'`` is a list of
+            2D arrays, since galaxies can have different shapes. For stacked
+            fluxes, it is an array of shape ``(ngal, ny, nx)``.
+
+    Example:
+        >>> maps = [Maps(plateifu=plateifu) for plateifu in ['8485-1901', '7443-12701']]
+        >>> bpt = bpt_kewley06_batch(maps, nworkers=2)
+        >>> bpt['counts']['sf']
+        array([1036,  540])
+        >>> sf_8485_1901 = bpt['classification'][0] == bpt_classes.index('sf')
+
+    """
+
+    nworkers = max(int(nworkers or 1), 1)
+
+    if isinstance(data, dict):
+
+        assert ivar is not None, 'ivar is required for stacked fluxes.'
+        mask = mask or {}
+
+        for channel, __ in bpt_channels:
+            assert channel in data and channel in ivar, \
+                'missing fluxes or ivar for channel {0!r}.'.format(channel)
+
+        ngal = len(data[bpt_channels[0][0]])
+        chunks = [slice(chunk[0], chunk[-1] + 1)
+                  for chunk in np.array_split(np.arange(ngal), max(min(nworkers, ngal), 1)) if len(chunk)]
+
+        def _classify(index):
+            return _classify_batch_stack(data, ivar, mask, index, snr_min=snr_min, use_oi=use_oi)
+
+    else:
+
+        data = list(data)
+        chunks = data
+
+        # The DB session cannot be shared between threads
+        if nworkers > 1 and any(maps.data_origin == 'db' for maps in data):
+            warnings.warn('some maps use the local database; classifying sequentially.',
+                          MarvinUserWarning)
+            nworkers = 1
+
+        def _classify(maps):
+            return _classify_batch_maps(maps, snr_min=snr_min, use_oi=use_oi)
+
+    if nworkers > 1 and len(chunks) > 1:
+        pool = ThreadPool(nworkers)
+        try:
+            results = pool.map(_classify, chunks)
+        finally:
+            pool.close()
+    else:
+        results = [_classify(chunk) for chunk in chunks]
+
+    if isinstance(data, dict):
+        codes = np.concatenate([codes for codes, __ in results]) if results else \
+            np.zeros(np.shape(data[bpt_channels[0][0]]), dtype=np.int8)
+        counts = dict((name, np.concatenate([cc[name] for __, cc in results]).astype(int)
+                       if results else np.zeros(0, dtype=int))
+                      for name in bpt_mechanisms)
+    else:
+        codes = [codes for codes, __ in results]
+        counts = dict((name, np.array([cc[name] for __, cc in results], dtype=int))
+                      for name in bpt_mechanisms)
+
+    return {'classification': codes, 'counts': counts}
+
+
+def _classify_kewley06(oiii, nii, ha, hb, oi, sii_6718, sii_6732, use_oi=True):
+    """Returns the Kewley+06 classification masks for masked arrays of line fluxes.
+
+    All the masks are computed with array operations, so the fluxes can have
+    any shape, for instance a stack of maps with shape ``(ngal, ny, nx)``.
+    Returns the dictionary of classification masks described in
+    `bpt_kewley06` and a tuple with the masked arrays of ``log([OIII]/Hb)``,
+    ``log([NII]/Ha)``, ``log([SII]/Ha)``, and ``log([OI]/Ha)``.
+
+    """
+
     sii = sii_6718 + sii_6732
 
     # Calculate masked logarithms
@@ -360,89 +668,7 @@ def bpt_kewley06(maps, snr_min=3, return_figure=True, use_oi=True, **kwargs):
                                  'invalid': invalid_classification,
                                  'ambiguous': ambiguous_classification}
 
-    if not return_figure:
-        return bpt_return_classification
-
-    # Does all the plotting
-    with plt.style.context('seaborn-darkgrid'):
-        fig, grid_bpt, gal_bpt = _get_kewley06_axes(use_oi=use_oi)
-
-    sf_kwargs = {'marker': 's', 's': 12, 'color': 'c', 'zorder': 50, 'alpha': 0.7, 'lw': 0.0,
-                 'label': 'Star-forming'}
-    sf_handler = grid_bpt[0].scatter(log_nii_ha[sf_mask], log_oiii_hb[sf_mask], **sf_kwargs)
-    grid_bpt[1].scatter(log_sii_ha[sf_mask], log_oiii_hb[sf_mask], **sf_kwargs)
-
-    comp_kwargs = {'marker': 's', 's': 12, 'color': 'g', 'zorder': 45, 'alpha': 0.7, 'lw': 0.0,
-                   'label': 'Composite'}
-    comp_handler = grid_bpt[0].scatter(log_nii_ha[comp_mask], log_oiii_hb[comp_mask],
-                                       **comp_kwargs)
-    grid_bpt[1].scatter(log_sii_ha[comp_mask], log_oiii_hb[comp_mask], **comp_kwargs)
-
-    seyfert_kwargs = {'marker': 's', 's': 12, 'color': 'r', 'zorder': 40, 'alpha': 0.7, 'lw': 0.0,
-                      'label': 'Seyfert'}
-    seyfert_handler = grid_bpt[0].scatter(log_nii_ha[seyfert_mask], log_oiii_hb[seyfert_mask],
-                                          **seyfert_kwargs)
-    grid_bpt[1].scatter(log_sii_ha[seyfert_mask], log_oiii_hb[seyfert_mask], **seyfert_kwargs)
-
-    liner_kwargs = {'marker': 's', 's': 12, 'color': 'm', 'zorder': 35, 'alpha': 0.7, 'lw': 0.0,
-                    'label': 'LINER'}
-    liner_handler = grid_bpt[0].scatter(log_nii_ha[liner_mask], log_oiii_hb[liner_mask],
-                                        **liner_kwargs)
-    grid_bpt[1].scatter(log_sii_ha[liner_mask], log_oiii_hb[liner_mask], **liner_kwargs)
-
-    amb_kwargs = {'marker': 's', 's': 12, 'color': '0.6', 'zorder': 30, 'alpha': 0.7, 'lw': 0.0,
-                  'label': 'Ambiguous '}
-    amb_handler = grid_bpt[0].scatter(log_nii_ha[ambiguous_mask], log_oiii_hb[ambiguous_mask],
-                                      **amb_kwargs)
-    grid_bpt[1].scatter(log_sii_ha[ambiguous_mask], log_oiii_hb[ambiguous_mask], **amb_kwargs)
-
-    if use_oi:
-        grid_bpt[2].scatter(log_oi_ha[sf_mask], log_oiii_hb[sf_mask], **sf_kwargs)
-        grid_bpt[2].scatter(log_oi_ha[comp_mask], log_oiii_hb[comp_mask], **comp_kwargs)
-        grid_bpt[2].scatter(log_oi_ha[seyfert_mask], log_oiii_hb[seyfert_mask], **seyfert_kwargs)
-        grid_bpt[2].scatter(log_oi_ha[liner_mask], log_oiii_hb[liner_mask], **liner_kwargs)
-        grid_bpt[2].scatter(log_oi_ha[ambiguous_mask], log_oiii_hb[ambiguous_mask], **amb_kwargs)
-
-    # Creates the legend
-    grid_bpt[0].legend([sf_handler, comp_handler, seyfert_handler, liner_handler, amb_handler],
-                       ['Star-forming', 'Composite', 'Seyfert', 'LINER', 'Ambiguous'], ncol=2,
-                       loc='upper left', frameon=True, labelspacing=0.1, columnspacing=0.1,
-                       handletextpad=0.1, fontsize=9)
-
-    # Creates a RGB image of the galaxy, and sets the colours of the spaxels to match the
-    # classification masks
-    gal_rgb = np.zeros((ha.shape[0], ha.shape[1], 3), dtype=np.uint8)
-
-    for ii in [1, 2]:  # Cyan
-        gal_rgb[:, :, ii][sf_mask] = 255
-
-    gal_rgb[:, :, 1][comp_mask] = 128  # Green
-
-    gal_rgb[:, :, 0][seyfert_mask] = 255  # Red
-
-    # Magenta
-    gal_rgb[:, :, 0][liner_mask] = 255
-    gal_rgb[:, :, 2][liner_mask] = 255
-
-    for ii in [0, 1, 2]:
-        gal_rgb[:, :, ii][invalid_mask] = 255  # White
-        gal_rgb[:, :, ii][ambiguous_mask] = 169  # Grey
-
-    # Shows the image.
-    gal_bpt.imshow(gal_rgb, origin='lower', aspect='auto', interpolation='nearest')
-
-    gal_bpt.set_xlim(0, ha.shape[1] - 1)
-    gal_bpt.set_ylim(0, ha.shape[0] - 1)
-    gal_bpt.set_xlabel('x [spaxels]')
-    gal_bpt.set_ylabel('y [spaxels]')
-
-    axes = grid_bpt.axes_all + [gal_bpt]
-
-    # Adds custom method to create figure
-    for ax in axes:
-        setattr(ax.__class__, 'bind_to_figure', _bind_to_figure)
-
-    return (bpt_return_classification, fig, axes)
+    return bpt_return_classification, (log_oiii_hb, log_nii_ha, log_sii_ha, log_oi_ha)
 
 
 def _bind_to_figure(self, fig=None):
@@ -453,6 +679,8 @@ def _bind_to_figure(self, fig=None):
 
     """
 
+    from marvin.utils.plot import bind_to_figure
+
     new_figure = bind_to_figure(self, fig=fig)
 
     if new_figure.axes[0].get_ylabel() == '':
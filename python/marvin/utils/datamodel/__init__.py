@@ -26,8 +26,36 @@ class MetaDataModel(type):
         return super(MetaDataModel, cls).__new__(cls, name, parents, dict)
 
 
+class LazyDataModel(object):
+    ''' A placeholder for a datamodel that is only built when first accessed
+
+    Parameters:
+        release (str):
+            The release of the datamodel.
+        aliases (list):
+            The aliases of the datamodel, so that it can be looked up without
+            building it.
+        loader (callable):
+            A function, called without arguments, that returns the datamodel.
+
+    '''
+
+    def __init__(self, release, aliases, loader):
+        self.release = release
+        self.aliases = aliases
+        self.loader = loader
+
+    def __repr__(self):
+        return '<LazyDataModel release={0!r}>'.format(self.release)
+
+
 class DataModelList(six.with_metaclass(MetaDataModel, OrderedDict)):
-    ''' Base Class for a list of DataModels '''
+    ''' Base Class for a list of DataModels
+
+    Datamodels can be added with `add_lazy_datamodel`, in which case they are
+    only built the first time they are accessed.
+
+    '''
 
     def __init__(self, models=None):
 
@@ -45,29 +73,63 @@ class DataModelList(six.with_metaclass(MetaDataModel, OrderedDict)):
 
         super(DataModelList, self).__setitem__(key, value)
 
+    def _load(self, release):
+        """Returns the model for a release, building it if it is lazy."""
+
+        model = OrderedDict.__getitem__(self, release)
+
+        if isinstance(model, LazyDataModel):
+            lazy = model
+            model = lazy.loader()
+            assert isinstance(model, self.base_model), 'value must be a {0}'.format(self.base_name)
+            assert model.release == lazy.release, 'lazy datamodel release does not match.'
+            OrderedDict.__setitem__(self, release, model)
+
+        return model
+
     def __getitem__(self, release):
         """Returns model based on release and aliases."""
 
         if release in self.keys():
-            return super(DataModelList, self).__getitem__(release)
+            return self._load(release)
 
-        for model in self.values():
-            if release in model.aliases:
-                return model
+        for key in self.keys():
+            if release in OrderedDict.__getitem__(self, key).aliases:
+                return self._load(key)
 
         raise KeyError('cannot find release or alias {0!r}'.format(release))
 
-    def __contains__(self, value):
-        ''' Returns True based on release/aliases using getitem '''
+    def get(self, release, default=None):
         try:
-            self[value]
-            return True
+            return self[release]
         except KeyError:
-            return False
+            return default
+
+    def values(self):
+        return [self._load(key) for key in self.keys()]
+
+    def items(self):
+        return [(key, self._load(key)) for key in self.keys()]
+
+    def add_lazy_datamodel(self, release, aliases, loader):
+        """Adds a datamodel that is built by ``loader`` when first accessed.
+
+        See `LazyDataModel` for a description of the parameters.
+
+        """
+
+        OrderedDict.__setitem__(self, release, LazyDataModel(release, aliases, loader))
+
+    def __contains__(self, value):
+        ''' Returns True based on release/aliases, without building lazy datamodels '''
+        if value in self.keys():
+            return True
+
+        return any(value in OrderedDict.__getitem__(self, key).aliases for key in self.keys())
 
     def __repr__(self):
 
-        return repr([xx for xx in self.values()])
+        return repr([OrderedDict.__getitem__(self, key) for key in self.keys()])
 
     def add_datamodel(self, dm):
         """Adds a new datamodel. Uses its release as key."""
@@ -1,12 +1,20 @@
 
+import importlib
+
 from .base import *
 
-from .MPL4 import MPL4
-from .MPL5 import MPL5
-from .MPL6 import MPL6
-from .MPL7 import MPL7
-from .MPL8 import MPL8
 
-# Defines the list of datamodels.
-datamodel = DAPDataModelList([MPL4, MPL5, MPL6, MPL7, MPL8])
+def _get_loader(name):
+    """Returns a function that imports the module of a release and returns its datamodel."""
+
+    return lambda: getattr(importlib.import_module('.' + name, __name__), name)
+
 
+# Defines the list of datamodels. Each datamodel is only built, by importing
+# its module, the first time it is accessed.
+datamodel = DAPDataModelList()
+datamodel.add_lazy_datamodel('1.1.1', ['MPL-4', 'MPL4'], _get_loader('MPL4'))
+datamodel.add_lazy_datamodel('2.0.2', ['MPL-5', 'MPL5'], _get_loader('MPL5'))
+datamodel.add_lazy_datamodel('2.1.3', ['MPL-6', 'MPL6'], _get_loader('MPL6'))
+datamodel.add_lazy_datamodel('2.2.1', ['MPL-7', 'MPL7', 'DR15'], _get_loader('MPL7'))
+datamodel.add_lazy_datamodel('2.3.0', ['MPL-8', 'MPL8'], _get_loader('MPL8'))
@@ -358,6 +358,11 @@ class PropertyList(FuzzyList):
 
         return value.full()
 
+    def aliases(self, value):
+        """The web and database names of the property also match it exactly."""
+
+        return [value.full(web=True), value.full(db=True)]
+
     def append(self, value, copy=True):
         """Appends with copy, and unpacking properties."""
 
@@ -507,6 +512,11 @@ class ModelList(FuzzyList):
 
         return value.full()
 
+    def aliases(self, value):
+        """The FITS extension name of the model also matches it exactly."""
+
+        return [value.fits_extension()]
+
     def append(self, value, copy=True):
         """Appends with copy."""
 
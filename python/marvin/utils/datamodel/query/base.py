@@ -31,9 +31,9 @@ from marvin.utils.general.structs import FuzzyList
 
 
 if config.db:
-    from marvin.utils.datamodel.query.forms import MarvinForm
+    from marvin.utils.datamodel.query.forms import get_marvin_form
 else:
-    MarvinForm = None
+    get_marvin_form = None
 
 
 __ALL__ = ('QueryDataModelList', 'QueryDataModel')
@@ -87,7 +87,7 @@ class QueryDataModel(object):
 
         # get the parameters
         if self._mode == 'local':
-            self._marvinform = MarvinForm(release=self.release)
+            self._marvinform = get_marvin_form(release=self.release)
             self._cleanup_keys()
         elif self._mode == 'remote':
             self._get_from_remote()
@@ -319,11 +319,11 @@ class QueryDataModel(object):
 
     def use_all_spaxels(self):
         ''' Sets the datamodel to use all the spaxels '''
-        self._marvinform = MarvinForm(release=self.release, allspaxels=True)
+        self._marvinform = get_marvin_form(release=self.release, allspaxels=True)
         self._cleanup_keys()
 
     def _reset_marvinform(self):
-        self._marvinform = MarvinForm(release=self.release)
+        self._marvinform = get_marvin_form(release=self.release)
 
     def to_table(self, pprint=False, max_width=1000, only_best=False, db=False):
         ''' Write the datamodel to an Astropy table '''
@@ -453,15 +453,31 @@ class QueryFuzzyList(FuzzyList):
 
     def __getattr__(self, value):
 
-        mapped_values = [super(QueryFuzzyList, self).__getattribute__('mapper')(item)
-                         for item in self]
-        stripped_values = strip_mapped(self)
+        if value.startswith('__'):
+            return super(QueryFuzzyList, self).__getattribute__(value)
+
+        mapped_values = super(QueryFuzzyList, self).__getattribute__('_get_index')()[0]
+        stripped_values = super(QueryFuzzyList, self).__getattribute__('_get_stripped')()
 
         if value in stripped_values:
             return self[mapped_values[stripped_values.index(value)]]
 
         return super(QueryFuzzyList, self).__getattribute__(value)
 
+    def _reset_index(self):
+        super(QueryFuzzyList, self)._reset_index()
+        self.__dict__['_stripped'] = None
+
+    def _get_stripped(self):
+        """Returns the cached output of `strip_mapped`."""
+
+        stripped = self.__dict__.get('_stripped', None)
+        if stripped is None:
+            stripped = strip_mapped(self)
+            self.__dict__['_stripped'] = stripped
+
+        return stripped
+
     def index(self, value):
         param = self == value
         index = [i for i, item in enumerate(self) if item is param]
@@ -502,6 +518,9 @@ class ParameterGroupList(QueryFuzzyList):
     def mapper(self, value):
         return value.name.lower().replace(' ', '_').replace('.', '_')
 
+    def aliases(self, value):
+        return [value.name, value.name.lower()]
+
     def _make_groups(self, items, best=None):
         if isinstance(items, list):
             paramgroups = [ParameterGroup(item, []) for item in items]
@@ -871,7 +890,7 @@ class QueryParameter(object):
         schema, table, column = self._split_full()
         if not schema:
             if self._in_form():
-                schema = self.parent._marvinform._param_form_lookup[self.full].Meta.model.__table__.schema
+                schema = self.parent._marvinform._param_form_lookup.get_model(self.full).__table__.schema
             else:
                 schema = None
         return schema
@@ -890,7 +909,7 @@ class QueryParameter(object):
 
     def is_hybrid(self):
         if self._in_form():
-            model = self.parent._marvinform._param_form_lookup[self.full].Meta.model
+            model = self.parent._marvinform._param_form_lookup.get_model(self.full)
             hybrids = get_hybrid_properties(model).keys()
             return self.db_column in hybrids
         return None
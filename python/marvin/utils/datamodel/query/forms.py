@@ -12,8 +12,12 @@ Revision History:
 
 from __future__ import division, print_function
 
+import hashlib
+import json
+import os
 import re
 import sys
+import tempfile
 import warnings
 from collections import OrderedDict, defaultdict
 from sqlalchemy.ext.hybrid import hybrid_method, hybrid_property
@@ -22,7 +26,8 @@ from sqlalchemy.orm.attributes import InstrumentedAttribute
 from wtforms import Field, SelectMultipleField, StringField, SubmitField, ValidationError, validators
 from wtforms.widgets import TextInput
 from wtforms_alchemy import model_form_factory
-from marvin import config, marvindb
+import marvin
+from marvin import config, log, marvindb
 from marvin.core.exceptions import MarvinUserWarning
 from marvin.utils.general.structs import FuzzyDict
 
@@ -33,7 +38,18 @@ if config._inapp:
 else:
     from wtforms import Form
 
-__all__ = ['MarvinForm']
+__all__ = ['MarvinForm', 'get_marvin_form', 'get_param_lookup']
+
+
+# Default directory where the parameter lookups are stored, if
+# config.forms_cache_dir is not set.
+_lookup_dir = os.path.join(os.path.expanduser('~'), '.marvin', 'cache', 'forms')
+
+# WTForm classes already built, keyed by SQLAlchemy ModelClass.
+_form_classes = {}
+
+# Shared MarvinForms, keyed by (release, allspaxels).
+_marvin_forms = {}
 
 
 def tree():
@@ -90,6 +106,20 @@ def formClassFactory(name, model, baseclass):
     newclass = type(name, (baseclass,), {'Meta': Meta})
     return newclass
 
+
+def get_model_form(model):
+    ''' Returns the WTForm class of a SQLAlchemy Model Class, building it only once
+
+    Raises any exception raised by `formClassFactory` if the Model Class is
+    not formable.
+
+    '''
+
+    if model not in _form_classes:
+        _form_classes[model] = formClassFactory('{0}Form'.format(model.__name__), model, ModelForm)
+
+    return _form_classes[model]
+
 # build a wtform select field for operators; tested but no longer used
 # can't seem to attach operator field to every individual parameter
 opdict = {'le': '<=', 'ge': '>=', 'gt': '>', 'lt': '<', 'ne': '!=', 'eq': '='}
@@ -119,6 +149,13 @@ class ParamFxnLookupDict(dict):
 
 
 class ParamFormLookupDict(dict):
+    ''' Parameter lookup of full parameter names to SQLAlchemy Model Classes
+
+    Keys are full ``schema.table.column`` names. Looking up a (possibly
+    shortcut) name returns the WTForm class of its Model Class, which is
+    only built the first time it is needed.
+
+    '''
 
     def __init__(self, **kwargs):
         self.allspaxels = kwargs.get('allspaxels', None)
@@ -129,17 +166,27 @@ class ParamFormLookupDict(dict):
         ''' Override the contains '''
 
         try:
-            key = self[value]
+            key = self._get_key(value)
         except KeyError as e:
             key = None
 
         return key is not None
 
     def __getitem__(self, key):
-        """Checks if `key` is a unique column name and return the value."""
+        """Checks if `key` is a unique column name and return its WTForm class."""
 
-        # Init the shortcuts
-        self._init_shortcuts()
+        return get_model_form(self.get_model(key))
+
+    def __setitem__(self, key, value):
+        self.__dict__.pop('_column_index', None)
+        super(ParamFormLookupDict, self).__setitem__(key, value)
+
+    def _get_key(self, key):
+        ''' Returns the full key in the lookup matching a (shortcut) key '''
+
+        # Init the shortcuts, if the dictionary was not created with __init__
+        if not hasattr(self, '_nameShortcuts'):
+            self._init_shortcuts()
 
         # Applies shortcuts
         keySplits = self._apply_shortcuts(key)
@@ -151,7 +198,11 @@ class ParamFormLookupDict(dict):
         matches = self._check_for_junk(matches)
 
         # Return matched key
-        return dict.__getitem__(self, self._get_good_match(key, matches))
+        return self._get_good_match(key, matches)
+
+    def get_model(self, key):
+        ''' Returns the SQLAlchemy Model Class of a unique column name '''
+        return dict.__getitem__(self, self._get_key(key))
 
     def _check_for_junk(self, matches):
         ''' check for Junk matches and return the correct key '''
@@ -191,13 +242,9 @@ class ParamFormLookupDict(dict):
 
         columns = []
         for key in keys:
-            keySplits = self._apply_shortcuts(key)
-            matches = self._get_matches(keySplits)
-            matches = self._check_for_junk(matches)
-            key = self._get_good_match(key, matches)
-            wtfForm = self[key]
+            key = self._get_key(key)
             column = key.split('.')[-1]
-            columns.append(getattr(wtfForm.Meta.model, column))
+            columns.append(getattr(dict.__getitem__(self, key), column))
 
         if len(columns) == 1:
             return columns[0]
@@ -311,7 +358,17 @@ class ParamFormLookupDict(dict):
 
     def _get_matches(self, keySplits):
         ''' Get the matches from a set of key splits '''
-        matches = [path for path in self
+
+        # index the full keys by column name, so that only the keys with the
+        # right column name are compared
+        index = self.__dict__.get('_column_index', None)
+        if index is None:
+            index = defaultdict(list)
+            for path in self:
+                index[path.rsplit('.', 1)[-1]].append(path)
+            self._column_index = index
+
+        matches = [path for path in index.get(keySplits[-1], [])
                    if all([keySplits[-1 - ii] == path.split('.')[-1 - ii]
                            for ii in range(len(keySplits))])]
         return matches
@@ -379,13 +436,121 @@ class SearchForm(Form):
     submitsearch = SubmitField('Search')
 
 
+def _get_schema_signature(modelclasses):
+    ''' Returns a description of the tables of the ModelClasses, which changes with the DB schema '''
+
+    signature = []
+    for name, model in modelclasses.items():
+        table = getattr(model, '__table__', None)
+        columns = sorted(table.columns.keys()) if table is not None else []
+        signature.append([name, str(table), columns])
+
+    return sorted(signature)
+
+
+def _build_param_lookup(modelclasses, verbose=False):
+    ''' Builds the lookup of full parameter names to ModelClass names
+
+    Generates the WTForm of each ModelClass, to skip those that are not
+    formable, and loads all the column and hybrid attribute names of its
+    mapper. Ignores hidden attributes, and the pk, sample, test and header
+    parameters.
+
+    '''
+
+    params = {}
+    for name, model in modelclasses.items():
+        try:
+            get_model_form(model)
+        except Exception as e:
+            if verbose:
+                warnings.warn('class {0} not Formable'.format(name), MarvinUserWarning)
+            continue
+
+        schema = model.__table__.schema
+        tablename = model.__table__.name
+
+        mapper = sa_inspect(model)
+        for key, item in mapper.all_orm_descriptors.items():
+            if isinstance(item, (hybrid_property, hybrid_method)):
+                key = key
+            elif isinstance(item, InstrumentedAttribute):
+                key = item.key
+            else:
+                continue
+
+            params[schema + '.' + tablename + '.' + key] = name
+
+    # remove keys for pk, mangadatadb.sample, test_, and cube_header
+    return {k: v for k, v in params.items()
+            if 'pk' not in k and 'mangadatadb.sample' not in k and
+            'test_' not in k and 'cube_header' not in k}
+
+
+def get_param_lookup(release, modelclasses, path=None, verbose=False):
+    ''' Returns the parameter lookup of the ModelClasses of a release
+
+    The lookup maps each full parameter name (``schema.table.column``) to
+    the name of its ModelClass. It is built once and stored as a JSON file,
+    keyed by the Marvin version, the release and the DB schema of the
+    ModelClasses, so that any later process only has to read the file.
+
+    Parameters:
+        release (str):
+            The release of the ModelClasses.
+        modelclasses (dict):
+            A dictionary of ModelClass name to SQLAlchemy ModelClass.
+        path (str):
+            The directory where the lookups are stored. Defaults to
+            ``config.forms_cache_dir`` or, if not set, ``~/.marvin/cache/forms``.
+        verbose (bool):
+            If True, warns about the ModelClasses that are not formable.
+
+    Returns:
+        A dictionary with the release and the ``params`` lookup.
+
+    '''
+
+    path = path or config.forms_cache_dir or _lookup_dir
+
+    signature = {'version': marvin.__version__, 'release': release,
+                 'schema': _get_schema_signature(modelclasses)}
+    name = hashlib.sha256(json.dumps(signature, sort_keys=True).encode('utf-8')).hexdigest()
+    filepath = os.path.join(path, 'params_{0}.json'.format(name))
+
+    try:
+        with open(filepath) as fileobj:
+            return json.load(fileobj)
+    except (IOError, OSError, ValueError):
+        pass
+
+    lookup = {'release': release, 'params': _build_param_lookup(modelclasses, verbose=verbose)}
+
+    try:
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        # Writes to a temporary file and then moves it in place so that
+        # other processes never read a partial file.
+        fd, tmppath = tempfile.mkstemp(suffix='.tmp', dir=path)
+        with os.fdopen(fd, 'w') as fileobj:
+            json.dump(lookup, fileobj)
+        os.rename(tmppath, filepath)
+    except (IOError, OSError) as ee:
+        log.debug('failed writing parameter lookup file {0}: {1}'.format(filepath, ee))
+
+    return lookup
+
+
 class MarvinForm(object):
     ''' Core Marvin Form object. '''
 
     def __init__(self, *args, **kwargs):
         ''' Initializes a Marvin Form
 
-        Generates all the WTForms from the SQLAlchemy ModelClasses defined in the MaNGA DB.
+        Loads the parameters of all the SQLAlchemy ModelClasses defined in the MaNGA DB from
+        the lookup returned by `get_param_lookup`. The WTForm of a ModelClass, e.g.
+        ``MarvinForm.IFUDesignForm``, is only generated when it is first used.
 
         _param_form_lookup = dictionary of all modelclass parameters
         of form {'SQLalchemy ModelClass parameter name': WTForm Class}
@@ -398,57 +563,38 @@ class MarvinForm(object):
             self._param_form_lookup = ParamFormLookupDict(**kwargs)
             self._param_fxn_lookup = ParamFxnLookupDict()
             self._paramtree = tree()
-            self._generateFormClasses(self._modelclasses)
+            self._loadParams(get_param_lookup(self._release, self._modelclasses,
+                                              verbose=self.verbose))
             self._generateFxns()
             self.SearchForm = SearchForm
-            self._cleanParams(**kwargs)
 
     def __repr__(self):
-        nforms = len([f for f in self.__dict__.keys() if 'Form' in f])
+        nforms = len(set(dict.values(self._param_form_lookup)))
         return ('<MarvinForm (release={0._release}, n_parameters={1}, n_functions={2}, '
                 'n_forms={3})>'.format(self, len(self._param_form_lookup), len(self._param_fxn_lookup), nforms))
 
-    def _generateFormClasses(self, classes):
-        ''' Loops over all ModelClasses and generates a new WTForm class.  New form classes are named as [ModelClassName]Form.
-            Sets the new form as an attribute on MarvinForm.  Also populates the _param_to_form_lookup dictonary with
-            all ModelClass/WTForm parameters and their corresponding forms.
+    def __getattr__(self, name):
+        ''' Returns the WTForm of a ModelClass, e.g. ``IFUDesignForm``, generating it if needed '''
 
-            e.g.  _param_form_lookup['name'] = marvin.tools.query.forms.IFUDesignForm
-        '''
+        model = None
+        if name.endswith('Form') and not name.startswith('_') and '_modelclasses' in self.__dict__:
+            model = dict.get(self._modelclasses, name[:-len('Form')], None)
 
-        for key, val in classes.items():
-            classname = '{0}Form'.format(key)
-            try:
-                newclass = formClassFactory(classname, val, ModelForm)
-            except Exception as e:
-                if self.verbose:
-                    warnings.warn('class {0} not Formable'.format(key), MarvinUserWarning)
-            else:
-                self.__setattr__(classname, newclass)
-                self._loadParams(newclass)
+        if model is None:
+            raise AttributeError('{0!r} object has no attribute {1!r}'.format(
+                self.__class__.__name__, name))
 
-    def _loadParams(self, newclass):
-        ''' Loads all parameters from wtforms into a dictionary with
-            key, value = {'parameter_name': 'parent WTForm name'}.
-            Ignores hidden attributes and the Meta class
-        '''
+        return get_model_form(model)
 
-        model = newclass.Meta.model
-        schema = model.__table__.schema
-        tablename = model.__table__.name
-
-        mapper = sa_inspect(model)
-        for key, item in mapper.all_orm_descriptors.items():
-            if isinstance(item, (hybrid_property, hybrid_method)):
-                key = key
-            elif isinstance(item, InstrumentedAttribute):
-                key = item.key
-            else:
-                continue
+    def _loadParams(self, lookup):
+        ''' Loads all parameters from a parameter lookup into a dictionary with
+            key, value = {'parameter_name': 'SQLalchemy ModelClass'}.
+        '''
 
-            lookupKeyName = schema + '.' + tablename + '.' + key
-            self._param_form_lookup[lookupKeyName] = newclass
-            self._paramtree[newclass.Meta.model.__name__][key]
+        for key, name in lookup['params'].items():
+            model = dict.__getitem__(self._modelclasses, name)
+            self._param_form_lookup[key] = model
+            self._paramtree[model.__name__][key.split('.')[-1]]
 
     def callInstance(self, form, params=None, **kwargs):
         ''' Creates an instance of a specified WTForm.  '''
@@ -473,21 +619,6 @@ class MarvinForm(object):
         dapkeys.sort()
         return dapkeys
 
-    def _cleanParams(self, **kwargs):
-        ''' Clean up the parameter-form lookup dictionary '''
-
-        # remove keys for pk, mangadatadb.sample, test_, and cube_header
-        new = ParamFormLookupDict(**kwargs)
-        for k, v in self._param_form_lookup.items():
-            if 'pk' not in k and \
-               'mangadatadb.sample' not in k and \
-               'test_' not in k and \
-               'cube_header' not in k:
-                new[k] = v
-
-        # make new dictionary
-        self._param_form_lookup = new
-
     def look_up_table(self, table):
         ''' Look up a database table and return the ModelClass '''
 
@@ -497,3 +628,24 @@ class MarvinForm(object):
             table_class = None
 
         return table_class
+
+
+def get_marvin_form(release=None, allspaxels=False):
+    ''' Returns a MarvinForm shared by all the callers in this session
+
+    Parameters:
+        release (str):
+            The release of the MarvinForm. Defaults to the current release.
+        allspaxels (bool):
+            If True, spaxelprop parameters point to the tables with all the
+            spaxels rather than the clean ones.
+
+    '''
+
+    release = release or config.release
+    key = (release, bool(allspaxels))
+
+    if key not in _marvin_forms:
+        _marvin_forms[key] = MarvinForm(release=release, allspaxels=allspaxels)
+
+    return _marvin_forms[key]
@@ -0,0 +1,584 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under a 3-clause BSD license.
+#
+# @Filename: catalogue_index.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from astropy import table
+from astropy.io import fits
+from scipy.spatial import cKDTree
+
+from marvin import log
+
+
+__all__ = ('CatalogueIndex', 'get_catalogue_index', 'get_fits_colnames', 'get_catalogue_column',
+           'SkyIndex', 'get_sky_index', 'angular_separation')
+
+
+# Increase when the layout of the sidecar files changes, to force a rebuild.
+_index_version = 1
+
+# Separator between the values of compound keys.
+_key_separator = '|'
+
+# Indices already loaded in this session, keyed by (path, hdu).
+_indices = {}
+
+# Column names of the catalogues, keyed by (path, hdu, mtime).
+_colnames = {}
+
+# Catalogue columns already loaded in this session, keyed by (path, hdu, name, mtime).
+_data_columns = {}
+
+# Sky indices already built in this session, keyed by (path, hdu, ra, dec, mtime).
+_sky_indices = {}
+
+
+def _as_strings(values):
+    ''' Returns an array of stripped unicode strings '''
+
+    values = np.asarray(values)
+    if values.dtype.kind == 'S':
+        values = np.char.decode(values, 'ascii')
+
+    return np.char.strip(values.astype(np.str_))
+
+
+class CatalogueIndex(object):
+    ''' A sorted, memory-mapped index over the rows of a FITS catalogue
+
+    For each key, the index stores the stripped key values sorted, and the
+    row numbers that sort them, so that lookups are binary searches
+    instead of scans of the whole table. A few small columns can also be
+    stored in the index so that they can be read without opening the
+    catalogue at all.
+
+    The index is saved as ``.npy`` files in a sidecar directory next to the
+    catalogue (``<catalogue>.idx``) and memory-mapped when loaded, so it is
+    only built once and shared between processes. It is rebuilt if the
+    catalogue changes. If the sidecar directory cannot be written, the
+    index is kept in memory for the session.
+
+    Parameters:
+        path (str):
+            The path to the FITS catalogue.
+        hdu (str or int):
+            The HDU containing the table to index.
+        keys (dict):
+            A mapping of key name to the list of columns that form the key.
+            Compound keys are formed by joining the stripped values of the
+            columns with ``'|'``.
+        columns (list):
+            The names of the columns to store in the index.
+
+    Example:
+        >>> index = CatalogueIndex('drpall-v2_4_3.fits', hdu=1,
+        >>>                        keys={'mangaid': ['mangaid']}, columns=['plateifu'])
+        >>> rows = index.lookup('mangaid', '1-209232')
+        >>> index.column('plateifu')[rows]
+        array(['8485-1901'], dtype='<U11')
+
+    '''
+
+    def __init__(self, path, hdu=1, keys=None, columns=None):
+
+        self.path = os.path.realpath(path)
+        self.hdu = hdu
+        self.keys = keys or {}
+        self.columns = columns or []
+
+        self._keys = {}
+        self._rows = {}
+        self._columns = {}
+
+        self._hdulist = None
+        self._mtime = None
+
+        self.load()
+
+    def __repr__(self):
+        return '<CatalogueIndex (path={0!r}, hdu={1!r}, keys={2})>'.format(
+            self.path, self.hdu, sorted(self.keys))
+
+    @property
+    def sidecar(self):
+        ''' The directory in which the index files are stored '''
+        return self.path + '.idx'
+
+    def _get_filename(self, kind, name):
+        return os.path.join(self.sidecar,
+                            '{0}_{1}_{2}.npy'.format(str(self.hdu).lower(), kind, name.lower()))
+
+    def _get_meta(self):
+        ''' Returns the metadata that identifies the catalogue and the index layout '''
+
+        stat = os.stat(self.path)
+
+        return {'version': _index_version, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                'hdu': str(self.hdu), 'keys': self.keys, 'columns': self.columns}
+
+    def _get_meta_filename(self):
+        return os.path.join(self.sidecar, '{0}_meta.json'.format(str(self.hdu).lower()))
+
+    def load(self):
+        ''' Loads the index from the sidecar directory, building it if needed '''
+
+        meta_filename = self._get_meta_filename()
+        self._mtime = os.stat(self.path).st_mtime
+
+        if os.path.exists(meta_filename):
+            try:
+                with open(meta_filename) as fileobj:
+                    meta = json.load(fileobj)
+                if meta == json.loads(json.dumps(self._get_meta())):
+                    self._load_files()
+                    return
+            except (IOError, OSError, ValueError) as ee:
+                log.debug('cannot load catalogue index {0}: {1}'.format(meta_filename, ee))
+
+        self.build()
+
+    def _load_files(self):
+
+        for name in self.keys:
+            self._keys[name] = np.load(self._get_filename('keys', name), mmap_mode='r')
+            self._rows[name] = np.load(self._get_filename('rows', name), mmap_mode='r')
+
+        for name in self.columns:
+            self._columns[name] = np.load(self._get_filename('column', name), mmap_mode='r')
+
+    def build(self):
+        ''' Builds the index from the catalogue and saves it in the sidecar directory '''
+
+        with fits.open(self.path, memmap=True) as hdulist:
+            data = hdulist[self.hdu].data
+
+            for name, key_columns in self.keys.items():
+                values = _as_strings(data.field(key_columns[0]))
+                for column in key_columns[1:]:
+                    values = np.char.add(np.char.add(values, _key_separator),
+                                         _as_strings(data.field(column)))
+
+                order = np.argsort(values, kind='mergesort')
+                self._keys[name] = values[order]
+                self._rows[name] = order.astype(np.int64)
+
+            for name in self.columns:
+                values = np.array(data.field(name))
+                if values.dtype.kind in ['S', 'U']:
+                    values = _as_strings(values)
+                self._columns[name] = values
+
+        self._save()
+
+    def _save(self):
+        ''' Saves the index files, silently keeping it in memory if that fails '''
+
+        tmpdir = None
+
+        try:
+            if not os.path.exists(self.sidecar):
+                os.makedirs(self.sidecar)
+
+            tmpdir = tempfile.mkdtemp(dir=self.sidecar)
+
+            files = [('keys', name, self._keys[name]) for name in self.keys]
+            files += [('rows', name, self._rows[name]) for name in self.keys]
+            files += [('column', name, self._columns[name]) for name in self.columns]
+
+            for kind, name, array in files:
+                filename = self._get_filename(kind, name)
+                tmpname = os.path.join(tmpdir, os.path.basename(filename))
+                np.save(tmpname, array)
+                os.rename(tmpname, filename)
+
+            # The metadata is written last, so that an index is never used
+            # before all its files are in place.
+            tmpname = os.path.join(tmpdir, 'meta.json')
+            with open(tmpname, 'w') as fileobj:
+                json.dump(self._get_meta(), fileobj)
+            os.rename(tmpname, self._get_meta_filename())
+
+        except (IOError, OSError) as ee:
+            log.debug('cannot save catalogue index for {0}: {1}'.format(self.path, ee))
+            return
+
+        finally:
+            if tmpdir is not None:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+
+        self._load_files()
+
+    def _make_key(self, value):
+        ''' Converts a value or a tuple of values into a key string '''
+
+        if isinstance(value, (list, tuple)):
+            return _key_separator.join(str(vv).strip() for vv in value)
+
+        return str(value).strip()
+
+    def lookup(self, name, value):
+        ''' Returns the sorted row numbers matching a value of a key
+
+        Parameters:
+            name (str):
+                The name of the key.
+            value (str or tuple):
+                The value to look for. For compound keys, a tuple with the
+                value of each column.
+
+        Returns:
+            An array with the row numbers matching ``value``. The array is
+            empty if there are no matches.
+
+        '''
+
+        keys = self._keys[name]
+        key = self._make_key(value)
+
+        start = np.searchsorted(keys, key, side='left')
+        end = np.searchsorted(keys, key, side='right')
+
+        return np.sort(self._rows[name][start:end])
+
+    def lookup_many(self, name, values):
+        ''' Returns the row numbers for a list of values, using a single vectorised search
+
+        Returns a list with one array of row numbers per input value.
+
+        '''
+
+        keys = self._keys[name]
+        search = np.array([self._make_key(value) for value in values], dtype=np.str_)
+
+        starts = np.searchsorted(keys, search, side='left')
+        ends = np.searchsorted(keys, search, side='right')
+
+        return [np.sort(self._rows[name][start:end]) for start, end in zip(starts, ends)]
+
+    def lookup_first(self, name, values):
+        ''' Returns the first row number matching each value, or -1 if there is none
+
+        Unlike `lookup_many`, returns a single array, so whole columns can be
+        matched against the index, e.g., to join two catalogues.
+
+        '''
+
+        keys = self._keys[name]
+
+        if isinstance(values, np.ndarray) and values.dtype.kind in ['S', 'U']:
+            search = _as_strings(values)
+        else:
+            search = np.array([self._make_key(value) for value in values], dtype=np.str_)
+
+        rows = np.full(len(search), -1, dtype=np.int64)
+        if len(keys) == 0:
+            return rows
+
+        # The keys are sorted with a stable sort, so the leftmost match is the first row.
+        starts = np.searchsorted(keys, search, side='left')
+        found = starts < len(keys)
+        found[found] = keys[starts[found]] == search[found]
+        rows[found] = self._rows[name][starts[found]]
+
+        return rows
+
+    def column(self, name):
+        ''' Returns a column stored in the index '''
+        return self._columns[name]
+
+    def close(self):
+        ''' Closes the catalogue, if it was opened to read rows or headers '''
+
+        if self._hdulist is not None:
+            self._hdulist.close()
+            self._hdulist = None
+
+    def _get_hdulist(self):
+
+        if self._hdulist is None:
+            self._hdulist = fits.open(self.path, memmap=True)
+
+        return self._hdulist
+
+    def header(self, hdu=0):
+        ''' Returns a header of the catalogue '''
+        return self._get_hdulist()[hdu].header
+
+    def read_rows(self, rows, as_table=False):
+        ''' Reads some rows from the catalogue
+
+        The catalogue is memory-mapped, so only the requested rows are read.
+
+        Parameters:
+            rows (list):
+                The row numbers to read.
+            as_table (bool):
+                If True, returns an `~astropy.table.Table`. Otherwise returns
+                a ``FITS_rec``.
+
+        '''
+
+        data = self._get_hdulist()[self.hdu].data[np.asarray(rows, dtype=int)]
+
+        return table.Table(data) if as_table else data
+
+
+def get_catalogue_index(path, hdu=1, keys=None, columns=None):
+    ''' Returns the `CatalogueIndex` for a catalogue, loading it only once per session
+
+    See `CatalogueIndex` for a description of the parameters.
+
+    '''
+
+    index_key = (os.path.realpath(path), str(hdu))
+
+    index = _indices.get(index_key, None)
+
+    if (index is None or index.keys != (keys or {}) or index.columns != (columns or []) or
+            index._mtime != os.stat(index.path).st_mtime):
+        if index is not None:
+            index.close()
+        index = CatalogueIndex(path, hdu=hdu, keys=keys, columns=columns)
+        _indices[index_key] = index
+
+    return index
+
+
+def get_fits_colnames(path, hdu=1):
+    ''' Returns the column names of a FITS table, reading only its header
+
+    The names are cached for the session until the file changes.
+
+    '''
+
+    path = os.path.realpath(path)
+    key = (path, str(hdu), os.stat(path).st_mtime)
+
+    if key not in _colnames:
+        with fits.open(path, memmap=True) as hdulist:
+            _colnames[key] = list(hdulist[hdu].columns.names)
+
+    return _colnames[key]
+
+
+def _save_column(filename, values):
+    ''' Saves a column as a .npy file and returns it memory-mapped, or in memory if that fails '''
+
+    dirname = os.path.dirname(filename)
+
+    try:
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        fd, tmpname = tempfile.mkstemp(suffix='.npy', dir=dirname)
+        try:
+            with os.fdopen(fd, 'wb') as fileobj:
+                np.save(fileobj, values)
+            os.rename(tmpname, filename)
+        finally:
+            if os.path.exists(tmpname):
+                os.remove(tmpname)
+    except (IOError, OSError) as ee:
+        log.debug('cannot save catalogue column {0}: {1}'.format(filename, ee))
+        return values
+
+    return np.load(filename, mmap_mode='r')
+
+
+def get_catalogue_column(path, name, hdu=1):
+    ''' Returns a column of a FITS catalogue as a memory-mapped array
+
+    The first time a column is needed it is read from the catalogue and
+    saved as a ``.npy`` file in the sidecar directory of the catalogue (see
+    `CatalogueIndex`), so that later reads, in this or any other process,
+    only map that column instead of the rows of the whole table. The file
+    is rewritten if the catalogue changes. String columns are stored
+    stripped, as unicode.
+
+    Parameters:
+        path (str):
+            The path to the FITS catalogue.
+        name (str):
+            The name of the column. Matched case-insensitively.
+        hdu (str or int):
+            The HDU containing the table.
+
+    '''
+
+    path = os.path.realpath(path)
+    mtime = os.stat(path).st_mtime
+    key = (path, str(hdu), name.lower(), mtime)
+
+    if key in _data_columns:
+        return _data_columns[key]
+
+    filename = os.path.join(path + '.idx', '{0}_data_{1}.npy'.format(str(hdu).lower(), name.lower()))
+
+    column = None
+    if os.path.exists(filename) and os.stat(filename).st_mtime >= mtime:
+        try:
+            column = np.load(filename, mmap_mode='r')
+        except (IOError, OSError, ValueError) as ee:
+            log.debug('cannot load catalogue column {0}: {1}'.format(filename, ee))
+
+    if column is None:
+        with fits.open(path, memmap=True) as hdulist:
+            values = np.array(hdulist[hdu].data.field(name))
+        if values.dtype.kind in ['S', 'U']:
+            values = _as_strings(values)
+        column = _save_column(filename, values)
+
+    _data_columns[key] = column
+
+    return column
+
+
+def angular_separation(ra1, dec1, ra2, dec2):
+    ''' Returns the angular separation in degrees between positions, using the haversine formula '''
+
+    ra1, dec1, ra2, dec2 = [np.radians(np.asarray(xx, dtype=float)) for xx in (ra1, dec1, ra2, dec2)]
+
+    sindec = np.sin((dec2 - dec1) / 2.)
+    sinra = np.sin((ra2 - ra1) / 2.)
+    hav = sindec ** 2 + np.cos(dec1) * np.cos(dec2) * sinra ** 2
+
+    return np.degrees(2 * np.arcsin(np.sqrt(np.clip(hav, 0, 1))))
+
+
+def _radec_to_xyz(ra, dec):
+    ''' Converts RA and Dec in degrees into unit vectors '''
+
+    ra = np.radians(np.asarray(ra, dtype=float))
+    dec = np.radians(np.asarray(dec, dtype=float))
+
+    return np.column_stack([np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)])
+
+
+class SkyIndex(object):
+    ''' A spatial index of the positions of a catalogue, for cone searches and cross-matches
+
+    The positions are stored as unit vectors in a k-d tree, so a cone
+    search only visits the branches of the tree near its centre instead of
+    computing the distance to every row. The rows within the chord
+    subtended by the radius, slightly padded, are selected from the tree
+    and then checked with the exact angular separation. Rows without a
+    finite position are never matched.
+
+    Parameters:
+        ra,dec (array):
+            The RA and Dec of each row of the catalogue, in degrees.
+
+    Example:
+        >>> index = SkyIndex(drpall['objra'], drpall['objdec'])
+        >>> index.query(232.5447, 48.6902, 0.1)
+        array([4211])
+        >>> index.query_many([(232.5447, 48.6902), (230.5, 43.5)], 0.1)
+        [array([4211]), array([], dtype=int64)]
+
+    '''
+
+    def __init__(self, ra, dec):
+
+        ra = np.asarray(ra, dtype=float)
+        dec = np.asarray(dec, dtype=float)
+
+        self.nrows = len(ra)
+
+        finite = np.isfinite(ra) & np.isfinite(dec)
+        self._rows = np.nonzero(finite)[0]
+        self._ra = ra[finite]
+        self._dec = dec[finite]
+
+        self._tree = cKDTree(_radec_to_xyz(self._ra, self._dec))
+
+    def __repr__(self):
+        return '<SkyIndex (nrows={0})>'.format(self.nrows)
+
+    def query(self, ra, dec, radius):
+        ''' Returns the sorted row numbers within ``radius`` degrees of a position '''
+        return self.query_many([(ra, dec)], radius)[0]
+
+    def query_many(self, coords, radius):
+        ''' Returns the row numbers within ``radius`` degrees of each of a list of positions
+
+        Parameters:
+            coords (array):
+                A list or ``(N, 2)`` array of RA and Dec pairs, in degrees.
+            radius (float):
+                The radius of the cones, in degrees.
+
+        Returns:
+            A list with a sorted array of row numbers for each position.
+
+        '''
+
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        if len(coords) == 0:
+            return []
+
+        # the chord subtending the radius, padded so that no row is lost to rounding
+        chord = 2 * np.sin(np.radians(min(radius, 180.)) / 2.) * (1 + 1e-8) + 1e-12
+        candidates = self._tree.query_ball_point(_radec_to_xyz(coords[:, 0], coords[:, 1]), chord)
+
+        lengths = np.array([len(cc) for cc in candidates], dtype=np.int64)
+        flat = np.concatenate([np.asarray(cc, dtype=np.int64) for cc in candidates])
+        centres = np.repeat(np.arange(len(coords)), lengths)
+
+        # exact check of the candidates
+        separation = angular_separation(self._ra[flat], self._dec[flat],
+                                        coords[centres, 0], coords[centres, 1])
+        good = separation <= radius
+
+        splits = np.cumsum(lengths)[:-1]
+        rows = np.split(self._rows[flat], splits)
+        good = np.split(good, splits)
+
+        return [np.sort(rr[gg]) for rr, gg in zip(rows, good)]
+
+    def match_mask(self, coords, radius):
+        ''' Returns a boolean mask of the rows within ``radius`` degrees of any of the positions '''
+
+        mask = np.zeros(self.nrows, dtype=bool)
+
+        matches = self.query_many(coords, radius)
+        if matches:
+            mask[np.concatenate(matches)] = True
+
+        return mask
+
+
+def get_sky_index(path, hdu=1, ra='ra', dec='dec'):
+    ''' Returns the `SkyIndex` of the positions of a FITS catalogue, building it once per session
+
+    The RA and Dec columns are read with `get_catalogue_column`, so they are
+    memory-mapped from the sidecar directory of the catalogue.
+
+    Parameters:
+        path (str):
+            The path to the FITS catalogue.
+        hdu (str or int):
+            The HDU containing the table.
+        ra,dec (str):
+            The names of the RA and Dec columns, in degrees.
+
+    '''
+
+    path = os.path.realpath(path)
+    key = (path, str(hdu), ra.lower(), dec.lower(), os.stat(path).st_mtime)
+
+    if key not in _sky_indices:
+        _sky_indices[key] = SkyIndex(get_catalogue_column(path, ra, hdu=hdu),
+                                     get_catalogue_column(path, dec, hdu=hdu))
+
+    return _sky_indices[key]
@@ -14,10 +14,13 @@ from __future__ import absolute_import, division, print_function
 
 import collections
 import contextlib
+import gzip
 import inspect
 import os
 import re
+import shutil
 import sys
+import tempfile
 import warnings
 from builtins import range
 from collections import OrderedDict
@@ -48,6 +51,12 @@ try:
 except ImportError:
     Path = None
 
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
 try:
     import pympler.summary
     import pympler.muppy
@@ -60,13 +69,15 @@ except ImportError:
 # General utilities
 __all__ = ('convertCoords', 'parseIdentifier', 'mangaid2plateifu', 'findClosestVector',
            'getWCSFromPng', 'convertImgCoords', 'getSpaxelXY',
-           'downloadList', 'getSpaxel', 'get_drpall_row', 'getDefaultMapPath',
+           'downloadList', 'getSpaxel', 'get_drpall_row', 'get_drpall_index', 'getDefaultMapPath',
            'getDapRedux', 'get_nsa_data', '_check_file_parameters',
            'invalidArgs', 'missingArgs', 'getRequiredArgs', 'getKeywordArgs',
            'isCallableWithArgs', 'map_bins_to_column', '_sort_dir',
            'get_dapall_file', 'temp_setattr', 'map_dapall', 'turn_off_ion', 'memory_usage',
            'validate_jwt', 'target_status', 'target_is_observed', 'get_drpall_file',
-           'target_is_mastar', 'get_plates', 'get_manga_image', 'check_versions')
+           'target_is_mastar', 'get_plates', 'get_manga_image', 'check_versions',
+           'pack_array', 'unpack_array', 'rows_to_arrow', 'pack_table', 'unpack_table',
+           'open_fits', 'get_fits_section')
 
 drpTable = {}
 
@@ -200,11 +211,19 @@ def getSpaxel(cube=True, maps=True, modelcube=True,
     iCube, jCube = zip(convertCoords(coords, wcs=ww, shape=cube_shape,
                                      mode=inputMode, xyorig=xyorig).T)
 
+    # Spaxels are created lazily and then loaded in bulk, so that the
+    # quantities for all of them are retrieved at once.
+    lazy = kwargs.pop('lazy', False)
+
     _spaxels = []
     for ii in range(len(iCube[0])):
         _spaxels.append(
             marvin.tools.spaxel.Spaxel(jCube[0][ii], iCube[0][ii],
-                                       cube=cube, maps=maps, modelcube=modelcube, **kwargs))
+                                       cube=cube, maps=maps, modelcube=modelcube,
+                                       lazy=True, **kwargs))
+
+    if not lazy:
+        marvin.tools.spaxel.Spaxel._load_many(_spaxels)
 
     if len(_spaxels) == 1 and isScalar:
         return _spaxels[0]
@@ -342,24 +361,22 @@ def mangaid2plateifu(mangaid, mode='auto', drpall=None, drpver=None):
 
     if mode == 'drpall':
 
-        # Get the drpall table from cache or fresh
-        drpall_table = get_drpall_table(drpver=drpver, drpall=drpall)
-
-        mangaids = np.array([mm.strip() for mm in drpall_table['mangaid']])
+        # Get the drpall index from cache or fresh
+        drpall_index = get_drpall_index(drpver=drpver, drpall=drpall)
 
-        plateifus = drpall_table[np.where(mangaids == mangaid)]
+        rows = drpall_index.lookup('mangaid', mangaid)
 
-        if len(plateifus) > 1:
+        if len(rows) > 1:
             warnings.warn('more than one plate-ifu found for mangaid={0}. '
                           'Using the one with the highest SN2.'.format(mangaid),
                           MarvinUserWarning)
-            plateifus = plateifus[
-                [np.argmax(plateifus['bluesn2'] + plateifus['redsn2'])]]
+            sn2 = drpall_index.column('bluesn2')[rows] + drpall_index.column('redsn2')[rows]
+            rows = rows[[np.argmax(sn2)]]
 
-        if len(plateifus) == 0:
+        if len(rows) == 0:
             raise ValueError('no plate-ifus found for mangaid={0}'.format(mangaid))
 
-        return plateifus['plateifu'][0]
+        return str(drpall_index.column('plateifu')[rows[0]])
 
     elif mode == 'db':
 
@@ -943,18 +960,18 @@ def get_drpall_file(drpall=None, drpver=None):
 def get_drpall_row(plateifu, drpver=None, drpall=None):
     """Returns a dictionary from drpall matching the plateifu."""
 
-    # get the drpall table
-    drpall_table = get_drpall_table(drpver=drpver, drpall=drpall, hdu='MANGA')
-    in_table = plateifu in drpall_table['plateifu']
+    # get the drpall index
+    drpall_index = get_drpall_index(drpver=drpver, drpall=drpall, hdu='MANGA')
+    rows = drpall_index.lookup('plateifu', plateifu)
     # check the mastar extension
-    if not in_table:
-        drpall_table = get_drpall_table(drpver=drpver, drpall=drpall, hdu='MASTAR')
-        in_table = plateifu in drpall_table['plateifu']
-        if not in_table:
+    if len(rows) == 0:
+        drpall_index = get_drpall_index(drpver=drpver, drpall=drpall, hdu='MASTAR')
+        rows = drpall_index.lookup('plateifu', plateifu)
+        if len(rows) == 0:
             raise ValueError('No results found for {0} in drpall table'.format(plateifu))
 
-    row = drpall_table[drpall_table['plateifu'] == plateifu]
-        
+    row = drpall_index.read_rows(rows[:1], as_table=True)
+
     return row[0]
 
 
@@ -1070,6 +1087,19 @@ def get_nsa_data(mangaid, source='nsa', mode='auto', drpver=None, drpall=None):
             plateifu = mangaid2plateifu(mangaid, drpver=drpver, drpall=drpall, mode='drpall')
             log.debug('get_nsa_data: found plateifu=%r for mangaid=%r', plateifu, mangaid)
 
+            # Reads the NSA columns stored in the drpall index.
+            drpall_index = get_drpall_index(drpver=drpver, drpall=drpall, hdu='MANGA')
+            rows = drpall_index.lookup('plateifu', plateifu)
+
+            if len(rows) > 0:
+                nsa_data = collections.OrderedDict()
+                for col in drpall_index.columns:
+                    if col.startswith('nsa_'):
+                        value = drpall_index.column(col)[rows[0]]
+                        nsa_data[col[4:]] = value.tolist() if isinstance(value, np.ndarray) \
+                            else value.item()
+                return DotableCaseInsensitive(nsa_data)
+
             drpall_row = get_drpall_row(plateifu, drpall=drpall, drpver=drpver)
 
             nsa_data = collections.OrderedDict()
@@ -1714,6 +1744,51 @@ def get_drpall_table(drpver=None, drpall=None, hdu='MANGA'):
     return drpall_table
 
 
+def get_drpall_index(drpver=None, drpall=None, hdu='MANGA'):
+    ''' Gets the index of the drpall table
+
+    Returns a :class:`~marvin.utils.general.catalogue_index.CatalogueIndex`
+    over the ``plateifu`` and ``mangaid`` columns of the drpall file, which
+    also stores the ``plateifu``, ``bluesn2``, and ``redsn2`` columns, and
+    all the ``nsa_`` columns. The index is built the first time it is needed and saved next to the drpall
+    file, so that lookups do not need to read the full table.
+
+    Parameters:
+        drpver (str):
+            The DRP release version to load.  Defaults to current marvin release
+        drpall (str):
+            The full path to the drpall table. Defaults to current marvin release.
+        hdu (str):
+            The name of the HDU to index.  Default is 'MANGA'
+
+    Returns:
+        A :class:`~marvin.utils.general.catalogue_index.CatalogueIndex`
+    '''
+
+    from marvin import config
+    from marvin.utils.general.catalogue_index import get_catalogue_index, get_fits_colnames
+
+    assert hdu.lower() in ['manga', 'mastar'], 'hdu can either be MANGA or MASTAR'
+    hdu = hdu.upper()
+
+    # get the drpall file
+    get_drpall_file(drpall=drpall, drpver=drpver)
+
+    config_drpver, __ = config.lookUpVersions()
+    drpver = drpver if drpver else config_drpver
+    drpall = drpall if drpall else config._getDrpAllPath(drpver=drpver)
+
+    # MPLs 1-7 only have one data extension
+    hduext = hdu if check_versions(drpver, 'v2_5_3') else 'MANGA'
+
+    nsa_columns = [col for col in get_fits_colnames(drpall, hdu=hduext)
+                   if col.lower().startswith('nsa_')]
+
+    return get_catalogue_index(drpall, hdu=hduext,
+                               keys={'plateifu': ['plateifu'], 'mangaid': ['mangaid']},
+                               columns=['plateifu', 'bluesn2', 'redsn2'] + nsa_columns)
+
+
 def get_plates(drpver=None, drpall=None, release=None):
     ''' Get a list of unique plates from the drpall file
 
@@ -1798,3 +1873,215 @@ def get_manga_image(cube=None, drpver=None, plate=None, ifu=None, dir3d=None):
         img = path.url('mangaimage', drpver=drpver, plate=plate, ifu=ifu, dir3d=dir3d)
     return img
     
+
+
+def pack_array(array, compression=None):
+    ''' Packs a numpy array for transport through the Marvin API
+
+    When ``compression`` is ``'msgpack'``, the array is packed as a binary
+    frame, i.e., a dictionary with the dtype string, the shape, and the raw
+    data buffer, which the client can decode without any parsing using
+    :func:`unpack_array`. For ``'json'`` compression, the array is converted
+    to nested lists.
+
+    Parameters:
+        array (`~numpy.ndarray`):
+            The array to pack. Can be None.
+        compression (str):
+            The compression type of the response, either ``'json'`` or
+            ``'msgpack'``. Defaults to ``marvin.config.compression``.
+
+    Returns:
+        A dictionary with keys ``dtype``, ``shape``, and ``buffer`` if the
+        array is packed as a binary frame, or a list otherwise.
+
+    '''
+
+    if array is None:
+        return None
+
+    compression = compression or marvin.config.compression
+    array = np.asarray(array)
+
+    if compression != 'msgpack':
+        return array.tolist()
+
+    # The dtype string preserves the byte order so that no swapping is needed
+    # on either end (FITS data are big-endian).
+    array = np.ascontiguousarray(array)
+    return {'dtype': array.dtype.str, 'shape': list(array.shape), 'buffer': array.tobytes()}
+
+
+def unpack_array(data):
+    ''' Unpacks an array received from the Marvin API
+
+    Decodes either a binary frame as produced by :func:`pack_array` or a
+    JSON nested list into a numpy array. Binary frames are decoded with
+    `numpy.frombuffer` into a writeable array owning a single copy of the
+    buffer.
+
+    Parameters:
+        data (dict or list):
+            The packed array. Can be None.
+
+    Returns:
+        A `~numpy.ndarray` or None.
+
+    '''
+
+    if data is None:
+        return None
+
+    if isinstance(data, np.ndarray):
+        return data
+
+    if isinstance(data, dict) and 'buffer' in data:
+        array = np.frombuffer(bytearray(data['buffer']), dtype=np.dtype(data['dtype']))
+        return array.reshape(data['shape'])
+
+    return np.array(data)
+
+
+def _check_pyarrow():
+    if pyarrow is None:
+        raise ImportError('this feature requires pyarrow. Install it by doing pip install pyarrow.')
+
+
+def rows_to_arrow(rows, names):
+    ''' Converts a list of rows into a columnar `pyarrow.Table`
+
+    Parameters:
+        rows (list):
+            A list of tuples, one per row, e.g., the results of a query.
+        names (list):
+            The name of each column.
+
+    Returns:
+        A `pyarrow.Table` with one column per name.
+
+    '''
+
+    _check_pyarrow()
+
+    names = list(names)
+    columns = list(zip(*rows)) if len(rows) > 0 else [[] for __ in names]
+
+    return pyarrow.Table.from_arrays([pyarrow.array(list(column)) for column in columns],
+                                     names=names)
+
+
+def pack_table(table, chunk=65536):
+    ''' Packs a `pyarrow.Table` for transport through the Marvin API
+
+    The table is serialised as an Arrow IPC stream of record batches of at
+    most ``chunk`` rows, which the client decodes with :func:`unpack_table`
+    without creating any per-row Python objects. The resulting bytes are
+    meant to be sent in a ``msgpack`` response.
+
+    '''
+
+    _check_pyarrow()
+
+    sink = pyarrow.BufferOutputStream()
+    writer = pyarrow.ipc.RecordBatchStreamWriter(sink, table.schema)
+    for batch in table.to_batches(chunk):
+        writer.write_batch(batch)
+    writer.close()
+
+    return sink.getvalue().to_pybytes()
+
+
+def unpack_table(data):
+    ''' Unpacks a `pyarrow.Table` packed with :func:`pack_table` '''
+
+    _check_pyarrow()
+
+    return pyarrow.ipc.open_stream(pyarrow.py_buffer(data)).read_all()
+
+
+def open_fits(filename):
+    ''' Opens a FITS file with lazy access to the data
+
+    Uncompressed files are memory-mapped, so that slicing the data of an
+    extension only reads the bytes needed. Gzipped files cannot be sliced
+    without decompressing them from the start, so they are decompressed
+    once, in chunks, to a temporary copy that is then memory-mapped. The
+    copy is deleted when the returned ``HDUList`` is garbage collected. In
+    both cases the extensions are loaded only when first accessed.
+
+    Parameters:
+        filename (str):
+            The path to the FITS file.
+
+    Returns:
+        An `~astropy.io.fits.HDUList`.
+
+    '''
+
+    from astropy.io import fits
+
+    if not str(filename).endswith('.gz'):
+        return fits.open(filename, memmap=True, lazy_load_hdus=True)
+
+    temp_file = tempfile.NamedTemporaryFile(suffix='.fits')
+
+    try:
+        with gzip.open(filename, 'rb') as gzip_file:
+            shutil.copyfileobj(gzip_file, temp_file, 16 * 1024 * 1024)
+        temp_file.flush()
+        hdulist = fits.open(temp_file.name, memmap=True, lazy_load_hdus=True)
+    except Exception:
+        temp_file.close()
+        raise
+
+    # Keeps the temporary copy alive for as long as the HDUList.
+    hdulist._marvin_temp_file = temp_file
+
+    return hdulist
+
+
+def get_fits_section(hdu, key):
+    ''' Returns ``hdu.data[key]`` reading only the needed part of the file
+
+    If the data of the HDU is already in memory or memory-mapped, as for
+    files opened with :func:`open_fits`, it is sliced directly. Otherwise
+    the bounding box of ``key`` is read using ``hdu.section`` and then
+    indexed, instead of loading the whole extension.
+
+    Parameters:
+        hdu (`~astropy.io.fits.ImageHDU`):
+            The HDU from which to read the data.
+        key (tuple):
+            The index into the data. Can contain integers, slices, and
+            arrays of non-negative integers.
+
+    Returns:
+        A `~numpy.ndarray` with the same result as ``hdu.data[key]``.
+
+    '''
+
+    key = key if isinstance(key, tuple) else (key, )
+
+    hdu_file = getattr(hdu, '_file', None)
+    if hdu._data_loaded or hdu_file is None or hdu_file.memmap:
+        return hdu.data[key]
+
+    section_key = []
+    post_key = []
+
+    for item in key:
+        if isinstance(item, slice):
+            section_key.append(item)
+            post_key.append(slice(None))
+        elif isinstance(item, (list, tuple, np.ndarray)):
+            item = np.asarray(item, dtype=int)
+            if item.size == 0 or item.min() < 0:
+                return hdu.data[key]
+            section_key.append(slice(item.min(), item.max() + 1))
+            post_key.append(item - item.min())
+        else:
+            section_key.append(int(item))
+
+    data = hdu.section[tuple(section_key)]
+
+    return data[tuple(post_key)] if len(post_key) > 0 else data
@@ -93,6 +93,25 @@ class Maskbit(object):
         self.description = description if description is not None else None
         self.mask = None
 
+    @property
+    def schema(self):
+        """The maskbit schema."""
+
+        return self._schema
+
+    @schema.setter
+    def schema(self, value):
+
+        self._schema = value
+
+        # Lookup tables derived from the schema.
+        self._schema_bits = np.array(value.bit.values, dtype=np.int64)
+        self._schema_labels = value.label.values.tolist()
+        self._label_to_bit = dict(zip(self._schema_labels, self._schema_bits.tolist()))
+
+        # Caches of {mask value: bits/labels list}.
+        self._lookup = {'bits': {}, 'labels': {}}
+
     def __repr__(self):
         if (isinstance(self.mask, int) or self.mask is None):
             labels = self.labels
@@ -174,6 +193,48 @@ class Maskbit(object):
 
         return bits_set
 
+    def _get_bit_planes(self, values):
+        """Returns a boolean array of shape ``values.shape + (nbits,)``.
+
+        The last axis is True where the corresponding bit of the schema is set.
+
+        """
+
+        values = np.asarray(values)
+        if not np.issubdtype(values.dtype, np.integer):
+            values = values.astype(np.int64)
+
+        return ((values[..., np.newaxis].astype(np.int64) >> self._schema_bits) & 1).astype(bool)
+
+    def _get_lookup(self, uniqvals, convert_to='bits'):
+        """Returns the list of bits or labels set for each unique mask value.
+
+        The bits or labels are cached as tuples for each value, and those not
+        yet cached are computed at once from the bit planes of the values.
+
+        """
+
+        cache = self._lookup[convert_to]
+
+        missing = [value for value in uniqvals if value not in cache]
+
+        if len(missing) > 0:
+
+            # Keeps the cache bounded if many different values are converted.
+            if len(cache) + len(missing) > 65536:
+                cache.clear()
+
+            planes = self._get_bit_planes(np.array(missing, dtype=np.int64))
+            if convert_to == 'bits':
+                choices = self._schema_bits.tolist()
+            else:
+                choices = self._schema_labels
+
+            for value, plane in zip(missing, planes):
+                cache[value] = tuple(choice for choice, is_set in zip(choices, plane) if is_set)
+
+        return [cache[value] for value in uniqvals]
+
     def _get_uniq_bits(self, values):
         ''' Return a dictionary of unique bits
 
@@ -185,9 +246,8 @@ class Maskbit(object):
             dict:
                 A unique dictionary of {mask value: bit list} as {key: value}
         '''
-        uniqvals = set(values)
-        vdict = {v: self._value_to_bits(v, self.schema.bit.values) for v in uniqvals}
-        return vdict
+        uniqvals = np.unique(values).tolist()
+        return dict(zip(uniqvals, map(list, self._get_lookup(uniqvals, convert_to='bits'))))
 
     def _get_uniq_labels(self, values):
         ''' Return a dictionary of unique labels
@@ -200,13 +260,15 @@ class Maskbit(object):
             dict:
                 A unique dictionary of {mask value: labels list} as {key: value}
         '''
-        uniqbits = self._get_uniq_bits(values)
-        uniqlabels = {k: self.schema.label[self.schema.bit.isin(v)].values.tolist() for k, v in uniqbits.items()}
-        return uniqlabels
+        uniqvals = np.unique(values).tolist()
+        return dict(zip(uniqvals, map(list, self._get_lookup(uniqvals, convert_to='labels'))))
 
     def _get_a_set(self, values, convert_to='bits'):
         ''' Convert mask values to a list of either bit or label sets.
 
+        The mask is decoded once per unique value, and each pixel gets a new
+        list built from the decoded bits or labels of its value.
+
         Parameters:
             values (int or array):
                 Mask values. If ``None``, apply to entire
@@ -220,27 +282,63 @@ class Maskbit(object):
 
         '''
         assert (self.mask is not None) or (values is not None), 'Must provide values.'
+        assert convert_to in ['bits', 'labels'], 'convert_to must be "bits" or "labels".'
+
+        values = np.asarray(self.mask if values is None else values)
+        if not np.issubdtype(values.dtype, np.integer):
+            values = values.astype(np.int64)
 
-        values = np.array(self.mask) if values is None else np.array(values)
         ndim = values.ndim
         shape = values.shape
 
         assert ndim <= 3, '`value` must be int, 1-D array, 2-D array, or 3-D array.'
 
-        flatmask = values.flatten()
+        uniqvals, inverse = np.unique(values, return_inverse=True)
+        lookup = self._get_lookup(uniqvals.tolist(), convert_to=convert_to)
 
-        if convert_to == 'bits':
-            uniqvals = self._get_uniq_bits(flatmask)
-        elif convert_to == 'labels':
-            uniqvals = self._get_uniq_labels(flatmask)
+        if ndim == 0:
+            return list(lookup[0])
 
-        vallist = list(map(lambda x: uniqvals[x], flatmask))
-        if ndim > 0:
-            vals_set = np.reshape(vallist, shape).tolist()
-        else:
-            vals_set = vallist[0]
+        table = np.empty(values.size, dtype=object)
+        for ii, index in enumerate(inverse.ravel()):
+            table[ii] = list(lookup[index])
+
+        return table.reshape(shape).tolist()
+
+    def get_bit_planes(self, values=None, packed=False):
+        """Returns the bits of mask values as boolean planes.
+
+        Parameters:
+            values (int or array):
+                Mask values. If ``None``, apply to entire
+                ``Maskbit.mask`` array.  Default is ``None``.
+            packed (bool):
+                If True, the planes are packed along the last axis with
+                `numpy.packbits`, using eight times less memory. They can be
+                unpacked with `numpy.unpackbits` along the last axis,
+                discarding the padding beyond ``values.shape[-1]``.
+
+        Returns:
+            array:
+                An array of shape ``(nbits,) + values.shape``, where
+                ``nbits`` is the number of bits in the schema, in the order
+                of ``Maskbit.schema``. Each plane is True where that bit is
+                set.
 
-        return vals_set
+        Example:
+            >>> cube = Cube(plateifu='8485-1901')
+            >>> planes = cube.flux.pixmask.get_bit_planes()
+            >>> donotuse = planes[cube.flux.pixmask.schema.label.tolist().index('DONOTUSE')]
+        """
+        assert (self.mask is not None) or (values is not None), 'Must provide values.'
+
+        values = np.asarray(self.mask if values is None else values)
+        planes = np.moveaxis(self._get_bit_planes(values), -1, 0)
+
+        if packed:
+            return np.packbits(planes, axis=-1)
+
+        return planes
 
     def _value_to_bits(self, value, bits_all):
         """Convert mask value to a list of bits.
@@ -323,11 +421,8 @@ class Maskbit(object):
         if isinstance(labels, str):
             labels = [labels]
 
-        bit_values = []
-        for label in labels:
-            bit = self.schema.bit[self.schema.label == label]
-            if not bit.empty:
-                bit_values.append(bit.values[0])
+        bit_values = [self._label_to_bit[label] for label in labels
+                      if label in self._label_to_bit]
 
         return np.sum([2**value for value in bit_values])
 
@@ -391,15 +486,19 @@ class Maskbit(object):
         if isinstance(labels, str):
             labels = [labels]
 
-        schema_labels = self.schema.label.tolist()
         for label in labels:
-            if label not in schema_labels:
+            if label not in self._label_to_bit:
                 raise ValueError('label {0!r} not found in the maskbit schema.'.format(label))
 
-        bits = self.labels_to_bits(labels)
-        mask = mask if mask is not None else self.mask
+        mask = np.asarray(mask if mask is not None else self.mask)
+        value = int(self.labels_to_value(labels))
+
+        if value == 0:
+            return np.zeros(mask.shape, dtype=dtype)
 
-        if len(bits) == 0:
-            return np.zeros(mask.shape, dtype=np.int)
+        # The bits are distinct, so a single AND with their combined value is
+        # equivalent to adding the AND with each bit.
+        if dtype is bool:
+            return (mask & value) != 0
 
-        return np.sum([mask & 2**bit for bit in bits], axis=0).astype(dtype)
+        return (mask & value).astype(dtype)
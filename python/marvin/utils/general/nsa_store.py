@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under a 3-clause BSD license.
+#
+# @Filename: nsa_store.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import tempfile
+import warnings
+
+import numpy as np
+from astropy import table
+
+from marvin.core.exceptions import MarvinError, MarvinUserWarning
+from marvin.utils.general.catalogue_index import get_catalogue_index, get_fits_colnames
+
+
+__all__ = ('get_nsa_store_path', 'build_nsa_store', 'get_nsa_store', 'get_nsa_columns')
+
+
+def _get_nsa_dir():
+    ''' Returns the directory where the NSA stores are kept '''
+
+    nsapath = os.environ.get('MANGA_SCRATCH_DIR', None)
+    if not nsapath or not os.path.isdir(nsapath):
+        nsapath = os.path.expanduser('~')
+
+    return os.path.join(nsapath, 'nsa_store')
+
+
+def get_nsa_store_path(drpver):
+    ''' Returns the default path of the NSA store for a DRP version '''
+    return os.path.join(_get_nsa_dir(), 'nsa_{0}.fits'.format(drpver))
+
+
+def _fill_missing(values):
+    ''' Returns a list of column values as an array, filling the missing values
+
+    Missing numerical values are filled with NaN (numerical columns with
+    missing values are therefore stored as floats) and missing strings with
+    empty strings. Returns None if all the values are missing.
+
+    '''
+
+    present = [value for value in values if value is not None]
+
+    if len(present) == 0:
+        return None
+    elif len(present) == len(values):
+        return np.array(values)
+
+    sample = np.asarray(present[0])
+    fill = '' if sample.dtype.kind in ['S', 'U'] else np.full(sample.shape, np.nan)
+
+    return np.array([value if value is not None else fill for value in values])
+
+
+def build_nsa_store(drpver=None, path=None):
+    ''' Builds the NSA store of a DRP version from the database
+
+    Queries the NSA values of all the targets observed in ``drpver`` and
+    writes them, with their ``plateifu``, as a FITS table. The columnar
+    index of the table (see `get_nsa_store`) is then built next to it. This
+    is meant to be run offline, once per DRP version, on a machine with
+    access to the database. Missing values are stored as NaN, or as empty
+    strings for string columns.
+
+    Parameters:
+        drpver (str):
+            The DRP version. Defaults to the version of the current release.
+        path (str):
+            The path of the FITS file. Defaults to ``nsa_<drpver>.fits`` in
+            ``$MANGA_SCRATCH_DIR/nsa_store`` (or ``~/nsa_store``).
+
+    Returns:
+        The path of the NSA store.
+
+    '''
+
+    from marvin import config, marvindb
+    from marvin.utils.general.general import _db_row_to_dict
+
+    if config.db is None:
+        raise MarvinError('build_nsa_store: cannot find a valid DB connection.')
+
+    drpver = drpver or config.lookUpVersions()[0]
+    path = path or get_nsa_store_path(drpver)
+
+    session = marvindb.session
+    sampledb = marvindb.sampledb
+    datadb = marvindb.datadb
+
+    allnsa = session.query(sampledb.NSA, datadb.Cube.plateifu).\
+        join(sampledb.MangaTargetToNSA, sampledb.MangaTarget,
+             datadb.Cube, datadb.PipelineInfo,
+             datadb.PipelineVersion, datadb.IFUDesign).\
+        filter(datadb.PipelineVersion.version == drpver).all()
+
+    if len(allnsa) == 0:
+        raise MarvinError('build_nsa_store: no NSA rows found for drpver={0}'.format(drpver))
+
+    rows = [_db_row_to_dict(nsa, remove_columns=['pk', 'catalogue_pk']) for nsa, __ in allnsa]
+
+    nsa_table = table.Table()
+    nsa_table['plateifu'] = np.array([plateifu for __, plateifu in allnsa], dtype=np.str_)
+
+    for col in rows[0]:
+        values = _fill_missing([row[col] for row in rows])
+        if values is None or values.dtype.kind == 'O':
+            warnings.warn('build_nsa_store: skipping column {0} that cannot be '
+                          'stored as an array'.format(col), MarvinUserWarning)
+            continue
+        nsa_table[col] = values
+
+    dirname = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+
+    # Writes to a temporary file and then moves it in place so that other
+    # processes never read a partial file.
+    fd, tmppath = tempfile.mkstemp(suffix='.fits', dir=dirname)
+    os.close(fd)
+    nsa_table.write(tmppath, format='fits', overwrite=True)
+    os.rename(tmppath, path)
+
+    get_nsa_store(drpver, path=path)
+
+    return path
+
+
+def get_nsa_store(drpver, path=None):
+    ''' Returns the index of the NSA store of a DRP version
+
+    The NSA store is a FITS table built with `build_nsa_store`. Its columns
+    are stored in a memory-mapped
+    :class:`~marvin.utils.general.catalogue_index.CatalogueIndex`, indexed
+    by ``plateifu``, so that individual columns can be read without reading
+    the rest of the table and without any unpickling.
+
+    Parameters:
+        drpver (str):
+            The DRP version.
+        path (str):
+            The path of the NSA store. Defaults to `get_nsa_store_path`.
+
+    Returns:
+        A :class:`~marvin.utils.general.catalogue_index.CatalogueIndex`, or
+        None if the NSA store has not been built.
+
+    Example:
+        >>> store = get_nsa_store('v2_4_3')
+        >>> store.column('z')
+        >>> store.lookup('plateifu', '8485-1901')
+
+    '''
+
+    path = path or get_nsa_store_path(drpver)
+
+    if not os.path.exists(path):
+        return None
+
+    return get_catalogue_index(path, hdu=1, keys={'plateifu': ['plateifu']},
+                               columns=get_fits_colnames(path, hdu=1))
+
+
+def get_nsa_columns(store, columns, plateifus=None):
+    ''' Returns some columns of an NSA store, optionally for some targets
+
+    Parameters:
+        store (`~marvin.utils.general.catalogue_index.CatalogueIndex`):
+            The NSA store, as returned by `get_nsa_store`.
+        columns (list):
+            The names of the columns to return.
+        plateifus (list):
+            If set, only the rows for these plateifus are returned, in the
+            order in which they are first found. Unknown plateifus are
+            ignored.
+
+    Returns:
+        A dictionary of column name to array.
+
+    '''
+
+    if plateifus is None:
+        return {col: store.column(col) for col in columns}
+
+    rows = store.lookup_many('plateifu', plateifus)
+    rows = np.concatenate(rows).astype(int) if len(rows) > 0 else np.array([], dtype=int)
+
+    return {col: np.asarray(store.column(col))[rows] for col in columns}
@@ -0,0 +1,444 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under a 3-clause BSD license.
+#
+# @Filename: spaxel_summary.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+import shutil
+import tempfile
+from operator import eq, ge, gt, le, lt, ne
+
+import numpy as np
+
+from marvin import log
+from marvin.core.exceptions import MarvinError
+
+
+__all__ = ('SpaxelSummary', 'get_spaxel_summary_path', 'build_spaxel_summary',
+           'get_spaxel_summary', 'get_dap_file_pks', 'default_summary_bins')
+
+
+# Increase when the layout of the summary files changes, to force a rebuild.
+_summary_version = 2
+
+# Summaries already loaded in this session, keyed by (path, mtime).
+_summaries = {}
+
+opdict = {'<=': le, '>=': ge, '>': gt, '<': lt, '!=': ne, '=': eq, '==': eq}
+
+# Bin edges of the summary histograms. Edges are exactly representable
+# floats, so that conditions with round values are answered exactly.
+_flux_bins = np.unique(np.concatenate([np.arange(-10, 10, 0.5), np.arange(10, 100, 1.),
+                                       np.arange(100, 1000, 10.), np.arange(1000, 10001, 100.)]))
+_velocity_bins = np.arange(-1000, 1001, 10.)
+_sigma_bins = np.arange(0, 1001, 5.)
+
+# The spaxel properties summarised by default, with their bin edges.
+default_summary_bins = {'spaxelprop.emline_gflux_ha_6564': _flux_bins,
+                        'spaxelprop.emline_gflux_hb_4862': _flux_bins,
+                        'spaxelprop.emline_gflux_oiii_5008': _flux_bins,
+                        'spaxelprop.emline_gflux_nii_6585': _flux_bins,
+                        'spaxelprop.emline_gvel_ha_6564': _velocity_bins,
+                        'spaxelprop.emline_gsigma_ha_6564': _sigma_bins,
+                        'spaxelprop.stellar_vel': _velocity_bins,
+                        'spaxelprop.stellar_sigma': _sigma_bins}
+
+
+def _get_summary_dir():
+    ''' Returns the directory where the spaxel summaries are kept '''
+
+    summarypath = os.environ.get('MANGA_SCRATCH_DIR', None)
+    if not summarypath or not os.path.isdir(summarypath):
+        summarypath = os.path.expanduser('~')
+
+    return os.path.join(summarypath, 'spaxel_summary')
+
+
+def get_spaxel_summary_path(dapver, table):
+    ''' Returns the default directory of the spaxel summary of a DAP version and spaxel table '''
+    return os.path.join(_get_summary_dir(), '{0}_{1}'.format(dapver, table))
+
+
+class SpaxelSummary(object):
+    ''' Per-file aggregates of the spaxel properties of a DAP version
+
+    For each DAP file, the summary stores the number of good spaxels, as
+    counted by the ``npergood`` query function, and, for a few spaxel
+    properties, a histogram of their values with fixed bin edges. The
+    number of spaxels of a file meeting a condition such as
+    ``emline_gflux_ha_6564 > 25`` is then bounded by the counts of the bins
+    on either side of the value, and is exact if the value is a bin edge.
+    Following PostgreSQL, the first bin holds the values below the first
+    edge and the last one the values above the last edge, including NaNs.
+
+    The summary is a directory of ``.npy`` files, memory-mapped when
+    loaded, written by `build_spaxel_summary`.
+
+    Parameters:
+        path (str):
+            The directory of the summary.
+
+    Attributes:
+        file_pks (array):
+            The sorted primary keys of the summarised DAP files.
+        goodcount (array):
+            The number of good spaxels of each file.
+        nspaxels,maxspaxelpk (array):
+            The number of spaxels of each file in the table, and their
+            largest primary key. They identify the load of the file, so
+            that a file reloaded since the summary was built is detected.
+        edges (dict):
+            The bin edges of the histogram of each property, keyed by
+            column name.
+
+    '''
+
+    def __init__(self, path):
+
+        self.path = path
+
+        with open(os.path.join(path, 'meta.json')) as fileobj:
+            self.meta = json.load(fileobj)
+
+        self.file_pks = np.load(os.path.join(path, 'file_pk.npy'), mmap_mode='r')
+        self.goodcount = np.load(os.path.join(path, 'goodcount.npy'), mmap_mode='r')
+        self.nspaxels = np.load(os.path.join(path, 'nspaxels.npy'), mmap_mode='r')
+        self.maxspaxelpk = np.load(os.path.join(path, 'maxspaxelpk.npy'), mmap_mode='r')
+
+        self.edges = {}
+        self._counts = {}
+        for name in self.meta['params']:
+            self.edges[name] = np.load(os.path.join(path, 'edges_{0}.npy'.format(name)))
+            self._counts[name] = np.load(os.path.join(path, 'counts_{0}.npy'.format(name)),
+                                         mmap_mode='r')
+
+    def __repr__(self):
+        return '<SpaxelSummary (dapver={0!r}, table={1!r}, nfiles={2}, params={3})>'.format(
+            self.meta['dapver'], self.meta['table'], len(self.file_pks), sorted(self.edges))
+
+    def __contains__(self, name):
+        return name in self.edges
+
+    def counts(self, name):
+        ''' Returns the histogram counts of a property, with one row per file '''
+        return self._counts[name]
+
+    def count_bounds(self, name, op, value):
+        ''' Returns the bounds of the number of spaxels of each file meeting a condition
+
+        Parameters:
+            name (str):
+                The column name of the property.
+            op (str):
+                The operator of the condition, one of ``<``, ``<=``, ``>``,
+                ``>=``, ``=``, ``==``, or ``!=``.
+            value (float):
+                The value of the condition.
+
+        Returns:
+            A tuple of arrays with the lower and upper bounds for each file.
+
+        '''
+
+        counts = self._counts[name]
+        edges = self.edges[name]
+
+        # the edges of each bin, the first and last ones being open
+        lows = np.concatenate([[-np.inf], edges])
+        highs = np.concatenate([edges, [np.inf]])
+
+        # bins whose values all meet the condition, and bins with some values that may
+        if op == '>':
+            sure, maybe = lows > value, highs > value
+        elif op == '>=':
+            sure, maybe = lows >= value, highs > value
+        elif op == '<':
+            sure, maybe = highs <= value, lows < value
+        elif op == '<=':
+            sure, maybe = highs <= value, lows <= value
+        elif op in ['=', '==']:
+            sure, maybe = np.zeros(len(lows), dtype=bool), (lows <= value) & (highs > value)
+        elif op == '!=':
+            sure, maybe = (lows > value) | (highs <= value), np.ones(len(lows), dtype=bool)
+        else:
+            raise MarvinError('operator {0} cannot be answered from the spaxel summary'.format(op))
+
+        lower = counts[:, sure].sum(axis=1)
+        upper = counts[:, maybe].sum(axis=1)
+
+        return lower, upper
+
+    def npergood(self, name, op, value, fxn_op, percent):
+        ''' Evaluates an ``npergood`` condition from the summary
+
+        The files for which the bounds of the count decide the comparison
+        are split into those passing and failing it. The rest must be
+        checked against the spaxels. As in the database query, a file only
+        passes if at least one of its spaxels meets the condition.
+
+        Parameters:
+            name,op,value:
+                The condition on the spaxels, as in `count_bounds`.
+            fxn_op (str):
+                The operator comparing the count with the percentage.
+            percent (float):
+                The fraction, between 0 and 1, of the good spaxels.
+
+        Returns:
+            A tuple of arrays with the primary keys of the files that pass
+            the condition and of those that must be checked exactly.
+
+        '''
+
+        lower, upper = self.count_bounds(name, op, value)
+        threshold = percent * np.asarray(self.goodcount)
+        compare = opdict[fxn_op]
+
+        if fxn_op in ['=', '==', '!=']:
+            exact = lower == upper
+            passes = exact & compare(lower, threshold)
+            fails = exact & ~compare(lower, threshold)
+            # the count cannot equal a threshold outside of its bounds
+            outside = (threshold < lower) | (threshold > upper)
+            if fxn_op == '!=':
+                passes |= outside
+            else:
+                fails |= outside
+        else:
+            # the comparison is monotonic in the count, so it is decided by the bounds
+            passes = compare(lower, threshold) & compare(upper, threshold)
+            fails = ~compare(lower, threshold) & ~compare(upper, threshold)
+
+        # files without good spaxels or without any spaxel meeting the condition never pass
+        passes &= lower > 0
+        fails |= (upper == 0) | (np.asarray(self.goodcount) == 0)
+
+        file_pks = np.asarray(self.file_pks)
+
+        return file_pks[passes & ~fails], file_pks[~passes & ~fails]
+
+
+def _save_summary(path, meta, arrays):
+    ''' Writes the files of a summary to a temporary directory and moves it in place '''
+
+    dirname = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+
+    tmpdir = tempfile.mkdtemp(dir=dirname)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmpdir, '{0}.npy'.format(name)), array)
+    with open(os.path.join(tmpdir, 'meta.json'), 'w') as fileobj:
+        json.dump(meta, fileobj)
+
+    # other processes never read a partially written summary
+    olddir = None
+    if os.path.exists(path):
+        olddir = tempfile.mkdtemp(dir=dirname)
+        os.rename(path, os.path.join(olddir, 'summary'))
+    os.rename(tmpdir, path)
+    if olddir:
+        shutil.rmtree(olddir, ignore_errors=True)
+
+
+def get_dap_file_pks(dapver):
+    ''' Returns the sorted primary keys of the DAP files of a DAP version in the database '''
+
+    from marvin import marvindb
+
+    datadb = marvindb.datadb
+    dapdb = marvindb.dapdb
+
+    pks = marvindb.session.query(dapdb.File.pk).join(datadb.PipelineInfo, datadb.PipelineVersion).\
+        filter(datadb.PipelineVersion.version == dapver).all()
+
+    return np.sort(np.array([pk for pk, in pks], dtype=np.int64))
+
+
+def build_spaxel_summary(release=None, bins=None, allspaxels=False, path=None, refresh=False):
+    ''' Builds or updates the spaxel summary of a release from the database
+
+    Counts the good spaxels of each DAP file of the release, and the
+    histogram of each spaxel property in ``bins``, with one grouped query
+    per property. This is meant to be run offline, on a machine with access
+    to the database. By default, an existing summary with the same
+    properties and bin edges is updated incrementally: only the DAP files
+    loaded or reloaded since it was built are summarised, and the deleted
+    ones are dropped. A file is taken to be reloaded if its number of
+    spaxels or their largest primary key have changed.
+
+    Parameters:
+        release (str):
+            The release. Defaults to the current release.
+        bins (dict):
+            A mapping of the full names of the spaxel properties to their
+            bin edges. Defaults to ``default_summary_bins``. Properties not
+            in the datamodel of the release are skipped.
+        allspaxels (bool):
+            If True, summarises the table of all the spaxels instead of the
+            table of the good ones, used by default by the queries.
+        path (str):
+            The directory of the summary. Defaults to `get_spaxel_summary_path`.
+        refresh (bool):
+            If True, all the files are summarised again.
+
+    Returns:
+        The directory of the spaxel summary.
+
+    '''
+
+    from marvin import config, marvindb
+    from marvin.utils.datamodel.query.forms import get_marvin_form
+    from sqlalchemy import cast, func
+    from sqlalchemy.dialects import postgresql
+
+    if config.db is None:
+        raise MarvinError('build_spaxel_summary: cannot find a valid DB connection.')
+
+    release = release or config.release
+    __, dapver = config.lookUpVersions(release=release)
+
+    lookup = get_marvin_form(release=release, allspaxels=allspaxels)._param_form_lookup
+    spaxelclass = lookup.get_model('spaxelprop.file')
+    table = spaxelclass.__tablename__
+    path = path or get_spaxel_summary_path(dapver, table)
+
+    columns = {}
+    for param, edges in (bins or default_summary_bins).items():
+        try:
+            column = lookup.mapToColumn(param)
+        except (KeyError, MarvinError) as ee:
+            log.debug('build_spaxel_summary: skipping {0}: {1}'.format(param, ee))
+            continue
+        columns[column.key] = (column, np.unique(np.asarray(edges, dtype=float)))
+
+    meta = {'version': _summary_version, 'dapver': dapver, 'table': table,
+            'params': sorted(columns),
+            'edges': {name: edges.tolist() for name, (__, edges) in columns.items()}}
+
+    # reuse the existing summary if it has the same layout
+    summary = None if refresh else get_spaxel_summary(dapver, table, path=path)
+    if summary is not None and {key: summary.meta[key] for key in meta} != meta:
+        summary = None
+
+    session = marvindb.session
+    all_pks = get_dap_file_pks(dapver)
+
+    # the number of spaxels of each file and their largest primary key,
+    # which changes when the file is reloaded, as its spaxels get new keys
+    nspaxels = np.zeros(len(all_pks), dtype=np.int64)
+    maxspaxelpk = np.zeros(len(all_pks), dtype=np.int64)
+    if len(all_pks) > 0:
+        file_rows = {pk: ii for ii, pk in enumerate(all_pks)}
+        query = session.query(spaxelclass.file_pk, func.count(spaxelclass.pk),
+                              func.max(spaxelclass.pk)).\
+            filter(spaxelclass.file_pk.in_(all_pks.tolist())).group_by(spaxelclass.file_pk)
+        for pk, count, maxpk in query:
+            nspaxels[file_rows[pk]] = count
+            maxspaxelpk[file_rows[pk]] = maxpk
+
+    # the rows of the existing summary of the files that have not changed
+    index = np.zeros(len(all_pks), dtype=int)
+    unchanged = np.zeros(len(all_pks), dtype=bool)
+    if summary is not None and len(summary.file_pks) > 0:
+        index = np.searchsorted(summary.file_pks, all_pks).clip(max=len(summary.file_pks) - 1)
+        unchanged = ((np.asarray(summary.file_pks)[index] == all_pks) &
+                     (np.asarray(summary.nspaxels)[index] == nspaxels) &
+                     (np.asarray(summary.maxspaxelpk)[index] == maxspaxelpk))
+
+    kept = index[unchanged]
+    new_pks = all_pks[~unchanged]
+
+    if summary is not None and len(new_pks) == 0 and len(kept) == len(summary.file_pks):
+        return path
+
+    rows = {pk: ii for ii, pk in enumerate(new_pks)}
+
+    # the good spaxels, as counted by the npergood query function
+    goodcount = np.zeros(len(new_pks), dtype=np.int64)
+    if len(new_pks) > 0:
+        query = session.query(spaxelclass.file_pk, func.count(spaxelclass.pk)).\
+            filter(spaxelclass.file_pk.in_(new_pks.tolist()))
+        if 'CleanSpaxelProp' not in spaxelclass.__name__:
+            query = query.filter(spaxelclass.binid != -1)
+        for pk, count in query.group_by(spaxelclass.file_pk):
+            goodcount[rows[pk]] = count
+
+    arrays = {}
+    for name, (column, edges) in columns.items():
+        counts = np.zeros((len(new_pks), len(edges) + 1), dtype=np.int64)
+        if len(new_pks) > 0:
+            thresholds = cast(postgresql.array(edges.tolist()),
+                              postgresql.ARRAY(postgresql.DOUBLE_PRECISION))
+            bucket = func.width_bucket(cast(column, postgresql.DOUBLE_PRECISION), thresholds)
+            query = session.query(spaxelclass.file_pk, bucket, func.count(spaxelclass.pk)).\
+                filter(spaxelclass.file_pk.in_(new_pks.tolist()), column.isnot(None)).\
+                group_by(spaxelclass.file_pk, bucket)
+            for pk, ibin, count in query:
+                counts[rows[pk], ibin] = count
+        arrays['edges_{0}'.format(name)] = edges
+        arrays['counts_{0}'.format(name)] = counts
+
+    # add the new files to those kept from the existing summary
+    file_pks = new_pks
+    if summary is not None:
+        file_pks = np.concatenate([np.asarray(summary.file_pks)[kept], new_pks])
+        goodcount = np.concatenate([np.asarray(summary.goodcount)[kept], goodcount])
+        for name in columns:
+            arrays['counts_{0}'.format(name)] = np.concatenate(
+                [summary.counts(name)[kept], arrays['counts_{0}'.format(name)]])
+
+    # the files are then those of all_pks, in the same order
+    order = np.argsort(file_pks, kind='mergesort')
+    arrays['file_pk'] = file_pks[order]
+    arrays['goodcount'] = goodcount[order]
+    arrays['nspaxels'] = nspaxels
+    arrays['maxspaxelpk'] = maxspaxelpk
+    for name in columns:
+        arrays['counts_{0}'.format(name)] = arrays['counts_{0}'.format(name)][order]
+
+    _save_summary(path, meta, arrays)
+
+    return path
+
+
+def get_spaxel_summary(dapver, table, path=None):
+    ''' Returns the spaxel summary of a DAP version and spaxel table
+
+    Parameters:
+        dapver (str):
+            The DAP version.
+        table (str):
+            The name of the spaxel property table, e.g., ``cleanspaxelprop5``.
+        path (str):
+            The directory of the summary. Defaults to `get_spaxel_summary_path`.
+
+    Returns:
+        A `SpaxelSummary`, or None if the summary has not been built.
+
+    '''
+
+    path = path or get_spaxel_summary_path(dapver, table)
+    meta_filename = os.path.join(path, 'meta.json')
+
+    if not os.path.exists(meta_filename):
+        return None
+
+    key = (os.path.realpath(path), os.stat(meta_filename).st_mtime)
+    if key not in _summaries:
+        try:
+            summary = SpaxelSummary(path)
+        except (IOError, OSError, ValueError) as ee:
+            log.debug('cannot load spaxel summary {0}: {1}'.format(path, ee))
+            return None
+        if summary.meta.get('version') != _summary_version:
+            return None
+        _summaries[key] = summary
+
+    return _summaries[key]
@@ -23,7 +23,7 @@ from fuzzywuzzy import process as fuzz_proc
 
 
 __ALL__ = ['FuzzyDict', 'Dotable', 'DotableCaseInsensitive', 'get_best_fuzzy',
-           'FuzzyList', 'string_folding_wrapper', 'gunzip']
+           'FuzzyList', 'string_folding_wrapper', 'gunzip', 'ArrayCache']
 
 
 class Dotable(dict):
@@ -114,8 +114,26 @@ def get_best_fuzzy(value, choices, min_score=75, scorer=fuzz_fuzz.WRatio, return
     return best if return_score else best[0]
 
 
+def _invalidates_fuzzy_cache(method):
+    """Decorates a dict method so that it clears the fuzzy cache of the `FuzzyDict`."""
+
+    def wrapper(self, *args, **kwargs):
+        self.__dict__.pop('_fuzzy_cache', None)
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+
+    return wrapper
+
+
 class FuzzyDict(OrderedDict):
-    """A dotable dictionary that uses fuzzywuzzy to select the key."""
+    """A dotable dictionary that uses fuzzywuzzy to select the key.
+
+    Exact keys are looked up directly. The result of each fuzzy match is
+    cached until the dictionary is modified.
+
+    """
 
     def __getattr__(self, value):
         if '__' in value:
@@ -127,21 +145,54 @@ class FuzzyDict(OrderedDict):
         if not isinstance(value, six.string_types):
             return self.values()[value]
 
-        if value in self.keys():
+        if dict.__contains__(self, value):
             return dict.__getitem__(self, value)
 
-        best = get_best_fuzzy(value, self.keys())
+        fuzzy_cache = self.__dict__.setdefault('_fuzzy_cache', {})
+
+        best = fuzzy_cache.get(value, None)
+        if best is None:
+            best = get_best_fuzzy(value, self.keys())
+            fuzzy_cache[value] = best
 
         return dict.__getitem__(self, best)
 
+    # The C implementation of OrderedDict does not call __delitem__ from pop,
+    # popitem, or clear, so all the methods that modify the keys are wrapped.
+    __setitem__ = _invalidates_fuzzy_cache(OrderedDict.__setitem__)
+    __delitem__ = _invalidates_fuzzy_cache(OrderedDict.__delitem__)
+    pop = _invalidates_fuzzy_cache(OrderedDict.pop)
+    popitem = _invalidates_fuzzy_cache(OrderedDict.popitem)
+    clear = _invalidates_fuzzy_cache(OrderedDict.clear)
+    setdefault = _invalidates_fuzzy_cache(OrderedDict.setdefault)
+    update = _invalidates_fuzzy_cache(OrderedDict.update)
+
     def __dir__(self):
 
         return list(self.keys())
 
 
+def _invalidates_index(method):
+    """Decorates a list method so that it resets the index of the `FuzzyList`."""
+
+    def wrapper(self, *args, **kwargs):
+        self._reset_index()
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+
+    return wrapper
+
+
 class FuzzyList(list):
     """A list that uses fuzzywuzzy to select the item.
 
+    Lookups by a string first check a hashed index of the mapped value of
+    each item (see `mapper`) and of its aliases (see `aliases`), and only
+    then use fuzzy matching. The index and the results of the fuzzy matches
+    are cached until the list is modified.
+
     Parameters:
         the_list (list):
             The list on which we will do fuzzy searching.
@@ -152,6 +203,7 @@ class FuzzyList(list):
     def __init__(self, the_list, use_fuzzy=None):
 
         self.use_fuzzy = use_fuzzy if use_fuzzy else get_best_fuzzy
+        self._reset_index()
 
         list.__init__(self, the_list)
 
@@ -160,9 +212,58 @@ class FuzzyList(list):
 
         return str(item)
 
+    def aliases(self, item):
+        """Returns other names that match an item exactly, apart from its mapped value.
+
+        Aliases shared by several items are ignored.
+
+        """
+
+        return []
+
+    def _reset_index(self):
+        """Removes the cached index and fuzzy matches."""
+
+        self.__dict__['_index'] = None
+
+    def _get_index(self):
+        """Returns the index as a tuple of mapped values, exact matches, and fuzzy matches."""
+
+        index = self.__dict__.get('_index', None)
+        if index is not None:
+            return index
+
+        mapped = [self.mapper(item) for item in self]
+
+        # Mapped values take precedence over aliases. As with list.index,
+        # the first item is used if several have the same mapped value.
+        exact = {}
+        for ii, name in enumerate(mapped):
+            exact.setdefault(name, ii)
+
+        aliases = {}
+        for ii, item in enumerate(self):
+            for alias in self.aliases(item):
+                if alias not in exact:
+                    aliases.setdefault(alias, set()).add(ii)
+
+        exact.update((alias, positions.pop())
+                     for alias, positions in aliases.items() if len(positions) == 1)
+
+        index = (mapped, exact, {})
+        self.__dict__['_index'] = index
+
+        return index
+
     def __eq__(self, value):
 
-        self_values = [self.mapper(item) for item in self]
+        self_values, exact, fuzzy = self._get_index()
+
+        if isinstance(value, six.string_types):
+            if value in exact:
+                return list.__getitem__(self, exact[value])
+            elif value in fuzzy:
+                return list.__getitem__(self, fuzzy[value])
 
         try:
             best = self.use_fuzzy(value, self_values)
@@ -170,7 +271,11 @@ class FuzzyList(list):
             # Second pass, using underscores.
             best = self.use_fuzzy(value.replace(' ', '_'), self_values)
 
-        return self[self_values.index(best)]
+        position = self_values.index(best)
+        if isinstance(value, six.string_types):
+            fuzzy[value] = position
+
+        return list.__getitem__(self, position)
 
     def __contains__(self, value):
 
@@ -192,8 +297,10 @@ class FuzzyList(list):
 
     def __getattr__(self, value):
 
-        self_values = [super(FuzzyList, self).__getattribute__('mapper')(item)
-                       for item in self]
+        if value.startswith('__'):
+            return super(FuzzyList, self).__getattribute__(value)
+
+        self_values = super(FuzzyList, self).__getattribute__('_get_index')()[0]
 
         if value in self_values:
             return self[value]
@@ -204,6 +311,22 @@ class FuzzyList(list):
 
         return [self.mapper(item) for item in self]
 
+    append = _invalidates_index(list.append)
+    extend = _invalidates_index(list.extend)
+    insert = _invalidates_index(list.insert)
+    remove = _invalidates_index(list.remove)
+    pop = _invalidates_index(list.pop)
+    sort = _invalidates_index(list.sort)
+    reverse = _invalidates_index(list.reverse)
+    __setitem__ = _invalidates_index(list.__setitem__)
+    __delitem__ = _invalidates_index(list.__delitem__)
+    __iadd__ = _invalidates_index(list.__iadd__)
+    __imul__ = _invalidates_index(list.__imul__)
+
+    if six.PY2:
+        __setslice__ = _invalidates_index(list.__setslice__)
+        __delslice__ = _invalidates_index(list.__delslice__)
+
 
 class OrderedDefaultDict(FuzzyDict):
 
@@ -264,6 +387,101 @@ class StringFolder(object):
         return t
 
 
+class ArrayCache(object):
+    """A least recently used cache of arrays, bounded by their size in bytes.
+
+    Each value is an array or a tuple of arrays (which can contain ``None``),
+    and its size is the sum of the ``nbytes`` of its arrays. When adding a
+    value makes the total size exceed ``max_size``, the least recently used
+    values are evicted. Values larger than ``max_size`` are not cached, so
+    ``max_size=0`` disables the cache. If ``max_size=None`` the cache is not
+    bounded.
+
+    Attributes:
+        hits (int):
+            The number of values found in the cache.
+        misses (int):
+            The number of values not found in the cache.
+
+    """
+
+    def __init__(self, max_size=None):
+
+        self.max_size = max_size
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        self._values = OrderedDict()
+        self._sizes = {}
+
+    def __repr__(self):
+        return '<ArrayCache (nvalues={0}, size={1}, max_size={2})>'.format(
+            len(self._values), self.size, self.max_size)
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def __len__(self):
+        return len(self._values)
+
+    @staticmethod
+    def _get_size(value):
+
+        if isinstance(value, tuple):
+            return sum(getattr(item, 'nbytes', 0) for item in value)
+
+        return getattr(value, 'nbytes', 0)
+
+    def get(self, key, default=None):
+        """Returns the value for a key, marking it as the most recently used."""
+
+        if key not in self._values:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+
+        value = self._values.pop(key)
+        self._values[key] = value
+
+        return value
+
+    def set(self, key, value):
+        """Adds a value to the cache, evicting the least recently used values if needed."""
+
+        self.pop(key)
+
+        size = self._get_size(value)
+        if self.max_size is not None and size > self.max_size:
+            return
+
+        self._values[key] = value
+        self._sizes[key] = size
+        self.size += size
+
+        while self.max_size is not None and self.size > self.max_size:
+            self.pop(next(iter(self._values)))
+
+    def pop(self, key):
+        """Removes a key from the cache. Returns the removed value or None."""
+
+        if key not in self._values:
+            return None
+
+        self.size -= self._sizes.pop(key)
+
+        return self._values.pop(key)
+
+    def clear(self):
+        """Removes all the values from the cache."""
+
+        self._values.clear()
+        self._sizes.clear()
+        self.size = 0
+
+
 def string_folding_wrapper(results, keys=None):
     """
     This generator yields rows from the results as tuples,
@@ -25,7 +25,7 @@ from marvin.web.controllers.plate import plate
 from marvin.web.controllers.images import images
 from marvin.web.controllers.users import users
 # API Views
-from marvin.api.base import BaseView
+from marvin.api.base import BaseView, get_app_routemap
 from marvin.api.cube import CubeView
 from marvin.api.maps import MapsView
 from marvin.api.modelcube import ModelCubeView
@@ -104,6 +104,9 @@ def create_app(debug=False, local=False, object_config=None):
     register_api(app, api)
     register_blueprints(app, url_prefix=url_prefix)
 
+    # Builds the route map once, now that all the routes are registered.
+    get_app_routemap(app)
+
     return app
 
 
@@ -10,12 +10,11 @@
 
 from __future__ import print_function, division, absolute_import
 from flask_classful import FlaskView
-from flask import request, current_app
+from flask import request
 from marvin.web.web_utils import parseSession, update_allowed, updateGlobalSession, check_access
 import marvin
 from brain.api.general import BrainGeneralRequestsView
-from brain.utils.general import build_routemap
-from marvin.api.base import arg_validate as av
+from marvin.api.base import arg_validate as av, get_app_routemap
 import json
 
 
@@ -44,7 +43,7 @@ class BaseWebView(FlaskView):
 
         # try to get a local version of the urlmap for the arg_validator
         if not av.urlmap:
-            urlmap = build_routemap(current_app)
+            urlmap, __ = get_app_routemap()
             marvin.config.urlmap = urlmap
             av.urlmap = urlmap
 
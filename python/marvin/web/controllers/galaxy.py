@@ -12,25 +12,31 @@ Revision History:
 '''
 from __future__ import division, print_function
 
+import copy
+import hashlib
+import io
 import os
 
 import numpy as np
 from brain.utils.general.general import convertIvarToErr
-from flask import Blueprint, jsonify, render_template, request
+from flask import Blueprint, Response, jsonify, render_template, request
 from flask import session as current_session
 from flask_classful import route
 
 import marvin
+from marvin.api.base import _compressed_response
 from marvin.api.base import arg_validate as av
 from marvin.core import marvin_pickle
 from marvin.core.caching_query import FromCache
 from marvin.core.exceptions import MarvinError
 from marvin.tools.cube import Cube
+from marvin.tools.maps import Maps
 from marvin.utils.datamodel.dap import datamodel
 from marvin.utils.general.general import (_db_row_to_dict, convertImgCoords, getDapRedux,
                                           getDefaultMapPath, parseIdentifier, target_status,
-                                          get_manga_image)
+                                          get_manga_image, pack_array)
 from marvin.utils.general.maskbit import Maskbit
+from marvin.utils.general.nsa_store import get_nsa_columns, get_nsa_store
 from marvin.web.controllers import BaseWebView
 from marvin.web.extensions import cache
 
@@ -42,6 +48,13 @@ except ImportError as e:
 
 galaxy = Blueprint("galaxy_page", __name__)
 
+# Seconds the map arrays and rendered maps are kept in the web cache
+_webmap_timeout = 3600
+
+# Web plot params, keyed by (dapver, parameter), and the shared DAP pixmask
+_plot_params = {}
+_dappixmask = None
+
 
 def getWebSpectrum(cube, x, y, xyorig=None, byradec=False):
     ''' Get and format a spectrum for the web '''
@@ -84,73 +97,141 @@ def getWebSpectrum(cube, x, y, xyorig=None, byradec=False):
     return webspec, specmsg
 
 
-def getWebMap(cube, parameter='emline_gflux', channel='ha_6564',
-              bintype=None, template=None):
-    ''' Get and format a map for the web '''
+def _get_dappixmask():
+    ''' Returns the MANGA_DAPPIXMASK Maskbit, created only once '''
+
+    global _dappixmask
+
+    if _dappixmask is None:
+        _dappixmask = Maskbit('MANGA_DAPPIXMASK')
+
+    return _dappixmask
+
+
+def _get_map_arrays(plateifu, release, parameter, channel=None, bintype=None, template=None):
+    ''' Get the value, ivar, and mask arrays of a map, and its message
+
+    Raises an exception if the map cannot be retrieved.
+    '''
     if channel:
         name = '{0}_{1}'.format(parameter.lower(), channel)
     else:
         name = '{0}'.format(parameter.lower())
 
-    webmap = None
-    try:
-        maps = cube.getMaps(plateifu=cube.plateifu, mode='local',
-                            bintype=bintype, template=template)
-        data = maps.getMap(parameter, channel=channel)
+    maps = Maps(plateifu=plateifu, release=release, mode='local',
+                bintype=bintype, template=template)
+    data = maps.getMap(parameter, channel=channel)
+
+    # correct the stellar_sigma or emline_gsigma maps
+    if parameter == 'stellar_sigma' or parameter == 'emline_gsigma':
+        try:
+            data = data.inst_sigma_correction()
+        except MarvinError as e:
+            pass
+        else:
+            name = 'Corrected {0}'.format(name)
+
+    arrays = {'value': np.asarray(data.value),
+              'ivar': np.asarray(data.ivar) if data.ivar is not None else None,
+              'mask': np.asarray(data.mask) if data.mask is not None else None}
+    mapmsg = "{0}: {1}-{2}".format(name, maps.bintype, maps.template)
+
+    return arrays, mapmsg
+
+
+@cache.memoize(timeout=_webmap_timeout)
+def get_cached_map_arrays(plateifu, release, parameter, channel=None, bintype=None, template=None):
+    ''' Get the map arrays from the web cache, shared by all the map routes
+
+    Only successful retrievals are cached.  See `_get_map_arrays`.
+    '''
+    return _get_map_arrays(plateifu, release, parameter, channel=channel,
+                           bintype=bintype, template=template)
 
-        # correct the stellar_sigma or emline_gsigma maps
-        if parameter == 'stellar_sigma' or parameter == 'emline_gsigma':
-            try:
-                data = data.inst_sigma_correction()
-            except MarvinError as e:
-                pass
-            else:
-                name = 'Corrected {0}'.format(name)
 
+def getWebMap(cube, parameter='emline_gflux', channel='ha_6564',
+              bintype=None, template=None, cached=False):
+    ''' Get and format a map for the web
+
+    If cached is True, the map arrays are read from the web cache.
+    '''
+
+    get_arrays = get_cached_map_arrays if cached else _get_map_arrays
+
+    webmap = None
+    try:
+        arrays, mapmsg = get_arrays(cube.plateifu, cube.release, parameter, channel=channel,
+                                    bintype=bintype, template=template)
     except Exception as e:
         mapmsg = 'Could not get map: {0}'.format(e)
     else:
-        vals = data.value
-        ivar = data.ivar
-        mask = data.mask
-        webmap = {'values': [it.tolist() for it in data.value],
-                  'ivar': [it.tolist() for it in data.ivar] if data.ivar is not None else None,
-                  'mask': [it.tolist() for it in data.mask] if data.mask is not None else None}
-        mapmsg = "{0}: {1}-{2}".format(name, maps.bintype, maps.template)
+        webmap = {'values': arrays['value'].tolist(),
+                  'ivar': arrays['ivar'].tolist() if arrays['ivar'] is not None else None,
+                  'mask': arrays['mask'].tolist() if arrays['mask'] is not None else None}
     return webmap, mapmsg
 
 
+def get_web_plot_params(dapver, parameter):
+    ''' Get the web plot params for a property, with the DAPPIXMASK bits
+
+    The plot params are built once per dapver and parameter.  A copy is
+    returned so that it can be modified.
+    '''
+
+    key = (dapver, parameter)
+
+    if key not in _plot_params:
+        plotparams = datamodel[dapver].get_plot_params(prop=parameter)
+        mask = _get_dappixmask()
+        baddata_labels = [it for it in plotparams['bitmasks'] if it != 'NOCOV']
+        baddata_bits = {it.lower(): int(mask.labels_to_bits(it)[0]) for it in baddata_labels}
+        plotparams['bits'] = {'nocov': int(mask.labels_to_bits('NOCOV')[0]),
+                              'badData': baddata_bits}
+        _plot_params[key] = plotparams
+
+    return copy.deepcopy(_plot_params[key])
+
+
+def _split_param(param):
+    ''' Split a parameter name in form of category:channel '''
+    try:
+        parameter, channel = str(param).split(':')
+    except ValueError as e:
+        parameter, channel = (str(param), None)
+    return parameter, channel
+
+
+def _split_bintemp(bintemp):
+    ''' Split a bintemp into its bintype and template '''
+    if bintemp:
+        bintype, temp = bintemp.split('-', 1)
+    else:
+        bintype, temp = (None, None)
+    return bintype, temp
+
+
 def buildMapDict(cube, params, dapver, bintemp=None):
     ''' Build a list of dictionaries of maps
 
     params - list of string parameter names in form of category_channel
 
+    The map arrays and plot params are cached, so repeated requests for the
+    same maps do not load them again.
+
         NOT GENERALIZED
     '''
     # split the bintemp
-    if bintemp:
-        bintype, temp = bintemp.split('-', 1)
-    else:
-        bintype, temp = (None, None)
+    bintype, temp = _split_bintemp(bintemp)
 
     mapdict = []
     params = params if isinstance(params, list) else [params]
 
     for param in params:
-        param = str(param)
-        try:
-            parameter, channel = param.split(':')
-        except ValueError as e:
-            parameter, channel = (param, None)
+        parameter, channel = _split_param(param)
         webmap, mapmsg = getWebMap(cube, parameter=parameter, channel=channel,
-                                   bintype=bintype, template=temp)
+                                   bintype=bintype, template=temp, cached=True)
 
-        plotparams = datamodel[dapver].get_plot_params(prop=parameter)
-        mask = Maskbit('MANGA_DAPPIXMASK')
-        baddata_labels = [it for it in plotparams['bitmasks'] if it != 'NOCOV']
-        baddata_bits = {it.lower(): int(mask.labels_to_bits(it)[0]) for it in baddata_labels}
-        plotparams['bits'] = {'nocov': int(mask.labels_to_bits('NOCOV')[0]),
-                              'badData': baddata_bits}
+        plotparams = get_web_plot_params(dapver, parameter)
         mapdict.append({'data': webmap, 'msg': mapmsg, 'plotparams': plotparams})
 
     anybad = [m['data'] is None for m in mapdict]
@@ -162,6 +243,48 @@ def buildMapDict(cube, params, dapver, bintemp=None):
     return mapdict
 
 
+@cache.memoize(timeout=_webmap_timeout)
+def render_web_map(plateifu, release, dapver, param, bintemp=None):
+    ''' Render a map as a PNG image, masked and scaled with its web plot params
+
+    Masked spaxels are transparent.  Returns the PNG bytes.
+    '''
+
+    import matplotlib.image
+
+    from marvin.utils.plot import colorbar
+    from marvin.utils.plot.map import mask_low_snr
+
+    parameter, channel = _split_param(param)
+    bintype, temp = _split_bintemp(bintemp)
+
+    arrays, __ = get_cached_map_arrays(plateifu, release, parameter, channel=channel,
+                                       bintype=bintype, template=temp)
+    plotparams = get_web_plot_params(dapver, parameter)
+
+    value = arrays['value']
+    bad = np.zeros(value.shape, dtype=bool)
+    if arrays['mask'] is not None:
+        bad |= _get_dappixmask().get_mask(plotparams['bitmasks'] + ['NOCOV'],
+                                          mask=arrays['mask'], dtype=bool)
+    if arrays['ivar'] is not None:
+        bad |= mask_low_snr(value, arrays['ivar'], plotparams['snr_min'])
+
+    image = np.ma.array(value, mask=bad)
+    cb_kws = colorbar._set_cbrange(image, {'percentile_clip': plotparams['percentile_clip'],
+                                           'symmetric': plotparams['symmetric']})
+    vmin, vmax = cb_kws['cbrange']
+
+    cmap = copy.copy(colorbar._set_cmap(plotparams['cmap']))
+    cmap.set_bad(alpha=0)
+
+    png = io.BytesIO()
+    matplotlib.image.imsave(png, image, cmap=cmap, vmin=vmin, vmax=vmax, origin='lower',
+                            format='png')
+
+    return png.getvalue()
+
+
 def make_nsa_dict(nsa, cols=None):
     ''' Make/rearrange the nsa dictionary of values '''
 
@@ -227,6 +350,35 @@ def get_nsa_dict(name, drpver, makenew=None):
     return nsadict
 
 
+def get_nsa_sample(name, drpver, cols):
+    ''' Gets the sample NSA columns needed for the NSA scatter plots
+
+    Reads only the needed columns from the columnar NSA store of the drpver,
+    if it has been built with `~marvin.utils.general.nsa_store.build_nsa_store`
+    and contains all of them. Otherwise falls back to `get_nsa_dict`.
+    '''
+
+    # the absmag_i and mtol_i columns are the i-band values of the array columns
+    basecols = {c: c.split('_i')[0] if 'absmag_i' in c or 'mtol_i' in c else c for c in cols}
+
+    store = get_nsa_store(drpver)
+    if store is not None and not set(basecols.values()).issubset(store.columns):
+        store = None
+
+    if store is not None:
+        columns = get_nsa_columns(store, list(set(basecols.values())) + ['plateifu'])
+        nsasamp = {c: np.asarray(columns[basecols[c]])[:, 5].tolist() if basecols[c] != c
+                   else np.asarray(columns[c]).tolist() for c in cols}
+        nsasamp['plateifu'] = np.asarray(columns['plateifu']).tolist()
+    else:
+        nsadict = get_nsa_dict(name, drpver)
+        nsasamp = {c: [n[0][basecols[c]][5] if basecols[c] != c else n[0][c] for n in nsadict]
+                   for c in cols}
+        nsasamp['plateifu'] = [n[1] for n in nsadict]
+
+    return nsasamp
+
+
 def remove_nans(datadict):
     ''' Removes objects with nan values from the NSA sample dictionary '''
 
@@ -525,6 +677,47 @@ class Galaxy(BaseWebView):
                 output = {'mapmsg': None, 'status': 1, 'maps': mapdict}
         return jsonify(result=output)
 
+    @route('/webmap/', methods=['GET'], endpoint='webmap')
+    def webMap(self):
+        ''' Route to return a single rendered or binary map
+
+        Returns a PNG image (format=png) or the compact binary value, ivar,
+        and mask arrays with the plot params (format=binary) of a property
+        for a plateifu and bintemp.  Both are cached, and the responses have
+        an ETag so that browsers can revalidate them.
+        '''
+        args = av.manual_parse(self, request, use_params='galaxy', required=['plateifu', 'property'])
+        plateifu = args.get('plateifu')
+        param = args.get('property')
+        bintemp = args.get('bintemp', None)
+        mapformat = args.get('format', None) or 'png'
+
+        try:
+            if mapformat == 'png':
+                content = render_web_map(plateifu, self._release, self._dapver, param,
+                                         bintemp=bintemp)
+                response = Response(content, mimetype='image/png')
+            else:
+                parameter, channel = _split_param(param)
+                bintype, temp = _split_bintemp(bintemp)
+                arrays, mapmsg = get_cached_map_arrays(plateifu, self._release, parameter,
+                                                       channel=channel, bintype=bintype,
+                                                       template=temp)
+                output = {'status': 1, 'mapmsg': mapmsg,
+                          'plotparams': get_web_plot_params(self._dapver, parameter),
+                          'data': {key: pack_array(value, compression='msgpack')
+                                   for key, value in arrays.items()}}
+                content = b''.join([arrays[key].tobytes() for key in sorted(arrays)
+                                    if arrays[key] is not None])
+                response = _compressed_response('msgpack', output)
+        except Exception as e:
+            return jsonify(result={'mapmsg': 'Could not get map: {0}'.format(e), 'status': -1})
+
+        response.set_etag(hashlib.sha1(content).hexdigest())
+        response.cache_control.max_age = _webmap_timeout
+
+        return response.make_conditional(request)
+
     @cache.cached(timeout=300, key_prefix='init_nsa')
     @route('/initnsaplot/', methods=['POST'], endpoint='initnsaplot')
     def init_nsaplot(self):
@@ -561,13 +754,10 @@ class Galaxy(BaseWebView):
                 # get the sample nsa parameters
                 try:
                     nsacache = 'nsa_{0}'.format(self._release.lower().replace('-', ''))
-                    nsadict = get_nsa_dict(nsacache, self._drpver)
+                    nsasamp = get_nsa_sample(nsacache, self._drpver, cols)
                 except Exception as e:
                     output = {'nsamsg': 'Failed to retrieve sample NSA: {0}'.format(e), 'status': -1, 'nsa': nsa, 'nsachoices': nsachoices}
                 else:
-                    #nsadict = [(_db_row_to_dict(n[0], remove_columns=['pk', 'catalogue_pk']), n[1]) for n in allnsa]
-                    nsasamp = {c: [n[0][c.split('_i')[0]][5] if 'absmag_i' in c or 'mtol_i' in c else n[0][c] for n in nsadict] for c in cols}
-                    nsasamp['plateifu'] = [n[1] for n in nsadict]
                     nsasamp = remove_nans(nsasamp)
                     nsa['sample'] = nsasamp
                     output = {'nsamsg': None, 'status': 1, 'nsa': nsa, 'nsachoices': nsachoices, 'nsaplotcols': cols}
@@ -25,7 +25,7 @@ from marvin.api.base import arg_validate as av
 from marvin.core.exceptions import MarvinError
 from marvin.tools.query import Query, doQuery
 from marvin.utils.datamodel.query.base import bestparams, query_params
-from marvin.utils.datamodel.query.forms import MarvinForm
+from marvin.utils.datamodel.query.forms import get_marvin_form
 from marvin.utils.general import getImagesByList
 from marvin.web.controllers import BaseWebView
 from marvin.web.extensions import limiter
@@ -83,7 +83,7 @@ class Search(BaseWebView):
         self.search['results'] = None
         self.search['errmsg'] = None
         self.search['returnparams'] = None
-        self.mf = MarvinForm()
+        self.mf = get_marvin_form()
 
     def before_request(self, *args, **kwargs):
         ''' Do these things before a request to any route '''
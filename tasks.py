@@ -182,9 +182,25 @@ def setup_utah(ctx, version=None):
     #       'wrapmarvin/mangawork.marvin_{0} \n startmarvin \n'.format(version))
 
 
+@task
+def build_nsa(ctx, drpver=None):
+    ''' Build the columnar NSA store used by the web for a DRP version '''
+    assert drpver is not None, 'A drpver is required to build the NSA store!'
+    ctx.run('python -c "from marvin.utils.general.nsa_store import build_nsa_store; '
+            'print(build_nsa_store(drpver=\'{0}\'))"'.format(drpver))
+
+
+@task
+def build_spaxel_summary(ctx, release=None):
+    ''' Build or update the spaxel summary used by npergood queries for a release '''
+    assert release is not None, 'A release is required to build the spaxel summary!'
+    ctx.run('python -c "from marvin.utils.general.spaxel_summary import build_spaxel_summary; '
+            'print(build_spaxel_summary(release=\'{0}\'))"'.format(release))
+
+
 os.chdir(os.path.dirname(__file__))
 
-ns = Collection(clean, deploy, setup_utah)
+ns = Collection(clean, deploy, setup_utah, build_nsa, build_spaxel_summary)
 docs = Collection('docs')
 docs.add_task(build_docs, 'build')
 docs.add_task(clean_docs, 'clean')